@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+📈 Banc d'essai des fournisseurs d'IA - DnD AI GameMaster
+
+Envoie un corpus de prompts à un ou plusieurs modèles de AVAILABLE_MODELS. Les
+appels passent par le chemin réel de l'application : `call_ai_model_optimized`,
+ou `call_ai_model_streaming` avec --stream. Le niveau de concurrence et le nombre
+de requêtes sont réglables.
+
+Par modèle, le rapport donne :
+- la latence p50 / p95 / p99 ;
+- le délai du premier token (en flux) ;
+- le débit de tokens de sortie ;
+- les taux d'erreurs et de 429 (réessais des SDK désactivés par défaut, voir
+  --max-retries) ;
+- le coût estimé par `calculate_estimated_cost`.
+
+Le rapport est émis en JSON pour comparer les exécutions dans le temps. Un
+fichier .jsonl reçoit une ligne par exécution.
+
+Exemples d'utilisation:
+  python scripts/bench_providers.py --models GPT-4o DeepSeek --requests 50 --concurrency 8
+  python scripts/bench_providers.py --stream --prompts prompts.json --output bench.jsonl
+  python scripts/bench_providers.py --mock --mock-latency lognormal:400:0.5 --requests 200 --concurrency 50
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from src.ai.chatbot import call_ai_model_optimized, call_ai_model_streaming  # noqa: E402
+from src.ai.models_config import AVAILABLE_MODELS, CHAT_DEFAULTS, calculate_estimated_cost  # noqa: E402
+
+SYSTEM_PROMPT = "Tu es le Maître du Jeu d'une partie de Donjons & Dragons. Réponds en quelques phrases."
+
+DEFAULT_PROMPTS = [
+    "J'entre dans la taverne et je cherche un informateur.",
+    "Je lance une boule de feu sur les gobelins.",
+    "Je fouille le coffre à la recherche de pièges.",
+    "Décris la forêt qui entoure le village.",
+    "Je tente de convaincre le garde de nous laisser passer.",
+]
+
+
+@dataclass
+class Sample:
+    """Mesure d'une requête."""
+
+    model: str
+    ok: bool
+    latency: float
+    ttft: Optional[float] = None
+    tokens_in: int = 0
+    tokens_out: int = 0
+    error_kind: Optional[str] = None  # "rate_limit", "timeout" ou "error"
+    error: Optional[str] = None
+
+
+def load_corpus(path: Optional[str]) -> List[List[Dict[str, str]]]:
+    """
+    Conversations du corpus.
+
+    Fichier .json : liste de prompts (chaînes) ou de conversations (listes de
+    messages). Autre fichier : un prompt par ligne non vide. Sans fichier : le
+    corpus intégré.
+    """
+    if path is None:
+        prompts: List[Any] = DEFAULT_PROMPTS
+    elif path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            prompts = json.load(f)
+    else:
+        with open(path, encoding="utf-8") as f:
+            prompts = [line.strip() for line in f if line.strip()]
+
+    corpus = []
+    for prompt in prompts:
+        if isinstance(prompt, list):
+            corpus.append(prompt)
+        else:
+            corpus.append([{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": str(prompt)}])
+    if not corpus:
+        raise ValueError("Corpus de prompts vide")
+    return corpus
+
+
+def classify_error(message: str) -> str:
+    lowered = message.lower()
+    if "rate limit" in lowered or "429" in lowered:
+        return "rate_limit"
+    if "timeout" in lowered or "timed out" in lowered:
+        return "timeout"
+    return "error"
+
+
+def run_request(model: str, messages: List[Dict[str, str]], stream: bool) -> Sample:
+    """Une requête sur le chemin de l'application, chronométrée."""
+    start = time.perf_counter()
+    try:
+        if stream:
+            result = call_ai_model_streaming(model, messages).result()
+            return Sample(model, True, result["duration"], result["ttft"], result["tokens_in"], result["tokens_out"])
+        result = call_ai_model_optimized(model, messages)
+        return Sample(model, True, time.perf_counter() - start, None, result["tokens_in"], result["tokens_out"])
+    except Exception as e:
+        return Sample(model, False, time.perf_counter() - start, error_kind=classify_error(str(e)), error=str(e))
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(p50, 4), "p95": round(p95, 4), "p99": round(p99, 4), "mean": round(float(np.mean(values)), 4)}
+
+
+def summarize(model: str, samples: List[Sample], wall_time: float) -> Dict[str, Any]:
+    """Statistiques d'un modèle : latence, premier token, débit, erreurs et coût."""
+    ok = [s for s in samples if s.ok]
+    total = len(samples)
+    # Débit de génération : tokens de sortie après le premier token (ou sur toute la requête hors flux)
+    rates = [s.tokens_out / (s.latency - (s.ttft or 0.0)) for s in ok if s.tokens_out and s.latency - (s.ttft or 0.0) > 0]
+    errors: Dict[str, int] = {}
+    for s in samples:
+        if not s.ok:
+            errors[s.error_kind] = errors.get(s.error_kind, 0) + 1
+    cost = sum(calculate_estimated_cost(model, s.tokens_in, s.tokens_out) for s in ok)
+    tokens_out = sum(s.tokens_out for s in ok)
+
+    return {
+        "requests": total,
+        "succeeded": len(ok),
+        "error_rate": round((total - len(ok)) / total, 4) if total else 0.0,
+        "rate_limit_rate": round(errors.get("rate_limit", 0) / total, 4) if total else 0.0,
+        "errors": errors,
+        "sample_errors": sorted({s.error for s in samples if s.error})[:3],
+        "latency_s": percentiles([s.latency for s in ok]),
+        "ttft_s": percentiles([s.ttft for s in ok if s.ttft is not None]),
+        "output_tokens_per_s": percentiles(rates),
+        "tokens_in": sum(s.tokens_in for s in ok),
+        "tokens_out": tokens_out,
+        "wall_time_s": round(wall_time, 4),
+        "throughput_rps": round(len(ok) / wall_time, 4) if wall_time > 0 else None,
+        "throughput_tokens_per_s": round(tokens_out / wall_time, 2) if wall_time > 0 else None,
+        "cost_total": round(cost, 6),
+        "cost_per_request": round(cost / len(ok), 6) if ok else None,
+    }
+
+
+def bench_model(
+    model: str, corpus: List[List[Dict[str, str]]], requests: int, concurrency: int, stream: bool, warmup: int
+) -> Dict[str, Any]:
+    """Exécute `requests` requêtes (après `warmup` non comptées) avec `concurrency` requêtes simultanées."""
+    for i in range(warmup):
+        run_request(model, corpus[i % len(corpus)], stream)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench") as pool:
+        samples = list(pool.map(lambda i: run_request(model, corpus[i % len(corpus)], stream), range(requests)))
+    return summarize(model, samples, time.perf_counter() - start)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=project_root, capture_output=True, text=True, check=True
+        )
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_summary(report: Dict[str, Any]) -> None:
+    """Tableau lisible sur stderr (le JSON reste seul sur stdout)."""
+
+    def fmt(value: Optional[float], scale: float = 1000, unit: str = "ms") -> str:
+        return f"{value * scale:.0f}{unit}" if value is not None else "-"
+
+    header = f"{'Modèle':<20} {'ok':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'ttft50':>8} {'tok/s':>7} {'429':>6} {'coût':>10}"
+    print(header, file=sys.stderr)
+    print("-" * len(header), file=sys.stderr)
+    for model, stats in report["models"].items():
+        latency, ttft = stats["latency_s"], stats["ttft_s"]
+        rate = stats["output_tokens_per_s"]["p50"]
+        print(
+            f"{model:<20} {stats['succeeded']:>3}/{stats['requests']:<3} {fmt(latency['p50']):>8} {fmt(latency['p95']):>8} "
+            f"{fmt(latency['p99']):>8} {fmt(ttft['p50']):>8} {fmt(rate, 1, ''):>7} "
+            f"{stats['rate_limit_rate']:>6.1%} ${stats['cost_total']:>9.4f}",
+            file=sys.stderr,
+        )
+
+
+def write_report(report: Dict[str, Any], output: Optional[str]) -> None:
+    """JSON sur stdout, dans un fichier, ou en une ligne ajoutée à un historique .jsonl."""
+    if output is None:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    elif output.endswith(".jsonl"):
+        with open(output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(report, ensure_ascii=False) + "\n")
+    else:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Fonction principale du script."""
+    parser = argparse.ArgumentParser(
+        description="📈 Banc d'essai des fournisseurs d'IA - DnD AI GameMaster",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split("Exemples d'utilisation:")[1],
+    )
+    parser.add_argument("--models", nargs="+", choices=list(AVAILABLE_MODELS), default=list(AVAILABLE_MODELS))
+    parser.add_argument("--requests", type=int, default=20, help="requêtes mesurées par modèle")
+    parser.add_argument("--concurrency", type=int, default=4, help="requêtes simultanées")
+    parser.add_argument("--warmup", type=int, default=1, help="requêtes d'échauffement non comptées, par modèle")
+    parser.add_argument("--prompts", help="corpus (.json : prompts ou conversations ; sinon un prompt par ligne)")
+    parser.add_argument("--stream", action="store_true", help="chemin en flux (mesure le premier token)")
+    parser.add_argument("--async-providers", action="store_true", help="appels via la boucle asyncio partagée")
+    parser.add_argument("--timeout", type=float, help=f"délai des appels (défaut: {CHAT_DEFAULTS['timeout']}s)")
+    parser.add_argument(
+        "--max-retries", type=int, default=0, help="réessais automatiques des SDK (0 : chaque 429 est comptée)"
+    )
+    parser.add_argument("--label", help="étiquette libre enregistrée avec le rapport")
+    parser.add_argument("--output", help="fichier JSON (ou .jsonl pour ajouter une ligne par exécution)")
+    mock = parser.add_argument_group("fournisseur simulé (src.ai.mock_provider)")
+    mock.add_argument("--mock", action="store_true", help="pointe les trois fournisseurs vers un serveur simulé local")
+    mock.add_argument("--mock-latency", default="lognormal:300:0.4")
+    mock.add_argument("--mock-tokens-per-second", type=float, default=50.0)
+    mock.add_argument("--mock-error-rate", type=float, default=0.0)
+    mock.add_argument("--mock-rate-limit-rate", type=float, default=0.0)
+    mock.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.CRITICAL)  # les erreurs sont comptées dans le rapport
+    corpus = load_corpus(args.prompts)
+    if args.timeout is not None:
+        CHAT_DEFAULTS["timeout"] = args.timeout
+    CHAT_DEFAULTS["async_providers"] = args.async_providers or CHAT_DEFAULTS["async_providers"]
+    os.environ["AI_MAX_RETRIES"] = str(args.max_retries)  # lu à la création (paresseuse) des clients
+
+    server = None
+    if args.mock:
+        from src.ai.mock_provider import MockProfile, MockProviderServer
+
+        profile = MockProfile(
+            latency=args.mock_latency,
+            tokens_per_second=args.mock_tokens_per_second,
+            error_rate=args.mock_error_rate,
+            rate_limit_rate=args.mock_rate_limit_rate,
+            seed=args.seed,
+        )
+        server = MockProviderServer(profile).start()
+        os.environ.update(server.env())  # avant la création (paresseuse) des clients
+
+    report: Dict[str, Any] = {
+        "run": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "label": args.label,
+            "commit": git_commit(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "stream": args.stream,
+            "async_providers": CHAT_DEFAULTS["async_providers"],
+            "timeout": CHAT_DEFAULTS["timeout"],
+            "max_retries": args.max_retries,
+            "prompts": len(corpus),
+            "mock": asdict(server.provider.profile) if server else None,
+        },
+        "models": {},
+    }
+    try:
+        for model in args.models:
+            print(f"▶️  {model}: {args.requests} requêtes, concurrence {args.concurrency}", file=sys.stderr)
+            report["models"][model] = bench_model(
+                model, corpus, args.requests, max(1, args.concurrency), args.stream, args.warmup
+            )
+    except KeyboardInterrupt:
+        print("⚠️  Interrompu : rapport partiel", file=sys.stderr)
+    finally:
+        if server is not None:
+            # Vu du serveur : avec --max-retries > 0, les 429 absorbées par les réessais n'apparaissent pas côté modèles
+            report["run"]["mock_server_stats"] = dict(server.provider.stats)
+            server.stop()
+
+    print_summary(report)
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,14 +8,76 @@ from functools import lru_cache
 from typing import Optional
 
 import anthropic
+import openai
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
 
+class HTTPPoolConfig:
+    """Pool de connexions des clients asynchrones (surchargeable par variables d'environnement)."""
+
+    MAX_CONNECTIONS = int(os.getenv("AI_HTTP_MAX_CONNECTIONS", "500"))  # requêtes simultanées par fournisseur
+    MAX_KEEPALIVE = int(os.getenv("AI_HTTP_MAX_KEEPALIVE", "100"))  # connexions inactives gardées ouvertes
+    KEEPALIVE_EXPIRY = float(os.getenv("AI_HTTP_KEEPALIVE_EXPIRY", "30"))  # secondes
+    CONNECT_TIMEOUT = float(os.getenv("AI_HTTP_CONNECT_TIMEOUT", "5"))  # secondes
+    READ_TIMEOUT = float(os.getenv("AI_HTTP_READ_TIMEOUT", "60"))  # secondes
+
+
+# URL de base par défaut quand {FOURNISSEUR}_BASE_URL n'est pas définie (absente = URL du SDK)
+DEFAULT_BASE_URLS = {"deepseek": "https://api.deepseek.com/v1"}
+
+
+def provider_base_url(provider: str) -> Optional[str]:
+    """
+    URL de base d'un fournisseur : OPENAI_BASE_URL, ANTHROPIC_BASE_URL ou DEEPSEEK_BASE_URL.
+
+    Permet de pointer les clients vers un serveur compatible, par exemple le
+    fournisseur simulé de `src.ai.mock_provider` pour les tests de charge.
+    """
+    return os.getenv(f"{provider.upper()}_BASE_URL") or DEFAULT_BASE_URLS.get(provider)
+
+
+def provider_max_retries() -> Optional[int]:
+    """
+    Réessais automatiques des SDK (AI_MAX_RETRIES ; absente = valeur par défaut du SDK, 2).
+
+    Le banc d'essai la met à 0 : chaque 429 reçue est alors comptée au lieu
+    d'être absorbée par un réessai.
+    """
+    value = os.getenv("AI_MAX_RETRIES")
+    return int(value) if value else None
+
+
+def _client_options(provider: str, api_key: str) -> dict:
+    options = {"api_key": api_key}
+    base_url = provider_base_url(provider)
+    if base_url:
+        options["base_url"] = base_url
+    max_retries = provider_max_retries()
+    if max_retries is not None:
+        options["max_retries"] = max_retries
+    return options
+
+
+def pooled_http_client(sdk):
+    """Client HTTP asynchrone du SDK (module openai ou anthropic) avec un pool keep-alive réglé.
+
+    Limits et Timeout sont pris dans le SDK lui-même pour rester alignés sur la
+    version de httpx qu'il embarque.
+    """
+    limits = type(sdk.DEFAULT_CONNECTION_LIMITS)(
+        max_connections=HTTPPoolConfig.MAX_CONNECTIONS,
+        max_keepalive_connections=HTTPPoolConfig.MAX_KEEPALIVE,
+        keepalive_expiry=HTTPPoolConfig.KEEPALIVE_EXPIRY,
+    )
+    timeout = sdk.Timeout(HTTPPoolConfig.READ_TIMEOUT, connect=HTTPPoolConfig.CONNECT_TIMEOUT)
+    return sdk.DefaultAsyncHttpxClient(limits=limits, timeout=timeout)
+
+
 class APIClientManager:
     """Gestionnaire centralisé des clients API avec mise en cache."""
 
@@ -32,7 +94,7 @@ class APIClientManager:
             if not api_key:
                 logger.warning("OPENAI_API_KEY n'est pas définie dans les variables d'environnement")
                 return None
-            cls._openai_client = OpenAI(api_key=api_key)
+            cls._openai_client = OpenAI(**_client_options("openai", api_key))
             logger.info("Client OpenAI initialisé")
         return cls._openai_client
 
@@ -45,7 +107,7 @@ class APIClientManager:
             if not api_key:
                 logger.warning("ANTHROPIC_API_KEY n'est pas définie dans les variables d'environnement")
                 return None
-            cls._anthropic_client = anthropic.Anthropic(api_key=api_key)
+            cls._anthropic_client = anthropic.Anthropic(**_client_options("anthropic", api_key))
             logger.info("Client Anthropic initialisé")
         return cls._anthropic_client
 
@@ -59,13 +121,38 @@ class APIClientManager:
                 logger.warning("DEEPSEEK_API_KEY n'est pas définie dans les variables d'environnement")
                 return None
             # Client compatible OpenAI pointant vers l'API DeepSeek
-            cls._deepseek_client = OpenAI(
-                api_key=api_key,
-                base_url=os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1"),
-            )
+            cls._deepseek_client = OpenAI(**_client_options("deepseek", api_key))
             logger.info("Client DeepSeek initialisé")
         return cls._deepseek_client
 
+    @classmethod
+    def create_async_client(cls, provider: str):
+        """
+        Crée un client asynchrone (AsyncOpenAI / AsyncAnthropic) à pool de connexions.
+
+        Non mis en cache : un client asynchrone est lié à la boucle d'événements
+        qui l'utilise, c'est à elle de le conserver.
+
+        Args:
+            provider: "openai", "anthropic" ou "deepseek"
+
+        Returns:
+            Le client, ou None si la clé API est manquante
+        """
+        env_key = f"{provider.upper()}_API_KEY"
+        api_key = os.getenv(env_key)
+        if not api_key:
+            logger.warning(f"{env_key} n'est pas définie dans les variables d'environnement")
+            return None
+
+        options = _client_options(provider, api_key)
+        if provider == "anthropic":
+            client = anthropic.AsyncAnthropic(**options, http_client=pooled_http_client(anthropic))
+        else:
+            client = AsyncOpenAI(**options, http_client=pooled_http_client(openai))
+        logger.info(f"Client asynchrone {provider} initialisé")
+        return client
+
     @classmethod
     def validate_api_keys(cls) -> dict:
         """Valide toutes les clés API disponibles."""
@@ -0,0 +1,383 @@
+"""
+Couche fournisseurs asynchrone : AsyncOpenAI / AsyncAnthropic sur une boucle dédiée.
+
+Avec les SDK synchrones, chaque appel occupe un thread de script Streamlit
+pendant toute l'attente réseau. Ici, une seule boucle asyncio tourne dans son
+propre thread. Elle porte toutes les requêtes en vol : des centaines ne coûtent
+que des coroutines. Les connexions keep-alive sont mises en commun dans un pool
+par fournisseur (`src.ai.api_client.HTTPPoolConfig`).
+
+Les threads de script soumettent des coroutines à la boucle. Ils attendent
+ensuite le résultat par tranches courtes (`concurrent.futures.Future`). Si
+Streamlit demande la relance ou l'arrêt du script (navigation vers une autre
+page, clic, fermeture de session), la requête est annulée dans la boucle. La
+connexion est alors rendue au pool au lieu d'attendre une réponse que personne
+n'affichera.
+
+Activée par AI_ASYNC_PROVIDERS=true (CHAT_DEFAULTS["async_providers"]).
+"""
+
+import asyncio
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, CancelledError, Future, wait
+from typing import Any, AsyncIterator, Callable, Coroutine, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from src.ai.api_client import APIClientManager
+from src.ai.chatbot import APIManager, ChatbotError, ChatStream, StreamEvent
+from src.ai.models_config import CHAT_DEFAULTS, ModelConfig, ModelProvider, get_model_config
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncProviderConfig:
+    """Paramètres de la boucle fournisseurs (surchargeables par variables d'environnement)."""
+
+    POLL_INTERVAL = float(os.getenv("AI_ASYNC_POLL_INTERVAL", "0.1"))  # secondes entre deux vérifications d'annulation
+    SHUTDOWN_TIMEOUT = float(os.getenv("AI_ASYNC_SHUTDOWN_TIMEOUT", "5"))  # secondes
+
+
+PROVIDER_LABELS = {
+    ModelProvider.OPENAI.value: "OpenAI",
+    ModelProvider.ANTHROPIC.value: "Anthropic",
+    ModelProvider.DEEPSEEK.value: "DeepSeek",
+}
+
+
+class ProviderCallCancelled(ChatbotError):
+    """Appel annulé avant sa réponse (navigation, fin de session ou annulation explicite)."""
+
+
+class ProviderEventLoop:
+    """Boucle asyncio dédiée (thread démon), partagée par tous les threads de script."""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._clients: Dict[str, Any] = {}  # lu et écrit uniquement depuis la boucle
+        self._owners: Dict[str, Set[Future]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Démarre la boucle si elle ne tourne pas déjà."""
+        with self._lock:
+            if self.running:
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run() -> None:
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            self._loop = loop
+            self._thread = threading.Thread(target=run, name="ai-provider-loop", daemon=True)
+            self._thread.start()
+        ready.wait()
+        logger.info("Boucle fournisseurs asynchrone démarrée")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Annule les requêtes en vol, ferme les pools de connexions et arrête la boucle."""
+        timeout = AsyncProviderConfig.SHUTDOWN_TIMEOUT if timeout is None else timeout
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+            self._owners.clear()
+        if loop is None or thread is None or not thread.is_alive():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"Arrêt incomplet de la boucle fournisseurs: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        if not thread.is_alive():
+            loop.close()
+
+    async def _shutdown(self) -> None:
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            try:
+                await client.close()
+            except Exception as e:
+                logger.warning(f"Fermeture d'un client asynchrone impossible: {e}")
+
+    def client(self, provider: str):
+        """Client asynchrone du fournisseur, créé au premier usage (à appeler depuis la boucle)."""
+        client = self._clients.get(provider)
+        if client is None:
+            client = APIClientManager.create_async_client(provider)
+            if client is not None:
+                self._clients[provider] = client
+        return client
+
+    def submit(self, coro: Coroutine, owner: Optional[str] = None) -> Future:
+        """Planifie une coroutine sur la boucle (démarrée au besoin).
+
+        Args:
+            coro: coroutine à exécuter
+            owner: regroupe les appels annulables ensemble (session Streamlit)
+        """
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        if owner is not None:
+            with self._lock:
+                self._owners.setdefault(owner, set()).add(future)
+            future.add_done_callback(lambda done: self._forget(owner, done))
+        return future
+
+    def _forget(self, owner: str, future: Future) -> None:
+        with self._lock:
+            futures = self._owners.get(owner)
+            if futures is not None:
+                futures.discard(future)
+                if not futures:
+                    del self._owners[owner]
+
+    def cancel(self, owner: str) -> int:
+        """Annule les appels en vol d'un propriétaire ; retourne le nombre d'appels annulés."""
+        with self._lock:
+            futures = list(self._owners.pop(owner, ()))
+        return sum(future.cancel() for future in futures)
+
+    def in_flight(self, owner: Optional[str] = None) -> int:
+        """Nombre d'appels suivis encore en cours (tous propriétaires si owner est None)."""
+        with self._lock:
+            if owner is not None:
+                return len(self._owners.get(owner, ()))
+            return sum(len(futures) for futures in self._owners.values())
+
+    def run(self, coro: Coroutine, owner: Optional[str] = None, should_cancel: Optional[Callable[[], bool]] = None) -> Any:
+        """
+        Exécute une coroutine sur la boucle et attend son résultat depuis un thread synchrone.
+
+        Raises:
+            ProviderCallCancelled: si `should_cancel()` devient vrai pendant l'attente
+                (la requête est alors annulée dans la boucle) ou si l'appel est annulé
+                par ailleurs (`cancel`, `stop`)
+        """
+        future = self.submit(coro, owner)
+        for _ in iter_completed([future], should_cancel):
+            pass
+        try:
+            return future.result()
+        except CancelledError:
+            raise ProviderCallCancelled("Appel au fournisseur annulé")
+
+
+def iter_completed(futures: Iterable[Future], should_cancel: Optional[Callable[[], bool]] = None) -> Iterator[Future]:
+    """
+    Produit les futures dans leur ordre d'achèvement, en vérifiant l'annulation entre deux attentes.
+
+    Les futures restantes sont annulées si `should_cancel()` devient vrai ou si
+    l'itération est abandonnée par l'appelant.
+
+    Raises:
+        ProviderCallCancelled: annulation demandée par `should_cancel`
+    """
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=AsyncProviderConfig.POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            yield from done
+            if pending and should_cancel is not None and should_cancel():
+                raise ProviderCallCancelled("Appel au fournisseur annulé : la page a été quittée")
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+_provider_loop: Optional[ProviderEventLoop] = None
+_provider_loop_lock = threading.Lock()
+
+
+def get_provider_loop() -> ProviderEventLoop:
+    """Boucle partagée du processus (démarrée au premier appel soumis, arrêtée à la sortie)."""
+    global _provider_loop
+    if _provider_loop is None:
+        with _provider_loop_lock:
+            if _provider_loop is None:
+                _provider_loop = ProviderEventLoop()
+                atexit.register(_provider_loop.stop)
+    return _provider_loop
+
+
+def script_interrupted(ctx) -> bool:
+    """Vrai si Streamlit a demandé la relance ou l'arrêt de l'exécution `ctx` (navigation, fermeture)."""
+    requests = getattr(ctx, "script_requests", None)
+    # Attribut privé de Streamlit : en son absence, on considère qu'il n'y a pas d'interruption
+    state = getattr(requests, "_state", None)
+    return getattr(state, "name", None) in ("RERUN", "STOP")
+
+
+def script_scope() -> Tuple[Optional[str], Callable[[], bool]]:
+    """Propriétaire (session) et test d'interruption du script courant ; neutres hors Streamlit."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None:
+        return None, lambda: False
+    return ctx.session_id, lambda: script_interrupted(ctx)
+
+
+def _resolve_model(model_name: str) -> Tuple[ModelConfig, str]:
+    model_config = get_model_config(model_name)
+    if model_config.provider not in PROVIDER_LABELS:
+        logger.warning(f"Modèle {model_name} non supporté, fallback vers GPT-4")
+        model_config = get_model_config("GPT-4")
+    return model_config, model_config.provider
+
+
+def _provider_error(model_config: ModelConfig, provider: str, e: Exception) -> ChatbotError:
+    if isinstance(e, ChatbotError):
+        return e
+    if provider == ModelProvider.OPENAI.value:
+        return APIManager._openai_error(model_config, e)
+    label = PROVIDER_LABELS[provider]
+    logger.error(f"Erreur {label} pour {model_config.name}: {e}")
+    return ChatbotError(f"Erreur {label}: {str(e)}")
+
+
+async def _open(model_config: ModelConfig, provider: str, messages: List[Dict], temperature: Optional[float], stream: bool):
+    """Envoie la requête au client asynchrone du fournisseur (réponse complète ou flux)."""
+    client = get_provider_loop().client(provider)
+    if client is None:
+        raise ChatbotError(f"Clé API {PROVIDER_LABELS[provider]} manquante")
+
+    options = {
+        "model": model_config.api_name,
+        "max_tokens": model_config.max_tokens,
+        "temperature": temperature or model_config.temperature_default,
+        "timeout": CHAT_DEFAULTS["timeout"],
+    }
+    if stream:
+        options["stream"] = True
+
+    if provider == ModelProvider.ANTHROPIC.value:
+        system_msg, user_messages = APIManager._anthropic_messages(messages)
+        return await client.messages.create(system=system_msg, messages=user_messages, **options)
+    if stream:
+        options["stream_options"] = {"include_usage": True}
+    return await client.chat.completions.create(messages=messages, **options)
+
+
+async def acall_model(model_name: str, messages: List[Dict], temperature: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Équivalent asynchrone de `call_ai_model_optimized`, à exécuter sur la boucle fournisseurs.
+
+    Returns:
+        Dict contenant 'content', 'tokens_in', 'tokens_out', 'model'
+
+    Raises:
+        ChatbotError: mêmes messages que les appels synchrones
+    """
+    model_config, provider = _resolve_model(model_name)
+    try:
+        response = await _open(model_config, provider, messages, temperature, stream=False)
+        if provider == ModelProvider.ANTHROPIC.value:
+            content = response.content[0].text
+            tokens_in, tokens_out = response.usage.input_tokens, response.usage.output_tokens
+        else:
+            content = response.choices[0].message.content
+            tokens_in, tokens_out = response.usage.prompt_tokens, response.usage.completion_tokens
+    except Exception as e:
+        raise _provider_error(model_config, provider, e)
+    return {"content": content, "tokens_in": tokens_in, "tokens_out": tokens_out, "model": model_config.name}
+
+
+async def _stream_events(provider: str, response) -> AsyncIterator[StreamEvent]:
+    """Événements d'un flux asynchrone, décodés par les mêmes fonctions que les flux synchrones."""
+    decode = (
+        APIManager._anthropic_stream_events if provider == ModelProvider.ANTHROPIC.value else APIManager._openai_stream_events
+    )
+    async for item in response:
+        for event in decode([item]):
+            yield event
+
+
+# Marqueurs de la file entre la boucle et le thread de script
+_OPENED = object()
+_END = object()
+
+
+async def _pump_stream(
+    model_config: ModelConfig, provider: str, messages: List[Dict], temperature: Optional[float], events: queue.Queue
+) -> None:
+    """Ouvre le flux puis recopie ses événements dans la file lue par le thread de script."""
+    response = None
+    try:
+        response = await _open(model_config, provider, messages, temperature, stream=True)
+        events.put(_OPENED)
+        async for event in _stream_events(provider, response):
+            events.put(event)
+    except asyncio.CancelledError:
+        events.put(ProviderCallCancelled("Flux du fournisseur annulé"))
+        raise
+    except Exception as e:
+        events.put(_provider_error(model_config, provider, e))
+    finally:
+        events.put(_END)
+        if response is not None:
+            try:
+                await response.close()  # rend la connexion au pool, y compris après annulation
+            except Exception as e:
+                logger.debug(f"Fermeture du flux {model_config.name} impossible: {e}")
+
+
+def _queued_events(events: queue.Queue, future: Future, should_cancel: Callable[[], bool]) -> Iterator[Any]:
+    """Lit la file alimentée par `_pump_stream` ; annule le flux si le script est interrompu ou abandonne la lecture."""
+    try:
+        while True:
+            try:
+                item = events.get(timeout=AsyncProviderConfig.POLL_INTERVAL)
+            except queue.Empty:
+                if should_cancel():
+                    raise ProviderCallCancelled("Flux du fournisseur annulé : la page a été quittée")
+                if future.cancelled():
+                    raise ProviderCallCancelled("Flux du fournisseur annulé")
+                continue
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        future.cancel()
+
+
+def call_model(model_name: str, messages: List[Dict], temperature: Optional[float] = None) -> Dict[str, Any]:
+    """Appel bloquant depuis un thread de script ; la requête vit sur la boucle partagée."""
+    owner, should_cancel = script_scope()
+    return get_provider_loop().run(acall_model(model_name, messages, temperature), owner, should_cancel)
+
+
+def stream_model(model_name: str, messages: List[Dict], temperature: Optional[float] = None) -> ChatStream:
+    """
+    Ouvre un flux sur la boucle partagée et le présente comme un `ChatStream` synchrone.
+
+    Les erreurs d'ouverture (clé, quota, rate limit) sont levées ici, avant tout affichage.
+    """
+    model_config, provider = _resolve_model(model_name)
+    owner, should_cancel = script_scope()
+    events: queue.Queue = queue.Queue()
+    start = time.perf_counter()
+    future = get_provider_loop().submit(_pump_stream(model_config, provider, messages, temperature, events), owner)
+
+    iterator = _queued_events(events, future, should_cancel)
+    first = next(iterator, _END)
+    if first is not _OPENED:  # flux vide ou fermé avant ouverture
+        raise ChatbotError(f"Erreur {PROVIDER_LABELS[provider]}: flux fermé avant la réponse")
+    return ChatStream(model_config.name, iterator, start, messages, f"Erreur {PROVIDER_LABELS[provider]}")
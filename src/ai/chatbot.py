@@ -5,13 +5,22 @@ Chatbot optimisé avec gestion d'erreurs et performance améliorées
 import logging
 import sys
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 import streamlit as st
 
 from src.ai.api_client import get_anthropic_client, get_deepseek_client, get_openai_client
-from src.ai.models_config import CHAT_DEFAULTS, ModelProvider, calculate_estimated_cost, get_model_config
+from src.ai.models_config import (
+    CHAT_DEFAULTS,
+    ModelProvider,
+    calculate_estimated_cost,
+    get_available_model_names,
+    get_model_config,
+)
+from src.analytics.live_performance import live_performance
+from src.analytics.session_resources import provider_wait
 from src.data.database import get_connection
+from src.data.performance_writer import enqueue_performance
 
 logger = logging.getLogger(__name__)
 
@@ -22,9 +31,206 @@ class ChatbotError(Exception):
     pass
 
 
+# Événements d'un flux : fragment de texte, ou mise à jour d'usage ({"tokens_in": n} / {"tokens_out": n})
+StreamEvent = Union[str, Dict[str, int]]
+
+
+class ChatStream:
+    """Réponse d'un modèle diffusée en flux.
+
+    L'itération produit les fragments de texte au fil de l'eau (compatible avec
+    `st.write_stream`) ; `result()` termine la lecture et retourne le contenu,
+    l'usage, le délai du premier token (`ttft`) et la durée totale.
+    """
+
+    def __init__(self, model: str, events: Iterator[StreamEvent], start: float, messages: List[Dict], error_label: str):
+        self.model = model
+        self._events = events
+        self._start = start  # perf_counter à l'envoi de la requête
+        self._error_label = error_label
+        self._parts: List[str] = []
+        self._done = False
+        # Usage estimé (~4 caractères par token) si le fournisseur ne le renvoie pas
+        self.tokens_in: Optional[int] = None
+        self.tokens_out: Optional[int] = None
+        self._prompt_chars = sum(len(str(m.get("content", ""))) for m in messages)
+        self.ttft: Optional[float] = None
+        self.duration: Optional[float] = None
+
+    def __iter__(self) -> Iterator[str]:
+        if self._done:
+            return
+        try:
+            with provider_wait():
+                for event in self._events:
+                    if isinstance(event, str):
+                        if not event:
+                            continue
+                        if self.ttft is None:
+                            self.ttft = time.perf_counter() - self._start
+                        self._parts.append(event)
+                        yield event
+                    else:
+                        self.tokens_in = event.get("tokens_in", self.tokens_in)
+                        self.tokens_out = event.get("tokens_out", self.tokens_out)
+        except ChatbotError:
+            raise
+        except Exception as e:
+            logger.error(f"{self._error_label} pendant le flux {self.model}: {e}")
+            raise ChatbotError(f"{self._error_label}: {str(e)}")
+        finally:
+            self.duration = time.perf_counter() - self._start
+        self._done = True
+
+    @property
+    def content(self) -> str:
+        return "".join(self._parts)
+
+    def result(self) -> Dict[str, Any]:
+        """Consomme le reste du flux et retourne content, tokens_in, tokens_out, model, ttft et duration."""
+        for _ in self:
+            pass
+        content = self.content
+        return {
+            "content": content,
+            "tokens_in": self.tokens_in if self.tokens_in is not None else self._prompt_chars // 4,
+            "tokens_out": self.tokens_out if self.tokens_out is not None else len(content) // 4,
+            "model": self.model,
+            "ttft": self.ttft,
+            "duration": self.duration,
+        }
+
+
 class APIManager:
     """Gestionnaire optimisé des appels API avec retry et timeout."""
 
+    @staticmethod
+    def _openai_error(model_config, e: Exception) -> ChatbotError:
+        """Traduit une erreur OpenAI (quota, rate limit, autre) en ChatbotError."""
+        error_str = str(e)
+        logger.error(f"Erreur OpenAI pour {model_config.name}: {e}")
+
+        # Détecter les erreurs de quota spécifiques
+        if (
+            "billing_hard_limit_reached" in error_str
+            or "insufficient_quota" in error_str
+            or "You exceeded your current quota" in error_str
+            or "Billing hard limit has been reached" in error_str
+        ):
+            return ChatbotError(
+                f"Quota OpenAI dépassé: Votre limite de facturation a été atteinte. Vérifiez votre compte OpenAI."
+            )
+        elif "rate limit" in error_str.lower() or "429" in error_str:
+            return ChatbotError(f"Rate limit OpenAI: Trop de requêtes. Veuillez patienter quelques secondes.")
+        else:
+            return ChatbotError(f"Erreur OpenAI: {str(e)}")
+
+    @staticmethod
+    def _anthropic_messages(messages: List[Dict]) -> Tuple[str, List[Dict]]:
+        """Sépare le message système des autres messages (l'API Anthropic les reçoit à part)."""
+        system_msg = ""
+        user_messages = []
+
+        for msg in messages:
+            if msg["role"] == "system":
+                system_msg = msg["content"]
+            else:
+                user_messages.append(msg)
+
+        # S'assurer qu'il y a au moins un message utilisateur
+        if not user_messages:
+            user_messages = [{"role": "user", "content": "Commençons l'aventure !"}]
+
+        return system_msg if system_msg else "Tu es un assistant IA.", user_messages
+
+    @staticmethod
+    def _openai_stream_events(response) -> Iterator[StreamEvent]:
+        """Fragments d'un flux chat.completions (OpenAI et API compatibles) ; l'usage arrive dans le dernier chunk."""
+        for chunk in response:
+            usage = getattr(chunk, "usage", None)
+            if usage is not None:
+                yield {"tokens_in": usage.prompt_tokens, "tokens_out": usage.completion_tokens}
+            for choice in chunk.choices or []:
+                if choice.delta is not None and choice.delta.content:
+                    yield choice.delta.content
+
+    @staticmethod
+    def _anthropic_stream_events(response) -> Iterator[StreamEvent]:
+        """Fragments d'un flux messages Anthropic (événements message_start / content_block_delta / message_delta)."""
+        for event in response:
+            if event.type == "message_start":
+                yield {"tokens_in": event.message.usage.input_tokens}
+            elif event.type == "content_block_delta":
+                text = getattr(event.delta, "text", None)
+                if text:
+                    yield text
+            elif event.type == "message_delta":
+                yield {"tokens_out": event.usage.output_tokens}
+
+    @staticmethod
+    def _open_openai_compatible_stream(client, model_config, messages: List[Dict], temperature: float):
+        return client.chat.completions.create(
+            model=model_config.api_name,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=model_config.max_tokens,
+            timeout=CHAT_DEFAULTS["timeout"],
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+
+    @staticmethod
+    def stream_openai_model(model_config, messages: List[Dict], temperature: float = None) -> ChatStream:
+        """Ouvre un flux OpenAI ; les erreurs d'ouverture (quota, rate limit) sont levées immédiatement."""
+        client = get_openai_client()
+        temperature = temperature or model_config.temperature_default
+        start = time.perf_counter()
+        try:
+            response = APIManager._open_openai_compatible_stream(client, model_config, messages, temperature)
+        except Exception as e:
+            raise APIManager._openai_error(model_config, e)
+        return ChatStream(model_config.name, APIManager._openai_stream_events(response), start, messages, "Erreur OpenAI")
+
+    @staticmethod
+    def stream_anthropic_model(model_config, messages: List[Dict], temperature: float = None) -> ChatStream:
+        """Ouvre un flux Anthropic."""
+        client = get_anthropic_client()
+        temperature = temperature or model_config.temperature_default
+        system_msg, user_messages = APIManager._anthropic_messages(messages)
+        start = time.perf_counter()
+        try:
+            response = client.messages.create(
+                model=model_config.api_name,
+                max_tokens=model_config.max_tokens,
+                temperature=temperature,
+                system=system_msg,
+                messages=user_messages,
+                timeout=CHAT_DEFAULTS["timeout"],
+                stream=True,
+            )
+        except Exception as e:
+            logger.error(f"Erreur Anthropic pour {model_config.name}: {e}")
+            raise ChatbotError(f"Erreur Anthropic: {str(e)}")
+        return ChatStream(
+            model_config.name, APIManager._anthropic_stream_events(response), start, messages, "Erreur Anthropic"
+        )
+
+    @staticmethod
+    def stream_deepseek_model(model_config, messages: List[Dict], temperature: float = None) -> ChatStream:
+        """Ouvre un flux DeepSeek (API compatible OpenAI)."""
+        client = get_deepseek_client()
+        if client is None:
+            raise ChatbotError("Clé API DeepSeek manquante")
+
+        temperature = temperature or model_config.temperature_default
+        start = time.perf_counter()
+        try:
+            response = APIManager._open_openai_compatible_stream(client, model_config, messages, temperature)
+        except Exception as e:
+            logger.error(f"Erreur DeepSeek pour {model_config.name}: {e}")
+            raise ChatbotError(f"Erreur DeepSeek: {str(e)}")
+        return ChatStream(model_config.name, APIManager._openai_stream_events(response), start, messages, "Erreur DeepSeek")
+
     @staticmethod
     def call_openai_model(model_config, messages: List[Dict], temperature: float = None) -> Dict[str, Any]:
         """Appelle un modèle OpenAI avec gestion d'erreurs."""
@@ -47,23 +253,7 @@ class APIManager:
                 "model": model_config.name,
             }
         except Exception as e:
-            error_str = str(e)
-            logger.error(f"Erreur OpenAI pour {model_config.name}: {e}")
-
-            # Détecter les erreurs de quota spécifiques
-            if (
-                "billing_hard_limit_reached" in error_str
-                or "insufficient_quota" in error_str
-                or "You exceeded your current quota" in error_str
-                or "Billing hard limit has been reached" in error_str
-            ):
-                raise ChatbotError(
-                    f"Quota OpenAI dépassé: Votre limite de facturation a été atteinte. Vérifiez votre compte OpenAI."
-                )
-            elif "rate limit" in error_str.lower() or "429" in error_str:
-                raise ChatbotError(f"Rate limit OpenAI: Trop de requêtes. Veuillez patienter quelques secondes.")
-            else:
-                raise ChatbotError(f"Erreur OpenAI: {str(e)}")
+            raise APIManager._openai_error(model_config, e)
 
     @staticmethod
     def call_anthropic_model(model_config, messages: List[Dict], temperature: float = None) -> Dict[str, Any]:
@@ -72,25 +262,13 @@ class APIManager:
         temperature = temperature or model_config.temperature_default
 
         try:
-            # Séparer le message système des autres messages
-            system_msg = ""
-            user_messages = []
-
-            for msg in messages:
-                if msg["role"] == "system":
-                    system_msg = msg["content"]
-                else:
-                    user_messages.append(msg)
-
-            # S'assurer qu'il y a au moins un message utilisateur
-            if not user_messages:
-                user_messages = [{"role": "user", "content": "Commençons l'aventure !"}]
+            system_msg, user_messages = APIManager._anthropic_messages(messages)
 
             response = client.messages.create(
                 model=model_config.api_name,
                 max_tokens=model_config.max_tokens,
                 temperature=temperature,
-                system=system_msg if system_msg else "Tu es un assistant IA.",
+                system=system_msg,
                 messages=user_messages,
                 timeout=CHAT_DEFAULTS["timeout"],
             )
@@ -152,17 +330,22 @@ def call_ai_model_optimized(model_name: str, messages: List[Dict], temperature:
     model_config = get_model_config(model_name)
 
     try:
-        if model_config.provider == ModelProvider.OPENAI.value:
-            return APIManager.call_openai_model(model_config, messages, temperature)
-        elif model_config.provider == ModelProvider.ANTHROPIC.value:
-            return APIManager.call_anthropic_model(model_config, messages, temperature)
-        elif model_config.provider == ModelProvider.DEEPSEEK.value:
-            return APIManager.call_deepseek_model(model_config, messages, temperature)
-        else:
-            # Fallback vers GPT-4 pour les modèles non supportés
-            logger.warning(f"Modèle {model_name} non supporté, fallback vers GPT-4")
-            fallback_config = get_model_config("GPT-4")
-            return APIManager.call_openai_model(fallback_config, messages, temperature)
+        with provider_wait():
+            if CHAT_DEFAULTS["async_providers"]:
+                from src.ai.async_providers import call_model  # import différé : le module dépend de celui-ci
+
+                return call_model(model_name, messages, temperature)
+            if model_config.provider == ModelProvider.OPENAI.value:
+                return APIManager.call_openai_model(model_config, messages, temperature)
+            elif model_config.provider == ModelProvider.ANTHROPIC.value:
+                return APIManager.call_anthropic_model(model_config, messages, temperature)
+            elif model_config.provider == ModelProvider.DEEPSEEK.value:
+                return APIManager.call_deepseek_model(model_config, messages, temperature)
+            else:
+                # Fallback vers GPT-4 pour les modèles non supportés
+                logger.warning(f"Modèle {model_name} non supporté, fallback vers GPT-4")
+                fallback_config = get_model_config("GPT-4")
+                return APIManager.call_openai_model(fallback_config, messages, temperature)
 
     except ChatbotError:
         raise  # Re-raise les erreurs de chatbot
@@ -171,6 +354,60 @@ def call_ai_model_optimized(model_name: str, messages: List[Dict], temperature:
         raise ChatbotError(f"Erreur inattendue: {str(e)}")
 
 
+def call_ai_model_streaming(model_name: str, messages: List[Dict], temperature: float = None) -> ChatStream:
+    """
+    Ouvre un flux de réponse sur le modèle d'IA approprié.
+
+    Les erreurs d'ouverture (clé, quota, rate limit) sont levées ici, avant tout
+    affichage ; celles survenant en cours de flux sont levées pendant l'itération.
+
+    Raises:
+        ChatbotError: En cas d'erreur dans l'appel API
+    """
+    model_config = get_model_config(model_name)
+
+    try:
+        with provider_wait():
+            if CHAT_DEFAULTS["async_providers"]:
+                from src.ai.async_providers import stream_model
+
+                return stream_model(model_name, messages, temperature)
+            if model_config.provider == ModelProvider.OPENAI.value:
+                return APIManager.stream_openai_model(model_config, messages, temperature)
+            elif model_config.provider == ModelProvider.ANTHROPIC.value:
+                return APIManager.stream_anthropic_model(model_config, messages, temperature)
+            elif model_config.provider == ModelProvider.DEEPSEEK.value:
+                return APIManager.stream_deepseek_model(model_config, messages, temperature)
+            else:
+                logger.warning(f"Modèle {model_name} non supporté, fallback vers GPT-4")
+                return APIManager.stream_openai_model(get_model_config("GPT-4"), messages, temperature)
+
+    except ChatbotError:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur inattendue avec le modèle {model_name}: {e}")
+        raise ChatbotError(f"Erreur inattendue: {str(e)}")
+
+
+def generate_reply(model_name: str, messages: List[Dict]) -> Dict[str, Any]:
+    """
+    Génère une réponse, affichée au fil des tokens si CHAT_DEFAULTS["stream"].
+
+    Returns:
+        Dict 'content', 'tokens_in', 'tokens_out', 'model', 'ttft' (None hors flux),
+        'duration' (secondes) et 'streamed' (réponse déjà affichée)
+    """
+    if not CHAT_DEFAULTS["stream"]:
+        start_time = time.time()
+        response = call_ai_model_optimized(model_name, messages)
+        return {**response, "ttft": None, "duration": time.time() - start_time, "streamed": False}
+
+    stream = call_ai_model_streaming(model_name, messages)
+    with st.chat_message("assistant"):
+        st.write_stream(stream)
+    return {**stream.result(), "streamed": True}
+
+
 def store_message_optimized(user_id: int, role: str, content: str, campaign_id: Optional[int] = None) -> None:
     """Stocke un message avec gestion d'erreurs optimisée."""
     try:
@@ -190,19 +427,12 @@ def store_message_optimized(user_id: int, role: str, content: str, campaign_id:
 def store_performance_optimized(
     user_id: int, model: str, latency: float, tokens_in: int, tokens_out: int, campaign_id: Optional[int] = None
 ) -> None:
-    """Stocke les données de performance avec calcul de coût."""
+    """Met en file les données de performance (écriture différée par lots, hors du tour de chat)."""
     try:
         estimated_cost = calculate_estimated_cost(model, tokens_in, tokens_out)
 
-        with get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """INSERT INTO performance_logs
-                   (user_id, model, latency, tokens_in, tokens_out, campaign_id)
-                   VALUES (?, ?, ?, ?, ?, ?)""",
-                (user_id, model, latency, tokens_in, tokens_out, campaign_id),
-            )
-            conn.commit()
+        live_performance.record(user_id, model, latency, tokens_in, tokens_out, estimated_cost)
+        enqueue_performance(user_id, model, latency, tokens_in, tokens_out, campaign_id, estimated_cost)
 
         logger.info(f"Performance enregistrée: {model}, {latency:.2f}s, coût estimé: ${estimated_cost:.4f}")
     except Exception as e:
@@ -210,6 +440,138 @@ def store_performance_optimized(
         # Ne pas propager l'erreur
 
 
+def store_turn_optimized(
+    user_id: int,
+    user_content: Optional[str],
+    assistant_content: Optional[str],
+    campaign_id: Optional[int] = None,
+    performance: Optional[Dict[str, Any]] = None,
+) -> None:
+    """Persiste un tour de chat (messages + performance) en une seule transaction."""
+    try:
+        from src.data.models import MessageManager
+
+        if performance:
+            performance = dict(performance)
+            tokens_in, tokens_out = performance.get("tokens_in", 0), performance.get("tokens_out", 0)
+            if performance.get("cost_estimate") is None:
+                performance["cost_estimate"] = calculate_estimated_cost(performance["model"], tokens_in, tokens_out)
+            live_performance.record(
+                user_id,
+                performance["model"],
+                performance["latency"],
+                tokens_in,
+                tokens_out,
+                performance["cost_estimate"],
+                ttft=performance.get("ttft"),
+            )
+
+        MessageManager.commit_turn(user_id, user_content, assistant_content, campaign_id, performance=performance)
+    except Exception as e:
+        logger.error(f"Erreur stockage tour de chat: {e}")
+        # Ne pas propager l'erreur pour ne pas casser l'expérience utilisateur
+        st.warning("Message non sauvegardé (erreur technique)")
+
+
+def format_timing(duration: float, ttft: Optional[float] = None) -> str:
+    """Libellé de latence : délai du premier token puis durée totale pour les réponses en flux."""
+    if ttft is None:
+        return f"⚡ {duration:.2f}s"
+    return f"⚡ 1er token {ttft:.2f}s · total {duration:.2f}s"
+
+
+def comparison_controls(model: str) -> List[str]:
+    """Sélecteur du mode comparaison ; retourne les modèles à comparer (vide si le mode est inactif)."""
+    with st.expander("⚖️ Comparer plusieurs modèles", expanded=False):
+        st.checkbox("Envoyer le prochain message à plusieurs modèles en parallèle", key="compare_mode")
+        st.multiselect(
+            "Modèles",
+            options=get_available_model_names(),
+            default=[model],
+            key="compare_models",
+            help="Les réponses s'affichent côte à côte ; gardez-en une pour la suite de la campagne.",
+        )
+    selection = st.session_state.get("compare_models") or []
+    return list(selection) if st.session_state.get("compare_mode") is True and len(selection) >= 2 else []
+
+
+def run_model_comparison(user_id: int, campaign_id: Optional[int], prompt: str, models: List[str]) -> None:
+    """Envoie l'historique + le message aux modèles en parallèle, affiche chaque réponse dès qu'elle arrive
+    et garde la comparaison en attente du choix du joueur (st.session_state.pending_comparison)."""
+    from src.ai.comparison import compare_models, new_comparison_id, store_comparison
+
+    messages = list(st.session_state.history) + [{"role": "user", "content": prompt}]
+    with st.chat_message("user"):
+        st.markdown(prompt)
+
+    progress = st.empty()
+    with progress.container():
+        slots = {}
+        for column, name in zip(st.columns(len(models)), models):
+            with column:
+                st.markdown(f"**{name}**")
+                slots[name] = st.empty()
+                slots[name].info("⏳ En attente de la réponse...")
+
+    results = {}
+    start = time.perf_counter()
+    for result in compare_models(models, messages):
+        results[result.model] = result
+        if result.ok:
+            slots[result.model].markdown(result.content)
+        else:
+            slots[result.model].error(f"❌ {result.error}")
+    wall_time = time.perf_counter() - start
+    progress.empty()
+
+    comparison_id = new_comparison_id()
+    ordered = [results[name] for name in models if name in results]
+    store_comparison(user_id, comparison_id, ordered, campaign_id)
+    st.session_state.pending_comparison = {
+        "id": comparison_id,
+        "prompt": prompt,
+        "wall_time": wall_time,
+        "results": [vars(result) for result in ordered],
+    }
+
+
+def keep_comparison_reply(user_id: int, campaign_id: Optional[int], prompt: str, content: str) -> None:
+    """Ajoute le message du joueur et la réponse retenue à l'historique de la campagne."""
+    st.session_state.history.append({"role": "user", "content": prompt})
+    st.session_state.history.append({"role": "assistant", "content": content})
+    # Performances déjà persistées par modèle lors de la comparaison
+    store_turn_optimized(user_id, prompt, content, campaign_id)
+    st.session_state.pending_comparison = None
+
+
+def show_pending_comparison(user_id: int, campaign_id: Optional[int]) -> None:
+    """Réponses côte à côte d'une comparaison, avec le choix de celle qui rejoint l'historique."""
+    pending = st.session_state.pending_comparison
+    results = pending["results"]
+    with st.chat_message("user"):
+        st.markdown(pending["prompt"])
+    serial_time = sum(result["latency"] for result in results)
+    st.caption(
+        f"⚖️ {len(results)} modèles en {pending['wall_time']:.2f}s (le plus lent) · {serial_time:.2f}s cumulés en série"
+    )
+
+    for column, result in zip(st.columns(len(results)), results):
+        with column:
+            st.markdown(f"**{result['model']}**")
+            if result["error"]:
+                st.error(f"❌ {result['error']}")
+                continue
+            st.markdown(result["content"])
+            st.caption(f"⚡ {result['latency']:.2f}s | 🎫 {result['tokens_out']} tokens | 💰 ${result['cost_estimate']:.4f}")
+            if st.button("✅ Garder cette réponse", key=f"keep_{pending['id']}_{result['model']}"):
+                keep_comparison_reply(user_id, campaign_id, pending["prompt"], result["content"])
+                st.rerun()
+
+    if st.button("🗑️ Abandonner la comparaison", key=f"discard_{pending['id']}"):
+        st.session_state.pending_comparison = None
+        st.rerun()
+
+
 def launch_chat_interface_optimized(user_id: int) -> None:
     """Interface de chat optimisée avec gestion d'erreurs améliorée."""
 
@@ -279,9 +641,20 @@ def launch_chat_interface_optimized(user_id: int) -> None:
     info_col1, info_col2 = st.columns([3, 1])
     with info_col1:
         st.caption(f"🤖 Modèle actif: {model}")
+        # Latence récente du modèle actif, lue en mémoire (pas d'accès base)
+        recent = live_performance.window_stats(model, 3600, user_id)
+        if recent:
+            first_token = f" · 1er token médian {recent['ttft_p50']:.2f}s" if recent["ttft_p50"] is not None else ""
+            st.caption(
+                f"⚡ Latence (1 h): médiane {recent['latency_p50']:.2f}s · p95 {recent['latency_p95']:.2f}s · "
+                f"dernière {recent['latency_last']:.2f}s{first_token} ({recent['count']} requêtes)"
+            )
     with info_col2:
         st.metric("💰 Coût/1K tokens", f"${model_config.cost_per_1k_input:.3f}")
 
+    # Mode comparaison : même historique envoyé à plusieurs modèles en parallèle
+    comparison_models = comparison_controls(model)
+
     # Initialisation de l'historique
     if "history" not in st.session_state:
         st.session_state.history = []
@@ -313,7 +686,16 @@ def launch_chat_interface_optimized(user_id: int) -> None:
     prompt = st.chat_input("Votre action ?")
     user_submitted = bool(prompt)
 
+    if user_submitted and comparison_models:
+        run_model_comparison(user_id, campaign_id, prompt, comparison_models)
+        user_submitted = False
+    if st.session_state.get("pending_comparison"):
+        show_pending_comparison(user_id, campaign_id)
+
     if auto_trigger or user_submitted:
+        # Message joueur persisté avec la réponse, dans la même transaction
+        pending_user_content = None
+        turn_performance = None
         if auto_trigger:
             # Retirer le flag pour ne pas boucler
             try:
@@ -350,200 +732,229 @@ def launch_chat_interface_optimized(user_id: int) -> None:
             with st.chat_message("user"):
                 st.markdown(prompt)
             st.session_state.history.append({"role": "user", "content": prompt})
-            store_message_optimized(user_id, "user", prompt, campaign_id)
-
-        # Générer la réponse avec gestion d'erreurs améliorée
-        with st.spinner("🎲 Le Maître du Jeu réfléchit..."):
-            reply = None
-            error_occurred = False
-            retry_count = 0
-            max_retries = 2
-
-            while retry_count <= max_retries and reply is None:
-                try:
-                    start_time = time.time()
-                    ai_response = call_ai_model_optimized(model, st.session_state.history)
-                    latency = time.time() - start_time
-
-                    reply = ai_response["content"]
+            pending_user_content = prompt
 
-                    # Stocker les performances seulement si succès
-                    store_performance_optimized(
-                        user_id, model, latency, ai_response["tokens_in"], ai_response["tokens_out"], campaign_id
-                    )
-
-                    # Afficher des métriques en temps réel
-                    cost = calculate_estimated_cost(model, ai_response["tokens_in"], ai_response["tokens_out"])
-                    st.caption(f"⚡ {latency:.2f}s | 🎫 {ai_response['tokens_out']} tokens | 💰 ${cost:.4f}")
-                    break
-
-                except ChatbotError as e:
-                    error_message = str(e)
-                    import os
-
-                    from src.ai.models_config import get_available_alternative_models
+        # Interruption possible pendant la réponse (nouvelle saisie, changement de page, annulation de l'appel)
+        try:
+            # Générer la réponse avec gestion d'erreurs améliorée
+            with st.spinner("🎲 Le Maître du Jeu réfléchit..."):
+                reply = None
+                streamed = False  # réponse déjà affichée au fil des tokens
+                error_occurred = False
+                retry_count = 0
+                max_retries = 2
+
+                while retry_count <= max_retries and reply is None:
+                    try:
+                        ai_response = generate_reply(model, st.session_state.history)
+                        latency = ai_response["duration"]
+
+                        reply = ai_response["content"]
+                        streamed = ai_response["streamed"]
+
+                        # Performances persistées avec le tour, seulement si succès
+                        turn_performance = {
+                            "model": model,
+                            "latency": latency,
+                            "tokens_in": ai_response["tokens_in"],
+                            "tokens_out": ai_response["tokens_out"],
+                            "ttft": ai_response["ttft"],
+                        }
+
+                        # Afficher des métriques en temps réel
+                        cost = calculate_estimated_cost(model, ai_response["tokens_in"], ai_response["tokens_out"])
+                        st.caption(
+                            f"{format_timing(latency, ai_response['ttft'])} | 🎫 {ai_response['tokens_out']} tokens | 💰 ${cost:.4f}"
+                        )
+                        break
 
-                    # Option expérimentale : basculement automatique
-                    auto_fallback = os.getenv("AI_AUTO_FALLBACK", "false").lower() == "true"
-                    available_alternatives = get_available_alternative_models(model)
+                    except ChatbotError as e:
+                        from src.ai.async_providers import ProviderCallCancelled
 
-                    # Détection des erreurs qui justifient un fallback automatique
-                    is_quota_error = (
-                        ("quota" in error_message.lower() and "dépassé" in error_message.lower())
-                        or ("billing" in error_message.lower() and "limit" in error_message.lower())
-                        or ("insufficient_quota" in error_message.lower())
-                    )
+                        if isinstance(e, ProviderCallCancelled):
+                            raise  # exécution du script interrompue : pas de réponse d'erreur
 
-                    is_timeout_error = (
-                        "timeout" in error_message.lower()
-                        or "timed out" in error_message.lower()
-                        or "request timed out" in error_message.lower()
-                    )
+                        error_message = str(e)
+                        import os
 
-                    is_rate_limit = "rate limit" in error_message.lower() or "429" in error_message
+                        from src.ai.models_config import get_available_alternative_models
 
-                    # Basculement automatique pour quota, timeout, ou rate limit (si configuré)
-                    should_auto_fallback = auto_fallback and available_alternatives and (is_quota_error or is_timeout_error)
+                        # Option expérimentale : basculement automatique
+                        auto_fallback = os.getenv("AI_AUTO_FALLBACK", "false").lower() == "true"
+                        available_alternatives = get_available_alternative_models(model)
 
-                    if should_auto_fallback:
-                        # Essayer automatiquement avec le premier modèle alternatif disponible
-                        fallback_model = available_alternatives[0]
-                        error_type = "quota épuisé" if is_quota_error else "timeout" if is_timeout_error else "erreur"
-                        logger.info(f"Basculement automatique de {model} vers {fallback_model} ({error_type})")
+                        # Détection des erreurs qui justifient un fallback automatique
+                        is_quota_error = (
+                            ("quota" in error_message.lower() and "dépassé" in error_message.lower())
+                            or ("billing" in error_message.lower() and "limit" in error_message.lower())
+                            or ("insufficient_quota" in error_message.lower())
+                        )
 
-                        try:
-                            # Réessayer avec le modèle alternatif
-                            ai_response = call_ai_model_optimized(fallback_model, st.session_state.history)
-                            latency = time.time() - start_time
+                        is_timeout_error = (
+                            "timeout" in error_message.lower()
+                            or "timed out" in error_message.lower()
+                            or "request timed out" in error_message.lower()
+                        )
 
-                            reply = f"🔄 **Basculement automatique** : {model} → {fallback_model}\n\n{ai_response['content']}"
+                        is_rate_limit = "rate limit" in error_message.lower() or "429" in error_message
 
-                            # Stocker les performances avec le nouveau modèle
-                            store_performance_optimized(
-                                user_id,
-                                fallback_model,
-                                latency,
-                                ai_response["tokens_in"],
-                                ai_response["tokens_out"],
-                                campaign_id,
-                            )
+                        # Basculement automatique pour quota, timeout, ou rate limit (si configuré)
+                        should_auto_fallback = (
+                            auto_fallback and available_alternatives and (is_quota_error or is_timeout_error)
+                        )
 
-                            # Afficher des métriques
-                            cost = calculate_estimated_cost(
-                                fallback_model, ai_response["tokens_in"], ai_response["tokens_out"]
+                        if should_auto_fallback:
+                            # Essayer automatiquement avec le premier modèle alternatif disponible
+                            fallback_model = available_alternatives[0]
+                            error_type = "quota épuisé" if is_quota_error else "timeout" if is_timeout_error else "erreur"
+                            logger.info(f"Basculement automatique de {model} vers {fallback_model} ({error_type})")
+
+                            try:
+                                # Réessayer avec le modèle alternatif
+                                ai_response = generate_reply(fallback_model, st.session_state.history)
+                                latency = ai_response["duration"]
+
+                                reply = (
+                                    f"🔄 **Basculement automatique** : {model} → {fallback_model}\n\n{ai_response['content']}"
+                                )
+                                streamed = ai_response["streamed"]
+
+                                # Performances rattachées au modèle de repli
+                                turn_performance = {
+                                    "model": fallback_model,
+                                    "latency": latency,
+                                    "tokens_in": ai_response["tokens_in"],
+                                    "tokens_out": ai_response["tokens_out"],
+                                    "ttft": ai_response["ttft"],
+                                }
+
+                                # Afficher des métriques
+                                cost = calculate_estimated_cost(
+                                    fallback_model, ai_response["tokens_in"], ai_response["tokens_out"]
+                                )
+                                st.caption(
+                                    f"{format_timing(latency, ai_response['ttft'])} | 🎫 {ai_response['tokens_out']} tokens | "
+                                    f"💰 ${cost:.4f} | 🔄 Modèle: {fallback_model}"
+                                )
+
+                                # Succès avec le modèle alternatif
+                                break
+
+                            except Exception as fallback_error:
+                                logger.warning(f"Échec du basculement automatique vers {fallback_model}: {fallback_error}")
+                                # Continuer avec le message d'erreur normal
+
+                        # Gestion spécifique par type d'erreur
+                        if is_quota_error:
+                            # Message d'erreur pour quota OpenAI
+                            alt_text = ""
+                            if available_alternatives:
+                                alt_text = f"\n\n🔄 **Modèles alternatifs disponibles :**\n"
+                                for alt_model in available_alternatives[:3]:  # Limite à 3 suggestions
+                                    alt_config = get_model_config(alt_model)
+                                    cost_comparison = alt_config.cost_per_1k_input
+                                    alt_text += f"• **{alt_model}** - ${cost_comparison:.4f}/1K tokens ({alt_config.description[:40]}...)\n"
+                                alt_text += f"\n✨ **Suggestion :** Changez de modèle dans les paramètres ou via le sélecteur en haut de page."
+                                if not auto_fallback:
+                                    alt_text += f"\n\n🔧 **Basculement automatique** : Ajoutez `AI_AUTO_FALLBACK=true` dans votre .env pour un basculement automatique."
+                            else:
+                                alt_text = f"\n\n⚠️ **Aucun modèle alternatif configuré.** Ajoutez des clés API pour Anthropic ou DeepSeek dans votre fichier .env."
+
+                            reply = (
+                                f"❌ **Quota {model} épuisé** ⛽\n\n"
+                                f"Votre limite de facturation a été atteinte.\n\n"
+                                f"🔧 **Solutions possibles :**\n"
+                                f"• Vérifiez votre compte et augmentez votre limite\n"
+                                f"• Attendez le renouvellement de votre quota mensuel{alt_text}\n\n"
+                                f"💡 Votre conversation est sauvegardée et vous pourrez continuer plus tard."
                             )
-                            st.caption(
-                                f"⚡ {latency:.2f}s | 🎫 {ai_response['tokens_out']} tokens | 💰 ${cost:.4f} | 🔄 Modèle: {fallback_model}"
+                            logger.error(f"Quota {model} épuisé: {e}")
+                            error_occurred = True
+                            break
+                        elif is_timeout_error:
+                            # Message d'erreur pour timeout
+                            alt_text = ""
+                            if available_alternatives:
+                                alt_text = f"\n\n🔄 **Modèles alternatifs disponibles :**\n"
+                                for alt_model in available_alternatives[:3]:
+                                    alt_config = get_model_config(alt_model)
+                                    cost_comparison = alt_config.cost_per_1k_input
+                                    alt_text += f"• **{alt_model}** - ${cost_comparison:.4f}/1K tokens ({alt_config.description[:40]}...)\n"
+                                alt_text += f"\n✨ **Suggestion :** Changez de modèle dans les paramètres."
+                                if not auto_fallback:
+                                    alt_text += f"\n\n🔧 **Basculement automatique** : `AI_AUTO_FALLBACK=true` dans votre .env."
+
+                            reply = (
+                                f"⏱️ **Timeout {model}** \n\n"
+                                f"Le modèle met trop de temps à répondre.\n\n"
+                                f"🔧 **Solutions :**\n"
+                                f"• Réessayez avec un message plus court\n"
+                                f"• Utilisez un autre modèle plus rapide{alt_text}\n\n"
+                                f"💡 Votre conversation reste sauvegardée."
                             )
-
-                            # Succès avec le modèle alternatif
+                            logger.error(f"Timeout {model}: {e}")
+                            error_occurred = True
                             break
-
-                        except Exception as fallback_error:
-                            logger.warning(f"Échec du basculement automatique vers {fallback_model}: {fallback_error}")
-                            # Continuer avec le message d'erreur normal
-
-                    # Gestion spécifique par type d'erreur
-                    if is_quota_error:
-                        # Message d'erreur pour quota OpenAI
-                        alt_text = ""
-                        if available_alternatives:
-                            alt_text = f"\n\n🔄 **Modèles alternatifs disponibles :**\n"
-                            for alt_model in available_alternatives[:3]:  # Limite à 3 suggestions
-                                alt_config = get_model_config(alt_model)
-                                cost_comparison = alt_config.cost_per_1k_input
-                                alt_text += f"• **{alt_model}** - ${cost_comparison:.4f}/1K tokens ({alt_config.description[:40]}...)\n"
-                            alt_text += f"\n✨ **Suggestion :** Changez de modèle dans les paramètres ou via le sélecteur en haut de page."
-                            if not auto_fallback:
-                                alt_text += f"\n\n🔧 **Basculement automatique** : Ajoutez `AI_AUTO_FALLBACK=true` dans votre .env pour un basculement automatique."
+                        elif is_rate_limit:
+                            # Rate limit - retry possible
+                            if retry_count < max_retries:
+                                st.warning(
+                                    f"⏳ Limite de débit {model} atteinte, nouvel essai dans quelques secondes... (tentative {retry_count + 1}/{max_retries + 1})"
+                                )
+                                time.sleep(2**retry_count)  # Backoff exponentiel
+                                retry_count += 1
+                                continue
+                            else:
+                                reply = f"❌ **Rate Limit {model} :** Trop de requêtes consécutives.\n\n💡 **Solution :** Attendez quelques minutes ou essayez un autre modèle dans les paramètres."
                         else:
-                            alt_text = f"\n\n⚠️ **Aucun modèle alternatif configuré.** Ajoutez des clés API pour Anthropic ou DeepSeek dans votre fichier .env."
-
-                        reply = (
-                            f"❌ **Quota {model} épuisé** ⛽\n\n"
-                            f"Votre limite de facturation a été atteinte.\n\n"
-                            f"🔧 **Solutions possibles :**\n"
-                            f"• Vérifiez votre compte et augmentez votre limite\n"
-                            f"• Attendez le renouvellement de votre quota mensuel{alt_text}\n\n"
-                            f"💡 Votre conversation est sauvegardée et vous pourrez continuer plus tard."
-                        )
-                        logger.error(f"Quota {model} épuisé: {e}")
+                            # Autres erreurs techniques
+                            reply = f"❌ **Erreur technique {model} :** {error_message}\n\n🔄 **Vous pouvez :** Réessayer votre dernière action ou reformuler votre message."
+                        logger.error(f"Erreur ChatbotError {model}: {e}")
                         error_occurred = True
                         break
-                    elif is_timeout_error:
-                        # Message d'erreur pour timeout
-                        alt_text = ""
-                        if available_alternatives:
-                            alt_text = f"\n\n🔄 **Modèles alternatifs disponibles :**\n"
-                            for alt_model in available_alternatives[:3]:
-                                alt_config = get_model_config(alt_model)
-                                cost_comparison = alt_config.cost_per_1k_input
-                                alt_text += f"• **{alt_model}** - ${cost_comparison:.4f}/1K tokens ({alt_config.description[:40]}...)\n"
-                            alt_text += f"\n✨ **Suggestion :** Changez de modèle dans les paramètres."
-                            if not auto_fallback:
-                                alt_text += f"\n\n🔧 **Basculement automatique** : `AI_AUTO_FALLBACK=true` dans votre .env."
-
-                        reply = (
-                            f"⏱️ **Timeout {model}** \n\n"
-                            f"Le modèle met trop de temps à répondre.\n\n"
-                            f"🔧 **Solutions :**\n"
-                            f"• Réessayez avec un message plus court\n"
-                            f"• Utilisez un autre modèle plus rapide{alt_text}\n\n"
-                            f"💡 Votre conversation reste sauvegardée."
-                        )
-                        logger.error(f"Timeout {model}: {e}")
-                        error_occurred = True
-                        break
-                    elif is_rate_limit:
-                        # Rate limit - retry possible
+
+                    except Exception as e:
                         if retry_count < max_retries:
                             st.warning(
-                                f"⏳ Limite de débit {model} atteinte, nouvel essai dans quelques secondes... (tentative {retry_count + 1}/{max_retries + 1})"
+                                f"⚠️ Erreur de connexion, nouvel essai... (tentative {retry_count + 1}/{max_retries + 1})"
                             )
-                            time.sleep(2**retry_count)  # Backoff exponentiel
+                            time.sleep(1)
                             retry_count += 1
                             continue
                         else:
-                            reply = f"❌ **Rate Limit {model} :** Trop de requêtes consécutives.\n\n💡 **Solution :** Attendez quelques minutes ou essayez un autre modèle dans les paramètres."
-                    else:
-                        # Autres erreurs techniques
-                        reply = f"❌ **Erreur technique {model} :** {error_message}\n\n🔄 **Vous pouvez :** Réessayer votre dernière action ou reformuler votre message."
-                    logger.error(f"Erreur ChatbotError {model}: {e}")
-                    error_occurred = True
-                    break
-
-                except Exception as e:
-                    if retry_count < max_retries:
-                        st.warning(f"⚠️ Erreur de connexion, nouvel essai... (tentative {retry_count + 1}/{max_retries + 1})")
-                        time.sleep(1)
-                        retry_count += 1
-                        continue
-                    else:
-                        reply = f"❌ **Erreur de connexion :** Impossible de contacter le serveur AI.\n\n🔄 **Suggestions :**\n- Vérifiez votre connexion internet\n- Réessayez dans quelques instants\n- La conversation reste sauvegardée"
-                        logger.error(f"Erreur inattendue dans chat après {max_retries} tentatives: {e}")
-                        error_occurred = True
-                        break
+                            reply = f"❌ **Erreur de connexion :** Impossible de contacter le serveur AI.\n\n🔄 **Suggestions :**\n- Vérifiez votre connexion internet\n- Réessayez dans quelques instants\n- La conversation reste sauvegardée"
+                            logger.error(f"Erreur inattendue dans chat après {max_retries} tentatives: {e}")
+                            error_occurred = True
+                            break
 
-        # Afficher la réponse et sauvegarder
-        response_container = st.chat_message("assistant")
-        with response_container:
-            st.markdown(reply)
-
-            # Bouton de retry si erreur
-            if error_occurred and not auto_trigger:
-                if st.button(f"🔄 Réessayer la dernière action", key=f"retry_{len(st.session_state.history)}"):
-                    # Ne pas ajouter la réponse d'erreur à l'historique
-                    st.rerun()
-
-        # Sauvegarder seulement si pas d'erreur ou si c'est une erreur informative
-        if reply and not error_occurred:
-            st.session_state.history.append({"role": "assistant", "content": reply})
-            store_message_optimized(user_id, "assistant", reply, campaign_id)
-        elif reply and error_occurred:
-            # Pour les erreurs, ajouter un message système informatif mais pas la réponse d'erreur complète
-            error_summary = "Erreur AI - voir message précédent pour détails"
-            st.session_state.history.append({"role": "assistant", "content": error_summary})
-            store_message_optimized(user_id, "assistant", error_summary, campaign_id)
+            # Afficher la réponse (sauf si déjà diffusée en flux) et sauvegarder
+            if not streamed:
+                response_container = st.chat_message("assistant")
+                with response_container:
+                    st.markdown(reply)
+
+                    # Bouton de retry si erreur
+                    if error_occurred and not auto_trigger:
+                        if st.button(f"🔄 Réessayer la dernière action", key=f"retry_{len(st.session_state.history)}"):
+                            # Ne pas ajouter la réponse d'erreur à l'historique
+                            st.rerun()
+
+            # Sauvegarder seulement si pas d'erreur ou si c'est une erreur informative
+            if reply and not error_occurred:
+                st.session_state.history.append({"role": "assistant", "content": reply})
+                store_turn_optimized(user_id, pending_user_content, reply, campaign_id, turn_performance)
+            elif reply and error_occurred:
+                # Pour les erreurs, ajouter un message système informatif mais pas la réponse d'erreur complète
+                error_summary = "Erreur AI - voir message précédent pour détails"
+                st.session_state.history.append({"role": "assistant", "content": error_summary})
+                store_turn_optimized(user_id, pending_user_content, error_summary, campaign_id)
+            elif pending_user_content:
+                store_turn_optimized(user_id, pending_user_content, None, campaign_id)
+            pending_user_content = None
+        finally:
+            if pending_user_content:
+                # Tour interrompu avant sa sauvegarde : message joueur persisté sans réponse, comme dans l'historique
+                store_turn_optimized(user_id, pending_user_content, None, campaign_id)
 
         # Auto-scroll vers le nouveau message + forcer un rerun
         st.markdown(
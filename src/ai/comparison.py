@@ -0,0 +1,172 @@
+"""
+Comparaison d'un même historique sur plusieurs modèles, en parallèle.
+
+Les appels partent simultanément dans un pool de threads (les SDK sont
+bloquants et relâchent le GIL pendant l'attente réseau) : la durée totale est
+celle du modèle le plus lent, pas la somme. Les résultats sont produits dans
+l'ordre d'arrivée pour être affichés au fil de l'eau. Avec AI_ASYNC_PROVIDERS,
+les appels sont des coroutines de la boucle fournisseurs partagée
+(`src.ai.async_providers`) et aucun thread n'est créé.
+"""
+
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from src.ai.chatbot import call_ai_model_optimized
+from src.ai.models_config import CHAT_DEFAULTS, calculate_estimated_cost
+from src.analytics.live_performance import live_performance
+from src.analytics.session_resources import provider_wait
+
+logger = logging.getLogger(__name__)
+
+
+class ComparisonConfig:
+    """Paramètres de la comparaison (surchargeables par variables d'environnement)."""
+
+    MAX_WORKERS = int(os.getenv("AI_COMPARE_MAX_WORKERS", "4"))  # appels simultanés au plus
+
+
+@dataclass
+class ComparisonResult:
+    """Réponse (ou erreur) d'un modèle pour une comparaison."""
+
+    model: str
+    content: Optional[str] = None
+    tokens_in: int = 0
+    tokens_out: int = 0
+    latency: float = 0.0
+    cost_estimate: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def new_comparison_id() -> str:
+    """Identifiant partagé par les lignes de performance d'une comparaison."""
+    return uuid.uuid4().hex
+
+
+def _result(model_name: str, response: Dict, latency: float) -> ComparisonResult:
+    tokens_in, tokens_out = response["tokens_in"], response["tokens_out"]
+    return ComparisonResult(
+        model=model_name,
+        content=response["content"],
+        tokens_in=tokens_in,
+        tokens_out=tokens_out,
+        latency=latency,
+        cost_estimate=calculate_estimated_cost(model_name, tokens_in, tokens_out),
+    )
+
+
+def _call_model(model_name: str, messages: List[Dict], temperature: Optional[float]) -> ComparisonResult:
+    start = time.perf_counter()
+    try:
+        response = call_ai_model_optimized(model_name, messages, temperature)
+    except Exception as e:
+        logger.warning(f"Comparaison: échec de {model_name}: {e}")
+        return ComparisonResult(model_name, latency=time.perf_counter() - start, error=str(e))
+    return _result(model_name, response, time.perf_counter() - start)
+
+
+async def _acall_model(model_name: str, messages: List[Dict], temperature: Optional[float]) -> ComparisonResult:
+    from src.ai.async_providers import acall_model
+
+    start = time.perf_counter()
+    try:
+        response = await acall_model(model_name, messages, temperature)
+    except Exception as e:
+        logger.warning(f"Comparaison: échec de {model_name}: {e}")
+        return ComparisonResult(model_name, latency=time.perf_counter() - start, error=str(e))
+    return _result(model_name, response, time.perf_counter() - start)
+
+
+def _compare_on_provider_loop(
+    models: List[str], messages: List[Dict], temperature: Optional[float]
+) -> Iterator[ComparisonResult]:
+    """Variante sans pool de threads : les appels sont des coroutines de la boucle fournisseurs."""
+    from src.ai.async_providers import get_provider_loop, iter_completed, script_scope
+
+    owner, should_cancel = script_scope()
+    loop = get_provider_loop()
+    futures = [loop.submit(_acall_model(model, messages, temperature), owner) for model in models]
+    for future in iter_completed(futures, should_cancel):
+        yield future.result()
+
+
+def compare_models(
+    model_names: Iterable[str],
+    messages: List[Dict],
+    temperature: Optional[float] = None,
+    max_workers: Optional[int] = None,
+) -> Iterator[ComparisonResult]:
+    """
+    Interroge les modèles en parallèle avec le même historique.
+
+    Args:
+        model_names: modèles à comparer (doublons ignorés)
+        messages: historique de conversation, partagé en lecture seule
+        temperature: température commune (sinon celle de chaque modèle)
+        max_workers: appels simultanés au plus (ComparisonConfig.MAX_WORKERS par défaut, pool de threads seulement)
+
+    Yields:
+        Un ComparisonResult par modèle, dans l'ordre d'arrivée ; les erreurs
+        sont portées par le résultat au lieu d'interrompre la comparaison
+    """
+    models = list(dict.fromkeys(model_names))
+    if not models:
+        return
+    if CHAT_DEFAULTS["async_providers"]:
+        with provider_wait():
+            yield from _compare_on_provider_loop(models, messages, temperature)
+        return
+
+    workers = max(1, min(len(models), max_workers or ComparisonConfig.MAX_WORKERS))
+
+    # Attente fournisseur attribuée à la page : durée murale, pas la somme des appels
+    with provider_wait():
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="model-compare") as pool:
+            futures = [pool.submit(_call_model, model, messages, temperature) for model in models]
+            for future in as_completed(futures):
+                yield future.result()
+
+
+def store_comparison(
+    user_id: int, comparison_id: str, results: Iterable[ComparisonResult], campaign_id: Optional[int] = None
+) -> List[int]:
+    """Persiste une ligne de performance par modèle ayant répondu (erreurs ignorées, jamais propagées)."""
+    from src.data.models import PerformanceManager
+
+    succeeded = [result for result in results if result.ok]
+    for result in succeeded:
+        live_performance.record(
+            user_id, result.model, result.latency, result.tokens_in, result.tokens_out, result.cost_estimate
+        )
+    if not succeeded:
+        return []
+
+    try:
+        return PerformanceManager.store_comparison(
+            user_id,
+            comparison_id,
+            [
+                {
+                    "model": result.model,
+                    "latency": result.latency,
+                    "tokens_in": result.tokens_in,
+                    "tokens_out": result.tokens_out,
+                    "cost_estimate": result.cost_estimate,
+                }
+                for result in succeeded
+            ],
+            campaign_id,
+        )
+    except Exception as e:
+        logger.error(f"Erreur stockage comparaison {comparison_id}: {e}")
+        return []
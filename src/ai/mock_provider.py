@@ -0,0 +1,501 @@
+"""
+Fournisseur d'IA simulé, compatible OpenAI / Anthropic, pour les tests de charge et de latence.
+
+Le serveur local parle les formats de transmission des API réelles :
+
+- chat completions d'OpenAI et de DeepSeek (`POST /v1/chat/completions`) ;
+- messages d'Anthropic (`POST /v1/messages`) ;
+- génération d'images (`POST /v1/images/generations`).
+
+Les réponses peuvent être complètes ou diffusées en flux (SSE). Plusieurs
+paramètres sont réglables :
+
+- la distribution de latence avant le premier token ;
+- le débit de tokens ;
+- les taux d'erreurs 500 et 429 injectées ;
+- la réponse : un gabarit, ou des réponses fixes choisies de façon
+  déterministe selon le prompt.
+
+Aucun coût et aucune limite de débit réelle.
+
+Lancement :
+    python -m src.ai.mock_provider --port 8765 --latency lognormal:400:0.5 --tokens-per-second 40
+
+puis exporter les variables affichées (OPENAI_BASE_URL, ANTHROPIC_BASE_URL,
+DEEPSEEK_BASE_URL et clés factices) avant de démarrer l'application.
+"""
+
+import argparse
+import base64
+import hashlib
+import itertools
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPLY = "Réponse simulée de {model} (requête {n}) : vous avez dit « {prompt} »."
+
+# PNG 1x1 transparent servi pour les images générées
+PIXEL_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Distribution de latence (secondes) à partir d'une spécification en millisecondes.
+
+    Formats : "fixed:300", "uniform:100:800", "lognormal:300:0.5" (médiane, sigma)
+    ou "normal:300:50" (moyenne, écart type, tronquée à 0).
+
+    Raises:
+        ValueError: spécification inconnue ou mal formée
+    """
+    kind, _, params = spec.partition(":")
+    try:
+        values = [float(value) for value in params.split(":")] if params else []
+    except ValueError:
+        raise ValueError(f"Latence invalide: {spec}")
+
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0] / 1000
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(max(values[0], 1e-3)), values[1]) / 1000
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1])) / 1000
+    raise ValueError(f"Latence invalide: {spec} (fixed:ms, uniform:min:max, lognormal:médiane:sigma, normal:moy:écart)")
+
+
+def split_tokens(text: str) -> List[str]:
+    """Découpe une réponse en « tokens » (un mot et l'espace qui le suit)."""
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokens estimés d'un prompt (~4 caractères par token, comme ChatStream)."""
+    return max(1, len(text) // 4)
+
+
+@dataclass
+class MockProfile:
+    """Comportement du fournisseur simulé."""
+
+    latency: str = "lognormal:300:0.4"  # délai avant le premier token (ms)
+    tokens_per_second: float = 50.0  # débit de sortie ; 0 = instantané
+    error_rate: float = 0.0  # part des requêtes en erreur 500
+    rate_limit_rate: float = 0.0  # part des requêtes en 429
+    retry_after: float = 1.0  # secondes annoncées par Retry-After sur les 429
+    reply: str = DEFAULT_REPLY  # gabarit : {model}, {prompt}, {n}
+    replies: List[str] = field(default_factory=list)  # réponses fixes, choisies par hachage du prompt
+    seed: Optional[int] = None
+
+    def __post_init__(self):
+        self.sample_latency = parse_latency(self.latency)
+
+
+class MockProvider:
+    """État partagé du serveur : tirages aléatoires reproductibles et compteurs."""
+
+    def __init__(self, profile: MockProfile):
+        self.profile = profile
+        self._rng = random.Random(profile.seed)
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"requests": 0, "errors": 0, "rate_limited": 0, "streams": 0}
+
+    def draw(self) -> Tuple[int, Optional[str], float]:
+        """Numéro de requête, incident injecté ("rate_limit", "error" ou None) et latence tirée."""
+        with self._lock:
+            n = next(self._counter)
+            roll = self._rng.random()
+            latency = self.profile.sample_latency(self._rng)
+            self.stats["requests"] += 1
+            if roll < self.profile.rate_limit_rate:
+                self.stats["rate_limited"] += 1
+                return n, "rate_limit", latency
+            if roll < self.profile.rate_limit_rate + self.profile.error_rate:
+                self.stats["errors"] += 1
+                return n, "error", latency
+        return n, None, latency
+
+    def count_stream(self) -> None:
+        with self._lock:
+            self.stats["streams"] += 1
+
+    def reply_for(self, model: str, prompt: str, n: int, max_tokens: Optional[int]) -> List[str]:
+        """Tokens de la réponse : réponse fixe (même prompt → même réponse) ou gabarit rendu."""
+        if self.profile.replies:
+            digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+            text = self.profile.replies[int.from_bytes(digest[:4], "big") % len(self.profile.replies)]
+        else:
+            text = self.profile.reply.format(model=model, prompt=prompt, n=n)
+        tokens = split_tokens(text) or [""]
+        return tokens[:max_tokens] if max_tokens else tokens
+
+    def token_delay(self) -> float:
+        rate = self.profile.tokens_per_second
+        return 1.0 / rate if rate > 0 else 0.0
+
+
+def _message_text(content: Any) -> str:
+    """Texte d'un contenu de message (chaîne ou liste de blocs)."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(block.get("text", "") for block in content if isinstance(block, dict))
+    return ""
+
+
+def _last_user_prompt(messages: List[Dict]) -> str:
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            return _message_text(message.get("content"))
+    return ""
+
+
+class MockProviderHandler(BaseHTTPRequestHandler):
+    """Routes OpenAI, Anthropic et images ; `server.provider` porte le MockProvider."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, comme les API réelles
+    server_version = "MockProvider/1.0"
+
+    @property
+    def provider(self) -> MockProvider:
+        return self.server.provider
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    # --- Réponses HTTP ---
+
+    def _send_json(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_sse(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _send_chunk(self, data: str) -> None:
+        raw = data.encode("utf-8")
+        self.wfile.write(f"{len(raw):x}\r\n".encode("ascii") + raw + b"\r\n")
+        self.wfile.flush()
+
+    def _end_sse(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _read_json(self) -> Optional[Dict]:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "JSON invalide", "type": "invalid_request_error"}})
+            return None
+
+    def _admit(self, anthropic_format: bool) -> Optional[int]:
+        """Tire la requête : numéro si elle doit aboutir, None si une erreur a été injectée.
+
+        Les 429 sont renvoyées immédiatement, comme un vrai limiteur ; les 500 après la latence.
+        """
+        n, incident, latency = self.provider.draw()
+        if incident != "rate_limit":
+            time.sleep(latency)
+        if incident:
+            self._send_incident(incident, anthropic_format)
+            return None
+        return n
+
+    def _send_incident(self, incident: str, anthropic_format: bool) -> None:
+        """Erreur injectée, au format de l'API imitée."""
+        if incident == "rate_limit":
+            status, kind, message = 429, "rate_limit_error", "Rate limit reached (simulated)"
+            headers = {"Retry-After": f"{self.provider.profile.retry_after:g}"}
+        else:
+            status, kind, message = 500, "api_error", "Internal server error (simulated)"
+            headers = {}
+        if anthropic_format:
+            payload = {"type": "error", "error": {"type": kind, "message": message}}
+        else:
+            code = "rate_limit_exceeded" if status == 429 else None
+            payload = {"error": {"message": message, "type": kind, "code": code}}
+        self._send_json(status, payload, headers)
+
+    # --- Routage ---
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", **self.provider.stats})
+        elif self.path.startswith("/mock-images/"):
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(PIXEL_PNG)))
+            self.end_headers()
+            self.wfile.write(PIXEL_PNG)
+        else:
+            self._send_json(404, {"error": {"message": f"Route inconnue: {self.path}", "type": "not_found"}})
+
+    def do_POST(self) -> None:
+        path = self.path.split("?", 1)[0].rstrip("/")
+        routes = {
+            "/v1/chat/completions": self._chat_completions,
+            "/chat/completions": self._chat_completions,
+            "/v1/messages": self._anthropic_messages,
+            "/v1/images/generations": self._images,
+            "/images/generations": self._images,
+        }
+        handler = routes.get(path)
+        if handler is None:
+            self._send_json(404, {"error": {"message": f"Route inconnue: {self.path}", "type": "not_found"}})
+            return
+        body = self._read_json()
+        if body is None:
+            return
+        try:
+            handler(body)
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug("Client déconnecté pendant la réponse simulée")
+
+    # --- OpenAI / DeepSeek ---
+
+    def _chat_completions(self, body: Dict) -> None:
+        n = self._admit(anthropic_format=False)
+        if n is None:
+            return
+
+        model = body.get("model", "mock")
+        messages = body.get("messages", [])
+        tokens = self.provider.reply_for(model, _last_user_prompt(messages), n, body.get("max_tokens"))
+        usage = {
+            "prompt_tokens": estimate_tokens("".join(_message_text(m.get("content")) for m in messages)),
+            "completion_tokens": len(tokens),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        completion_id, created = f"chatcmpl-mock-{n}", int(time.time())
+
+        if not body.get("stream"):
+            time.sleep(self.provider.token_delay() * len(tokens))
+            message = {"role": "assistant", "content": "".join(tokens)}
+            self._send_json(
+                200,
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+                    "usage": usage,
+                },
+            )
+            return
+
+        self.provider.count_stream()
+        base = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model}
+
+        def send(choices: List[Dict], **extra) -> None:
+            self._send_chunk(f"data: {json.dumps({**base, 'choices': choices, **extra})}\n\n")
+
+        self._start_sse()
+        send([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(self.provider.token_delay())
+            send([{"index": 0, "delta": {"content": token}, "finish_reason": None}])
+        send([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if (body.get("stream_options") or {}).get("include_usage"):
+            send([], usage=usage)
+        self._send_chunk("data: [DONE]\n\n")
+        self._end_sse()
+
+    # --- Anthropic ---
+
+    def _anthropic_messages(self, body: Dict) -> None:
+        n = self._admit(anthropic_format=True)
+        if n is None:
+            return
+
+        model = body.get("model", "mock")
+        messages = body.get("messages", [])
+        prompt_text = _message_text(body.get("system", "")) + "".join(_message_text(m.get("content")) for m in messages)
+        tokens = self.provider.reply_for(model, _last_user_prompt(messages), n, body.get("max_tokens"))
+        input_tokens, message_id = estimate_tokens(prompt_text), f"msg_mock_{n}"
+
+        if not body.get("stream"):
+            time.sleep(self.provider.token_delay() * len(tokens))
+            self._send_json(
+                200,
+                {
+                    "id": message_id,
+                    "type": "message",
+                    "role": "assistant",
+                    "model": model,
+                    "content": [{"type": "text", "text": "".join(tokens)}],
+                    "stop_reason": "end_turn",
+                    "stop_sequence": None,
+                    "usage": {"input_tokens": input_tokens, "output_tokens": len(tokens)},
+                },
+            )
+            return
+
+        self.provider.count_stream()
+
+        def send(event: str, payload: Dict) -> None:
+            self._send_chunk(f"event: {event}\ndata: {json.dumps({'type': event, **payload})}\n\n")
+
+        self._start_sse()
+        message = {
+            "id": message_id,
+            "type": "message",
+            "role": "assistant",
+            "model": model,
+            "content": [],
+            "stop_reason": None,
+            "stop_sequence": None,
+            "usage": {"input_tokens": input_tokens, "output_tokens": 1},
+        }
+        send("message_start", {"message": message})
+        send("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(self.provider.token_delay())
+            send("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": token}})
+        send("content_block_stop", {"index": 0})
+        send(
+            "message_delta",
+            {"delta": {"stop_reason": "end_turn", "stop_sequence": None}, "usage": {"output_tokens": len(tokens)}},
+        )
+        send("message_stop", {})
+        self._end_sse()
+
+    # --- Images ---
+
+    def _images(self, body: Dict) -> None:
+        n = self._admit(anthropic_format=False)
+        if n is None:
+            return
+
+        count = int(body.get("n") or 1)
+        if body.get("response_format") == "b64_json":
+            images = [{"b64_json": base64.b64encode(PIXEL_PNG).decode("ascii")} for _ in range(count)]
+        else:
+            host, port = self.server.server_address[:2]
+            images = [{"url": f"http://{host}:{port}/mock-images/{n}-{i}.png"} for i in range(count)]
+        for image in images:
+            image["revised_prompt"] = body.get("prompt", "")
+        self._send_json(200, {"created": int(time.time()), "data": images})
+
+
+class MockProviderServer:
+    """Serveur simulé démarré dans un thread d'arrière-plan (utilisable en contexte `with`)."""
+
+    def __init__(self, profile: Optional[MockProfile] = None, host: str = "127.0.0.1", port: int = 0):
+        self.provider = MockProvider(profile or MockProfile())
+        self._server = ThreadingHTTPServer((host, port), MockProviderHandler)
+        self._server.daemon_threads = True
+        self._server.provider = self.provider
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> Dict[str, str]:
+        """Variables d'environnement pointant les trois fournisseurs vers ce serveur (clés factices)."""
+        return {
+            "OPENAI_BASE_URL": f"{self.url}/v1",
+            "ANTHROPIC_BASE_URL": self.url,
+            "DEEPSEEK_BASE_URL": f"{self.url}/v1",
+            "OPENAI_API_KEY": "sk-mock",
+            "ANTHROPIC_API_KEY": "sk-ant-mock",
+            "DEEPSEEK_API_KEY": "sk-mock",
+        }
+
+    def start(self) -> "MockProviderServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-provider", daemon=True)
+        self._thread.start()
+        logger.info(f"Fournisseur simulé à l'écoute sur {self.url}")
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> "MockProviderServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def load_replies(path: str) -> List[str]:
+    """Réponses fixes : liste JSON de chaînes, ou une réponse par ligne non vide."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if path.endswith(".json"):
+        return [str(reply) for reply in json.loads(text)]
+    return [line for line in text.splitlines() if line.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Fournisseur d'IA simulé (OpenAI / Anthropic / DeepSeek)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default=MockProfile.latency, help="fixed:ms, uniform:min:max, lognormal:médiane:sigma")
+    parser.add_argument("--tokens-per-second", type=float, default=MockProfile.tokens_per_second)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="part des requêtes en erreur 500 (0-1)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="part des requêtes en 429 (0-1)")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--reply", default=DEFAULT_REPLY, help="gabarit de réponse ({model}, {prompt}, {n})")
+    parser.add_argument("--replies-file", help="réponses fixes (.json ou une par ligne)")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    profile = MockProfile(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        reply=args.reply,
+        replies=load_replies(args.replies_file) if args.replies_file else [],
+        seed=args.seed,
+    )
+    server = MockProviderServer(profile, args.host, args.port)
+    print(f"Fournisseur simulé sur {server.url} — variables à exporter :")
+    for name, value in server.env().items():
+        print(f"export {name}={value}")
+    try:
+        server.start()
+        server._thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -2,6 +2,7 @@
 Configuration des modèles IA et paramètres
 """
 
+import os
 from dataclasses import dataclass
 from enum import Enum
 from typing import Dict, List
@@ -147,4 +148,7 @@ CHAT_DEFAULTS = {
     "timeout": 30,  # secondes
     "retry_attempts": 3,
     "retry_delay": 1.0,  # secondes
+    "stream": os.getenv("AI_STREAMING", "true").lower() == "true",  # réponses affichées au fil des tokens
+    # Appels portés par la boucle asyncio partagée (src.ai.async_providers) plutôt que par le thread de script
+    "async_providers": os.getenv("AI_ASYNC_PROVIDERS", "false").lower() == "true",
 }
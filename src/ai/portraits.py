@@ -7,6 +7,7 @@ import os
 from typing import List, Optional
 from urllib.parse import quote_plus
 
+from ..analytics.session_resources import provider_wait
 from ..data.models import update_campaign_portrait, update_character_portrait
 from .api_client import get_openai_client
 
@@ -292,7 +293,7 @@ class PortraitGenerator:
             if not cls._primary_disabled_due_to_quota:
                 try:
                     primary_config = cls.MODEL_CONFIGS.get(cls.PRIMARY_IMAGE_MODEL, cls.DEFAULT_CONFIG)
-                    response = client.images.generate(prompt=prompt, model=cls.PRIMARY_IMAGE_MODEL, **primary_config)
+                    response = cls._generate_image(client, prompt=prompt, model=cls.PRIMARY_IMAGE_MODEL, **primary_config)
                     image_url = response.data[0].url
                     logger.info(f"[Portraits] Succès {cls.PRIMARY_IMAGE_MODEL}")
                     return image_url
@@ -306,7 +307,7 @@ class PortraitGenerator:
             # 2) Fallback vers dall-e-2
             try:
                 dalle2_config = cls.MODEL_CONFIGS.get(cls.SECONDARY_IMAGE_MODEL, cls.DEFAULT_CONFIG)
-                response = client.images.generate(prompt=prompt, model=cls.SECONDARY_IMAGE_MODEL, **dalle2_config)
+                response = cls._generate_image(client, prompt=prompt, model=cls.SECONDARY_IMAGE_MODEL, **dalle2_config)
                 image_url = response.data[0].url
                 logger.info(f"[Portraits] Succès {cls.SECONDARY_IMAGE_MODEL}")
                 return image_url
@@ -332,6 +333,12 @@ class PortraitGenerator:
                 return cls._placeholder_portrait_url(name)
             return cls._fallback_or_none(name)
 
+    @staticmethod
+    def _generate_image(client, **kwargs):
+        """Appel de génération d'image, compté comme attente fournisseur de la page courante."""
+        with provider_wait():
+            return client.images.generate(**kwargs)
+
     @staticmethod
     def _placeholder_portrait_url(name: str) -> str:
         """Retourne une URL d'avatar de secours (Dicebear PNG) basée sur le nom."""
@@ -366,7 +373,7 @@ class PortraitGenerator:
             if not cls._primary_disabled_due_to_quota:
                 try:
                     primary_config = cls.MODEL_CONFIGS.get(cls.PRIMARY_IMAGE_MODEL, cls.DEFAULT_CONFIG)
-                    resp = client.images.generate(prompt=prompt, model=cls.PRIMARY_IMAGE_MODEL, **primary_config)
+                    resp = cls._generate_image(client, prompt=prompt, model=cls.PRIMARY_IMAGE_MODEL, **primary_config)
                     return resp.data[0].url, cls.PRIMARY_IMAGE_MODEL
                 except Exception as primary_err:
                     if cls._is_quota_error(primary_err):
@@ -375,7 +382,7 @@ class PortraitGenerator:
             # 2) Fallback vers dall-e-2
             try:
                 dalle2_config = cls.MODEL_CONFIGS.get(cls.SECONDARY_IMAGE_MODEL, cls.DEFAULT_CONFIG)
-                resp = client.images.generate(prompt=prompt, model=cls.SECONDARY_IMAGE_MODEL, **dalle2_config)
+                resp = cls._generate_image(client, prompt=prompt, model=cls.SECONDARY_IMAGE_MODEL, **dalle2_config)
                 return resp.data[0].url, cls.SECONDARY_IMAGE_MODEL
             except Exception:
                 pass
@@ -433,7 +440,7 @@ class PortraitGenerator:
             if not cls._primary_disabled_due_to_quota:
                 try:
                     primary_config = cls.MODEL_CONFIGS.get(cls.PRIMARY_IMAGE_MODEL, cls.DEFAULT_CONFIG)
-                    resp = client.images.generate(prompt=prompt, model=cls.PRIMARY_IMAGE_MODEL, **primary_config)
+                    resp = cls._generate_image(client, prompt=prompt, model=cls.PRIMARY_IMAGE_MODEL, **primary_config)
                     return resp.data[0].url, cls.PRIMARY_IMAGE_MODEL
                 except Exception as primary_err:
                     if cls._is_quota_error(primary_err):
@@ -442,7 +449,7 @@ class PortraitGenerator:
             # 2) Fallback vers dall-e-2
             try:
                 dalle2_config = cls.MODEL_CONFIGS.get(cls.SECONDARY_IMAGE_MODEL, cls.DEFAULT_CONFIG)
-                resp = client.images.generate(prompt=prompt, model=cls.SECONDARY_IMAGE_MODEL, **dalle2_config)
+                resp = cls._generate_image(client, prompt=prompt, model=cls.SECONDARY_IMAGE_MODEL, **dalle2_config)
                 return resp.data[0].url, cls.SECONDARY_IMAGE_MODEL
             except Exception:
                 pass
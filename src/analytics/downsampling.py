@@ -0,0 +1,76 @@
+"""
+Réduction de séries temporelles pour l'affichage (Largest-Triangle-Three-Buckets)
+
+LTTB conserve la forme visuelle d'une série (pics, creux) avec un nombre fixe
+de points, ce qui borne la taille des graphiques envoyés au navigateur.
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Indices des points conservés par LTTB (premier et dernier toujours inclus).
+
+    Args:
+        x: abscisses croissantes (numériques)
+        y: ordonnées
+        threshold: nombre de points voulus
+
+    Returns:
+        Indices triés ; tous les indices si la série est déjà assez courte
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    every = (n - 2) / (threshold - 2)
+    edges = (np.arange(threshold - 1) * every).astype(np.int64) + 1
+    edges[-1] = n - 1
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Point moyen du seau suivant (le dernier point pour le dernier seau)
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        indices[i + 1] = a
+    return indices
+
+
+def downsample(df: pd.DataFrame, x: str, y: str, max_points: int, by: Optional[str] = None) -> pd.DataFrame:
+    """
+    Réduit chaque série (une par valeur de `by`) à `max_points` points au plus.
+
+    Args:
+        df: données triables sur `x` (dates ou nombres)
+        x: colonne des abscisses
+        y: colonne dont la forme est préservée
+        max_points: points conservés par série
+        by: colonne identifiant les séries (ex. "model")
+
+    Returns:
+        Sous-ensemble des lignes de df, trié par série puis par x
+    """
+    if df.empty:
+        return df
+
+    groups = df.groupby(by, sort=False, observed=True) if by else [(None, df)]
+    parts = []
+    for _, group in groups:
+        group = group.sort_values(x)
+        xs = group[x]
+        if not pd.api.types.is_numeric_dtype(xs):
+            xs = pd.to_datetime(xs).astype("int64")
+        parts.append(group.iloc[lttb_indices(xs.to_numpy(), group[y].to_numpy(), max_points)])
+    return pd.concat(parts)
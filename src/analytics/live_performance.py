@@ -0,0 +1,130 @@
+"""
+Échantillons de performance récents en mémoire, par modèle.
+
+Le chemin du chat alimente un anneau colonnaire par modèle (horodatage,
+utilisateur, latence, tokens, coût). Les vues « temps réel » (dernière heure,
+24 h, latence du modèle actif) s'y agrègent en microsecondes, sans accès à la
+base. Les données sont propres au processus et perdues au redémarrage ;
+l'historique complet reste dans performance_logs.
+"""
+
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from src.analytics.ring_buffer import ColumnarRingBuffer
+from src.data.database import epoch_ms
+
+
+class LivePerformanceConfig:
+    """Paramètres du tampon (surchargeables par variables d'environnement)."""
+
+    CAPACITY = int(os.getenv("PERF_LIVE_CAPACITY", "2048"))  # échantillons par modèle
+
+
+SAMPLE_COLUMNS = {
+    "timestamp": np.int64,  # ms epoch
+    "user_id": np.int64,
+    "latency": np.float64,
+    "tokens_in": np.int64,
+    "tokens_out": np.int64,
+    "cost": np.float64,
+    "ttft": np.float64,  # délai du premier token (s), NaN pour les réponses non diffusées en flux
+}
+
+
+class LivePerformance:
+    """Anneaux d'échantillons récents, un par modèle."""
+
+    def __init__(self, capacity: int = LivePerformanceConfig.CAPACITY):
+        self.capacity = capacity
+        self._rings: Dict[str, ColumnarRingBuffer] = {}
+        self._lock = threading.Lock()
+
+    def _ring(self, model: str) -> ColumnarRingBuffer:
+        ring = self._rings.get(model)
+        if ring is None:
+            with self._lock:
+                ring = self._rings.setdefault(model, ColumnarRingBuffer(SAMPLE_COLUMNS, self.capacity))
+        return ring
+
+    def record(
+        self,
+        user_id: int,
+        model: str,
+        latency: float,
+        tokens_in: int,
+        tokens_out: int,
+        cost: float = 0.0,
+        timestamp_ms: Optional[int] = None,
+        ttft: Optional[float] = None,
+    ) -> None:
+        """Ajoute un échantillon (horodaté maintenant par défaut)."""
+        self._ring(model).append(
+            timestamp=epoch_ms() if timestamp_ms is None else timestamp_ms,
+            user_id=user_id,
+            latency=latency,
+            tokens_in=tokens_in,
+            tokens_out=tokens_out,
+            cost=cost or 0.0,
+            ttft=np.nan if ttft is None else ttft,
+        )
+
+    def models(self) -> List[str]:
+        return list(self._rings)
+
+    def samples(self, model: str, seconds: float, user_id: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Colonnes des échantillons d'un modèle sur les `seconds` dernières secondes."""
+        ring = self._rings.get(model)
+        if ring is None:
+            return {name: np.zeros(0, dtype=dtype) for name, dtype in SAMPLE_COLUMNS.items()}
+        data = ring.since("timestamp", epoch_ms() - int(seconds * 1000))
+        if user_id is not None:
+            mask = data["user_id"] == user_id
+            data = {name: values[mask] for name, values in data.items()}
+        return data
+
+    def window_stats(self, model: str, seconds: float, user_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Agrégats d'un modèle sur une fenêtre glissante.
+
+        Returns:
+            count, latency_mean, latency_p50, latency_p95, latency_last, ttft_p50
+            (None sans réponse en flux), tokens_in, tokens_out, tokens_per_second,
+            cost ; None sans échantillon
+        """
+        data = self.samples(model, seconds, user_id)
+        latency = data["latency"]
+        if not len(latency):
+            return None
+        p50, p95 = np.percentile(latency, [50, 95])
+        total_latency = latency.sum()
+        ttft = data["ttft"][~np.isnan(data["ttft"])]
+        return {
+            "model": model,
+            "count": int(len(latency)),
+            "latency_mean": float(latency.mean()),
+            "latency_p50": float(p50),
+            "latency_p95": float(p95),
+            "latency_last": float(latency[np.argmax(data["timestamp"])]),
+            "ttft_p50": float(np.median(ttft)) if len(ttft) else None,
+            "tokens_in": int(data["tokens_in"].sum()),
+            "tokens_out": int(data["tokens_out"].sum()),
+            "tokens_per_second": float(data["tokens_out"].sum() / total_latency) if total_latency > 0 else None,
+            "cost": float(data["cost"].sum()),
+        }
+
+    def all_window_stats(self, seconds: float, user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Agrégats de chaque modèle ayant des échantillons dans la fenêtre, du plus utilisé au moins utilisé."""
+        stats = [self.window_stats(model, seconds, user_id) for model in self.models()]
+        return sorted((s for s in stats if s), key=lambda s: s["count"], reverse=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rings.clear()
+
+
+# Tampon partagé du processus
+live_performance = LivePerformance()
@@ -1,81 +1,182 @@
 import logging
+import sqlite3
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
 
-from src.data.database import get_connection
+from src.ai.models_config import get_model_config
+from src.analytics.downsampling import downsample
+from src.analytics.live_performance import live_performance
+from src.analytics.session_resources import is_resource_admin, session_resources
+from src.analytics.system_monitoring import get_system_sampler, show_live_metrics
+from src.data.database import days_ago_ms, get_readonly_connection
+from src.data.queries import PERFORMANCE_LOGS_WINDOW_SQL
+from src.data.rollups import get_latency_percentiles, get_model_stats, get_rollups
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Coûts par modèle (USD par 1K tokens) - Mis à jour avec les tarifs actuels
-MODEL_COSTS = {
-    "GPT-4": {"in": 0.03, "out": 0.06},
-    "GPT-4o": {"in": 0.005, "out": 0.015},
-    "Claude 3.5 Sonnet": {"in": 0.003, "out": 0.015},
-    "DeepSeek": {"in": 0.00014, "out": 0.00028},  # Tarifs DeepSeek mis à jour
+# Points par série dans les graphiques temporels : la page reste de taille constante
+MAX_CHART_POINTS = 200
+# Logs bruts chargés pour le tableau détaillé et l'export CSV
+DETAIL_ROW_LIMIT = 1000
+# Quantiles lus dans les sketches (boîtes à moustaches p5-p95 et colonnes p50/p90/p99)
+PERCENTILE_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99)
+
+# Libellés des colonnes de la vue des ressources par session
+RESOURCE_LABELS = {
+    "page": "Page",
+    "session_id": "Session",
+    "runs": "Exécutions",
+    "cpu_s": "CPU (s)",
+    "cpu_per_run_ms": "CPU/exécution (ms)",
+    "wall_s": "Temps mural (s)",
+    "max_wall_s": "Max mural (s)",
+    "db_s": "Base (s)",
+    "provider_s": "Fournisseurs IA (s)",
+    "state_bytes": "State (octets)",
+    "last_page": "Dernière page",
+    "last_seen": "Vue le",
 }
 
 
-def get_performance_data(user_id: int, days: int = 30) -> pd.DataFrame:
+def get_performance_data(user_id: int, days: int = 30, limit: Optional[int] = None) -> pd.DataFrame:
     """
-    Récupère les données de performance d'un utilisateur.
+    Récupère les logs de performance bruts d'un utilisateur, du plus récent au plus ancien.
 
     Args:
         user_id: ID de l'utilisateur
         days: Nombre de jours à récupérer (défaut: 30)
+        limit: Nombre maximal de logs (défaut: tous)
 
     Returns:
         DataFrame avec les données de performance
     """
-    conn = get_connection()
-    try:
-        query = """
-            SELECT model, latency, tokens_in, tokens_out, timestamp
-            FROM performance_logs
-            WHERE user_id = ? AND timestamp >= datetime('now', '-{} days')
-            ORDER BY timestamp DESC
-        """.format(
-            days
+    # Connexion lecture seule dédiée : la connexion d'écriture du thread reste intacte
+    with get_readonly_connection() as conn:
+        df = pd.read_sql_query(
+            PERFORMANCE_LOGS_WINDOW_SQL, conn, params=(user_id, days_ago_ms(days), -1 if limit is None else limit)
         )
 
-        df = pd.read_sql_query(query, conn, params=(user_id,))
+    if not df.empty:
+        # Conversion du timestamp
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+        df["date"] = df["timestamp"].dt.date
+
+        # Coût persisté à l'écriture ; estimation vectorisée pour les lignes sans coût
+        df["cost"] = pd.to_numeric(df["cost"]).fillna(calculate_costs(df))
+
+    return df
+
+
+def get_performance_rollup(user_id: int, days: int = 30, granularity: str = "daily") -> pd.DataFrame:
+    """
+    Agrégats (date, modèle) lus dans les tables de rollup plutôt que dans les logs bruts.
+
+    Args:
+        user_id: ID de l'utilisateur
+        days: Nombre de jours à récupérer (défaut: 30)
+        granularity: "daily" ou "hourly"
+
+    Returns:
+        DataFrame avec date, model, count, latency (moyenne), latency_min, latency_max,
+        tokens_in, tokens_out et cost ; vide si les agrégats sont indisponibles
+    """
+    try:
+        rows = get_rollups(user_id, days, granularity)
+    except sqlite3.Error as e:
+        logger.warning(f"Agrégats de performance indisponibles: {e}")
+        return pd.DataFrame()
+
+    df = pd.DataFrame(rows)
+    if not df.empty:
+        df["date"] = pd.to_datetime(df["bucket"], unit="ms")
+        if granularity == "daily":
+            df["date"] = df["date"].dt.date
+        df["latency"] = df["latency_sum"] / df["count"]
+        # Seaux sans cost_estimate persisté : coût estimé depuis les sommes de tokens
+        df["cost"] = df["cost"].where(df["cost"] > 0, calculate_costs(df))
+        df = df.drop(columns=["bucket", "latency_sum"])
+    return df
+
+
+def get_performance_overview(user_id: int, days: int = 30) -> pd.DataFrame:
+    """
+    Totaux par modèle agrégés en SQL (tables de rollup), sans charger les logs bruts.
+
+    Args:
+        user_id: ID de l'utilisateur
+        days: Nombre de jours couverts (défaut: 30)
+
+    Returns:
+        DataFrame avec model, count, latency (moyenne), latency_min, latency_max,
+        tokens_in, tokens_out et cost (totaux) ; vide si indisponible
+    """
+    try:
+        df = pd.DataFrame(get_model_stats(user_id, days))
+    except sqlite3.Error as e:
+        logger.warning(f"Totaux de performance indisponibles: {e}")
+        return pd.DataFrame()
+
+    if not df.empty:
+        df["cost"] = df["cost"].where(df["cost"] > 0, calculate_costs(df))
+    return df
 
-        if not df.empty:
-            # Conversion du timestamp
-            df["timestamp"] = pd.to_datetime(df["timestamp"])
-            df["date"] = df["timestamp"].dt.date
 
-            # Calcul des coûts
-            df["cost"] = df.apply(calculate_cost, axis=1)
+def get_model_percentiles(user_id: int, days: int = 30, quantiles: Tuple[float, ...] = PERCENTILE_QUANTILES) -> pd.DataFrame:
+    """
+    Percentiles de latence et de débit par modèle, issus des sketches journaliers.
 
-        return df
-    finally:
-        conn.close()
+    Args:
+        user_id: ID de l'utilisateur
+        days: Nombre de jours couverts (défaut: 30)
+        quantiles: Quantiles calculés (colonnes p5, p25, p50...)
 
+    Returns:
+        DataFrame avec model, metric, count, mean et une colonne par quantile ; vide si indisponible
+    """
+    try:
+        return pd.DataFrame(get_latency_percentiles(user_id, days, quantiles))
+    except sqlite3.Error as e:
+        logger.warning(f"Percentiles de performance indisponibles: {e}")
+        return pd.DataFrame()
 
-def calculate_cost(row: pd.Series) -> float:
-    """Calcule le coût d'une requête basé sur le modèle et les tokens."""
-    costs = MODEL_COSTS.get(row["model"], {"in": 0.01, "out": 0.01})
-    return round((row["tokens_in"] / 1000) * costs["in"] + (row["tokens_out"] / 1000) * costs["out"], 4)
 
+def calculate_costs(df: pd.DataFrame) -> pd.Series:
+    """
+    Coût de chaque ligne (colonnes model, tokens_in, tokens_out), calcul vectorisé.
 
-def show_performance_summary(df: pd.DataFrame) -> None:
-    """Affiche un résumé des performances."""
-    if df.empty:
+    Les modèles sont codés en catégories ; un tableau de prix par catégorie, issu
+    de models_config (même repli que calculate_estimated_cost), est indexé par ces codes.
+    """
+    models = df["model"].astype("category")
+    configs = [get_model_config(name) for name in models.cat.categories]
+    price_in = np.array([config.cost_per_1k_input for config in configs], dtype=float)
+    price_out = np.array([config.cost_per_1k_output for config in configs], dtype=float)
+    codes = models.cat.codes.to_numpy()
+    tokens_in = df["tokens_in"].to_numpy(dtype=float)
+    tokens_out = df["tokens_out"].to_numpy(dtype=float)
+    costs = (tokens_in * price_in[codes] + tokens_out * price_out[codes]) / 1000
+    return pd.Series(costs, index=df.index, name="cost")
+
+
+def show_performance_summary(model_stats: pd.DataFrame) -> None:
+    """Affiche un résumé des performances à partir des totaux par modèle (get_performance_overview)."""
+    if model_stats.empty:
         st.info("📊 Aucune donnée de performance disponible.")
         return
 
     # Métriques globales
-    total_requests = len(df)
-    total_cost = df["cost"].sum()
-    avg_latency = df["latency"].mean()
-    total_tokens = df["tokens_in"].sum() + df["tokens_out"].sum()
+    total_requests = int(model_stats["count"].sum())
+    total_cost = model_stats["cost"].sum()
+    avg_latency = (model_stats["latency"] * model_stats["count"]).sum() / total_requests
+    total_tokens = int(model_stats["tokens_in"].sum() + model_stats["tokens_out"].sum())
 
     col1, col2, col3, col4 = st.columns(4)
 
@@ -89,44 +190,98 @@ def show_performance_summary(df: pd.DataFrame) -> None:
         st.metric("🎯 Tokens totaux", f"{total_tokens:,}")
 
 
-def show_model_comparison(df: pd.DataFrame) -> None:
-    """Affiche une comparaison entre les modèles."""
-    if df.empty:
+def show_model_comparison(model_stats: pd.DataFrame, percentiles: Optional[pd.DataFrame] = None) -> None:
+    """Affiche une comparaison entre les modèles.
+
+    Args:
+        model_stats: Totaux par modèle (voir get_performance_overview)
+        percentiles: Percentiles par modèle (voir get_model_percentiles), ajoutés au tableau si fournis
+    """
+    if model_stats.empty:
         return
 
     st.subheader("📈 Comparaison des modèles")
 
-    # Agrégation par modèle
-    model_stats = (
-        df.groupby("model")
-        .agg({"latency": ["mean", "std", "count"], "tokens_in": "mean", "tokens_out": "mean", "cost": ["mean", "sum"]})
-        .round(4)
+    # Moyennes par requête dérivées des totaux
+    count = model_stats["count"]
+    comparison = pd.DataFrame(
+        {
+            "model": model_stats["model"],
+            "Latence moy. (s)": model_stats["latency"].round(4),
+            "Latence min (s)": model_stats["latency_min"].round(4),
+            "Latence max (s)": model_stats["latency_max"].round(4),
+            "Nb requêtes": count,
+            "Tokens entrée moy.": (model_stats["tokens_in"] / count).round(1),
+            "Tokens sortie moy.": (model_stats["tokens_out"] / count).round(1),
+            "Coût moy. ($)": (model_stats["cost"] / count).round(4),
+            "Coût total ($)": model_stats["cost"].round(4),
+        }
     )
 
-    # Aplatir les colonnes multi-niveau
-    model_stats.columns = ["_".join(col).strip() for col in model_stats.columns]
-    model_stats = model_stats.reset_index()
-
-    # Renommer pour plus de clarté
-    model_stats.rename(
-        columns={
-            "latency_mean": "Latence moy. (s)",
-            "latency_std": "Écart-type latence",
-            "latency_count": "Nb requêtes",
-            "tokens_in_mean": "Tokens entrée moy.",
-            "tokens_out_mean": "Tokens sortie moy.",
-            "cost_mean": "Coût moy. ($)",
-            "cost_sum": "Coût total ($)",
-        },
-        inplace=True,
-    )
+    if percentiles is not None and not percentiles.empty:
+        labels = {"latency": "Latence {} (s)", "tokens_per_second": "Tokens/s {}"}
+        for metric, label in labels.items():
+            subset = percentiles[percentiles["metric"] == metric].set_index("model")
+            for column in ("p50", "p90", "p99"):
+                if column in subset:
+                    comparison[label.format(column)] = comparison["model"].map(subset[column]).round(3)
+
+    st.dataframe(comparison, use_container_width=True)
 
-    st.dataframe(model_stats, use_container_width=True)
 
+def latency_box_figure(model_stats: pd.DataFrame, percentiles: Optional[pd.DataFrame] = None) -> go.Figure:
+    """Boîtes à moustaches (p5, p25, p50, p75, p95) construites depuis les sketches, sans logs bruts.
 
-def show_performance_charts(df: pd.DataFrame) -> None:
-    """Affiche des graphiques de performance."""
-    if df.empty:
+    À défaut de percentiles, barres de latence moyenne par modèle.
+    """
+    columns = ("p5", "p25", "p50", "p75", "p95")
+    latency = None
+    if percentiles is not None and not percentiles.empty and set(columns) <= set(percentiles.columns):
+        latency = percentiles[percentiles["metric"] == "latency"]
+
+    if latency is None or latency.empty:
+        fig = px.bar(
+            model_stats,
+            x="model",
+            y="latency",
+            title="Latence moyenne par modèle",
+            labels={"latency": "Latence (secondes)", "model": "Modèle"},
+        )
+    else:
+        fig = go.Figure(
+            [
+                go.Box(
+                    name=row["model"],
+                    lowerfence=[row["p5"]],
+                    q1=[row["p25"]],
+                    median=[row["p50"]],
+                    q3=[row["p75"]],
+                    upperfence=[row["p95"]],
+                    mean=[row["mean"]],
+                )
+                for _, row in latency.iterrows()
+            ]
+        )
+        fig.update_layout(
+            title="Distribution de la latence par modèle (p5-p95)", xaxis_title="Modèle", yaxis_title="Latence (secondes)"
+        )
+    return fig
+
+
+def show_performance_charts(
+    model_stats: pd.DataFrame, daily_stats: Optional[pd.DataFrame] = None, percentiles: Optional[pd.DataFrame] = None
+) -> None:
+    """Affiche des graphiques de performance.
+
+    Les données sont déjà agrégées (totaux par modèle, seaux journaliers, sketches) ;
+    les courbes sont réduites à MAX_CHART_POINTS points par modèle (LTTB).
+
+    Args:
+        model_stats: totaux par modèle (get_performance_overview)
+        daily_stats: agrégats journaliers (get_performance_rollup)
+        percentiles: percentiles par modèle (get_model_percentiles)
+    """
+    if model_stats.empty:
         return
 
     st.subheader("📊 Graphiques de performance")
@@ -135,39 +290,27 @@ def show_performance_charts(df: pd.DataFrame) -> None:
 
     with col1:
         # Graphique de latence par modèle
-        fig_latency = px.box(
-            df,
-            x="model",
-            y="latency",
-            title="Distribution de la latence par modèle",
-            labels={"latency": "Latence (secondes)", "model": "Modèle"},
-        )
+        fig_latency = latency_box_figure(model_stats, percentiles)
         fig_latency.update_layout(height=400)
         st.plotly_chart(fig_latency, use_container_width=True)
 
     with col2:
         # Graphique des coûts par modèle
-        cost_by_model = df.groupby("model")["cost"].sum().reset_index()
-        fig_cost = px.pie(cost_by_model, values="cost", names="model", title="Répartition des coûts par modèle")
+        fig_cost = px.pie(model_stats, values="cost", names="model", title="Répartition des coûts par modèle")
         fig_cost.update_layout(height=400)
         st.plotly_chart(fig_cost, use_container_width=True)
 
     # Évolution temporelle
-    if len(df) > 1:
+    if daily_stats is not None and not daily_stats.empty and daily_stats["date"].nunique() > 1:
         st.subheader("📈 Évolution temporelle")
 
-        # Agrégation par jour
-        daily_stats = (
-            df.groupby(["date", "model"])
-            .agg({"latency": "mean", "cost": "sum", "tokens_in": "sum", "tokens_out": "sum"})
-            .reset_index()
-        )
+        daily_stats = daily_stats.assign(total_tokens=daily_stats["tokens_in"] + daily_stats["tokens_out"])
 
         tab1, tab2, tab3 = st.tabs(["Latence", "Coûts", "Tokens"])
 
         with tab1:
             fig_latency_time = px.line(
-                daily_stats,
+                downsample(daily_stats, "date", "latency", MAX_CHART_POINTS, by="model"),
                 x="date",
                 y="latency",
                 color="model",
@@ -177,6 +320,7 @@ def show_performance_charts(df: pd.DataFrame) -> None:
             st.plotly_chart(fig_latency_time, use_container_width=True)
 
         with tab2:
+            # Barres : une par jour et par modèle (une réduction fausserait les totaux)
             fig_cost_time = px.bar(
                 daily_stats,
                 x="date",
@@ -188,10 +332,8 @@ def show_performance_charts(df: pd.DataFrame) -> None:
             st.plotly_chart(fig_cost_time, use_container_width=True)
 
         with tab3:
-            # Calculer le total de tokens par jour
-            daily_stats["total_tokens"] = daily_stats["tokens_in"] + daily_stats["tokens_out"]
             fig_tokens_time = px.line(
-                daily_stats,
+                downsample(daily_stats, "date", "total_tokens", MAX_CHART_POINTS, by="model"),
                 x="date",
                 y="total_tokens",
                 color="model",
@@ -201,19 +343,56 @@ def show_performance_charts(df: pd.DataFrame) -> None:
             st.plotly_chart(fig_tokens_time, use_container_width=True)
 
 
+def show_live_performance(user_id: int) -> None:
+    """Affiche les agrégats temps réel (dernière heure et 24 h) du tampon mémoire, sans accès base."""
+    windows = {"1 h": 3600, "24 h": 86400}
+    rows = [
+        {"Fenêtre": label, **stats}
+        for label, seconds in windows.items()
+        for stats in live_performance.all_window_stats(seconds, user_id)
+    ]
+    if not rows:
+        st.caption("Aucune requête récente dans ce processus.")
+        return
+
+    live = pd.DataFrame(rows)[
+        ["Fenêtre", "model", "count", "latency_p50", "latency_p95", "latency_last", "tokens_per_second", "cost"]
+    ]
+    live.columns = [
+        "Fenêtre",
+        "Modèle",
+        "Requêtes",
+        "Latence p50 (s)",
+        "Latence p95 (s)",
+        "Dernière (s)",
+        "Tokens/s",
+        "Coût ($)",
+    ]
+    st.dataframe(live.round(3), use_container_width=True, hide_index=True)
+
+
 def show_performance(user_id: int) -> None:
     """Affiche les performances des modèles avec onglets pour différentes vues."""
     st.title("📊 Analyse des Performances")
 
-    # Onglets principaux
-    tab1, tab2 = st.tabs(["🤖 Performances IA", "🖥️ Monitoring Système"])
+    # Onglets principaux (la vue des ressources par session est réservée aux ADMIN_EMAILS)
+    user = st.session_state.get("user") or {}
+    labels = ["🤖 Performances IA", "🖥️ Monitoring Système"]
+    admin = isinstance(user, dict) and is_resource_admin(user.get("email"))
+    if admin:
+        labels.append("🧮 Ressources par session")
+    tabs = st.tabs(labels)
 
-    with tab1:
+    with tabs[0]:
         show_ai_performance(user_id)
 
-    with tab2:
+    with tabs[1]:
         show_system_monitoring()
 
+    if admin:
+        with tabs[2]:
+            show_session_resources()
+
 
 def show_ai_performance(user_id: int) -> None:
     """Affiche les performances des modèles IA."""
@@ -231,10 +410,10 @@ def show_ai_performance(user_id: int) -> None:
     with col2:
         st.button("🔄 Actualiser", use_container_width=True)
 
-    # Récupération des données
-    df = get_performance_data(user_id, period)
+    # Totaux agrégés en SQL : la taille de la page ne dépend pas de l'historique
+    model_stats = get_performance_overview(user_id, period)
 
-    if df.empty:
+    if model_stats.empty:
         st.info("� Aucune donnée de performance enregistrée pour cette période.")
         st.markdown(
             """
@@ -246,19 +425,31 @@ def show_ai_performance(user_id: int) -> None:
         )
         return
 
+    percentiles = get_model_percentiles(user_id, period)
+
     # Affichage des résultats
-    show_performance_summary(df)
+    show_performance_summary(model_stats)
+
+    with st.expander("⚡ Temps réel"):
+        show_live_performance(user_id)
 
     st.divider()
 
-    show_model_comparison(df)
+    show_model_comparison(model_stats, percentiles)
 
     st.divider()
 
-    show_performance_charts(df)
+    show_performance_charts(model_stats, get_performance_rollup(user_id, period), percentiles)
 
-    # Section détails
+    # Section détails : seuls les logs les plus récents sont chargés
     with st.expander("📋 Données détaillées"):
+        df = get_performance_data(user_id, period, limit=DETAIL_ROW_LIMIT)
+        if df.empty:
+            st.info("Aucun log détaillé pour cette période.")
+            return
+        if len(df) == DETAIL_ROW_LIMIT:
+            st.caption(f"{DETAIL_ROW_LIMIT} requêtes les plus récentes")
+
         # Options d'affichage
         col1, col2 = st.columns(2)
         with col1:
@@ -288,105 +479,54 @@ def show_ai_performance(user_id: int) -> None:
 
 
 def show_system_monitoring() -> None:
-    """Affiche les informations de monitoring système."""
+    """Onglet système : dernier instantané de l'échantillonneur partagé (aucune mesure sur le thread du script)."""
     st.title("🖥️ Monitoring Système")
+    show_live_metrics(get_system_sampler())
 
-    st.info("📊 **Informations Système** - Vue d'ensemble de l'état du système")
-
-    try:
-        import platform
-
-        import psutil
-
-        st.success("✅ Module psutil détecté")
-
-        # Informations générales
-        col1, col2, col3 = st.columns(3)
 
-        with col1:
-            try:
-                ram_percent = psutil.virtual_memory().percent
-                st.metric("💾 RAM utilisée", f"{ram_percent:.1f}%")
-            except Exception as e:
-                st.metric("💾 RAM utilisée", "Erreur")
-                st.error(f"Erreur RAM: {e}")
-
-        with col2:
-            try:
-                cpu_percent = psutil.cpu_percent(interval=0.1)  # Interval plus court
-                st.metric("💽 CPU utilisé", f"{cpu_percent:.1f}%")
-            except Exception as e:
-                st.metric("💽 CPU utilisé", "Erreur")
-                st.error(f"Erreur CPU: {e}")
-        with col3:
-            try:
-                # Essayer '/' d'abord (Linux/Docker), puis 'C:' (Windows)
-                try:
-                    disk_usage = psutil.disk_usage("/")
-                except (OSError, FileNotFoundError):
-                    disk_usage = psutil.disk_usage("C:")
-                disk_percent = (disk_usage.used / disk_usage.total) * 100
-                st.metric("💿 Disque utilisé", f"{disk_percent:.1f}%")
-            except Exception:
-                st.metric("💿 Disque utilisé", "N/A")
-
-        st.divider()
-
-        # Informations détaillées
-        st.subheader("📋 Détails du système")
+def show_session_resources() -> None:
+    """Vue d'administration : sessions et pages les plus coûteuses (ressources attribuées par track_page)."""
+    st.subheader("🧮 Ressources par session et par page")
+    st.caption("Totaux en mémoire depuis le démarrage du processus ; la taille du state est la dernière observée.")
 
-        col1, col2 = st.columns(2)
-
-        with col1:
-            st.markdown("**🖥️ Système d'exploitation**")
-            st.write(f"• **OS:** {platform.system()} {platform.release()}")
-            st.write(f"• **Architecture:** {platform.machine()}")
-            st.write(f"• **Processeur:** {platform.processor()}")
-
-        with col2:
-            st.markdown("**💾 Mémoire**")
-            memory = psutil.virtual_memory()
-            st.write(f"• **Total:** {memory.total / (1024**3):.1f} GB")
-            st.write(f"• **Disponible:** {memory.available / (1024**3):.1f} GB")
-            st.write(f"• **Utilisée:** {memory.used / (1024**3):.1f} GB")
-
-        # Status de l'application
-        st.divider()
-        st.subheader("🚀 État de l'application")
-
-        col1, col2, col3 = st.columns(3)
-
-        with col1:
-            st.success("✅ Base de données connectée")
-        with col2:
-            st.success("✅ Streamlit actif")
-        with col3:
-            st.success("✅ API endpoints disponibles")
-
-    except ImportError:
-        st.warning("⚠️ Module `psutil` non installé - Monitoring système limité")
-
-        # Version simplifiée sans psutil
-        st.subheader("📋 Informations basiques")
-
-        col1, col2 = st.columns(2)
-
-        with col1:
-            # Importer platform ici pour éviter UnboundLocalError lorsque l'import dans le bloc try a échoué
-            import platform  # noqa: F401
-
-            st.markdown("**🖥️ Système**")
-            st.write(f"• **OS:** {platform.system()}")
-            st.write(f"• **Version:** {platform.release()}")
+    order_by = st.selectbox(
+        "Trier par",
+        options=["cpu_s", "wall_s", "db_s", "provider_s", "state_bytes", "runs"],
+        format_func=lambda key: RESOURCE_LABELS.get(key, key),
+    )
 
-        with col2:
-            st.markdown("**🚀 Application**")
-            st.success("✅ Streamlit actif")
-            st.success("✅ Base de données connectée")
+    pages = pd.DataFrame(session_resources.page_stats(order_by=order_by))
+    if pages.empty:
+        st.info("Aucune exécution de page mesurée pour l'instant.")
+        return
 
-    except Exception as e:
-        st.error(f"❌ Erreur lors du monitoring système: {e}")
+    st.markdown("**Pages**")
+    st.dataframe(
+        pages[["page", "runs", "cpu_s", "cpu_per_run_ms", "wall_s", "max_wall_s", "db_s", "provider_s"]].rename(
+            columns=RESOURCE_LABELS
+        ),
+        use_container_width=True,
+        hide_index=True,
+    )
+    times = pages.melt(id_vars="page", value_vars=["cpu_s", "db_s", "provider_s"], var_name="ressource", value_name="secondes")
+    st.plotly_chart(
+        px.bar(
+            times,
+            x="page",
+            y="secondes",
+            color="ressource",
+            title="Temps par page",
+        ),
+        use_container_width=True,
+    )
 
-        # Fallback basique
-        st.subheader("📋 État basique")
-        st.success("✅ Application fonctionnelle")
+    st.markdown("**Sessions les plus coûteuses**")
+    sessions = pd.DataFrame(session_resources.top_sessions(n=20, order_by=order_by))
+    sessions["state_bytes"] = sessions["state_bytes"] / 1024
+    sessions["last_seen"] = pd.to_datetime(sessions["last_seen"], unit="s")
+    columns = ["session_id", "runs", "cpu_s", "wall_s", "db_s", "provider_s", "state_bytes", "last_page", "last_seen"]
+    st.dataframe(
+        sessions[columns].rename(columns={**RESOURCE_LABELS, "state_bytes": "State (Ko)"}),
+        use_container_width=True,
+        hide_index=True,
+    )
@@ -0,0 +1,55 @@
+"""
+Anneau colonnaire de taille fixe (un tableau NumPy par colonne).
+
+L'ajout écrase l'entrée la plus ancienne une fois la capacité atteinte ;
+les lectures renvoient des copies dans l'ordre chronologique, prêtes pour
+des agrégations vectorisées.
+"""
+
+import threading
+from typing import Dict, Mapping
+
+import numpy as np
+
+
+class ColumnarRingBuffer:
+    """Anneau thread-safe de `capacity` lignes, colonnes typées."""
+
+    def __init__(self, columns: Mapping[str, np.dtype], capacity: int):
+        if capacity < 1:
+            raise ValueError("La capacité doit être positive")
+        self.capacity = capacity
+        self._columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in columns.items()}
+        self._next = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, **values) -> None:
+        """Ajoute une ligne (une valeur par colonne)."""
+        with self._lock:
+            for name, column in self._columns.items():
+                column[self._next] = values[name]
+            self._next = (self._next + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def snapshot(self) -> Dict[str, np.ndarray]:
+        """Copie des colonnes, de la ligne la plus ancienne à la plus récente."""
+        with self._lock:
+            if self._size < self.capacity:
+                return {name: column[: self._size].copy() for name, column in self._columns.items()}
+            order = np.r_[self._next : self.capacity, 0 : self._next]
+            return {name: column[order] for name, column in self._columns.items()}
+
+    def since(self, column: str, threshold) -> Dict[str, np.ndarray]:
+        """Lignes dont `column` (ex. horodatage) est >= threshold."""
+        data = self.snapshot()
+        mask = data[column] >= threshold
+        return {name: values[mask] for name, values in data.items()}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._next = 0
+            self._size = 0
@@ -0,0 +1,205 @@
+"""
+Attribution des ressources par session Streamlit et par page.
+
+Chaque exécution de page (routée par `src.ui.app.main`) est mesurée dans
+`track_page` : temps CPU du thread de script, temps mural, temps passé en base
+(rapporté par les curseurs instrumentés de `src.data.query_stats`), attente des
+fournisseurs d'IA (`provider_wait`) et taille approximative de `session_state`.
+Les totaux sont agrégés en mémoire par session et par page.
+
+Le module n'importe que la bibliothèque standard : la couche données peut y
+rapporter son temps sans dépendance circulaire.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class SessionResourceConfig:
+    """Paramètres de l'attribution (surchargeables par variables d'environnement)."""
+
+    ENABLED = os.getenv("SESSION_RESOURCES", "true").lower() == "true"
+    MAX_SESSIONS = int(os.getenv("SESSION_RESOURCES_MAX_SESSIONS", "500"))  # sessions les plus récentes gardées
+    # Emails autorisés à voir la vue d'administration (séparés par des virgules)
+    ADMIN_EMAILS = {email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()}
+
+
+# Métriques cumulées, en secondes sauf state_bytes (dernière valeur observée)
+METRICS = ("cpu_s", "wall_s", "db_s", "provider_s")
+
+
+class RunUsage:
+    """Temps attribués à l'exécution de page en cours (DB et fournisseurs)."""
+
+    __slots__ = ("db_s", "provider_s")
+
+    def __init__(self):
+        self.db_s = 0.0
+        self.provider_s = 0.0
+
+
+_current_run: ContextVar[Optional[RunUsage]] = ContextVar("session_resources_run", default=None)
+
+
+def add_db_time(seconds: float) -> None:
+    """Ajoute du temps base de données à l'exécution de page courante (sans effet hors page)."""
+    usage = _current_run.get()
+    if usage is not None:
+        usage.db_s += seconds
+
+
+@contextmanager
+def provider_wait() -> Iterator[None]:
+    """Chronomètre une attente de fournisseur d'IA pour l'exécution de page courante."""
+    usage = _current_run.get()
+    if usage is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        usage.provider_s += time.perf_counter() - start
+
+
+def approximate_size(obj: Any, max_depth: int = 6) -> int:
+    """Taille mémoire approximative (octets) d'un objet et de ses conteneurs imbriqués."""
+    seen = set()
+
+    def size(value: Any, depth: int) -> int:
+        if id(value) in seen:
+            return 0
+        seen.add(id(value))
+        try:
+            total = sys.getsizeof(value)
+        except TypeError:
+            return 0
+        if depth >= max_depth:
+            return total
+        if isinstance(value, Mapping):
+            total += sum(size(k, depth + 1) + size(v, depth + 1) for k, v in value.items())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            total += sum(size(item, depth + 1) for item in value)
+        return total
+
+    try:
+        return size(obj, 0)
+    except (RuntimeError, TypeError):  # conteneur modifié pendant le parcours, mapping non itérable
+        return 0
+
+
+class _Totals:
+    """Totaux d'une session ou d'une page."""
+
+    __slots__ = ("runs", "cpu_s", "wall_s", "db_s", "provider_s", "max_wall_s", "state_bytes", "last_page", "last_seen")
+
+    def __init__(self):
+        self.runs = 0
+        self.cpu_s = self.wall_s = self.db_s = self.provider_s = self.max_wall_s = 0.0
+        self.state_bytes = 0
+        self.last_page = ""
+        self.last_seen = 0.0
+
+    def add(self, page: str, cpu_s: float, wall_s: float, db_s: float, provider_s: float, state_bytes: int) -> None:
+        self.runs += 1
+        self.cpu_s += cpu_s
+        self.wall_s += wall_s
+        self.db_s += db_s
+        self.provider_s += provider_s
+        self.max_wall_s = max(self.max_wall_s, wall_s)
+        self.state_bytes = state_bytes
+        self.last_page = page
+        self.last_seen = time.time()
+
+    def to_dict(self, **key) -> Dict[str, Any]:
+        return {
+            **key,
+            "runs": self.runs,
+            **{metric: round(getattr(self, metric), 6) for metric in METRICS},
+            "cpu_per_run_ms": round(self.cpu_s * 1000 / self.runs, 3) if self.runs else 0.0,
+            "max_wall_s": round(self.max_wall_s, 6),
+            "state_bytes": self.state_bytes,
+            "last_page": self.last_page,
+            "last_seen": self.last_seen,
+        }
+
+
+class SessionResources:
+    """Agrégats par session (bornés aux `max_sessions` plus récentes) et par page."""
+
+    def __init__(self, max_sessions: int = 500):
+        self.max_sessions = max(1, max_sessions)
+        self._sessions: "OrderedDict[str, _Totals]" = OrderedDict()
+        self._pages: Dict[str, _Totals] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self, session_id: str, page: str, cpu_s: float, wall_s: float, db_s: float, provider_s: float, state_bytes: int
+    ) -> None:
+        """Ajoute une exécution de page aux totaux de sa session et de sa page."""
+        with self._lock:
+            session = self._sessions.pop(session_id, None) or _Totals()
+            self._sessions[session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            for totals in (session, self._pages.setdefault(page, _Totals())):
+                totals.add(page, cpu_s, wall_s, db_s, provider_s, state_bytes)
+
+    def top_sessions(self, n: int = 20, order_by: str = "cpu_s") -> List[Dict[str, Any]]:
+        """Les n sessions les plus coûteuses (cpu_s, wall_s, db_s, provider_s, state_bytes ou runs)."""
+        with self._lock:
+            rows = [totals.to_dict(session_id=session_id) for session_id, totals in self._sessions.items()]
+        rows.sort(key=lambda row: row[order_by], reverse=True)
+        return rows[:n]
+
+    def page_stats(self, order_by: str = "cpu_s") -> List[Dict[str, Any]]:
+        """Totaux par page, du plus coûteux au moins coûteux."""
+        with self._lock:
+            rows = [totals.to_dict(page=page) for page, totals in self._pages.items()]
+        rows.sort(key=lambda row: row[order_by], reverse=True)
+        return rows
+
+    def reset(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+            self._pages.clear()
+
+
+session_resources = SessionResources(max_sessions=SessionResourceConfig.MAX_SESSIONS)
+
+
+@contextmanager
+def track_page(session_id: str, page: str, state: Any = None) -> Iterator[RunUsage]:
+    """Mesure une exécution de page et l'attribue à la session (exceptions comprises).
+
+    Args:
+        session_id: identifiant de la session Streamlit
+        page: clé de routage de la page
+        state: session_state mesuré en sortie (optionnel)
+    """
+    usage = RunUsage()
+    if not SessionResourceConfig.ENABLED:
+        yield usage
+        return
+
+    token = _current_run.set(usage)
+    cpu_start, wall_start = time.thread_time(), time.perf_counter()
+    try:
+        yield usage
+    finally:
+        cpu_s, wall_s = time.thread_time() - cpu_start, time.perf_counter() - wall_start
+        _current_run.reset(token)
+        state_bytes = approximate_size(state) if state is not None else 0
+        session_resources.record(session_id, page, cpu_s, wall_s, usage.db_s, usage.provider_s, state_bytes)
+
+
+def is_resource_admin(email: Optional[str]) -> bool:
+    """Vrai si l'email figure dans ADMIN_EMAILS."""
+    return bool(email) and str(email).lower() in SessionResourceConfig.ADMIN_EMAILS
@@ -1,16 +1,56 @@
+import atexit
+import logging
+import os
 import platform
 import queue
 import threading
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Any, Dict, List, Optional
 
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import psutil
 import streamlit as st
 
+from src.analytics.downsampling import downsample
+from src.analytics.ring_buffer import ColumnarRingBuffer
+from src.data.database import days_ago_ms, epoch_ms, get_optimized_connection, get_readonly_connection
+
+logger = logging.getLogger(__name__)
+
+
+class SamplerConfig:
+    """Paramètres de l'échantillonneur système (surchargeables par variables d'environnement)."""
+
+    ENABLED = os.getenv("SYSMON_SAMPLER", "true").lower() == "true"
+    INTERVAL = float(os.getenv("SYSMON_INTERVAL", "5"))  # secondes entre deux échantillons
+    HISTORY = int(os.getenv("SYSMON_HISTORY", "720"))  # échantillons gardés en mémoire (1 h à 5 s)
+    PERSIST = os.getenv("SYSMON_PERSIST", "false").lower() == "true"  # moyennes par minute dans SQLite
+    PERSIST_INTERVAL = float(os.getenv("SYSMON_PERSIST_INTERVAL", "60"))  # secondes
+    RETENTION_DAYS = float(os.getenv("SYSMON_RETENTION_DAYS", "7"))
+    REFRESH_SECONDS = int(os.getenv("SYSMON_REFRESH", "30"))  # auto-refresh de la page
+
+
+# Colonnes de l'historique (une valeur agrégée par échantillon)
+HISTORY_COLUMNS = {
+    "timestamp": np.int64,  # ms epoch
+    "cpu_percent": np.float64,
+    "memory_percent": np.float64,
+    "swap_percent": np.float64,
+    "disk_percent": np.float64,
+    "net_sent_rate": np.float64,  # octets/s
+    "net_recv_rate": np.float64,
+    "process_rss": np.float64,
+    "process_cpu": np.float64,
+    "process_threads": np.float64,
+}
+
+# Points par courbe de tendance
+MAX_TREND_POINTS = 300
+
 
 def get_system_info() -> Dict:
     """Récupère les informations système de base."""
@@ -26,13 +66,17 @@ def get_system_info() -> Dict:
     }
 
 
-def get_cpu_stats() -> Dict:
-    """Récupère les statistiques CPU."""
-    cpu_percent = psutil.cpu_percent(interval=1, percpu=True)
+def get_cpu_stats(interval: Optional[float] = None) -> Dict:
+    """Récupère les statistiques CPU.
+
+    Sans `interval`, la mesure est non bloquante et couvre la période écoulée
+    depuis l'appel précédent (la cadence de l'échantillonneur).
+    """
+    cpu_percent = psutil.cpu_percent(interval=interval, percpu=True)
     cpu_freq = psutil.cpu_freq()
 
     return {
-        "cpu_usage_total": psutil.cpu_percent(interval=0.1),
+        "cpu_usage_total": psutil.cpu_percent(interval=interval),
         "cpu_usage_per_core": cpu_percent,
         "cpu_frequency_current": cpu_freq.current if cpu_freq else 0,
         "cpu_frequency_max": cpu_freq.max if cpu_freq else 0,
@@ -97,11 +141,20 @@ def get_network_stats() -> Dict:
     }
 
 
+_process: Optional[psutil.Process] = None
+
+
+def _current_process() -> psutil.Process:
+    """Processus courant, conservé d'un appel à l'autre pour que cpu_percent() mesure l'intervalle écoulé."""
+    global _process
+    if _process is None or _process.pid != os.getpid():
+        _process = psutil.Process(os.getpid())
+    return _process
+
+
 def get_streamlit_process_info() -> Dict:
     """Récupère les informations sur le processus Streamlit actuel."""
-    import os
-
-    current_process = psutil.Process(os.getpid())
+    current_process = _current_process()
 
     return {
         "pid": current_process.pid,
@@ -122,6 +175,193 @@ def format_bytes(bytes_value: int) -> str:
     return f"{bytes_value:.1f} PB"
 
 
+class SystemMetricsSampler:
+    """Échantillonneur d'arrière-plan partagé : un instantané complet toutes les `interval` secondes.
+
+    Le dernier instantané et l'historique (anneau colonnaire) sont lus sans
+    attente par les pages ; l'historique peut être agrégé à la minute dans la
+    table system_metrics.
+    """
+
+    def __init__(
+        self,
+        interval: float = SamplerConfig.INTERVAL,
+        history: int = SamplerConfig.HISTORY,
+        persist: bool = SamplerConfig.PERSIST,
+        persist_interval: float = SamplerConfig.PERSIST_INTERVAL,
+    ):
+        self.interval = interval
+        self.persist = persist
+        self.persist_interval = persist_interval
+        self.history = ColumnarRingBuffer(HISTORY_COLUMNS, history)
+        self._latest: Optional[Dict[str, Any]] = None
+        self._previous_net: Optional[tuple] = None
+        self._persisted_until = epoch_ms()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Démarre le thread d'échantillonnage (idempotent)."""
+        with self._lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="system-metrics-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def sample(self) -> Dict[str, Any]:
+        """Collecte un instantané (appels psutil non bloquants) et l'ajoute à l'historique."""
+        now = epoch_ms()
+        snapshot: Dict[str, Any] = {
+            "timestamp": now,
+            "cpu": get_cpu_stats(),
+            "memory": get_memory_stats(),
+            "disk": get_disk_stats(),
+            "network": get_network_stats(),
+            "process": get_streamlit_process_info(),
+        }
+
+        network = snapshot["network"]
+        sent_rate = recv_rate = 0.0
+        with self._lock:
+            if self._previous_net is not None:
+                elapsed = (now - self._previous_net[0]) / 1000
+                if elapsed > 0:
+                    sent_rate = max(network["bytes_sent"] - self._previous_net[1], 0) / elapsed
+                    recv_rate = max(network["bytes_recv"] - self._previous_net[2], 0) / elapsed
+            self._previous_net = (now, network["bytes_sent"], network["bytes_recv"])
+        snapshot["network"] = {**network, "sent_rate": sent_rate, "recv_rate": recv_rate}
+
+        disks, process = snapshot["disk"], snapshot["process"]
+        self.history.append(
+            timestamp=now,
+            cpu_percent=snapshot["cpu"]["cpu_usage_total"],
+            memory_percent=snapshot["memory"]["memory_percent"],
+            swap_percent=snapshot["memory"]["swap_percent"],
+            disk_percent=sum(d["percent"] for d in disks) / len(disks) if disks else 0.0,
+            net_sent_rate=sent_rate,
+            net_recv_rate=recv_rate,
+            process_rss=process["memory_info"].rss,
+            process_cpu=process["cpu_percent"],
+            process_threads=process["num_threads"],
+        )
+        with self._lock:
+            self._latest = snapshot
+        return snapshot
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Dernier instantané collecté (None avant le premier échantillon)."""
+        with self._lock:
+            return self._latest
+
+    def history_frame(self, seconds: Optional[float] = None) -> pd.DataFrame:
+        """Historique en mémoire (les `seconds` dernières secondes, ou tout), avec une colonne `time`."""
+        data = self.history.snapshot() if seconds is None else self.history.since("timestamp", epoch_ms() - seconds * 1000)
+        df = pd.DataFrame(data)
+        df["time"] = pd.to_datetime(df["timestamp"], unit="ms")
+        return df
+
+    def persist_history(self) -> int:
+        """Écrit les moyennes par minute des minutes complètes non encore persistées.
+
+        Returns:
+            Nombre de minutes écrites
+        """
+        cutoff = epoch_ms() // 60000 * 60000
+        data = self.history.since("timestamp", self._persisted_until)
+        keep = data["timestamp"] < cutoff
+        self._persisted_until = cutoff
+        if not keep.any():
+            return 0
+
+        minutes, inverse = np.unique(data["timestamp"][keep] // 60000 * 60000, return_inverse=True)
+        counts = np.bincount(inverse)
+        columns = [name for name in HISTORY_COLUMNS if name != "timestamp"]
+        means = [np.bincount(inverse, weights=data[name][keep]) / counts for name in columns]
+        rows = [
+            (int(minute), int(count), *(float(m[i]) for m in means)) for i, (minute, count) in enumerate(zip(minutes, counts))
+        ]
+
+        with get_optimized_connection() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO system_metrics (minute, samples, {', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * (len(columns) + 2))})",
+                rows,
+            )
+            conn.execute("DELETE FROM system_metrics WHERE minute < ?", (days_ago_ms(SamplerConfig.RETENTION_DAYS),))
+        return len(rows)
+
+    def _run(self) -> None:
+        # Référence CPU de ce thread (cpu_percent() non bloquant mesure depuis l'appel précédent du même thread)
+        try:
+            get_cpu_stats()
+        except Exception as e:
+            logger.warning(f"Échantillonnage système en échec: {e}")
+        self._stop.wait(min(self.interval, 1.0))
+        last_persist = time.monotonic()
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.sample()
+                if self.persist and started - last_persist >= self.persist_interval:
+                    self.persist_history()
+                    last_persist = started
+            except Exception as e:
+                logger.warning(f"Échantillonnage système en échec: {e}")
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+_sampler: Optional[SystemMetricsSampler] = None
+_sampler_lock = threading.Lock()
+
+
+def get_system_sampler() -> SystemMetricsSampler:
+    """Échantillonneur partagé du processus, démarré au premier appel (sauf SYSMON_SAMPLER=false)."""
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                _sampler = SystemMetricsSampler()
+                if SamplerConfig.ENABLED:
+                    _sampler.start()
+                    atexit.register(_sampler.stop)
+    return _sampler
+
+
+def get_persisted_history(hours: float = 24) -> pd.DataFrame:
+    """Moyennes par minute persistées dans system_metrics (vide si indisponible)."""
+    try:
+        with get_readonly_connection() as conn:
+            df = pd.read_sql_query(
+                "SELECT * FROM system_metrics WHERE minute >= ? ORDER BY minute", conn, params=(days_ago_ms(hours / 24),)
+            )
+    except Exception as e:
+        logger.warning(f"Historique système indisponible: {e}")
+        return pd.DataFrame()
+    df["time"] = pd.to_datetime(df["minute"], unit="ms")
+    return df
+
+
+def create_trend_chart(history: pd.DataFrame, columns: Dict[str, str], title: str, yaxis_title: str) -> go.Figure:
+    """Courbes de tendance (une par colonne), réduites à MAX_TREND_POINTS points (LTTB)."""
+    fig = go.Figure()
+    for column, label in columns.items():
+        series = downsample(history, "timestamp", column, MAX_TREND_POINTS)
+        fig.add_trace(go.Scatter(x=series["time"], y=series[column], mode="lines", name=label))
+    fig.update_layout(title=title, yaxis_title=yaxis_title, height=300, margin=dict(t=40, b=20))
+    return fig
+
+
 def create_cpu_chart(cpu_stats: Dict) -> go.Figure:
     """Crée un graphique d'utilisation CPU."""
     fig = go.Figure()
@@ -206,11 +446,7 @@ def show_system_monitoring():
         if st.button("🔄 Actualiser", type="primary"):
             st.rerun()
     with col2:
-        auto_refresh = st.checkbox("Auto-refresh (30s)", value=False)
-
-    if auto_refresh:
-        time.sleep(30)
-        st.rerun()
+        auto_refresh = st.checkbox(f"Auto-refresh ({SamplerConfig.REFRESH_SECONDS}s)", value=False)
 
     # Informations système de base
     with st.expander("ℹ️ Informations Système", expanded=False):
@@ -235,12 +471,47 @@ def show_system_monitoring():
             """
             )
 
-    # Métriques en temps réel
-    cpu_stats = get_cpu_stats()
-    memory_stats = get_memory_stats()
-    disk_stats = get_disk_stats()
-    network_stats = get_network_stats()
-    process_info = get_streamlit_process_info()
+    sampler = get_system_sampler()
+    if auto_refresh:
+        # Seul le fragment est réexécuté à intervalle régulier, sans bloquer le serveur
+        st.fragment(run_every=SamplerConfig.REFRESH_SECONDS)(show_live_metrics)(sampler)
+    else:
+        show_live_metrics(sampler)
+
+    if SamplerConfig.PERSIST:
+        with st.expander("🕒 Historique 24 h", expanded=False):
+            show_persisted_history()
+
+
+def current_snapshot(sampler: SystemMetricsSampler) -> Optional[Dict[str, Any]]:
+    """Dernier instantané de l'échantillonneur, ou None s'il manque ou date de plus de deux intervalles.
+
+    Les mesures ne sont prises que sur le thread de l'échantillonneur : cpu_percent()
+    non bloquant garde sa référence par thread, et chaque exécution du script
+    Streamlit a son propre thread (la mesure y vaudrait toujours 0).
+    """
+    if SamplerConfig.ENABLED and not sampler.running:
+        sampler.start()  # relance un thread arrêté
+    snapshot = sampler.latest()
+    if snapshot is None or epoch_ms() - snapshot["timestamp"] > 2000 * sampler.interval:
+        return None
+    return snapshot
+
+
+def show_live_metrics(sampler: SystemMetricsSampler):
+    """Métriques, graphiques et détails issus du dernier instantané."""
+    snapshot = current_snapshot(sampler)
+    if snapshot is None:
+        if SamplerConfig.ENABLED:
+            st.info("⏳ Aucune mesure récente : premier échantillon en cours, actualisez dans quelques secondes.")
+        else:
+            st.info("Aucune donnée : l'échantillonneur système est désactivé (SYSMON_SAMPLER=false).")
+        return
+    cpu_stats = snapshot["cpu"]
+    memory_stats = snapshot["memory"]
+    disk_stats = snapshot["disk"]
+    network_stats = snapshot["network"]
+    process_info = snapshot["process"]
 
     # Métriques principales
     st.markdown("### 📊 Métriques Principales")
@@ -281,6 +552,24 @@ def show_system_monitoring():
     if disk_stats:
         st.plotly_chart(create_disk_chart(disk_stats), use_container_width=True)
 
+    # Tendances (historique en mémoire de l'échantillonneur)
+    history = sampler.history_frame()
+    if len(history) > 1:
+        st.markdown("### 📉 Tendances")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.plotly_chart(
+                create_trend_chart(
+                    history, {"cpu_percent": "CPU", "memory_percent": "RAM", "process_cpu": "App CPU"}, "Utilisation", "%"
+                ),
+                use_container_width=True,
+            )
+        with col2:
+            st.plotly_chart(
+                create_trend_chart(history, {"net_recv_rate": "Reçu", "net_sent_rate": "Envoyé"}, "Débit réseau", "octets/s"),
+                use_container_width=True,
+            )
+
     # Détails par coeur CPU
     with st.expander("🔧 Détails CPU par coeur", expanded=False):
         cpu_cores_df = pd.DataFrame(
@@ -363,5 +652,18 @@ def show_system_monitoring():
             st.markdown(f"**Uptime :** {str(uptime).split('.')[0]}")
 
 
+def show_persisted_history():
+    """Moyennes par minute des dernières 24 h (SYSMON_PERSIST=true)."""
+    history = get_persisted_history(hours=24)
+    if history.empty:
+        st.info("Aucun historique persisté pour l'instant.")
+        return
+    history = history.rename(columns={"minute": "timestamp"})
+    st.plotly_chart(
+        create_trend_chart(history, {"cpu_percent": "CPU", "memory_percent": "RAM", "disk_percent": "Disque"}, "24 h", "%"),
+        use_container_width=True,
+    )
+
+
 if __name__ == "__main__":
     show_system_monitoring()
@@ -14,6 +14,7 @@ import bcrypt
 import streamlit as st
 
 from src.data.database import get_connection
+from src.data.queries import USER_CREDENTIALS_BY_EMAIL_SQL
 
 logger = logging.getLogger(__name__)
 
@@ -295,7 +296,7 @@ def login_enhanced() -> Optional[Dict[str, any]]:
             try:
                 with get_connection() as conn:
                     cursor = conn.cursor()
-                    cursor.execute("SELECT id, password FROM users WHERE email = ?", (email.lower(),))
+                    cursor.execute(USER_CREDENTIALS_BY_EMAIL_SQL, (email.lower(),))
                     result = cursor.fetchone()
 
                     if result and bcrypt.checkpw(password.encode("utf-8"), result[1]):
@@ -6,9 +6,14 @@ import logging
 import os
 import sqlite3
 import threading
+import time
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional
+
+from src.ai.models_config import AVAILABLE_MODELS, get_model_config
+from src.data.query_stats import InstrumentedConnection, QueryStatsConfig, query_stats
+from src.data.sketches import rebuild_performance_sketches
 
 logger = logging.getLogger(__name__)
 
@@ -30,7 +35,43 @@ class DatabaseConfig:
     ]
 
     # Version du schéma pour les migrations
-    SCHEMA_VERSION = 4
+    SCHEMA_VERSION = 15
+
+    # Pool de connexions (surchargeable par variables d'environnement)
+    POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+    POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "16"))
+    POOL_IDLE_TIMEOUT = float(os.getenv("DB_POOL_IDLE_TIMEOUT", "300"))  # secondes
+    POOL_CHECKOUT_TIMEOUT = float(os.getenv("DB_POOL_CHECKOUT_TIMEOUT", "30"))  # secondes
+    POOL_REAP_INTERVAL = float(os.getenv("DB_POOL_REAP_INTERVAL", "30"))  # secondes
+
+    # Connexions en lecture seule (analytique, tableaux de bord)
+    READONLY_POOL_MAX_SIZE = int(os.getenv("DB_READONLY_POOL_MAX_SIZE", "4"))
+    READONLY_CACHE_KB = int(os.getenv("DB_READONLY_CACHE_KB", "65536"))  # 64MB
+    READONLY_PRAGMA_SETTINGS = [
+        "PRAGMA query_only=ON",  # Garde-fou : aucune écriture possible
+        f"PRAGMA cache_size=-{READONLY_CACHE_KB}",  # Cache plus large pour les agrégats
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA mmap_size=268435456",
+    ]
+
+
+# Horodatage courant en millisecondes depuis l'epoch Unix, calculé par SQLite
+EPOCH_MS_SQL = "CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)"
+
+
+def epoch_ms(seconds: Optional[float] = None) -> int:
+    """Horodatage en millisecondes depuis l'epoch (maintenant par défaut)."""
+    return int((time.time() if seconds is None else seconds) * 1000)
+
+
+def days_ago_ms(days: float) -> int:
+    """Borne inférieure en millisecondes pour les filtres « N derniers jours »."""
+    return epoch_ms(time.time() - days * 86400)
+
+
+def sql_datetime(column: str) -> str:
+    """Expression SQL formatant une colonne epoch ms comme CURRENT_TIMESTAMP ('YYYY-MM-DD HH:MM:SS')."""
+    return f"strftime('%Y-%m-%d %H:%M:%S', {column} / 1000, 'unixepoch')"
 
 
 def get_db_path() -> Path:
@@ -64,30 +105,382 @@ def get_db_path() -> Path:
     return Path("database.db")
 
 
+class _PooledConnection:
+    """Connexion du pool accompagnée de ses métadonnées de bail."""
+
+    __slots__ = ("connection", "db_path", "generation", "last_used", "owner", "pinned")
+
+    def __init__(self, connection: sqlite3.Connection, db_path: str, generation: int):
+        self.connection = connection
+        self.db_path = db_path
+        self.generation = generation
+        self.last_used = time.monotonic()
+        self.owner: Optional[threading.Thread] = None
+        self.pinned = False
+
+
+class ConnectionPool:
+    """Pool borné de connexions SQLite avec baux par thread.
+
+    Une connexion est prêtée à un thread puis rendue au pool (fin de
+    `get_optimized_connection`, libération explicite ou mort du thread).
+    La validité est vérifiée sans requête : compteur de génération,
+    chemin de la base et invalidation sur erreur.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], sqlite3.Connection],
+        min_size: int = 1,
+        max_size: int = 16,
+        idle_timeout: float = 300.0,
+        checkout_timeout: float = 30.0,
+        reap_interval: float = 30.0,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size doit être >= 1")
+        self._factory = factory
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.reap_interval = reap_interval
+
+        self._cond = threading.Condition(threading.Lock())
+        self._idle: List[_PooledConnection] = []
+        self._in_use: Dict[int, _PooledConnection] = {}
+        self._size = 0
+        self._generation = 0
+        self._last_reap = time.monotonic()
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time": 0.0,
+            "creations": 0,
+            "closed": 0,
+            "reaped_idle": 0,
+            "reaped_dead_threads": 0,
+            "invalidations": 0,
+        }
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def is_valid(self, entry: _PooledConnection, db_path: str) -> bool:
+        """Vérifie un bail sans exécuter de requête SQL."""
+        if entry.generation != self._generation or entry.db_path != db_path:
+            return False
+        try:
+            # Lecture d'attribut C : lève ProgrammingError si la connexion a été fermée
+            entry.connection.total_changes
+        except sqlite3.Error:
+            return False
+        return True
+
+    def owns(self, entry: _PooledConnection) -> bool:
+        """True si le bail est actuellement enregistré dans ce pool."""
+        return self._in_use.get(id(entry)) is entry
+
+    def acquire(self, db_path: str) -> _PooledConnection:
+        """Prête une connexion au thread courant (attend si le pool est plein)."""
+        owner = threading.current_thread()
+        started = None
+        with self._cond:
+            self._maybe_reap_locked()
+            while True:
+                entry = self._pop_idle_locked(db_path)
+                if entry is not None:
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                # Pool plein : récupérer les baux des threads morts avant d'attendre
+                if self._reap_dead_threads_locked():
+                    continue
+                if started is None:
+                    started = time.monotonic()
+                    self._stats["waits"] += 1
+                remaining = self.checkout_timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._stats["wait_time"] += time.monotonic() - started
+                    raise sqlite3.OperationalError(
+                        f"Pool de connexions SQLite épuisé ({self.max_size} connexions en cours d'utilisation)"
+                    )
+                # Réveil périodique pour détecter les threads morts
+                self._cond.wait(min(remaining, 1.0))
+            if started is not None:
+                self._stats["wait_time"] += time.monotonic() - started
+            generation = self._generation
+
+        if entry is None:
+            # Création hors verrou : un slot a été réservé ci-dessus
+            try:
+                connection = self._factory()
+            except BaseException:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            entry = _PooledConnection(connection, db_path, generation)
+            with self._cond:
+                self._stats["creations"] += 1
+
+        with self._cond:
+            entry.owner = owner
+            entry.pinned = False
+            entry.last_used = time.monotonic()
+            self._in_use[id(entry)] = entry
+            self._stats["checkouts"] += 1
+        return entry
+
+    def release(self, entry: _PooledConnection) -> None:
+        """Rend une connexion au pool (ou la ferme si elle n'est plus valide)."""
+        with self._cond:
+            if self._in_use.pop(id(entry), None) is None:
+                return
+            entry.owner = None
+            entry.pinned = False
+            if not self._reset(entry) or entry.generation != self._generation:
+                self._close_locked(entry)
+            else:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+            self._cond.notify()
+
+    def discard(self, entry: _PooledConnection) -> None:
+        """Ferme une connexion prêtée (invalidation suite à une erreur)."""
+        with self._cond:
+            if self._in_use.pop(id(entry), None) is None:
+                return
+            self._close_locked(entry)
+            self._cond.notify()
+
+    def invalidate(self) -> None:
+        """Invalide toutes les connexions : les inactives sont fermées, les prêtées le seront à leur retour."""
+        with self._cond:
+            self._generation += 1
+            self._stats["invalidations"] += 1
+            idle, self._idle = self._idle, []
+            for entry in idle:
+                self._close_locked(entry)
+            self._cond.notify_all()
+
+    def reap(self) -> int:
+        """Ferme les connexions inactives expirées et récupère celles des threads morts."""
+        with self._cond:
+            return self._reap_locked()
+
+    def stats(self) -> Dict[str, Any]:
+        """Retourne les statistiques du pool."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(
+                {
+                    "size": self._size,
+                    "idle": len(self._idle),
+                    "in_use": len(self._in_use),
+                    "min_size": self.min_size,
+                    "max_size": self.max_size,
+                    "generation": self._generation,
+                }
+            )
+        return stats
+
+    def close_all(self) -> None:
+        """Ferme toutes les connexions inactives et invalide les connexions prêtées."""
+        self.invalidate()
+
+    # --- Helpers internes (appelés avec le verrou détenu) ---
+
+    def _pop_idle_locked(self, db_path: str) -> Optional[_PooledConnection]:
+        while self._idle:
+            entry = self._idle.pop()  # LIFO : la connexion la plus chaude d'abord
+            if self.is_valid(entry, db_path):
+                return entry
+            self._close_locked(entry)
+        return None
+
+    def _close_locked(self, entry: _PooledConnection) -> None:
+        self._size -= 1
+        self._stats["closed"] += 1
+        try:
+            entry.connection.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _reset(entry: _PooledConnection) -> bool:
+        """Annule une transaction restée ouverte avant remise dans le pool."""
+        try:
+            if getattr(entry.connection, "in_transaction", False) is True:
+                entry.connection.rollback()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _maybe_reap_locked(self) -> None:
+        if time.monotonic() - self._last_reap >= self.reap_interval:
+            self._reap_locked()
+
+    def _reap_dead_threads_locked(self) -> int:
+        dead = [entry for entry in self._in_use.values() if entry.owner is not None and not entry.owner.is_alive()]
+        for entry in dead:
+            del self._in_use[id(entry)]
+            entry.owner = None
+            entry.pinned = False
+            if self._reset(entry) and entry.generation == self._generation:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+            else:
+                self._close_locked(entry)
+        if dead:
+            self._stats["reaped_dead_threads"] += len(dead)
+            self._cond.notify_all()
+        return len(dead)
+
+    def _reap_locked(self) -> int:
+        self._last_reap = time.monotonic()
+        reaped = self._reap_dead_threads_locked()
+        deadline = self._last_reap - self.idle_timeout
+        kept = []
+        # Les plus anciennes en tête de liste : on ferme tant qu'on reste au-dessus de min_size
+        for entry in self._idle:
+            if entry.last_used < deadline and self._size > self.min_size:
+                self._close_locked(entry)
+                self._stats["reaped_idle"] += 1
+                reaped += 1
+            else:
+                kept.append(entry)
+        self._idle = kept
+        return reaped
+
+
+def _connection_factory() -> type:
+    """Classe de connexion : instrumentée (durées par requête) sauf si DB_QUERY_STATS=false."""
+    return InstrumentedConnection if QueryStatsConfig.ENABLED else sqlite3.Connection
+
+
 class DatabaseConnection:
-    """Gestionnaire de connexion optimisé avec pooling basique."""
+    """Gestionnaire de connexion adossé à un pool borné (un bail par thread)."""
 
     _thread_local = threading.local()
+    _pool: Optional[ConnectionPool] = None
+    _readonly_pool: Optional[ConnectionPool] = None
+    _pool_lock = threading.Lock()
 
     @classmethod
-    def get_connection(cls) -> sqlite3.Connection:
-        """Retourne une connexion SQLite optimisée."""
-        # Une connexion par thread pour éviter les conflits
-        # Si une connexion existe mais est fermée/invalide, on la recrée.
-        if hasattr(cls._thread_local, "connection"):
-            try:
-                # Vérifie que la connexion est valide
-                cls._thread_local.connection.execute("SELECT 1")
-            except sqlite3.Error:
-                try:
-                    cls._thread_local.connection.close()
-                except Exception:
-                    pass
-                del cls._thread_local.connection
-        if not hasattr(cls._thread_local, "connection"):
-            cls._thread_local.connection = cls._create_optimized_connection()
+    def get_pool(cls) -> ConnectionPool:
+        """Retourne le pool de connexions (créé à la première utilisation)."""
+        if cls._pool is None:
+            with cls._pool_lock:
+                if cls._pool is None:
+                    cls._pool = ConnectionPool(
+                        # Lambda : reste compatible avec les patchs de _create_optimized_connection
+                        factory=lambda: cls._create_optimized_connection(),
+                        min_size=DatabaseConfig.POOL_MIN_SIZE,
+                        max_size=DatabaseConfig.POOL_MAX_SIZE,
+                        idle_timeout=DatabaseConfig.POOL_IDLE_TIMEOUT,
+                        checkout_timeout=DatabaseConfig.POOL_CHECKOUT_TIMEOUT,
+                        reap_interval=DatabaseConfig.POOL_REAP_INTERVAL,
+                    )
+        return cls._pool
+
+    @classmethod
+    def get_readonly_pool(cls) -> ConnectionPool:
+        """Pool distinct de connexions en lecture seule (jamais prêtées aux écritures)."""
+        if cls._readonly_pool is None:
+            with cls._pool_lock:
+                if cls._readonly_pool is None:
+                    cls._readonly_pool = ConnectionPool(
+                        factory=lambda: cls._create_readonly_connection(),
+                        min_size=0,
+                        max_size=DatabaseConfig.READONLY_POOL_MAX_SIZE,
+                        idle_timeout=DatabaseConfig.POOL_IDLE_TIMEOUT,
+                        checkout_timeout=DatabaseConfig.POOL_CHECKOUT_TIMEOUT,
+                        reap_interval=DatabaseConfig.POOL_REAP_INTERVAL,
+                    )
+        return cls._readonly_pool
+
+    @classmethod
+    def configure_pool(cls, **kwargs) -> ConnectionPool:
+        """Recrée le pool avec de nouveaux paramètres (min_size, max_size, ...)."""
+        with cls._pool_lock:
+            old_pool = cls._pool
+            params = {
+                "min_size": DatabaseConfig.POOL_MIN_SIZE,
+                "max_size": DatabaseConfig.POOL_MAX_SIZE,
+                "idle_timeout": DatabaseConfig.POOL_IDLE_TIMEOUT,
+                "checkout_timeout": DatabaseConfig.POOL_CHECKOUT_TIMEOUT,
+                "reap_interval": DatabaseConfig.POOL_REAP_INTERVAL,
+            }
+            params.update(kwargs)
+            cls._pool = ConnectionPool(factory=lambda: cls._create_optimized_connection(), **params)
+        if old_pool is not None:
+            old_pool.close_all()
+        return cls._pool
+
+    @classmethod
+    def get_connection(cls, pin: bool = True) -> sqlite3.Connection:
+        """Retourne la connexion prêtée au thread courant.
 
-        return cls._thread_local.connection
+        Args:
+            pin: si True (API historique), le bail est conservé jusqu'à
+                `release_connection()` ou la fin du thread. Sinon il est rendu
+                au pool à la sortie de `get_optimized_connection`.
+        """
+        pool = cls.get_pool()
+        local = cls._thread_local
+        entry = getattr(local, "pooled", None)
+        connection = getattr(local, "connection", None)
+        db_path = str(get_db_path())
+
+        if entry is not None:
+            if connection is entry.connection and pool.owns(entry) and pool.is_valid(entry, db_path):
+                entry.pinned = entry.pinned or pin
+                return connection
+            # Bail périmé (invalidation, changement de base, connexion fermée)
+            pool.discard(entry)
+            cls._forget_thread_lease()
+
+        entry = pool.acquire(db_path)
+        entry.pinned = pin
+        local.pooled = entry
+        local.connection = entry.connection
+        return entry.connection
+
+    @classmethod
+    def release_connection(cls, force: bool = True) -> None:
+        """Rend la connexion du thread courant au pool.
+
+        Args:
+            force: si False, un bail épinglé par l'API historique est conservé.
+        """
+        entry = getattr(cls._thread_local, "pooled", None)
+        if entry is None or (entry.pinned and not force):
+            return
+        cls._forget_thread_lease()
+        if cls._pool is not None:
+            cls._pool.release(entry)
+
+    @classmethod
+    def discard_connection(cls) -> None:
+        """Ferme la connexion du thread courant suite à une erreur (sans toucher aux autres)."""
+        entry = getattr(cls._thread_local, "pooled", None)
+        cls._forget_thread_lease()
+        if entry is not None and cls._pool is not None:
+            cls._pool.discard(entry)
+
+    @classmethod
+    def _forget_thread_lease(cls) -> None:
+        for attr in ("pooled", "connection"):
+            if hasattr(cls._thread_local, attr):
+                delattr(cls._thread_local, attr)
+
+    @classmethod
+    def get_pool_stats(cls) -> Dict[str, Any]:
+        """Statistiques du pool : checkouts, attentes, créations, tailles."""
+        return cls.get_pool().stats()
 
     @classmethod
     def _create_optimized_connection(cls) -> sqlite3.Connection:
@@ -98,6 +491,7 @@ class DatabaseConnection:
             check_same_thread=False,
             timeout=30.0,  # Timeout de 30 secondes
             isolation_level=None,  # Autocommit mode
+            factory=_connection_factory(),
         )
 
         # Activer les clés étrangères
@@ -117,17 +511,76 @@ class DatabaseConnection:
         logger.debug("Connexion SQLite optimisée créée")
         return conn
 
+    @classmethod
+    def _create_readonly_connection(cls) -> sqlite3.Connection:
+        """Crée une connexion en lecture seule (URI mode=ro, query_only)."""
+        uri = f"{get_db_path().resolve().as_uri()}?mode=ro"
+        # Autocommit : chaque requête est sa propre transaction de lecture, sans BEGIN différé
+        conn = sqlite3.connect(
+            uri, uri=True, check_same_thread=False, timeout=30.0, isolation_level=None, factory=_connection_factory()
+        )
+
+        for pragma in DatabaseConfig.READONLY_PRAGMA_SETTINGS:
+            try:
+                conn.execute(pragma)
+            except sqlite3.Error as e:
+                logger.warning(f"Échec {pragma}: {e}")
+
+        conn.row_factory = sqlite3.Row
+        logger.debug("Connexion SQLite lecture seule créée")
+        return conn
+
     @classmethod
     def close_all_connections(cls):
-        """Ferme toutes les connexions ouvertes."""
-        if hasattr(cls._thread_local, "connection"):
-            cls._thread_local.connection.close()
-            del cls._thread_local.connection
+        """Ferme la connexion du thread courant et invalide toutes celles des pools."""
+        cls.discard_connection()
+        for pool in (cls._pool, cls._readonly_pool):
+            if pool is not None:
+                pool.invalidate()
 
 
 class DatabaseSchema:
     """Gestionnaire de schéma avec migrations versionnées."""
 
+    # DDL des tables horodatées, paramétrées par nom pour la reconstruction (migration v9)
+    MESSAGES_TABLE_SQL = f"""
+        CREATE TABLE IF NOT EXISTS {{table}} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            campaign_id INTEGER,
+            role TEXT NOT NULL CHECK(role IN ('system', 'user', 'assistant')),
+            content TEXT NOT NULL,
+            character_id INTEGER,
+            timestamp INTEGER NOT NULL DEFAULT ({EPOCH_MS_SQL}),
+            FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE,
+            FOREIGN KEY(campaign_id) REFERENCES campaigns(id) ON DELETE CASCADE,
+            FOREIGN KEY(character_id) REFERENCES characters(id) ON DELETE SET NULL
+        )
+    """
+    PERFORMANCE_LOGS_TABLE_SQL = f"""
+        CREATE TABLE IF NOT EXISTS {{table}} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            campaign_id INTEGER,
+            model TEXT NOT NULL,
+            latency REAL NOT NULL,
+            tokens_in INTEGER NOT NULL,
+            tokens_out INTEGER NOT NULL,
+            cost_estimate REAL,
+            timestamp INTEGER NOT NULL DEFAULT ({EPOCH_MS_SQL}),
+            ttft REAL,
+            comparison_id TEXT,
+            FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE,
+            FOREIGN KEY(campaign_id) REFERENCES campaigns(id) ON DELETE CASCADE
+        )
+    """
+
+    # Index partiel : seules les lignes issues d'une comparaison multi-modèles y figurent
+    COMPARISON_INDEX_SQL = (
+        "CREATE INDEX IF NOT EXISTS idx_performance_comparison ON performance_logs(comparison_id) "
+        "WHERE comparison_id IS NOT NULL"
+    )
+
     @staticmethod
     def get_schema_version(conn: sqlite3.Connection) -> int:
         """Récupère la version actuelle du schéma."""
@@ -206,6 +659,8 @@ class DatabaseSchema:
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                 updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                 is_active BOOLEAN DEFAULT 1,
+                message_count INTEGER NOT NULL DEFAULT 0,
+                last_activity DATETIME,
                 FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
             )
         """
@@ -215,6 +670,10 @@ class DatabaseSchema:
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_campaigns_user ON campaigns(user_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_campaigns_active ON campaigns(is_active)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_campaigns_updated ON campaigns(updated_at)")
+        # Listing des campagnes actives triées par activité, sans B-tree temporaire
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_campaigns_user_active_updated ON campaigns(user_id, is_active, updated_at)"
+        )
 
         # Table personnages
         cursor.execute(
@@ -242,55 +701,49 @@ class DatabaseSchema:
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_characters_user ON characters(user_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_characters_campaign ON characters(campaign_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_characters_active ON characters(is_active)")
-
-        # Table messages
         cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                campaign_id INTEGER,
-                role TEXT NOT NULL CHECK(role IN ('system', 'user', 'assistant')),
-                content TEXT NOT NULL,
-                character_id INTEGER,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE,
-                FOREIGN KEY(campaign_id) REFERENCES campaigns(id) ON DELETE CASCADE,
-                FOREIGN KEY(character_id) REFERENCES characters(id) ON DELETE SET NULL
-            )
-        """
+            "CREATE INDEX IF NOT EXISTS idx_characters_user_active_created ON characters(user_id, is_active, created_at)"
         )
 
+        # Table messages (timestamp en millisecondes epoch)
+        cursor.execute(cls.MESSAGES_TABLE_SQL.format(table="messages"))
+
         # Index pour les messages (critiques pour la performance)
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_user ON messages(user_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_campaign ON messages(campaign_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages(timestamp)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_role ON messages(role)")
+        # Fenêtre de fin et pagination par curseur (keyset) sur (campaign_id, id)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_campaign_user_id ON messages(campaign_id, user_id, id)")
 
-        # Table performance logs
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS performance_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                campaign_id INTEGER,
-                model TEXT NOT NULL,
-                latency REAL NOT NULL,
-                tokens_in INTEGER NOT NULL,
-                tokens_out INTEGER NOT NULL,
-                cost_estimate REAL,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE,
-                FOREIGN KEY(campaign_id) REFERENCES campaigns(id) ON DELETE CASCADE
-            )
-        """
-        )
+        # Statistiques de campagne maintenues par triggers (bases déjà migrées uniquement)
+        if cls._table_has_column(conn, "campaigns", "message_count"):
+            cls.create_campaign_stats_triggers(conn)
+
+        # Table performance logs (timestamp en millisecondes epoch)
+        cursor.execute(cls.PERFORMANCE_LOGS_TABLE_SQL.format(table="performance_logs"))
 
         # Index pour les performances
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_performance_user ON performance_logs(user_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_performance_model ON performance_logs(model)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_performance_timestamp ON performance_logs(timestamp)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_performance_campaign ON performance_logs(campaign_id)")
+        # Fenêtres temporelles par utilisateur (statistiques, tableau de bord)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_performance_user_timestamp ON performance_logs(user_id, timestamp)")
+        # Lignes d'une comparaison multi-modèles (colonne ajoutée en v15 sur les bases existantes)
+        if cls._table_has_column(conn, "performance_logs", "comparison_id"):
+            cursor.execute(cls.COMPARISON_INDEX_SQL)
+
+        # Compteurs de version pour la cohérence du cache entre processus
+        cls.create_cache_versions(conn)
+
+        # Agrégats horaires/journaliers maintenus par triggers
+        cls.create_performance_rollups(conn)
+        cls.create_performance_sketches(conn)
+        cls.create_system_metrics(conn)
+
+        # Vues de compatibilité (timestamp texte) pour les lecteurs existants
+        cls.create_compat_views(conn)
 
         logger.info("Toutes les tables et index créés avec succès")
 
@@ -315,6 +768,50 @@ class DatabaseSchema:
             logger.info("Migration vers version 4: Ajout de la colonne ai_model sur campaigns")
             cls._migration_v4(conn)
 
+        if current_version < 5:
+            logger.info("Migration vers version 5: Index de pagination des messages")
+            cls._migration_v5(conn)
+
+        if current_version < 6:
+            logger.info("Migration vers version 6: Statistiques de campagne dénormalisées")
+            cls._migration_v6(conn)
+
+        if current_version < 7:
+            logger.info("Migration vers version 7: Compteurs de version du cache")
+            cls._migration_v7(conn)
+
+        if current_version < 8:
+            logger.info("Migration vers version 8: Index composites des requêtes chaudes")
+            cls._migration_v8(conn)
+
+        if current_version < 9:
+            logger.info("Migration vers version 9: Horodatages entiers (ms epoch) pour messages et performance_logs")
+            cls._migration_v9(conn)
+
+        if current_version < 10:
+            logger.info("Migration vers version 10: Agrégats horaires/journaliers de performance_logs")
+            cls._migration_v10(conn)
+
+        if current_version < 11:
+            logger.info("Migration vers version 11: Sketches de quantiles de latence")
+            cls._migration_v11(conn)
+
+        if current_version < 12:
+            logger.info("Migration vers version 12: Backfill de performance_logs.cost_estimate")
+            cls._migration_v12(conn)
+
+        if current_version < 13:
+            logger.info("Migration vers version 13: Historique des métriques système")
+            cls._migration_v13(conn)
+
+        if current_version < 14:
+            logger.info("Migration vers version 14: Délai du premier token (performance_logs.ttft)")
+            cls._migration_v14(conn)
+
+        if current_version < 15:
+            logger.info("Migration vers version 15: Identifiant de comparaison multi-modèles (performance_logs.comparison_id)")
+            cls._migration_v15(conn)
+
         # Mettre à jour la version finale
         if current_version < DatabaseConfig.SCHEMA_VERSION:
             cls.set_schema_version(conn, DatabaseConfig.SCHEMA_VERSION)
@@ -411,30 +908,574 @@ class DatabaseSchema:
             # Si la table n'existe pas encore, elle sera créée par create_tables
             pass
 
+    @staticmethod
+    def _migration_v5(conn: sqlite3.Connection):
+        """Migration version 5: index (campaign_id, user_id, id) pour l'historique paginé."""
+        cursor = conn.cursor()
+        try:
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_campaign_user_id ON messages(campaign_id, user_id, id)")
+        except sqlite3.OperationalError:
+            # Table absente : l'index sera créé par create_tables
+            pass
+
+    @staticmethod
+    def create_campaign_stats_triggers(conn: sqlite3.Connection):
+        """Triggers maintenant campaigns.message_count et campaigns.last_activity."""
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_messages_stats_insert
+            AFTER INSERT ON messages
+            WHEN NEW.campaign_id IS NOT NULL
+            BEGIN
+                UPDATE campaigns
+                SET message_count = message_count + 1,
+                    last_activity = CASE
+                        WHEN last_activity IS NULL OR NEW.timestamp > last_activity THEN NEW.timestamp
+                        ELSE last_activity
+                    END
+                WHERE id = NEW.campaign_id;
+            END
+        """
+        )
+        cursor.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_messages_stats_delete
+            AFTER DELETE ON messages
+            WHEN OLD.campaign_id IS NOT NULL
+            BEGIN
+                UPDATE campaigns
+                SET message_count = MAX(message_count - 1, 0),
+                    last_activity = (SELECT MAX(timestamp) FROM messages WHERE campaign_id = OLD.campaign_id)
+                WHERE id = OLD.campaign_id;
+            END
+        """
+        )
+        cursor.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_messages_stats_move
+            AFTER UPDATE OF campaign_id ON messages
+            WHEN OLD.campaign_id IS NOT NEW.campaign_id
+            BEGIN
+                UPDATE campaigns
+                SET message_count = MAX(message_count - 1, 0),
+                    last_activity = (SELECT MAX(timestamp) FROM messages WHERE campaign_id = OLD.campaign_id)
+                WHERE id = OLD.campaign_id;
+                UPDATE campaigns
+                SET message_count = message_count + 1,
+                    last_activity = (SELECT MAX(timestamp) FROM messages WHERE campaign_id = NEW.campaign_id)
+                WHERE id = NEW.campaign_id;
+            END
+        """
+        )
+
+    @staticmethod
+    def rebuild_campaign_stats(conn: sqlite3.Connection):
+        """Recalcule message_count/last_activity depuis messages (backfill ponctuel)."""
+        conn.execute(
+            """
+            UPDATE campaigns
+            SET message_count = (SELECT COUNT(*) FROM messages m WHERE m.campaign_id = campaigns.id),
+                last_activity = (SELECT MAX(m.timestamp) FROM messages m WHERE m.campaign_id = campaigns.id)
+        """
+        )
+
+    @staticmethod
+    def _migration_v6(conn: sqlite3.Connection):
+        """Migration version 6: compteurs de messages sur campaigns, triggers et backfill."""
+        new_columns = [("message_count", "INTEGER NOT NULL DEFAULT 0"), ("last_activity", "DATETIME")]
+        try:
+            cursor = conn.cursor()
+            for column, definition in new_columns:
+                if not DatabaseSchema._table_has_column(conn, "campaigns", column):
+                    cursor.execute(f"ALTER TABLE campaigns ADD COLUMN {column} {definition}")
+            DatabaseSchema.create_campaign_stats_triggers(conn)
+            DatabaseSchema.rebuild_campaign_stats(conn)
+        except sqlite3.OperationalError:
+            # Tables absentes : create_tables créera colonnes et triggers
+            pass
+
+    # Table source -> (portée de cache, colonne portant l'utilisateur)
+    CACHE_VERSION_SOURCES = {
+        "users": ("user", "id"),
+        "model_choices": ("model_choice", "user_id"),
+        "campaigns": ("campaigns", "user_id"),
+        "characters": ("characters", "user_id"),
+    }
+
+    @staticmethod
+    def create_cache_versions(conn: sqlite3.Connection):
+        """Table cache_versions et triggers incrémentant la version (utilisateur, portée) à chaque écriture.
+
+        Chaque processus valide ses entrées de cache par une simple lecture entière,
+        quel que soit le processus ou la réplique qui a écrit.
+        """
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_versions (
+                user_id INTEGER NOT NULL,
+                scope TEXT NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, scope)
+            ) WITHOUT ROWID
+        """
+        )
+        for table, (scope, user_column) in DatabaseSchema.CACHE_VERSION_SOURCES.items():
+            for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+                cursor.execute(
+                    f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_cache_version_{table}_{event.lower()}
+                    AFTER {event} ON {table}
+                    BEGIN
+                        INSERT INTO cache_versions (user_id, scope, version)
+                        VALUES ({row}.{user_column}, '{scope}', 1)
+                        ON CONFLICT(user_id, scope) DO UPDATE SET version = version + 1;
+                    END
+                """
+                )
+
+    @staticmethod
+    def _migration_v7(conn: sqlite3.Connection):
+        """Migration version 7: compteurs de version pour la cohérence du cache multi-processus."""
+        try:
+            DatabaseSchema.create_cache_versions(conn)
+        except sqlite3.OperationalError:
+            # Tables sources absentes : create_tables créera table et triggers
+            pass
+
+    @staticmethod
+    def _migration_v8(conn: sqlite3.Connection):
+        """Migration version 8: index composites signalés par l'analyse des plans (src.data.query_plans)."""
+        cursor = conn.cursor()
+        indexes = [
+            "CREATE INDEX IF NOT EXISTS idx_campaigns_user_active_updated ON campaigns(user_id, is_active, updated_at)",
+            "CREATE INDEX IF NOT EXISTS idx_characters_user_active_created ON characters(user_id, is_active, created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_performance_user_timestamp ON performance_logs(user_id, timestamp)",
+        ]
+
+        for index_sql in indexes:
+            try:
+                cursor.execute(index_sql)
+            except sqlite3.OperationalError:
+                # Table absente : l'index sera créé par create_tables
+                pass
+
+    @staticmethod
+    def _column_type(conn: sqlite3.Connection, table_name: str, column_name: str) -> Optional[str]:
+        """Type déclaré d'une colonne (None si table ou colonne absente). Tolère les mocks dans les tests."""
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"PRAGMA table_info({table_name})")
+            for row in cursor.fetchall():
+                if row[1] == column_name:
+                    return (row[2] or "").upper()
+        except Exception:
+            pass
+        return None
+
+    @staticmethod
+    def _rebuild_with_epoch_ms(conn: sqlite3.Connection, table: str, create_sql: str):
+        """Reconstruit `table` avec un timestamp entier (ms epoch) : copie, bascule, index et triggers recréés."""
+        cursor = conn.cursor()
+        dependents = [
+            row[0]
+            for row in cursor.execute(
+                "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+                (table,),
+            ).fetchall()
+        ]
+        old_columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()]
+
+        new_table = f"{table}_v9"
+        cursor.execute(f"DROP TABLE IF EXISTS {new_table}")
+        cursor.execute(create_sql.format(table=new_table))
+        new_columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({new_table})").fetchall()]
+        columns = [column for column in new_columns if column in old_columns and column != "timestamp"]
+
+        # Texte 'YYYY-MM-DD HH:MM:SS' -> ms epoch ; valeurs déjà entières conservées
+        converted = f"""
+            CASE
+                WHEN typeof(timestamp) = 'integer' THEN timestamp
+                ELSE COALESCE(CAST(ROUND((julianday(timestamp) - 2440587.5) * 86400000) AS INTEGER), {EPOCH_MS_SQL})
+            END
+        """
+        column_list = ", ".join(columns)
+        cursor.execute(
+            f"INSERT INTO {new_table} ({column_list}, timestamp) SELECT {column_list}, {converted} FROM {table} ORDER BY id"
+        )
+        cursor.execute(f"DROP TABLE {table}")
+        cursor.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+        for sql in dependents:
+            cursor.execute(sql)
+
+    @staticmethod
+    def create_compat_views(conn: sqlite3.Connection):
+        """Vues messages_compat / performance_logs_compat : timestamp au format texte historique.
+
+        La colonne `timestamp_ms` expose la valeur entière d'origine.
+        """
+        cursor = conn.cursor()
+        cursor.execute("DROP VIEW IF EXISTS messages_compat")
+        cursor.execute(
+            f"""
+            CREATE VIEW messages_compat AS
+            SELECT id, user_id, campaign_id, role, content, character_id,
+                   {sql_datetime("timestamp")} AS timestamp, timestamp AS timestamp_ms
+            FROM messages
+        """
+        )
+        cursor.execute("DROP VIEW IF EXISTS performance_logs_compat")
+        cursor.execute(
+            f"""
+            CREATE VIEW performance_logs_compat AS
+            SELECT id, user_id, campaign_id, model, latency, tokens_in, tokens_out, cost_estimate,
+                   {sql_datetime("timestamp")} AS timestamp, timestamp AS timestamp_ms
+            FROM performance_logs
+        """
+        )
+
+    @staticmethod
+    def _migration_v9(conn: sqlite3.Connection):
+        """Migration version 9: timestamps DATETIME texte -> INTEGER ms epoch (ordre déterministe, index plus compacts)."""
+        rebuilds = [
+            ("messages", DatabaseSchema.MESSAGES_TABLE_SQL),
+            ("performance_logs", DatabaseSchema.PERFORMANCE_LOGS_TABLE_SQL),
+        ]
+        try:
+            # Les vues référencent les tables reconstruites : recréées après la bascule
+            conn.execute("DROP VIEW IF EXISTS messages_compat")
+            conn.execute("DROP VIEW IF EXISTS performance_logs_compat")
+            for table, create_sql in rebuilds:
+                column_type = DatabaseSchema._column_type(conn, table, "timestamp")
+                if column_type is not None and column_type != "INTEGER":
+                    DatabaseSchema._rebuild_with_epoch_ms(conn, table, create_sql)
+            if DatabaseSchema._table_has_column(conn, "campaigns", "message_count"):
+                # last_activity suit désormais le format entier de messages.timestamp
+                DatabaseSchema.rebuild_campaign_stats(conn)
+            DatabaseSchema.create_compat_views(conn)
+        except sqlite3.OperationalError as e:
+            # Tables absentes : create_tables créera le nouveau format
+            logger.warning(f"Migration v9 incomplète: {e}")
+
+    # Agrégats de performance_logs : table -> largeur du seau (ms epoch, UTC)
+    PERFORMANCE_ROLLUPS = {
+        "performance_rollup_hourly": 3600 * 1000,
+        "performance_rollup_daily": 86400 * 1000,
+    }
+
+    @staticmethod
+    def _rollup_recompute_sql(table: str, width: int, row: str) -> str:
+        """SQL recalculant depuis performance_logs le seau (utilisateur, modèle) de la ligne `row` (OLD/NEW)."""
+        bucket = f"({row}.timestamp - {row}.timestamp % {width})"
+        return f"""
+            DELETE FROM {table} WHERE user_id = {row}.user_id AND bucket = {bucket} AND model = {row}.model;
+            INSERT INTO {table}
+                (user_id, model, bucket, count, latency_sum, latency_min, latency_max, tokens_in, tokens_out, cost)
+            SELECT user_id, model, {bucket}, COUNT(*), SUM(latency), MIN(latency), MAX(latency),
+                   SUM(tokens_in), SUM(tokens_out), COALESCE(SUM(cost_estimate), 0)
+            FROM performance_logs
+            WHERE user_id = {row}.user_id AND model = {row}.model
+                AND timestamp >= {bucket} AND timestamp < {bucket} + {width}
+            GROUP BY user_id, model;
+        """
+
+    @staticmethod
+    def create_performance_rollups(conn: sqlite3.Connection):
+        """Tables performance_rollup_hourly/daily et triggers les tenant à jour à chaque écriture.
+
+        Insertion : upsert incrémental du seau. Suppression/modification : le seau
+        concerné est recalculé depuis les lignes brutes (min/max non décrémentables).
+        """
+        cursor = conn.cursor()
+        for table, width in DatabaseSchema.PERFORMANCE_ROLLUPS.items():
+            cursor.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    user_id INTEGER NOT NULL,
+                    model TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    latency_sum REAL NOT NULL DEFAULT 0,
+                    latency_min REAL,
+                    latency_max REAL,
+                    tokens_in INTEGER NOT NULL DEFAULT 0,
+                    tokens_out INTEGER NOT NULL DEFAULT 0,
+                    cost REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (user_id, bucket, model)
+                ) WITHOUT ROWID
+            """
+            )
+            cursor.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_insert
+                AFTER INSERT ON performance_logs
+                BEGIN
+                    INSERT INTO {table}
+                        (user_id, model, bucket, count, latency_sum, latency_min, latency_max, tokens_in, tokens_out, cost)
+                    VALUES (
+                        NEW.user_id, NEW.model, NEW.timestamp - NEW.timestamp % {width}, 1,
+                        NEW.latency, NEW.latency, NEW.latency, NEW.tokens_in, NEW.tokens_out, COALESCE(NEW.cost_estimate, 0)
+                    )
+                    ON CONFLICT(user_id, bucket, model) DO UPDATE SET
+                        count = count + 1,
+                        latency_sum = latency_sum + excluded.latency_sum,
+                        latency_min = MIN(latency_min, excluded.latency_min),
+                        latency_max = MAX(latency_max, excluded.latency_max),
+                        tokens_in = tokens_in + excluded.tokens_in,
+                        tokens_out = tokens_out + excluded.tokens_out,
+                        cost = cost + excluded.cost;
+                END
+            """
+            )
+            cursor.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_delete
+                AFTER DELETE ON performance_logs
+                BEGIN
+                    {DatabaseSchema._rollup_recompute_sql(table, width, "OLD")}
+                END
+            """
+            )
+            cursor.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_update
+                AFTER UPDATE OF user_id, model, latency, tokens_in, tokens_out, cost_estimate, timestamp ON performance_logs
+                BEGIN
+                    {DatabaseSchema._rollup_recompute_sql(table, width, "OLD")}
+                    {DatabaseSchema._rollup_recompute_sql(table, width, "NEW")}
+                END
+            """
+            )
+
+    @staticmethod
+    def rebuild_performance_rollups(conn: sqlite3.Connection, since_ms: Optional[int] = None):
+        """Recalcule les agrégats depuis performance_logs (tout, ou à partir de `since_ms`)."""
+        for table, width in DatabaseSchema.PERFORMANCE_ROLLUPS.items():
+            start = 0 if since_ms is None else since_ms - since_ms % width
+            conn.execute(f"DELETE FROM {table} WHERE bucket >= ?", (start,))
+            conn.execute(
+                f"""
+                INSERT INTO {table}
+                    (user_id, model, bucket, count, latency_sum, latency_min, latency_max, tokens_in, tokens_out, cost)
+                SELECT user_id, model, timestamp - timestamp % {width} AS bucket, COUNT(*), SUM(latency),
+                       MIN(latency), MAX(latency), SUM(tokens_in), SUM(tokens_out), COALESCE(SUM(cost_estimate), 0)
+                FROM performance_logs
+                WHERE timestamp >= ?
+                GROUP BY user_id, model, bucket
+            """,
+                (start,),
+            )
+
+    @staticmethod
+    def _migration_v10(conn: sqlite3.Connection):
+        """Migration version 10: agrégats de performance_logs et backfill depuis l'historique."""
+        try:
+            DatabaseSchema.create_performance_rollups(conn)
+            DatabaseSchema.rebuild_performance_rollups(conn)
+        except sqlite3.OperationalError:
+            # performance_logs absente : create_tables créera agrégats et triggers
+            pass
+
+    @staticmethod
+    def create_performance_sketches(conn: sqlite3.Connection):
+        """Table des sketches de quantiles par (utilisateur, modèle, jour, métrique), voir src.data.sketches."""
+        conn.cursor().execute(
+            """
+            CREATE TABLE IF NOT EXISTS performance_sketches (
+                user_id INTEGER NOT NULL,
+                model TEXT NOT NULL,
+                day INTEGER NOT NULL,
+                metric TEXT NOT NULL,
+                sketch BLOB NOT NULL,
+                PRIMARY KEY (user_id, day, model, metric)
+            ) WITHOUT ROWID
+        """
+        )
+
+    @staticmethod
+    def _migration_v11(conn: sqlite3.Connection):
+        """Migration version 11: sketches de quantiles et backfill depuis l'historique."""
+        try:
+            DatabaseSchema.create_performance_sketches(conn)
+            if DatabaseSchema._table_has_column(conn, "performance_logs", "timestamp"):
+                rebuild_performance_sketches(conn)
+        except sqlite3.OperationalError:
+            # performance_logs absente : create_tables créera la table
+            pass
+
+    @staticmethod
+    def _cost_estimate_sql() -> str:
+        """Expression SQL du coût d'un log, tarifs de models_config (même repli que calculate_estimated_cost)."""
+        default = get_model_config("")
+        cases = " ".join(
+            "WHEN '{}' THEN tokens_in * {!r} + tokens_out * {!r}".format(
+                name.replace("'", "''"), config.cost_per_1k_input, config.cost_per_1k_output
+            )
+            for name, config in AVAILABLE_MODELS.items()
+        )
+        fallback = f"tokens_in * {default.cost_per_1k_input!r} + tokens_out * {default.cost_per_1k_output!r}"
+        return f"(CASE model {cases} ELSE {fallback} END) / 1000.0"
+
+    @staticmethod
+    def backfill_cost_estimates(conn: sqlite3.Connection) -> int:
+        """Renseigne cost_estimate sur les logs qui n'en ont pas, puis recalcule les agrégats.
+
+        Les triggers de mise à jour des agrégats sont suspendus le temps de l'UPDATE
+        (un recalcul de seau par ligne serait quadratique), puis recréés.
+
+        Returns:
+            Nombre de logs mis à jour
+        """
+        for table in DatabaseSchema.PERFORMANCE_ROLLUPS:
+            conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_update")
+        updated = conn.execute(
+            f"UPDATE performance_logs SET cost_estimate = {DatabaseSchema._cost_estimate_sql()} WHERE cost_estimate IS NULL"
+        ).rowcount
+        DatabaseSchema.create_performance_rollups(conn)
+        if updated:
+            DatabaseSchema.rebuild_performance_rollups(conn)
+        return updated
+
+    @staticmethod
+    def _migration_v12(conn: sqlite3.Connection):
+        """Migration version 12: coût estimé persisté sur les logs existants."""
+        try:
+            if DatabaseSchema._table_has_column(conn, "performance_logs", "cost_estimate"):
+                DatabaseSchema.backfill_cost_estimates(conn)
+        except sqlite3.OperationalError:
+            # performance_logs absente : rien à renseigner
+            pass
+
+    @staticmethod
+    def create_system_metrics(conn: sqlite3.Connection):
+        """Historique des métriques système agrégées à la minute (voir src.analytics.system_monitoring)."""
+        conn.cursor().execute(
+            """
+            CREATE TABLE IF NOT EXISTS system_metrics (
+                minute INTEGER PRIMARY KEY,
+                samples INTEGER NOT NULL,
+                cpu_percent REAL,
+                memory_percent REAL,
+                swap_percent REAL,
+                disk_percent REAL,
+                net_sent_rate REAL,
+                net_recv_rate REAL,
+                process_rss REAL,
+                process_cpu REAL,
+                process_threads REAL
+            )
+        """
+        )
+
+    @staticmethod
+    def _migration_v13(conn: sqlite3.Connection):
+        """Migration version 13: table system_metrics."""
+        DatabaseSchema.create_system_metrics(conn)
+
+    @staticmethod
+    def _migration_v14(conn: sqlite3.Connection):
+        """Migration version 14: performance_logs.ttft (délai du premier token des réponses en flux, secondes)."""
+        try:
+            if not DatabaseSchema._table_has_column(conn, "performance_logs", "ttft"):
+                conn.execute("ALTER TABLE performance_logs ADD COLUMN ttft REAL")
+        except sqlite3.OperationalError:
+            # performance_logs absente : create_tables créera la colonne
+            pass
+
+    @staticmethod
+    def _migration_v15(conn: sqlite3.Connection):
+        """Migration version 15: performance_logs.comparison_id (lignes d'une même comparaison multi-modèles)."""
+        try:
+            if not DatabaseSchema._table_has_column(conn, "performance_logs", "comparison_id"):
+                conn.execute("ALTER TABLE performance_logs ADD COLUMN comparison_id TEXT")
+            conn.execute(DatabaseSchema.COMPARISON_INDEX_SQL)
+        except sqlite3.OperationalError:
+            # performance_logs absente : create_tables créera colonne et index
+            pass
+
 
 @contextmanager
-def get_optimized_connection():
-    """Context manager pour connexions optimisées avec gestion d'erreurs."""
-    conn = None
+def get_optimized_connection(immediate: bool = False):
+    """Context manager pour connexions optimisées avec gestion d'erreurs.
+
+    La connexion est empruntée au pool et lui est rendue à la sortie du bloc
+    le plus externe (sauf si elle a été épinglée via `get_connection()`).
+    Un bloc imbriqué réutilise la transaction ouverte : il s'exécute dans un
+    SAVEPOINT, annulé seul en cas d'erreur.
+
+    Args:
+        immediate: prend le verrou d'écriture dès l'ouverture (`BEGIN IMMEDIATE`),
+            pour les transactions d'écriture multi-requêtes (sans effet dans un
+            bloc imbriqué : le mode est celui de la transaction externe).
+    """
+    local = DatabaseConnection._thread_local
+    local.depth = getattr(local, "depth", 0) + 1
     try:
-        conn = DatabaseConnection.get_connection()
+        if local.depth > 1:
+            with _nested_transaction(DatabaseConnection.get_connection(pin=False), local.depth) as conn:
+                yield conn
+            return
+
+        conn = None
+        begin = "BEGIN IMMEDIATE" if immediate else "BEGIN"
         try:
-            conn.execute("BEGIN")
-        except sqlite3.Error:
-            # Si la connexion est invalide/fermée, on la recrée et on recommence
-            DatabaseConnection.close_all_connections()
-            conn = DatabaseConnection.get_connection()
-            conn.execute("BEGIN")
-        yield conn
-        conn.commit()
-    except Exception as e:
-        if conn is not None:
+            conn = DatabaseConnection.get_connection(pin=False)
             try:
-                conn.rollback()
-            except Exception as rb_err:
-                logger.error(f"Échec du rollback (connexion invalide ?): {rb_err}")
-        logger.error(f"Erreur base de données, rollback tenté: {e}")
+                conn.execute(begin)
+            except sqlite3.Error:
+                # Invalidation pilotée par l'erreur : on écarte cette connexion et on recommence
+                DatabaseConnection.discard_connection()
+                conn = DatabaseConnection.get_connection(pin=False)
+                conn.execute(begin)
+            yield conn
+            conn.commit()
+        except Exception as e:
+            if conn is not None:
+                try:
+                    conn.rollback()
+                except Exception as rb_err:
+                    logger.error(f"Échec du rollback (connexion invalide ?): {rb_err}")
+            logger.error(f"Erreur base de données, rollback tenté: {e}")
+            raise
+    finally:
+        local.depth -= 1
+        if local.depth == 0:
+            DatabaseConnection.release_connection(force=False)
+
+
+@contextmanager
+def _nested_transaction(conn: sqlite3.Connection, depth: int):
+    """SAVEPOINT dans la transaction du bloc externe : validé par RELEASE, annulé seul en cas d'erreur."""
+    savepoint = f"nested_{depth}"
+    conn.execute(f"SAVEPOINT {savepoint}")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute(f"ROLLBACK TO {savepoint}")
+        conn.execute(f"RELEASE {savepoint}")
+        raise
+    conn.execute(f"RELEASE {savepoint}")
+
+
+@contextmanager
+def get_readonly_connection():
+    """Context manager de lecture seule pour l'analytique et les tableaux de bord.
+
+    La connexion vient d'un pool dédié : les lectures lourdes ne monopolisent
+    ni ne ferment la connexion d'écriture du thread.
+    """
+    pool = DatabaseConnection.get_readonly_pool()
+    entry = pool.acquire(str(get_db_path()))
+    try:
+        yield entry.connection
+    except sqlite3.Error:
+        pool.discard(entry)
+        entry = None
         raise
+    finally:
+        if entry is not None:
+            pool.release(entry)
 
 
 def init_optimized_db():
@@ -468,6 +1509,25 @@ def get_connection() -> sqlite3.Connection:
     return DatabaseConnection.get_connection()
 
 
+def get_pool_stats() -> Dict[str, Any]:
+    """Statistiques du pool de connexions (checkouts, attentes, créations...)."""
+    return DatabaseConnection.get_pool_stats()
+
+
+def get_query_stats(top_n: int = 20, order_by: str = "total_ms") -> List[Dict[str, Any]]:
+    """Top-N des requêtes SQL normalisées par temps total (ou avg_ms, max_ms, calls, rows).
+
+    Chaque entrée contient le SQL normalisé, le nombre d'appels, les durées,
+    les lignes retournées, l'histogramme des durées et les principaux appelants.
+    """
+    return query_stats.top(top_n, order_by)
+
+
+def reset_query_stats() -> None:
+    """Remet à zéro les statistiques de requêtes."""
+    query_stats.reset()
+
+
 # Fonction d'initialisation principale (rétrocompatibilité)
 def init_db():
     """Initialise la base de données (interface de compatibilité)."""
@@ -4,54 +4,455 @@ Module de modèles optimisé avec cache et requêtes performantes
 
 import json
 import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
 from contextlib import contextmanager
 from datetime import datetime, timedelta
 from functools import lru_cache
-from typing import Any, Dict, List, Optional, Tuple
-
-from src.data.database import get_connection, get_optimized_connection
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.ai.models_config import calculate_estimated_cost
+from src.data.database import days_ago_ms, epoch_ms, get_connection, get_optimized_connection
+from src.data.performance_writer import enqueue_performance
+from src.data.queries import (
+    ACTIVE_CAMPAIGNS_SQL,
+    ACTIVE_CHARACTERS_SQL,
+    ACTIVE_USER_BY_ID_SQL,
+    CACHE_VERSIONS_SQL,
+    LATEST_CAMPAIGN_SQL,
+    LATEST_MODEL_CHOICE_SQL,
+    MESSAGE_TAIL_SQL,
+    PERFORMANCE_STATS_SQL,
+)
+from src.data.rollups import bucket_start
+from src.data.sketches import record_performance_sketches
 
 logger = logging.getLogger(__name__)
 
 
-class ModelCache:
-    """Cache simple en mémoire pour les requêtes fréquentes."""
-
-    def __init__(self, ttl_seconds: int = 300):  # 5 minutes par défaut
-        self._cache = {}
-        self._timestamps = {}
-        self._ttl = ttl_seconds
+class CacheConfig:
+    """Paramètres du cache des modèles (surchargeables par variables d'environnement)."""
+
+    DEFAULT_TTL = float(os.getenv("MODEL_CACHE_TTL", "300"))  # 5 minutes
+    MAX_ENTRIES = int(os.getenv("MODEL_CACHE_MAX_ENTRIES", "5000"))
+    MAX_BYTES = int(os.getenv("MODEL_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # 64 MB
+    SWEEP_INTERVAL = float(os.getenv("MODEL_CACHE_SWEEP_INTERVAL", "60"))
+    # TTL plus court pour les résultats vides/None (comptes sans campagne, pas de choix de modèle...)
+    NEGATIVE_TTL = float(os.getenv("MODEL_CACHE_NEGATIVE_TTL", "30"))
+    # Validation des entrées contre cache_versions (à activer avec plusieurs répliques)
+    COHERENCE = os.getenv("MODEL_CACHE_COHERENCE", "false").lower() == "true"
+    COHERENCE_CHECK_INTERVAL = float(os.getenv("MODEL_CACHE_COHERENCE_INTERVAL", "1.0"))  # secondes
+    # Stale-while-revalidate : durée pendant laquelle une valeur expirée reste servie
+    # pendant son rafraîchissement en arrière-plan (0 = désactivé)
+    STALE_TTL = float(os.getenv("MODEL_CACHE_STALE_TTL", "0"))
+    # Attente maximale d'un calcul concurrent avant de calculer soi-même
+    LOAD_WAIT_TIMEOUT = float(os.getenv("MODEL_CACHE_LOAD_WAIT_TIMEOUT", "30"))
+
+    # TTL par espace de noms (préfixe de clé avant l'identifiant)
+    NAMESPACE_TTLS = {
+        "user": 300,
+        "model_choice": 300,
+        "user_campaigns": 300,
+        "user_characters": 300,
+        "performance_stats": 120,  # données de performance changent souvent
+    }
+
+
+# Sentinelle distinguant « absent du cache » de « None/vide mis en cache »
+MISSING = object()
+
+
+def _is_negative(value: Any) -> bool:
+    """True pour un résultat négatif (None ou collection vide)."""
+    return value is None or (isinstance(value, (list, dict, tuple, set)) and not value)
+
+
+def _estimate_size(value: Any, _depth: int = 0) -> int:
+    """Estimation approximative de l'empreinte mémoire d'une valeur mise en cache."""
+    size = sys.getsizeof(value)
+    if _depth > 4:
+        return size
+    if isinstance(value, dict):
+        size += sum(_estimate_size(k, _depth + 1) + _estimate_size(v, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_estimate_size(item, _depth + 1) for item in value)
+    return size
+
+
+class CacheCoherence:
+    """Versions (utilisateur, portée) lues dans cache_versions, maintenue par triggers.
+
+    Une entrée dont la version a changé depuis sa mise en cache a été modifiée
+    par un autre processus et n'est plus servie.
+    """
+
+    # Préfixe de clé -> portée (les préfixes les plus longs d'abord)
+    SCOPES = {
+        "user_campaigns_": "campaigns",
+        "user_characters_": "characters",
+        "model_choice_": "model_choice",
+        "user_": "user",
+    }
+    MAX_TRACKED_USERS = 10000
+
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self._versions: Dict[int, Tuple[float, Dict[str, int]]] = {}
+        self._lock = threading.Lock()
+
+    def scope_for(self, key: str) -> Optional[Tuple[int, str]]:
+        """(user_id, portée) d'une clé de cache, ou None si la clé n'est pas versionnée."""
+        for prefix, scope in self.SCOPES.items():
+            if key.startswith(prefix):
+                suffix = key[len(prefix) :]
+                return (int(suffix), scope) if suffix.isdigit() else None
+        return None
 
-    def get(self, key: str) -> Optional[Any]:
-        """Récupère une valeur du cache."""
-        if key not in self._cache:
+    def version(self, key: str, fresh: bool = False) -> Optional[int]:
+        """Version courante de la clé (relue au plus toutes les check_interval secondes sauf si fresh)."""
+        target = self.scope_for(key)
+        if target is None:
             return None
+        user_id, scope = target
+        now = time.monotonic()
+        with self._lock:
+            snapshot = self._versions.get(user_id)
+        if fresh or snapshot is None or now - snapshot[0] >= self.check_interval:
+            versions = self._load(user_id)
+            if versions is None:
+                return None
+            snapshot = (now, versions)
+            with self._lock:
+                if len(self._versions) >= self.MAX_TRACKED_USERS:
+                    self._versions.clear()
+                self._versions[user_id] = snapshot
+        return snapshot[1].get(scope, 0)
 
-        # Vérifier l'expiration
-        if datetime.now().timestamp() - self._timestamps[key] > self._ttl:
-            self.delete(key)
+    @staticmethod
+    def _load(user_id: int) -> Optional[Dict[str, int]]:
+        try:
+            with get_optimized_connection() as conn:
+                rows = conn.execute(CACHE_VERSIONS_SQL, (user_id,)).fetchall()
+        except sqlite3.Error as e:
+            # Table absente (base non migrée) : repli sur le seul TTL
+            logger.debug(f"Versions de cache indisponibles: {e}")
             return None
+        return {scope: version for scope, version in rows}
+
 
-        return self._cache[key]
+class _Flight:
+    """Calcul en cours d'une clé, partagé par les appelants concurrents."""
 
-    def set(self, key: str, value: Any) -> None:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.invalidated = False  # clé supprimée pendant le calcul : résultat non mis en cache
+
+
+class ModelCache:
+    """Cache LRU thread-safe, borné en entrées et en octets, avec TTL par espace de noms."""
+
+    def __init__(
+        self,
+        ttl_seconds: float = 300,  # 5 minutes par défaut
+        max_entries: int = 5000,
+        max_bytes: int = 64 * 1024 * 1024,
+        namespace_ttls: Optional[Dict[str, float]] = None,
+        sweep_interval: Optional[float] = None,
+        negative_ttl: Optional[float] = None,
+        coherence: Optional[CacheCoherence] = None,
+        stale_ttl: float = 0,
+        load_wait_timeout: float = 30,
+    ):
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
+        self._timestamps: Dict[str, float] = {}  # instant d'insertion (horloge monotone)
+        self._expires: Dict[str, float] = {}
+        self._sizes: Dict[str, int] = {}
+        self._versions: Dict[str, int] = {}  # version observée avant le calcul de la valeur
+        self._fill_versions: Dict[str, int] = {}
+        self.coherence = coherence
+        self.stale_ttl = stale_ttl
+        self.load_wait_timeout = load_wait_timeout
+        self._inflight: Dict[str, _Flight] = {}
+        self._ttl = ttl_seconds
+        self._namespace_ttls = dict(namespace_ttls or {})
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._stats = {
+            "hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "stale": 0,
+            "coalesced": 0,
+            "stale_served": 0,
+            "refreshes": 0,
+        }
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop_sweeper = threading.Event()
+        if sweep_interval:
+            self.start_sweeper(sweep_interval)
+
+    def ttl_for(self, key: str) -> float:
+        """TTL de la clé selon le plus long espace de noms correspondant."""
+        best, best_len = self._ttl, -1
+        for namespace, ttl in self._namespace_ttls.items():
+            if key.startswith(namespace + "_") and len(namespace) > best_len:
+                best, best_len = ttl, len(namespace)
+        return best
+
+    def get(self, key: str, default: Any = None) -> Optional[Any]:
+        """Récupère une valeur du cache.
+
+        Passer `default=MISSING` permet de distinguer une valeur None/vide
+        mise en cache d'une clé absente.
+        """
+        with self._lock:
+            value = MISSING
+            if key in self._cache:
+                # Vérifier l'expiration (une valeur expirée reste disponible pour get_or_load
+                # pendant stale_ttl)
+                now = time.monotonic()
+                if now < self._expires[key]:
+                    self._cache.move_to_end(key)
+                    value = self._cache[key]
+                elif now >= self._expires[key] + self.stale_ttl:
+                    self._remove(key)
+                    self._stats["expirations"] += 1
+            version = self._versions.get(key)
+
+        # Écriture par un autre processus depuis la mise en cache ?
+        if value is not MISSING and version is not None and self.coherence is not None:
+            current = self.coherence.version(key)
+            if current is not None and current != version:
+                with self._lock:
+                    if self._versions.get(key) == version:
+                        self._remove(key)
+                    self._stats["stale"] += 1
+                value = MISSING
+
+        if value is MISSING:
+            with self._lock:
+                self._stats["misses"] += 1
+            self._note_fill_version(key)
+            return default
+
+        with self._lock:
+            self._stats["hits"] += 1
+            if _is_negative(value):
+                self._stats["negative_hits"] += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
         """Stocke une valeur dans le cache."""
-        self._cache[key] = value
-        self._timestamps[key] = datetime.now().timestamp()
+        size = _estimate_size(value)
+        version = None
+        if self.coherence is not None:
+            with self._lock:
+                version = self._fill_versions.pop(key, None)
+            if version is None:
+                version = self.coherence.version(key, fresh=True)
+        now = time.monotonic()
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
+            if size > self.max_bytes:
+                # Valeur trop volumineuse pour le budget : ne pas la mettre en cache
+                return
+            self._cache[key] = value
+            self._timestamps[key] = now
+            if ttl is None:
+                ttl = self.ttl_for(key)
+                if self.negative_ttl is not None and _is_negative(value):
+                    ttl = min(ttl, self.negative_ttl)
+            self._expires[key] = now + ttl
+            self._sizes[key] = size
+            if version is not None:
+                self._versions[key] = version
+            self._bytes += size
+            self._stats["sets"] += 1
+            self._evict_over_budget()
+
+    def get_or_load(self, key: str, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """Lecture avec calcul coalescé (single-flight) en cas d'absence.
+
+        Un seul appelant exécute `loader` ; les appelants concurrents attendent son
+        résultat. Avec stale_ttl, une valeur expirée est servie pendant qu'un unique
+        rafraîchissement tourne en arrière-plan.
+        """
+        value = self.get(key, MISSING)
+        if value is not MISSING:
+            return value
+
+        if self.stale_ttl > 0:
+            stale = self._stale_value(key)
+            if stale is not MISSING:
+                self._refresh_in_background(key, loader, ttl)
+                return stale
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self._stats["coalesced"] += 1
+
+        if leader:
+            self._run_flight(key, flight, loader, ttl)
+        elif not flight.done.wait(self.load_wait_timeout):
+            logger.warning(f"Calcul concurrent trop long pour {key}, calcul local")
+            return loader()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
 
     def delete(self, key: str) -> None:
         """Supprime une clé du cache."""
-        self._cache.pop(key, None)
-        self._timestamps.pop(key, None)
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
+            flight = self._inflight.get(key)
+            if flight is not None:
+                flight.invalidated = True
 
     def clear(self) -> None:
         """Vide le cache complètement."""
-        self._cache.clear()
-        self._timestamps.clear()
+        with self._lock:
+            self._cache.clear()
+            self._timestamps.clear()
+            self._expires.clear()
+            self._sizes.clear()
+            self._versions.clear()
+            self._fill_versions.clear()
+            self._bytes = 0
+            for flight in self._inflight.values():
+                flight.invalidated = True
+
+    def purge_expired(self) -> int:
+        """Supprime les entrées expirées ; retourne le nombre d'entrées retirées."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, expires_at in self._expires.items() if now >= expires_at + self.stale_ttl]
+            for key in expired:
+                self._remove(key)
+            self._stats["expirations"] += len(expired)
+        return len(expired)
+
+    def start_sweeper(self, interval: float) -> None:
+        """Démarre le balayage périodique des entrées expirées en arrière-plan."""
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._stop_sweeper.clear()
+
+        def _sweep():
+            while not self._stop_sweeper.wait(interval):
+                try:
+                    self.purge_expired()
+                except Exception as e:  # pragma: no cover - filet de sécurité du thread
+                    logger.warning(f"Échec du balayage du cache: {e}")
+
+        self._sweeper = threading.Thread(target=_sweep, name="model-cache-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        """Arrête le balayage en arrière-plan."""
+        self._stop_sweeper.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs hits/misses/évictions et occupation du cache."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._cache)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _remove(self, key: str) -> None:
+        self._cache.pop(key, None)
+        self._timestamps.pop(key, None)
+        self._expires.pop(key, None)
+        self._versions.pop(key, None)
+        self._bytes -= self._sizes.pop(key, 0)
+
+    def _stale_value(self, key: str) -> Any:
+        """Valeur expirée encore dans la fenêtre stale_ttl, sinon MISSING."""
+        with self._lock:
+            if key not in self._cache or time.monotonic() >= self._expires[key] + self.stale_ttl:
+                return MISSING
+            self._stats["stale_served"] += 1
+            return self._cache[key]
+
+    def _refresh_in_background(self, key: str, loader: Callable[[], Any], ttl: Optional[float]) -> None:
+        with self._lock:
+            if key in self._inflight:
+                return
+            flight = self._inflight[key] = _Flight()
+            self._stats["refreshes"] += 1
+
+        def _refresh():
+            self._run_flight(key, flight, loader, ttl)
+            if flight.error is not None:
+                logger.warning(f"Rafraîchissement du cache échoué pour {key}: {flight.error}")
+
+        threading.Thread(target=_refresh, name="model-cache-refresh", daemon=True).start()
+
+    def _run_flight(self, key: str, flight: _Flight, loader: Callable[[], Any], ttl: Optional[float]) -> None:
+        try:
+            flight.value = loader()
+            if not flight.invalidated:
+                self.set(key, flight.value, ttl)
+        except Exception as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+            flight.done.set()
+
+    def _note_fill_version(self, key: str) -> None:
+        """Mémorise la version lue avant le calcul, pour qu'une écriture concurrente invalide l'entrée."""
+        if self.coherence is None:
+            return
+        version = self.coherence.version(key, fresh=True)
+        if version is None:
+            return
+        with self._lock:
+            previous = self._fill_versions.get(key)
+            if previous is None or version < previous:
+                self._fill_versions[key] = version
+
+    def _evict_over_budget(self) -> None:
+        while self._cache and (len(self._cache) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._cache))
+            self._remove(oldest)
+            self._stats["evictions"] += 1
 
 
 # Instance globale du cache
-_model_cache = ModelCache()
+_model_cache = ModelCache(
+    ttl_seconds=CacheConfig.DEFAULT_TTL,
+    max_entries=CacheConfig.MAX_ENTRIES,
+    max_bytes=CacheConfig.MAX_BYTES,
+    namespace_ttls=CacheConfig.NAMESPACE_TTLS,
+    sweep_interval=CacheConfig.SWEEP_INTERVAL,
+    negative_ttl=CacheConfig.NEGATIVE_TTL,
+    coherence=CacheCoherence(CacheConfig.COHERENCE_CHECK_INTERVAL) if CacheConfig.COHERENCE else None,
+    stale_ttl=CacheConfig.STALE_TTL,
+    load_wait_timeout=CacheConfig.LOAD_WAIT_TIMEOUT,
+)
 
 
 class UserManager:
@@ -60,30 +461,18 @@ class UserManager:
     @staticmethod
     def get_user_by_id(user_id: int) -> Optional[Dict]:
         """Récupère un utilisateur par ID avec cache."""
-        cache_key = f"user_{user_id}"
-        cached_user = _model_cache.get(cache_key)
-
-        if cached_user:
-            return cached_user
 
-        with get_optimized_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT id, email, created_at, last_login, is_active
-                FROM users
-                WHERE id = ? AND is_active = 1
-            """,
-                (user_id,),
-            )
+        def load() -> Optional[Dict]:
+            with get_optimized_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(ACTIVE_USER_BY_ID_SQL, (user_id,))
 
-            row = cursor.fetchone()
-            if row:
-                user_data = dict(row)
-                _model_cache.set(cache_key, user_data)
-                return user_data
+                row = cursor.fetchone()
+                user_data = dict(row) if row else None
+            return user_data
 
-        return None
+        # None mis en cache aussi (TTL négatif plus court)
+        return _model_cache.get_or_load(f"user_{user_id}", load)
 
     @staticmethod
     def update_last_login(user_id: int):
@@ -134,32 +523,17 @@ class ModelChoiceManager:
     @staticmethod
     def get_user_model_choice(user_id: int) -> Optional[str]:
         """Récupère le choix de modèle avec cache."""
-        cache_key = f"model_choice_{user_id}"
-        cached_choice = _model_cache.get(cache_key)
 
-        if cached_choice:
-            return cached_choice
-
-        with get_optimized_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT model
-                FROM model_choices
-                WHERE user_id = ?
-                ORDER BY created_at DESC
-                LIMIT 1
-            """,
-                (user_id,),
-            )
+        def load() -> Optional[str]:
+            with get_optimized_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(LATEST_MODEL_CHOICE_SQL, (user_id,))
 
-            row = cursor.fetchone()
-            if row:
-                model = row[0]
-                _model_cache.set(cache_key, model)
-                return model
+                row = cursor.fetchone()
+                model = row[0] if row else None
+            return model
 
-        return None
+        return _model_cache.get_or_load(f"model_choice_{user_id}", load)
 
 
 class CampaignManager:
@@ -232,72 +606,46 @@ class CampaignManager:
         if not user_id or (isinstance(user_id, str) and not user_id.strip()):
             raise ValueError("user_id ne peut pas être None ou vide")
 
-        cache_key = f"user_campaigns_{user_id}"
-        cached_campaigns = _model_cache.get(cache_key)
-
-        if cached_campaigns:
-            return cached_campaigns
-
-        with get_optimized_connection() as conn:
-            cursor = conn.cursor()
-
-            # Requête optimisée avec JOIN pour éviter les requêtes N+1
-            cursor.execute(
-                """
-                SELECT
-                    c.id,
-                    c.name,
-                    c.themes,
-                    c.language,
-                    c.ai_model,
-                    c.gm_portrait,
-                    c.created_at,
-                    c.updated_at,
-                    COALESCE(COUNT(m.id), 0) as message_count,
-                    MAX(m.timestamp) as last_activity
-                FROM campaigns c
-                LEFT JOIN messages m ON c.id = m.campaign_id
-                WHERE c.user_id = ? AND c.is_active = 1
-                GROUP BY c.id
-                ORDER BY c.updated_at DESC
-            """,
-                (user_id,),
-            )
-
-            campaigns = []
-            for row in cursor.fetchall():
-                # Compat: anciens tests peuvent mocker sans ai_model (9 colonnes)
-                if len(row) == 9:
-                    campaign = {
-                        "id": row[0],
-                        "name": row[1],
-                        "themes": json.loads(row[2]) if row[2] else [],
-                        "language": row[3],
-                        "gm_portrait": row[4],
-                        "created_at": row[5],
-                        "updated_at": row[6],
-                        "message_count": row[7] or 0,
-                        "last_activity": row[8],
-                        "ai_model": "GPT-4o",  # valeur de repli
-                    }
-                else:
-                    campaign = {
-                        "id": row[0],
-                        "name": row[1],
-                        "themes": json.loads(row[2]) if row[2] else [],
-                        "language": row[3],
-                        "ai_model": row[4],
-                        "gm_portrait": row[5],
-                        "created_at": row[6],
-                        "updated_at": row[7],
-                        "message_count": row[8] or 0,
-                        "last_activity": row[9],
-                    }
-                campaigns.append(campaign)
+        def load() -> List[Dict]:
+            with get_optimized_connection() as conn:
+                cursor = conn.cursor()
 
-        # Cache pour 5 minutes
-        _model_cache.set(cache_key, campaigns)
-        return campaigns
+                # Compteurs dénormalisés maintenus par triggers : pas de JOIN sur messages
+                cursor.execute(ACTIVE_CAMPAIGNS_SQL, (user_id,))
+
+                campaigns = []
+                for row in cursor.fetchall():
+                    # Compat: anciens tests peuvent mocker sans ai_model (9 colonnes)
+                    if len(row) == 9:
+                        campaign = {
+                            "id": row[0],
+                            "name": row[1],
+                            "themes": json.loads(row[2]) if row[2] else [],
+                            "language": row[3],
+                            "gm_portrait": row[4],
+                            "created_at": row[5],
+                            "updated_at": row[6],
+                            "message_count": row[7] or 0,
+                            "last_activity": row[8],
+                            "ai_model": "GPT-4o",  # valeur de repli
+                        }
+                    else:
+                        campaign = {
+                            "id": row[0],
+                            "name": row[1],
+                            "themes": json.loads(row[2]) if row[2] else [],
+                            "language": row[3],
+                            "ai_model": row[4],
+                            "gm_portrait": row[5],
+                            "created_at": row[6],
+                            "updated_at": row[7],
+                            "message_count": row[8] or 0,
+                            "last_activity": row[9],
+                        }
+                    campaigns.append(campaign)
+            return campaigns
+
+        return _model_cache.get_or_load(f"user_campaigns_{user_id}", load)
 
     @staticmethod
     def update_campaign_timestamp(campaign_id: int):
@@ -388,42 +736,30 @@ class CharacterManager:
     @staticmethod
     def get_user_characters(user_id: int) -> List[Dict]:
         """Récupère tous les personnages d'un utilisateur."""
-        cache_key = f"user_characters_{user_id}"
-        cached_characters = _model_cache.get(cache_key)
 
-        if cached_characters:
-            return cached_characters
+        def load() -> List[Dict]:
+            with get_optimized_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(ACTIVE_CHARACTERS_SQL, (user_id,))
 
-        with get_optimized_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT id, campaign_id, name, class, race, gender, level, description, portrait_url, created_at
-                FROM characters
-                WHERE user_id = ? AND is_active = 1
-                ORDER BY created_at DESC
-                """,
-                (user_id,),
-            )
+                characters = []
+                for row in cursor.fetchall():
+                    character = {
+                        "id": row[0],
+                        "campaign_id": row[1],
+                        "name": row[2],
+                        "class": row[3],
+                        "race": row[4],
+                        "gender": row[5],
+                        "level": row[6],
+                        "description": row[7],
+                        "portrait_url": row[8],
+                        "created_at": row[9],
+                    }
+                    characters.append(character)
+            return characters
 
-            characters = []
-            for row in cursor.fetchall():
-                character = {
-                    "id": row[0],
-                    "campaign_id": row[1],
-                    "name": row[2],
-                    "class": row[3],
-                    "race": row[4],
-                    "gender": row[5],
-                    "level": row[6],
-                    "description": row[7],
-                    "portrait_url": row[8],
-                    "created_at": row[9],
-                }
-                characters.append(character)
-
-        _model_cache.set(cache_key, characters)
-        return characters
+        return _model_cache.get_or_load(f"user_characters_{user_id}", load)
 
 
 class MessageManager:
@@ -446,51 +782,144 @@ class MessageManager:
 
             message_id = cursor.lastrowid
 
-        # Mettre à jour l'activité de la campagne si applicable
+            # Mettre à jour l'activité de la campagne dans la même transaction
+            if campaign_id:
+                cursor.execute("UPDATE campaigns SET updated_at = CURRENT_TIMESTAMP WHERE id = ?", (campaign_id,))
+
         if campaign_id:
-            CampaignManager.update_campaign_timestamp(campaign_id)
             # Invalider le cache des campagnes
             _model_cache.delete(f"user_campaigns_{user_id}")
 
         return message_id
 
     @staticmethod
-    def get_campaign_messages(user_id: int, campaign_id: Optional[int] = None, limit: int = 50) -> List[Dict]:
-        """Récupère les messages d'une campagne avec pagination."""
-        with get_optimized_connection() as conn:
+    def commit_turn(
+        user_id: int,
+        user_content: Optional[str],
+        assistant_content: Optional[str],
+        campaign_id: Optional[int] = None,
+        character_id: Optional[int] = None,
+        performance: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Optional[int]]:
+        """Persiste un tour de chat complet en une seule transaction.
+
+        Le message utilisateur, la réponse de l'assistant, la ligne de performance
+        et la mise à jour de `campaigns.updated_at` sont écrits atomiquement
+        (`BEGIN IMMEDIATE`), avec une seule invalidation de cache.
+
+        Args:
+            user_content: message du joueur (None s'il est déjà persisté)
+            assistant_content: réponse du MJ (None si absente)
+            performance: dict avec 'model', 'latency', 'tokens_in', 'tokens_out'
+                et optionnellement 'cost_estimate' (sinon estimé depuis models_config)
+                et 'ttft' (délai du premier token des réponses en flux)
+
+        Returns:
+            Dict des IDs insérés: 'user_message_id', 'assistant_message_id', 'performance_id'
+        """
+        ids: Dict[str, Optional[int]] = {"user_message_id": None, "assistant_message_id": None, "performance_id": None}
+        messages = [("user", user_content, "user_message_id"), ("assistant", assistant_content, "assistant_message_id")]
+
+        with get_optimized_connection(immediate=True) as conn:
             cursor = conn.cursor()
-
-            if campaign_id:
+            for role, content, id_key in messages:
+                if not content:
+                    continue
                 cursor.execute(
                     """
-                    SELECT role, content, timestamp
-                    FROM messages
-                    WHERE user_id = ? AND campaign_id = ?
-                    ORDER BY timestamp ASC
-                    LIMIT ?
+                    INSERT INTO messages (user_id, campaign_id, role, content, character_id)
+                    VALUES (?, ?, ?, ?, ?)
                 """,
-                    (user_id, campaign_id, limit),
+                    (user_id, campaign_id, role, content, character_id),
                 )
-            else:
-                # Récupérer les messages de la campagne la plus récente
+                ids[id_key] = cursor.lastrowid
+
+            if performance:
+                tokens_in, tokens_out = performance.get("tokens_in", 0), performance.get("tokens_out", 0)
+                cost_estimate = performance.get("cost_estimate")
+                if cost_estimate is None:
+                    cost_estimate = calculate_estimated_cost(performance["model"], tokens_in, tokens_out)
                 cursor.execute(
                     """
-                    SELECT m.role, m.content, m.timestamp
-                    FROM messages m
-                    JOIN campaigns c ON m.campaign_id = c.id
-                    WHERE m.user_id = ? AND c.is_active = 1
-                    ORDER BY c.updated_at DESC, m.timestamp ASC
-                    LIMIT ?
+                    INSERT INTO performance_logs
+                    (user_id, campaign_id, model, latency, tokens_in, tokens_out, cost_estimate, ttft)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 """,
-                    (user_id, limit),
+                    (
+                        user_id,
+                        campaign_id,
+                        performance["model"],
+                        performance["latency"],
+                        tokens_in,
+                        tokens_out,
+                        cost_estimate,
+                        performance.get("ttft"),
+                    ),
                 )
+                ids["performance_id"] = cursor.lastrowid
+                record_performance_sketches(
+                    conn,
+                    [(user_id, performance["model"], performance["latency"], tokens_out, epoch_ms())],
+                )
+
+            if campaign_id:
+                cursor.execute("UPDATE campaigns SET updated_at = CURRENT_TIMESTAMP WHERE id = ?", (campaign_id,))
+
+        if campaign_id:
+            _model_cache.delete(f"user_campaigns_{user_id}")
+
+        return ids
+
+    @staticmethod
+    def get_campaign_messages(user_id: int, campaign_id: Optional[int] = None, limit: int = 50) -> List[Dict]:
+        """Récupère les `limit` derniers messages d'une campagne, du plus ancien au plus récent."""
+        with get_optimized_connection() as conn:
+            cursor = conn.cursor()
+
+            if not campaign_id:
+                # Campagne active ayant l'activité la plus récente
+                cursor.execute(LATEST_CAMPAIGN_SQL, (user_id,))
+                row = cursor.fetchone()
+                if not row:
+                    return []
+                campaign_id = row[0]
+
+            rows = MessageManager._fetch_tail(cursor, user_id, campaign_id, limit)
+
+        return [{"role": row[1], "content": row[2], "timestamp": row[3]} for row in rows]
+
+    @staticmethod
+    def get_message_page(user_id: int, campaign_id: int, limit: int = 50, before_id: Optional[int] = None) -> Dict[str, Any]:
+        """Page de messages par curseur (keyset) pour « charger les plus anciens ».
 
-            messages = []
-            for row in cursor.fetchall():
-                message = {"role": row[0], "content": row[1], "timestamp": row[2]}
-                messages.append(message)
+        Args:
+            before_id: curseur retourné par la page précédente (None = fin de l'historique)
 
-        return messages
+        Returns:
+            Dict avec 'messages' (du plus ancien au plus récent, avec 'id'),
+            'next_cursor' (à passer en before_id, None s'il n'y a plus rien) et 'has_more'
+        """
+        with get_optimized_connection() as conn:
+            cursor = conn.cursor()
+            # Une ligne de plus pour savoir s'il reste des messages plus anciens
+            rows = MessageManager._fetch_tail(cursor, user_id, campaign_id, limit + 1, before_id)
+
+        has_more = len(rows) > limit
+        if has_more:
+            rows = rows[1:]
+        messages = [{"id": row[0], "role": row[1], "content": row[2], "timestamp": row[3]} for row in rows]
+        return {
+            "messages": messages,
+            "next_cursor": messages[0]["id"] if has_more and messages else None,
+            "has_more": has_more,
+        }
+
+    @staticmethod
+    def _fetch_tail(cursor, user_id: int, campaign_id: int, limit: int, before_id: Optional[int] = None) -> List[Tuple]:
+        """Derniers messages (avant `before_id`) via idx_messages_campaign_user_id, remis dans l'ordre chronologique."""
+        upper_id = before_id if before_id is not None else 2**63 - 1  # Plus grand rowid SQLite
+        cursor.execute(MESSAGE_TAIL_SQL, (campaign_id, user_id, upper_id, limit))
+        return list(reversed(cursor.fetchall()))
 
 
 class PerformanceManager:
@@ -506,7 +935,9 @@ class PerformanceManager:
         campaign_id: Optional[int] = None,
         cost_estimate: Optional[float] = None,
     ) -> int:
-        """Stocke les données de performance."""
+        """Stocke les données de performance (coût estimé depuis models_config s'il n'est pas fourni)."""
+        if cost_estimate is None:
+            cost_estimate = calculate_estimated_cost(model, tokens_in, tokens_out)
         with get_optimized_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
@@ -519,57 +950,94 @@ class PerformanceManager:
             )
 
             log_id = cursor.lastrowid
+            record_performance_sketches(conn, [(user_id, model, latency, tokens_out, epoch_ms())])
 
         return log_id
 
+    @staticmethod
+    def store_comparison(
+        user_id: int, comparison_id: str, results: List[Dict[str, Any]], campaign_id: Optional[int] = None
+    ) -> List[int]:
+        """Stocke une ligne de performance par modèle d'une comparaison, en une transaction.
+
+        Args:
+            comparison_id: identifiant partagé par les lignes de la comparaison
+            results: dicts avec 'model', 'latency', 'tokens_in', 'tokens_out' et
+                optionnellement 'cost_estimate' (sinon estimé depuis models_config)
+
+        Returns:
+            IDs des lignes insérées, dans l'ordre de `results`
+        """
+        ids = []
+        now_ms = epoch_ms()
+        with get_optimized_connection(immediate=True) as conn:
+            cursor = conn.cursor()
+            for result in results:
+                cost_estimate = result.get("cost_estimate")
+                if cost_estimate is None:
+                    cost_estimate = calculate_estimated_cost(result["model"], result["tokens_in"], result["tokens_out"])
+                cursor.execute(
+                    """
+                    INSERT INTO performance_logs
+                    (user_id, campaign_id, model, latency, tokens_in, tokens_out, cost_estimate, comparison_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                    (
+                        user_id,
+                        campaign_id,
+                        result["model"],
+                        result["latency"],
+                        result["tokens_in"],
+                        result["tokens_out"],
+                        cost_estimate,
+                        comparison_id,
+                    ),
+                )
+                ids.append(cursor.lastrowid)
+            record_performance_sketches(conn, [(user_id, r["model"], r["latency"], r["tokens_out"], now_ms) for r in results])
+        return ids
+
+    @staticmethod
+    def queue_performance(
+        user_id: int,
+        model: str,
+        latency: float,
+        tokens_in: int,
+        tokens_out: int,
+        campaign_id: Optional[int] = None,
+        cost_estimate: Optional[float] = None,
+    ) -> bool:
+        """Met en file les données de performance (écriture différée, sans ID retourné)."""
+        return enqueue_performance(user_id, model, latency, tokens_in, tokens_out, campaign_id, cost_estimate)
+
     @staticmethod
     def get_performance_stats(user_id: int, days: int = 7) -> Dict[str, Any]:
         """Récupère les statistiques de performance avec cache."""
-        cache_key = f"performance_stats_{user_id}_{days}"
-        cached_stats = _model_cache.get(cache_key)
 
-        if cached_stats:
-            return cached_stats
+        def load() -> Dict[str, Any]:
+            with get_optimized_connection() as conn:
+                cursor = conn.cursor()
 
-        with get_optimized_connection() as conn:
-            cursor = conn.cursor()
+                # Statistiques globales depuis les agrégats horaires (fenêtre arrondie à l'heure)
+                cursor.execute(PERFORMANCE_STATS_SQL, (user_id, bucket_start(days_ago_ms(days), "hourly")))
 
-            # Statistiques globales
-            cursor.execute(
-                """
-                SELECT
-                    model,
-                    COUNT(*) as count,
-                    AVG(latency) as avg_latency,
-                    SUM(tokens_in) as total_tokens_in,
-                    SUM(tokens_out) as total_tokens_out,
-                    SUM(cost_estimate) as total_cost
-                FROM performance_logs
-                WHERE user_id = ?
-                    AND timestamp >= datetime('now', '-' || ? || ' days')
-                GROUP BY model
-                ORDER BY count DESC
-            """,
-                (user_id, days),
-            )
+                stats = {"by_model": {}, "total_requests": 0, "total_cost": 0.0}
 
-            stats = {"by_model": {}, "total_requests": 0, "total_cost": 0.0}
-
-            for row in cursor.fetchall():
-                model_stats = {
-                    "count": row[1],
-                    "avg_latency": round(row[2], 3) if row[2] else 0,
-                    "total_tokens_in": row[3] or 0,
-                    "total_tokens_out": row[4] or 0,
-                    "total_cost": round(row[5], 4) if row[5] else 0,
-                }
-                stats["by_model"][row[0]] = model_stats
-                stats["total_requests"] += model_stats["count"]
-                stats["total_cost"] += model_stats["total_cost"]
-
-        # Cache pour 2 minutes (données de performance changent souvent)
-        _model_cache.set(cache_key, stats)
-        return stats
+                for row in cursor.fetchall():
+                    model_stats = {
+                        "count": row[1],
+                        "avg_latency": round(row[2], 3) if row[2] else 0,
+                        "total_tokens_in": row[3] or 0,
+                        "total_tokens_out": row[4] or 0,
+                        "total_cost": round(row[5], 4) if row[5] else 0,
+                    }
+                    stats["by_model"][row[0]] = model_stats
+                    stats["total_requests"] += model_stats["count"]
+                    stats["total_cost"] += model_stats["total_cost"]
+            return stats
+
+        # TTL de l'espace de noms performance_stats (2 minutes)
+        return _model_cache.get_or_load(f"performance_stats_{user_id}_{days}", load)
 
 
 # Fonctions de rétrocompatibilité avec l'ancienne API
@@ -628,11 +1096,27 @@ def get_campaign_messages(user_id: int, campaign_id: Optional[int] = None, limit
     return MessageManager.get_campaign_messages(user_id, campaign_id, limit)
 
 
+def get_message_page(user_id: int, campaign_id: int, limit: int = 50, before_id: Optional[int] = None) -> Dict[str, Any]:
+    """Pagination par curseur des messages (compatibilité)."""
+    return MessageManager.get_message_page(user_id, campaign_id, limit, before_id)
+
+
 def store_message(user_id: int, role: str, content: str, campaign_id: Optional[int] = None) -> int:
     """Stockage de message (compatibilité)."""
     return MessageManager.store_message(user_id, role, content, campaign_id)
 
 
+def commit_turn(
+    user_id: int,
+    user_content: Optional[str],
+    assistant_content: Optional[str],
+    campaign_id: Optional[int] = None,
+    performance: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Optional[int]]:
+    """Persistance atomique d'un tour de chat (compatibilité)."""
+    return MessageManager.commit_turn(user_id, user_content, assistant_content, campaign_id, performance=performance)
+
+
 def update_campaign_portrait(campaign_id: int, gm_portrait_url: str) -> bool:
     """Mise à jour du portrait MJ (compatibilité)."""
     return CampaignManager.update_campaign_portrait(campaign_id, gm_portrait_url)
@@ -648,3 +1132,8 @@ def clear_cache():
     """Nettoie le cache complet (utile pour les tests)."""
     _model_cache.clear()
     logger.info("Cache des modèles nettoyé")
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Statistiques du cache des modèles (hits, misses, évictions, occupation)."""
+    return _model_cache.stats()
@@ -0,0 +1,257 @@
+"""
+Écriture différée (write-behind) des logs de performance.
+
+Les enregistrements sont mis en file par le thread du script Streamlit puis
+insérés par lots (`executemany`) depuis un thread d'arrière-plan, sur seuil de
+taille ou de temps. La télémétrie n'ajoute ainsi ni latence ni prise du verrou
+d'écriture SQLite à chaque tour de chat.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.ai.models_config import calculate_estimated_cost
+from src.data.database import epoch_ms, get_optimized_connection
+from src.data.sketches import SketchRecord, record_performance_sketches
+
+logger = logging.getLogger(__name__)
+
+# (user_id, campaign_id, model, latency, tokens_in, tokens_out, cost_estimate)
+PerformanceRecord = Tuple[int, Optional[int], str, float, int, int, Optional[float]]
+
+INSERT_PERFORMANCE_SQL = """
+    INSERT INTO performance_logs
+    (user_id, campaign_id, model, latency, tokens_in, tokens_out, cost_estimate)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class WriterConfig:
+    """Paramètres du writer (surchargeables par variables d'environnement)."""
+
+    ENABLED = os.getenv("PERF_WRITE_BEHIND", "true").lower() == "true"
+    BATCH_SIZE = int(os.getenv("PERF_WRITER_BATCH_SIZE", "50"))
+    FLUSH_INTERVAL = float(os.getenv("PERF_WRITER_FLUSH_INTERVAL", "2.0"))  # secondes
+    MAX_QUEUE_SIZE = int(os.getenv("PERF_WRITER_MAX_QUEUE", "10000"))
+
+
+# Sentinelles de contrôle transmises par la file
+_FLUSH = object()
+_STOP = object()
+
+
+class PerformanceLogWriter:
+    """Writer en arrière-plan pour la table performance_logs."""
+
+    def __init__(
+        self,
+        batch_size: int = 50,
+        flush_interval: float = 2.0,
+        max_queue_size: int = 10000,
+        enabled: bool = True,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "failed": 0,
+            "batches": 0,
+            "last_batch_size": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    def enqueue(self, record: PerformanceRecord) -> bool:
+        """Met un enregistrement en file. Retourne False s'il a été abandonné (file pleine)."""
+        if not self.enabled:
+            self._write_batch([record])
+            return True
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self._stats["dropped"] += 1
+            logger.warning("File des logs de performance pleine, enregistrement abandonné")
+            return False
+        with self._lock:
+            self._stats["enqueued"] += 1
+        return True
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Force l'écriture des enregistrements en attente et attend leur persistance."""
+        if self._thread is None or not self._thread.is_alive():
+            return self._queue.unfinished_tasks == 0
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(_FLUSH, timeout=timeout)
+        except queue.Full:
+            return False
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Vide la file puis arrête le thread d'écriture."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("Arrêt du writer de performance: file pleine, données en attente perdues")
+            return
+        thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Profondeur de file et latence des flushs."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize()
+        stats["avg_flush_ms"] = round(stats["total_flush_ms"] / stats["batches"], 3) if stats["batches"] else 0.0
+        stats["running"] = bool(self._thread and self._thread.is_alive())
+        return stats
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="performance-log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch, stop = self._next_batch()
+            if batch:
+                self._write_batch(batch)
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _next_batch(self) -> Tuple[List[PerformanceRecord], bool]:
+        """Accumule jusqu'à batch_size enregistrements ou flush_interval secondes."""
+        batch: List[PerformanceRecord] = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            try:
+                if deadline is None:
+                    item = self._queue.get()
+                else:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _FLUSH or item is _STOP:
+                self._queue.task_done()
+                return batch, item is _STOP
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+        return batch, False
+
+    def _write_batch(self, batch: List[PerformanceRecord]) -> None:
+        started = time.perf_counter()
+        try:
+            with get_optimized_connection() as conn:
+                conn.executemany(INSERT_PERFORMANCE_SQL, batch)
+                record_performance_sketches(conn, _sketch_records(batch))
+            written, failed = len(batch), 0
+        except sqlite3.IntegrityError as e:
+            # Un enregistrement invalide (ex: utilisateur supprimé) ne doit pas faire perdre tout le lot
+            logger.warning(f"Lot de logs de performance rejeté ({e}), écriture ligne par ligne")
+            written, failed = self._write_rows(batch)
+        except Exception as e:
+            logger.error(f"Échec d'écriture de {len(batch)} logs de performance: {e}")
+            written, failed = 0, len(batch)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._stats["written"] += written
+            self._stats["failed"] += failed
+            self._stats["batches"] += 1
+            self._stats["last_batch_size"] = len(batch)
+            self._stats["last_flush_ms"] = round(elapsed_ms, 3)
+            self._stats["max_flush_ms"] = round(max(self._stats["max_flush_ms"], elapsed_ms), 3)
+            self._stats["total_flush_ms"] += elapsed_ms
+
+    @staticmethod
+    def _write_rows(batch: List[PerformanceRecord]) -> Tuple[int, int]:
+        written = 0
+        for row in batch:
+            try:
+                with get_optimized_connection() as conn:
+                    conn.execute(INSERT_PERFORMANCE_SQL, row)
+                    record_performance_sketches(conn, _sketch_records([row]))
+                written += 1
+            except Exception as e:
+                logger.error(f"Log de performance abandonné {row[:3]}: {e}")
+        return written, len(batch) - written
+
+
+def _sketch_records(batch: List[PerformanceRecord]) -> List[SketchRecord]:
+    """Enregistrements pour les sketches de quantiles, horodatés à l'écriture."""
+    now_ms = epoch_ms()
+    return [(user_id, model, latency, tokens_out, now_ms) for user_id, _, model, latency, _, tokens_out, _ in batch]
+
+
+_writer: Optional[PerformanceLogWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_performance_writer() -> PerformanceLogWriter:
+    """Retourne le writer global (créé à la première utilisation)."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = PerformanceLogWriter(
+                    batch_size=WriterConfig.BATCH_SIZE,
+                    flush_interval=WriterConfig.FLUSH_INTERVAL,
+                    max_queue_size=WriterConfig.MAX_QUEUE_SIZE,
+                    enabled=WriterConfig.ENABLED,
+                )
+                atexit.register(_writer.shutdown)
+    return _writer
+
+
+def enqueue_performance(
+    user_id: int,
+    model: str,
+    latency: float,
+    tokens_in: int,
+    tokens_out: int,
+    campaign_id: Optional[int] = None,
+    cost_estimate: Optional[float] = None,
+) -> bool:
+    """Met en file un log de performance pour écriture différée (coût estimé s'il n'est pas fourni)."""
+    if cost_estimate is None:
+        cost_estimate = calculate_estimated_cost(model, tokens_in, tokens_out)
+    return get_performance_writer().enqueue((user_id, campaign_id, model, latency, tokens_in, tokens_out, cost_estimate))
+
+
+def flush_performance_logs(timeout: float = 5.0) -> bool:
+    """Persiste immédiatement les logs en attente (utile avant une lecture ou pour les tests)."""
+    return get_performance_writer().flush(timeout)
+
+
+def get_performance_writer_stats() -> Dict[str, Any]:
+    """Statistiques du writer : profondeur de file, lots écrits, latence de flush."""
+    return get_performance_writer().stats()
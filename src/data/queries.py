@@ -0,0 +1,126 @@
+"""
+Requêtes SQL chaudes de l'application
+
+Partagées entre le code qui les exécute (src.data.models, src.data.rollups,
+src.auth.auth, src.analytics.performance) et le registre de src.data.query_plans,
+pour que l'analyse des plans porte sur le SQL réellement exécuté.
+"""
+
+from src.data.database import sql_datetime
+
+# Utilisateurs (UserManager.get_user_by_id, connexion dans src.auth.auth)
+ACTIVE_USER_BY_ID_SQL = """
+    SELECT id, email, created_at, last_login, is_active
+    FROM users
+    WHERE id = ? AND is_active = 1
+"""
+USER_CREDENTIALS_BY_EMAIL_SQL = "SELECT id, password FROM users WHERE email = ?"
+
+# Dernier modèle choisi (ModelChoiceManager.get_user_model_choice)
+LATEST_MODEL_CHOICE_SQL = """
+    SELECT model
+    FROM model_choices
+    WHERE user_id = ?
+    ORDER BY created_at DESC
+    LIMIT 1
+"""
+
+# Campagnes actives (CampaignManager.get_user_campaigns) : compteurs dénormalisés maintenus par triggers
+ACTIVE_CAMPAIGNS_SQL = f"""
+    SELECT
+        id,
+        name,
+        themes,
+        language,
+        ai_model,
+        gm_portrait,
+        created_at,
+        updated_at,
+        message_count,
+        {sql_datetime("last_activity")} AS last_activity
+    FROM campaigns
+    WHERE user_id = ? AND is_active = 1
+    ORDER BY updated_at DESC, id
+"""
+
+# Personnages actifs (CharacterManager.get_user_characters)
+ACTIVE_CHARACTERS_SQL = """
+    SELECT id, campaign_id, name, class, race, gender, level, description, portrait_url, created_at
+    FROM characters
+    WHERE user_id = ? AND is_active = 1
+    ORDER BY created_at DESC, id
+"""
+
+# Campagne active ayant l'activité la plus récente (MessageManager.get_campaign_messages)
+LATEST_CAMPAIGN_SQL = """
+    SELECT m.campaign_id
+    FROM messages m
+    JOIN campaigns c ON m.campaign_id = c.id
+    WHERE m.user_id = ? AND c.is_active = 1
+    ORDER BY m.id DESC
+    LIMIT 1
+"""
+
+# Derniers messages avant un id (MessageManager._fetch_tail) : paramètres campaign_id, user_id, id, limite
+MESSAGE_TAIL_SQL = f"""
+    SELECT id, role, content, {sql_datetime("timestamp")} AS timestamp
+    FROM messages
+    WHERE campaign_id = ? AND user_id = ? AND id < ?
+    ORDER BY id DESC
+    LIMIT ?
+"""
+
+# Totaux par modèle depuis les agrégats horaires (PerformanceManager.get_performance_stats)
+PERFORMANCE_STATS_SQL = """
+    SELECT
+        model,
+        SUM(count) as count,
+        SUM(latency_sum) / SUM(count) as avg_latency,
+        SUM(tokens_in) as total_tokens_in,
+        SUM(tokens_out) as total_tokens_out,
+        SUM(cost) as total_cost
+    FROM performance_rollup_hourly
+    WHERE user_id = ?
+        AND bucket >= ?
+    GROUP BY model
+    ORDER BY count DESC
+"""
+
+# Totaux par modèle avec extrêmes de latence (src.data.rollups.get_model_stats)
+MODEL_STATS_SQL = """
+    SELECT model, SUM(count) AS count, SUM(latency_sum) / SUM(count) AS latency,
+           MIN(latency_min) AS latency_min, MAX(latency_max) AS latency_max,
+           SUM(tokens_in) AS tokens_in, SUM(tokens_out) AS tokens_out, SUM(cost) AS cost
+    FROM performance_rollup_hourly
+    WHERE user_id = ? AND bucket >= ?
+    GROUP BY model
+    ORDER BY count DESC
+"""
+
+# Seaux d'une fenêtre (src.data.rollups.get_rollups) ; {table} : performance_rollup_hourly ou _daily
+ROLLUP_WINDOW_SQL = """
+    SELECT bucket, model, count, latency_sum, latency_min, latency_max, tokens_in, tokens_out, cost
+    FROM {table}
+    WHERE user_id = ? AND bucket >= ?
+    ORDER BY bucket, model
+"""
+
+# Sketches de quantiles d'une fenêtre (src.data.rollups.get_latency_percentiles)
+SKETCH_WINDOW_SQL = """
+    SELECT model, metric, sketch
+    FROM performance_sketches
+    WHERE user_id = ? AND day >= ?
+"""
+
+# Logs bruts récents (src.analytics.performance.get_performance_data) : filtre et tri sur l'entier ms epoch (index),
+# timestamp restitué au format texte ; LIMIT -1 = sans limite
+PERFORMANCE_LOGS_WINDOW_SQL = f"""
+    SELECT model, latency, tokens_in, tokens_out, cost_estimate AS cost, {sql_datetime("timestamp")} AS timestamp
+    FROM performance_logs
+    WHERE user_id = ? AND performance_logs.timestamp >= ?
+    ORDER BY performance_logs.timestamp DESC
+    LIMIT ?
+"""
+
+# Versions de cache d'un utilisateur (CacheCoherence._load)
+CACHE_VERSIONS_SQL = "SELECT scope, version FROM cache_versions WHERE user_id = ?"
@@ -0,0 +1,334 @@
+"""
+Registre des requêtes chaudes et analyse de leurs plans d'exécution (EXPLAIN QUERY PLAN)
+
+Usage:
+    python -m src.data.query_plans            # base temporaire peuplée
+    python -m src.data.query_plans --db database.db
+"""
+
+import argparse
+import logging
+import random
+import sqlite3
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.data import queries
+from src.data.database import DatabaseSchema, days_ago_ms
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class HotQuery:
+    """Requête chaude de l'application, décrite pour l'analyse de plan et le conseil d'index."""
+
+    name: str
+    sql: str
+    params: Tuple
+    table: str
+    equality: Tuple[str, ...] = ()  # colonnes filtrées par égalité
+    range: Tuple[str, ...] = ()  # colonnes filtrées par intervalle
+    order_by: Tuple[str, ...] = ()  # colonnes de tri
+    columns: Tuple[str, ...] = ()  # colonnes lues (index couvrant)
+    # B-trees temporaires inévitables (ex. ORDER BY sur un agrégat)
+    allowed_temp_btrees: Tuple[str, ...] = ()
+
+
+@dataclass
+class PlanReport:
+    """Résultat de l'analyse d'une requête chaude."""
+
+    query: HotQuery
+    plan: List[str]
+    issues: List[str] = field(default_factory=list)
+    suggestion: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return not self.issues
+
+
+# Requêtes chaudes : le SQL exécuté par l'application (src.data.queries), avec des paramètres représentatifs
+HOT_QUERIES: Dict[str, HotQuery] = {}
+
+
+def register_hot_query(query: HotQuery) -> HotQuery:
+    """Ajoute (ou remplace) une requête dans le registre."""
+    HOT_QUERIES[query.name] = query
+    return query
+
+
+register_hot_query(
+    HotQuery(
+        name="users.by_id",
+        sql=queries.ACTIVE_USER_BY_ID_SQL,
+        params=(1,),
+        table="users",
+        equality=("id",),
+    )
+)
+register_hot_query(
+    HotQuery(
+        name="users.by_email",
+        sql=queries.USER_CREDENTIALS_BY_EMAIL_SQL,
+        params=("user1@example.com",),
+        table="users",
+        equality=("email",),
+    )
+)
+register_hot_query(
+    HotQuery(
+        name="model_choices.latest_for_user",
+        sql=queries.LATEST_MODEL_CHOICE_SQL,
+        params=(1,),
+        table="model_choices",
+        equality=("user_id",),
+        order_by=("created_at",),
+        columns=("model",),
+    )
+)
+register_hot_query(
+    HotQuery(
+        name="campaigns.active_for_user",
+        sql=queries.ACTIVE_CAMPAIGNS_SQL,
+        params=(1,),
+        table="campaigns",
+        equality=("user_id", "is_active"),
+        order_by=("updated_at",),
+        # Départage par ordre de création : tri limité aux ex aequo
+        allowed_temp_btrees=("RIGHT PART OF ORDER BY",),
+    )
+)
+register_hot_query(
+    HotQuery(
+        name="characters.active_for_user",
+        sql=queries.ACTIVE_CHARACTERS_SQL,
+        params=(1,),
+        table="characters",
+        equality=("user_id", "is_active"),
+        order_by=("created_at",),
+        allowed_temp_btrees=("RIGHT PART OF ORDER BY",),
+    )
+)
+register_hot_query(
+    HotQuery(
+        name="messages.latest_campaign",
+        sql=queries.LATEST_CAMPAIGN_SQL,
+        params=(1,),
+        table="messages",
+        equality=("user_id",),
+        order_by=("id",),
+        columns=("campaign_id",),
+    )
+)
+register_hot_query(
+    HotQuery(
+        name="messages.tail",
+        sql=queries.MESSAGE_TAIL_SQL,
+        params=(1, 1, 2**63 - 1, 50),
+        table="messages",
+        equality=("campaign_id", "user_id"),
+        range=("id",),
+        order_by=("id",),
+    )
+)
+register_hot_query(
+    HotQuery(
+        name="performance_rollup_hourly.stats_by_model",
+        sql=queries.MODEL_STATS_SQL,
+        params=(1, days_ago_ms(7)),
+        table="performance_rollup_hourly",
+        equality=("user_id",),
+        range=("bucket",),
+        # Quelques centaines de seaux au plus : regroupement et tri en mémoire
+        allowed_temp_btrees=("GROUP BY", "ORDER BY"),
+    )
+)
+register_hot_query(
+    HotQuery(
+        name="performance_rollup_hourly.performance_stats",
+        sql=queries.PERFORMANCE_STATS_SQL,
+        params=(1, days_ago_ms(7)),
+        table="performance_rollup_hourly",
+        equality=("user_id",),
+        range=("bucket",),
+        # Quelques centaines de seaux au plus : regroupement et tri en mémoire
+        allowed_temp_btrees=("GROUP BY", "ORDER BY"),
+    )
+)
+register_hot_query(
+    HotQuery(
+        name="performance_rollup_daily.window_for_user",
+        sql=queries.ROLLUP_WINDOW_SQL.format(table="performance_rollup_daily"),
+        params=(1, days_ago_ms(365)),
+        table="performance_rollup_daily",
+        equality=("user_id",),
+        range=("bucket",),
+        order_by=("bucket", "model"),
+    )
+)
+register_hot_query(
+    HotQuery(
+        name="performance_sketches.window_for_user",
+        sql=queries.SKETCH_WINDOW_SQL,
+        params=(1, days_ago_ms(30)),
+        table="performance_sketches",
+        equality=("user_id",),
+        range=("day",),
+    )
+)
+register_hot_query(
+    HotQuery(
+        name="performance_logs.window_for_user",
+        sql=queries.PERFORMANCE_LOGS_WINDOW_SQL,
+        params=(1, days_ago_ms(30), 1000),
+        table="performance_logs",
+        equality=("user_id",),
+        range=("timestamp",),
+        order_by=("timestamp",),
+    )
+)
+register_hot_query(
+    HotQuery(
+        name="cache_versions.for_user",
+        sql=queries.CACHE_VERSIONS_SQL,
+        params=(1,),
+        table="cache_versions",
+        equality=("user_id",),
+    )
+)
+
+
+def explain_query_plan(conn: sqlite3.Connection, sql: str, params: Sequence = ()) -> List[str]:
+    """Retourne les lignes « detail » de EXPLAIN QUERY PLAN."""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", tuple(params)).fetchall()]
+
+
+def find_plan_issues(plan: Iterable[str], allowed_temp_btrees: Iterable[str] = ()) -> List[str]:
+    """Repère les parcours complets (SCAN) et les B-trees temporaires non autorisés."""
+    allowed = {f"USE TEMP B-TREE FOR {purpose}" for purpose in allowed_temp_btrees}
+    issues = []
+    for detail in plan:
+        if detail.startswith("SCAN "):
+            issues.append(f"parcours complet: {detail}")
+        elif detail.startswith("USE TEMP B-TREE") and detail not in allowed:
+            issues.append(f"B-tree temporaire: {detail}")
+    return issues
+
+
+def suggest_covering_index(query: HotQuery) -> str:
+    """Index couvrant suggéré : égalités, puis tri/intervalle, puis colonnes lues."""
+    columns: List[str] = []
+    for column in (*query.equality, *query.order_by, *query.range, *query.columns):
+        if column not in columns:
+            columns.append(column)
+    name = f"idx_{query.table}_{'_'.join(columns)}"
+    return f"CREATE INDEX IF NOT EXISTS {name} ON {query.table}({', '.join(columns)})"
+
+
+def analyze_hot_queries(conn: sqlite3.Connection, queries: Optional[Iterable[HotQuery]] = None) -> List[PlanReport]:
+    """Analyse le plan de chaque requête chaude et propose un index en cas de problème."""
+    reports = []
+    for query in queries if queries is not None else HOT_QUERIES.values():
+        plan = explain_query_plan(conn, query.sql, query.params)
+        report = PlanReport(query=query, plan=plan, issues=find_plan_issues(plan, query.allowed_temp_btrees))
+        if report.issues:
+            report.suggestion = suggest_covering_index(query)
+        reports.append(report)
+    return reports
+
+
+def seed_database(
+    conn: sqlite3.Connection,
+    users: int = 200,
+    campaigns_per_user: int = 5,
+    messages: int = 20000,
+    performance_logs: int = 20000,
+    seed: int = 42,
+) -> None:
+    """Crée le schéma et peuple une base volumineuse puis lance ANALYZE.
+
+    Les statistiques (sqlite_stat1) orientent le planificateur comme en production.
+    """
+    rng = random.Random(seed)
+    DatabaseSchema.create_tables(conn)
+    DatabaseSchema.run_migrations(conn)
+
+    conn.executemany(
+        "INSERT INTO users (email, password) VALUES (?, ?)", [(f"user{i}@example.com", "x") for i in range(1, users + 1)]
+    )
+    conn.executemany("INSERT INTO model_choices (user_id, model) VALUES (?, 'GPT-4o')", [(i,) for i in range(1, users + 1)])
+    campaign_count = users * campaigns_per_user
+    conn.executemany(
+        "INSERT INTO campaigns (user_id, name, language, is_active) VALUES (?, ?, 'fr', ?)",
+        [(1 + i % users, f"campagne {i}", int(rng.random() > 0.1)) for i in range(campaign_count)],
+    )
+    conn.executemany(
+        "INSERT INTO characters (user_id, campaign_id, name, class, race) VALUES (?, ?, ?, 'Guerrier', 'Humain')",
+        [(1 + i % users, i + 1, f"perso {i}") for i in range(campaign_count)],
+    )
+    conn.executemany(
+        "INSERT INTO messages (user_id, campaign_id, role, content) VALUES (?, ?, ?, 'lorem ipsum')",
+        [
+            (1 + campaign % users, campaign + 1, rng.choice(("user", "assistant")))
+            for campaign in (rng.randrange(campaign_count) for _ in range(messages))
+        ],
+    )
+    conn.executemany(
+        """
+        INSERT INTO performance_logs (user_id, campaign_id, model, latency, tokens_in, tokens_out, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+        [
+            (
+                rng.randint(1, users),
+                rng.randint(1, campaign_count),
+                rng.choice(("GPT-4o", "GPT-4", "Claude 3.5 Sonnet", "DeepSeek")),
+                rng.uniform(0.2, 8.0),
+                rng.randint(10, 2000),
+                rng.randint(10, 2000),
+                days_ago_ms(rng.uniform(0, 90)),
+            )
+            for _ in range(performance_logs)
+        ],
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+
+
+def format_report(reports: Iterable[PlanReport]) -> str:
+    """Rapport texte lisible (une section par requête)."""
+    lines = []
+    for report in reports:
+        lines.append(f"[{'OK' if report.ok else 'KO'}] {report.query.name}")
+        lines.extend(f"    {detail}" for detail in report.plan)
+        lines.extend(f"    ! {issue}" for issue in report.issues)
+        if report.suggestion:
+            lines.append(f"    -> {report.suggestion}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Point d'entrée CLI : code retour 1 si une requête chaude fait un parcours complet."""
+    parser = argparse.ArgumentParser(description="Analyse des plans des requêtes chaudes")
+    parser.add_argument("--db", help="Base existante à analyser (par défaut : base temporaire peuplée)")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    else:
+        conn = sqlite3.connect(":memory:")
+        seed_database(conn)
+    try:
+        reports = analyze_hot_queries(conn)
+    finally:
+        conn.close()
+
+    print(format_report(reports))
+    return 0 if all(report.ok for report in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""
+Instrumentation des requêtes SQL (durée, lignes, appelant) et journal des requêtes lentes.
+
+Les connexions créées par `DatabaseConnection` utilisent `InstrumentedConnection` :
+chaque `execute`/`executemany` est chronométré et agrégé par texte SQL normalisé
+dans des histogrammes en mémoire. Le coût par requête se limite à deux appels
+`perf_counter`, une remontée de pile bornée et une prise de verrou. Les durées
+sont aussi attribuées à l'exécution de page en cours (`session_resources`).
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.analytics.session_resources import add_db_time
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("src.data.slow_queries")
+
+
+class QueryStatsConfig:
+    """Paramètres de l'instrumentation (surchargeables par variables d'environnement)."""
+
+    ENABLED = os.getenv("DB_QUERY_STATS", "true").lower() == "true"
+    SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "100"))
+    SLOW_QUERY_LOG = os.getenv("DB_SLOW_QUERY_LOG", "")  # fichier ; vide = logger applicatif
+    SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv("DB_SLOW_QUERY_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+    SLOW_QUERY_LOG_BACKUPS = int(os.getenv("DB_SLOW_QUERY_LOG_BACKUPS", "3"))
+    MAX_STATEMENTS = int(os.getenv("DB_QUERY_STATS_MAX_STATEMENTS", "500"))
+
+
+# Bornes supérieures des seaux de l'histogramme (ms) ; le dernier seau est ouvert
+HISTOGRAM_BOUNDS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+
+# Statements au-delà de MAX_STATEMENTS regroupés sous cette clé
+OTHER_STATEMENTS = "<autres>"
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+# Modules ignorés lors de la recherche de l'appelant
+_INTERNAL_MODULES = {__name__, "contextlib", "src.data.database"}
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql: str) -> str:
+    """Texte SQL canonique : littéraux remplacés par ?, listes IN repliées, espaces compactés."""
+    normalized = _LITERAL_RE.sub("?", sql)
+    normalized = _IN_LIST_RE.sub("(?...)", normalized)
+    return _SPACE_RE.sub(" ", normalized).strip()
+
+
+def find_caller(max_depth: int = 12) -> str:
+    """Première fonction applicative (module src.*) hors couche base de données."""
+    frame = sys._getframe(2)
+    fallback = None
+    depth = 0
+    while frame is not None and depth < max_depth:
+        module = frame.f_globals.get("__name__", "")
+        if module not in _INTERNAL_MODULES:
+            code = frame.f_code
+            name = f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+            if module.startswith("src."):
+                return name
+            fallback = fallback or name
+        frame = frame.f_back
+        depth += 1
+    return fallback or "<inconnu>"
+
+
+class _StatementStats:
+    """Agrégats d'un statement normalisé."""
+
+    __slots__ = ("calls", "total_s", "max_s", "rows", "histogram", "callers")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.rows = 0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        self.callers: Counter = Counter()
+
+    def to_dict(self, sql: str) -> Dict[str, Any]:
+        labels = [f"<={bound}ms" for bound in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}ms"]
+        return {
+            "sql": sql,
+            "calls": self.calls,
+            "total_ms": round(self.total_s * 1000, 3),
+            "avg_ms": round(self.total_s * 1000 / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_s * 1000, 3),
+            "rows": self.rows,
+            "histogram": dict(zip(labels, self.histogram)),
+            "callers": dict(self.callers.most_common(5)),
+        }
+
+
+class QueryStats:
+    """Histogrammes de durée par statement et journal des requêtes lentes."""
+
+    def __init__(self, slow_query_ms: float = 100.0, max_statements: int = 500):
+        self.slow_query_ms = slow_query_ms
+        self.max_statements = max(1, max_statements)
+        self._statements: Dict[str, _StatementStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, sql: str, duration: float, rows: int, caller: str) -> str:
+        """Enregistre une exécution et retourne la clé normalisée du statement."""
+        key = normalize_sql(sql)
+        bucket = 0
+        duration_ms = duration * 1000
+        while bucket < len(HISTOGRAM_BOUNDS_MS) and duration_ms > HISTOGRAM_BOUNDS_MS[bucket]:
+            bucket += 1
+
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                if len(self._statements) >= self.max_statements:
+                    key = OTHER_STATEMENTS
+                stats = self._statements.setdefault(key, _StatementStats())
+            stats.calls += 1
+            stats.total_s += duration
+            stats.max_s = max(stats.max_s, duration)
+            stats.rows += max(rows, 0)
+            stats.histogram[bucket] += 1
+            stats.callers[caller] += 1
+
+        if duration_ms >= self.slow_query_ms:
+            slow_query_logger.warning("%.1f ms | %s | %s", duration_ms, caller, key)
+        return key
+
+    def add_fetch(self, key: str, duration: float, rows: int) -> None:
+        """Ajoute le temps et les lignes d'un fetch au statement qui l'a produit."""
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is not None:
+                stats.total_s += duration
+                stats.rows += rows
+
+    def top(self, n: int = 20, order_by: str = "total_ms") -> List[Dict[str, Any]]:
+        """Les n statements les plus coûteux (total_ms, avg_ms, max_ms, calls ou rows)."""
+        with self._lock:
+            snapshot = [stats.to_dict(sql) for sql, stats in self._statements.items()]
+        snapshot.sort(key=lambda item: item[order_by], reverse=True)
+        return snapshot[:n]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._statements.clear()
+
+
+query_stats = QueryStats(slow_query_ms=QueryStatsConfig.SLOW_QUERY_MS, max_statements=QueryStatsConfig.MAX_STATEMENTS)
+
+
+def configure_slow_query_log(path: str, max_bytes: int, backup_count: int) -> None:
+    """Redirige le journal des requêtes lentes vers un fichier rotatif."""
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    slow_query_logger.addHandler(handler)
+    slow_query_logger.propagate = False
+
+
+if QueryStatsConfig.SLOW_QUERY_LOG:
+    try:
+        configure_slow_query_log(
+            QueryStatsConfig.SLOW_QUERY_LOG,
+            QueryStatsConfig.SLOW_QUERY_LOG_MAX_BYTES,
+            QueryStatsConfig.SLOW_QUERY_LOG_BACKUPS,
+        )
+    except OSError as e:
+        logger.warning(f"Journal des requêtes lentes indisponible ({QueryStatsConfig.SLOW_QUERY_LOG}): {e}")
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Curseur chronométrant execute/executemany et les fetch qui suivent.
+
+    L'itération directe (`for row in cursor`) n'est pas comptée dans les lignes.
+    """
+
+    _stats_key: Optional[str] = None
+
+    def execute(self, sql: str, parameters: Any = ()) -> "InstrumentedCursor":
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._record(sql, start)
+
+    def executemany(self, sql: str, seq_of_parameters: Iterable[Any]) -> "InstrumentedCursor":
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._record(sql, start)
+
+    def fetchone(self) -> Any:
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._note_fetch(start, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size: Optional[int] = None) -> List[Any]:
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._note_fetch(start, len(rows))
+        return rows
+
+    def fetchall(self) -> List[Any]:
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._note_fetch(start, len(rows))
+        return rows
+
+    def _record(self, sql: str, start: float) -> None:
+        duration = time.perf_counter() - start
+        self._stats_key = query_stats.record(sql, duration, self.rowcount, find_caller())
+        add_db_time(duration)
+
+    def _note_fetch(self, start: float, rows: int) -> None:
+        duration = time.perf_counter() - start
+        add_db_time(duration)
+        if self._stats_key is not None:
+            query_stats.add_fetch(self._stats_key, duration, rows)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connexion dont les curseurs (y compris ceux de `conn.execute`) sont instrumentés."""
+
+    def cursor(self, factory: Any = InstrumentedCursor) -> sqlite3.Cursor:
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters: Any = ()) -> sqlite3.Cursor:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Iterable[Any]) -> sqlite3.Cursor:
+        return self.cursor().executemany(sql, seq_of_parameters)
@@ -0,0 +1,118 @@
+"""
+Agrégats horaires/journaliers de performance_logs (lecture et backfill).
+
+Les tables performance_rollup_hourly/daily sont tenues à jour par triggers
+(voir `DatabaseSchema.create_performance_rollups`) ; les sketches de quantiles
+(`performance_sketches`) par les chemins d'écriture (voir `src.data.sketches`).
+Ce module fournit la lecture par fenêtre et la commande de reconstruction.
+
+Usage:
+    python -m src.data.rollups backfill            # tout l'historique
+    python -m src.data.rollups backfill --days 30  # seaux des 30 derniers jours
+"""
+
+import argparse
+import logging
+import sys
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.data.database import DatabaseSchema, days_ago_ms, get_optimized_connection, get_readonly_connection
+from src.data.queries import MODEL_STATS_SQL, ROLLUP_WINDOW_SQL, SKETCH_WINDOW_SQL
+from src.data.sketches import DAY_MS, QuantileSketch, rebuild_performance_sketches
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = {
+    "hourly": "performance_rollup_hourly",
+    "daily": "performance_rollup_daily",
+}
+
+
+def bucket_start(timestamp_ms: int, granularity: str) -> int:
+    """Début du seau (ms epoch) contenant `timestamp_ms`."""
+    width = DatabaseSchema.PERFORMANCE_ROLLUPS[GRANULARITIES[granularity]]
+    return timestamp_ms - timestamp_ms % width
+
+
+def get_rollups(user_id: int, days: float, granularity: str = "daily") -> List[Dict[str, Any]]:
+    """Seaux (utilisateur, modèle, période) couvrant les `days` derniers jours, du plus ancien au plus récent.
+
+    Le premier seau est inclus en entier : la fenêtre est arrondie à l'heure/au jour.
+    """
+    table = GRANULARITIES[granularity]
+    with get_readonly_connection() as conn:
+        rows = conn.execute(
+            ROLLUP_WINDOW_SQL.format(table=table), (user_id, bucket_start(days_ago_ms(days), granularity))
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def get_model_stats(user_id: int, days: float) -> List[Dict[str, Any]]:
+    """Totaux par modèle sur les `days` derniers jours (seaux horaires), du plus utilisé au moins utilisé.
+
+    Returns:
+        Une ligne par modèle : model, count, latency (moyenne), latency_min, latency_max,
+        tokens_in, tokens_out, cost
+    """
+    with get_readonly_connection() as conn:
+        rows = conn.execute(MODEL_STATS_SQL, (user_id, bucket_start(days_ago_ms(days), "hourly"))).fetchall()
+    return [dict(row) for row in rows]
+
+
+def get_latency_percentiles(user_id: int, days: float, quantiles: Sequence[float] = (0.5, 0.9, 0.99)) -> List[Dict[str, Any]]:
+    """Percentiles par modèle et métrique, par fusion des sketches journaliers des `days` derniers jours.
+
+    Returns:
+        Une ligne par (modèle, métrique) : model, metric, count, mean et p50/p90/p99...
+        (erreur relative bornée par la précision des sketches)
+    """
+    since = days_ago_ms(days)
+    with get_readonly_connection() as conn:
+        rows = conn.execute(SKETCH_WINDOW_SQL, (user_id, since - since % DAY_MS)).fetchall()
+
+    merged: Dict[Tuple[str, str], QuantileSketch] = defaultdict(QuantileSketch)
+    for model, metric, blob in rows:
+        merged[(model, metric)].merge(QuantileSketch.from_bytes(blob))
+
+    results = []
+    for (model, metric), sketch in sorted(merged.items()):
+        row = {"model": model, "metric": metric, "count": sketch.count, "mean": sketch.mean}
+        row.update({f"p{q * 100:g}": sketch.quantile(q) for q in quantiles})
+        results.append(row)
+    return results
+
+
+def backfill_performance_rollups(days: Optional[float] = None) -> int:
+    """Recalcule les agrégats et les sketches depuis performance_logs (tout l'historique si days est None).
+
+    Returns:
+        Nombre de seaux écrits
+    """
+    since_ms = None if days is None else days_ago_ms(days)
+    with get_optimized_connection(immediate=True) as conn:
+        DatabaseSchema.rebuild_performance_rollups(conn, since_ms)
+        rebuild_performance_sketches(conn, since_ms)
+        written = sum(
+            conn.execute(f"SELECT COUNT(*) FROM {table} WHERE bucket >= ?", (bucket_start(since_ms or 0, name),)).fetchone()[0]
+            for name, table in GRANULARITIES.items()
+        )
+    logger.info(f"Agrégats de performance reconstruits: {written} seaux")
+    return written
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Point d'entrée CLI."""
+    parser = argparse.ArgumentParser(description="Agrégats de performance_logs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    backfill = subparsers.add_parser("backfill", help="Reconstruit les agrégats depuis les logs bruts")
+    backfill.add_argument("--days", type=float, help="Limiter aux N derniers jours")
+    args = parser.parse_args(argv)
+
+    if args.command == "backfill":
+        print(f"{backfill_performance_rollups(args.days)} seaux écrits")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Sketches de quantiles fusionnables (style DDSketch) pour les latences par modèle.
+
+Chaque (utilisateur, modèle, jour, métrique) garde un sketch sérialisé dans
+`performance_sketches`. Les percentiles d'une période s'obtiennent en fusionnant
+les sketches journaliers, sans relire les logs bruts. L'erreur relative sur
+chaque quantile est bornée par `relative_accuracy` (1% par défaut).
+"""
+
+import math
+import sqlite3
+import struct
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+
+DAY_MS = 86400 * 1000
+
+# Métriques suivies : latence (s) et débit de génération (tokens de sortie / s)
+METRICS = ("latency", "tokens_per_second")
+
+_HEADER = struct.Struct("<BdQQddd")  # version, précision, compte, zéros, somme, min, max
+_BIN = struct.Struct("<iQ")
+_VERSION = 1
+
+# (user_id, model, latency, tokens_out, timestamp_ms)
+SketchRecord = Tuple[int, str, float, int, int]
+
+
+class QuantileSketch:
+    """Sketch à précision relative : seaux logarithmiques de raison gamma, fusion par addition des comptes."""
+
+    MIN_INDEXABLE = 1e-9
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Ajoute une observation (valeurs négatives ramenées à 0)."""
+        value = max(float(value), 0.0)
+        if value < self.MIN_INDEXABLE:
+            self.zero_count += count
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """Fusionne un sketch de même précision."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Précisions relatives différentes, fusion impossible")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Valeur au quantile q (0..1), None si le sketch est vide."""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                value = 2 * self._gamma**index / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def to_bytes(self) -> bytes:
+        """Sérialisation binaire compacte (en-tête fixe + 12 octets par seau)."""
+        header = _HEADER.pack(_VERSION, self.relative_accuracy, self.count, self.zero_count, self.sum, self.min, self.max)
+        return header + b"".join(_BIN.pack(index, count) for index, count in sorted(self.bins.items()))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "QuantileSketch":
+        version, accuracy, count, zero_count, total, minimum, maximum = _HEADER.unpack_from(data)
+        if version != _VERSION:
+            raise ValueError(f"Version de sketch inconnue: {version}")
+        sketch = cls(accuracy)
+        sketch.count, sketch.zero_count, sketch.sum, sketch.min, sketch.max = count, zero_count, total, minimum, maximum
+        sketch.bins = dict(_BIN.iter_unpack(data[_HEADER.size :]))
+        return sketch
+
+
+def metric_values(latency: float, tokens_out: int) -> Dict[str, float]:
+    """Valeurs observées pour chaque métrique d'un log de performance."""
+    values = {"latency": latency}
+    if latency > 0:
+        values["tokens_per_second"] = tokens_out / latency
+    return values
+
+
+def record_performance_sketches(conn: sqlite3.Connection, records: Iterable[SketchRecord]) -> None:
+    """Intègre des logs de performance aux sketches journaliers (une lecture/écriture par clé).
+
+    À appeler dans la transaction qui insère les logs correspondants.
+    """
+    grouped: Dict[Tuple[int, str, int, str], QuantileSketch] = defaultdict(QuantileSketch)
+    for user_id, model, latency, tokens_out, timestamp_ms in records:
+        day = timestamp_ms - timestamp_ms % DAY_MS
+        for metric, value in metric_values(latency, tokens_out).items():
+            grouped[(user_id, model, day, metric)].add(value)
+
+    for (user_id, model, day, metric), sketch in grouped.items():
+        row = conn.execute(
+            "SELECT sketch FROM performance_sketches WHERE user_id = ? AND day = ? AND model = ? AND metric = ?",
+            (user_id, day, model, metric),
+        ).fetchone()
+        if row is not None:
+            sketch.merge(QuantileSketch.from_bytes(row[0]))
+        conn.execute(
+            """
+            INSERT INTO performance_sketches (user_id, model, day, metric, sketch)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(user_id, day, model, metric) DO UPDATE SET sketch = excluded.sketch
+        """,
+            (user_id, model, day, metric, sketch.to_bytes()),
+        )
+
+
+def rebuild_performance_sketches(conn: sqlite3.Connection, since_ms: Optional[int] = None) -> None:
+    """Reconstruit les sketches depuis performance_logs (tout, ou à partir du jour de `since_ms`)."""
+    start = 0 if since_ms is None else since_ms - since_ms % DAY_MS
+    conn.execute("DELETE FROM performance_sketches WHERE day >= ?", (start,))
+    cursor = conn.execute(
+        "SELECT user_id, model, latency, tokens_out, timestamp FROM performance_logs WHERE timestamp >= ?", (start,)
+    )
+    while True:
+        rows = cursor.fetchmany(5000)
+        if not rows:
+            break
+        record_performance_sketches(conn, [tuple(row) for row in rows])
+
+
+def merge_sketches(blobs: Iterable[bytes]) -> QuantileSketch:
+    """Fusionne des sketches sérialisés en un seul."""
+    merged: Optional[QuantileSketch] = None
+    for blob in blobs:
+        sketch = QuantileSketch.from_bytes(blob)
+        if merged is None:
+            merged = sketch
+        else:
+            merged.merge(sketch)
+    return merged if merged is not None else QuantileSketch()
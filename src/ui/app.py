@@ -6,7 +6,9 @@ import logging
 from typing import Any, Dict, Optional
 
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
+from src.analytics.session_resources import track_page
 from src.data.database import init_db
 from src.ui.components.styles import apply_custom_css, configure_page, create_styled_button
 from src.ui.views.auth_page import show_auth_page
@@ -33,6 +35,12 @@ def initialize_app() -> None:
         st.stop()
 
 
+def current_session_id() -> str:
+    """Identifiant de la session Streamlit courante ("local" hors serveur, ex. tests)."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else "local"
+
+
 def show_navigation() -> None:
     """Affiche la navigation dans la sidebar."""
     # Vérifier si l'utilisateur est connecté
@@ -116,7 +124,9 @@ def main() -> None:
     current_page = st.session_state.page
     if current_page in page_functions:
         try:
-            page_functions[current_page]()
+            # CPU, temps mural, DB, attente fournisseurs et taille du state attribués à la session et à la page
+            with track_page(current_session_id(), current_page, st.session_state):
+                page_functions[current_page]()
         except Exception as e:
             st.error(f"❌ Erreur dans la page {current_page}: {e}")
             logger.error(f"Erreur page {current_page}: {e}")
@@ -213,7 +213,7 @@ def show_campaign_page() -> None:
                         finally:
                             try:
                                 # Traquer la génération d'image dans les performances (0 tokens)
-                                PerformanceManager.store_performance(
+                                PerformanceManager.queue_performance(
                                     user_id=user_id,
                                     model="portrait-ai",
                                     latency=latency if "latency" in locals() else 0.0,
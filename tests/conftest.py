@@ -186,3 +186,18 @@ def sample_user(clean_db):
                 pass
             DatabaseConnection._connection = None
         raise
+
+
+@pytest.fixture
+def user_db(tmp_path):
+    """Base optimisée isolée dans un fichier temporaire, contenant l'utilisateur 1."""
+    from unittest.mock import patch
+
+    from src.data import database
+
+    with patch("src.data.database.get_db_path", return_value=tmp_path / "user.db"):
+        database.init_optimized_db()
+        with database.get_optimized_connection() as conn:
+            conn.execute("INSERT INTO users (id, email, password) VALUES (1, 'a@b.c', 'x')")
+        yield
+        database.DatabaseConnection.close_all_connections()
@@ -15,8 +15,7 @@ import pytest
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from src.analytics.performance import (
-    MODEL_COSTS,
-    calculate_cost,
+    calculate_costs,
     get_performance_data,
     show_ai_performance,
     show_model_comparison,
@@ -52,15 +51,28 @@ class TestPerformanceAnalytics:
             ],
         }
         self.sample_df = pd.DataFrame(self.sample_data)
+        # Totaux par modèle, tels que renvoyés par get_performance_overview
+        self.model_stats = pd.DataFrame(
+            {
+                "model": ["GPT-4", "Claude 3.5 Sonnet"],
+                "count": [2, 1],
+                "latency": [2.0, 1.8],
+                "latency_min": [1.5, 1.8],
+                "latency_max": [2.5, 1.8],
+                "tokens_in": [200, 150],
+                "tokens_out": [400, 180],
+                "cost": [0.03, 0.0032],
+            }
+        )
 
-    @patch("src.analytics.performance.get_connection")
+    @patch("src.analytics.performance.get_readonly_connection")
     def test_get_performance_data_success(self, mock_get_connection):
         """Test récupération des données de performance - succès."""
         # Mock de la connexion et du cursor
         mock_conn = Mock()
         mock_cursor = Mock()
         mock_conn.cursor.return_value = mock_cursor
-        mock_get_connection.return_value = mock_conn
+        mock_get_connection.return_value.__enter__.return_value = mock_conn
 
         # Données de test
         mock_cursor.fetchall.return_value = [
@@ -71,25 +83,26 @@ class TestPerformanceAnalytics:
         # Configuration du mock pandas
         with patch("pandas.read_sql_query") as mock_read_sql:
             test_df = self.sample_df.copy()
+            # Coût persisté sur la première ligne seulement : les autres sont estimés
+            test_df["cost"] = [0.045, None, None]
             mock_read_sql.return_value = test_df
 
-            # Mock de la fonction apply pour calculer les coûts
-            with patch.object(test_df, "apply") as mock_apply:
-                mock_apply.return_value = pd.Series([0.045, 0.033, 0.021])
-
-                result = get_performance_data(self.test_user_id, 30)
+            result = get_performance_data(self.test_user_id, 30)
 
-                # Vérifications
-                assert not result.empty
-                assert len(result) == 3
-                mock_get_connection.assert_called_once()
-                mock_conn.close.assert_called_once()
+            # Vérifications
+            assert not result.empty
+            assert len(result) == 3
+            estimated = [(150 * 0.003 + 180 * 0.015) / 1000, (80 * 0.005 + 120 * 0.015) / 1000]
+            assert result["cost"].tolist() == pytest.approx([0.045, *estimated])
+            mock_get_connection.assert_called_once()
+            # La connexion est rendue au pool, jamais fermée
+            mock_conn.close.assert_not_called()
 
-    @patch("src.analytics.performance.get_connection")
+    @patch("src.analytics.performance.get_readonly_connection")
     def test_get_performance_data_empty(self, mock_get_connection):
         """Test récupération des données de performance - pas de données."""
         mock_conn = Mock()
-        mock_get_connection.return_value = mock_conn
+        mock_get_connection.return_value.__enter__.return_value = mock_conn
 
         with patch("pandas.read_sql_query") as mock_read_sql:
             mock_read_sql.return_value = pd.DataFrame()
@@ -97,44 +110,40 @@ class TestPerformanceAnalytics:
             result = get_performance_data(self.test_user_id, 7)
 
             assert result.empty
-            mock_conn.close.assert_called_once()
-
-    def test_calculate_cost_gpt4(self):
-        """Test calcul du coût pour GPT-4."""
-        row = pd.Series({"model": "GPT-4", "tokens_in": 1000, "tokens_out": 500})
-
-        cost = calculate_cost(row)
-
-        expected_cost = (1000 / 1000) * 0.03 + (500 / 1000) * 0.06
-        assert cost == round(expected_cost, 4)
-
-    def test_calculate_cost_claude(self):
-        """Test calcul du coût pour Claude."""
-        row = pd.Series({"model": "Claude 3.5 Sonnet", "tokens_in": 2000, "tokens_out": 800})
-
-        cost = calculate_cost(row)
-
-        expected_cost = (2000 / 1000) * 0.003 + (800 / 1000) * 0.015
-        assert cost == round(expected_cost, 4)
+            mock_get_connection.return_value.__exit__.assert_called_once()
+
+    def test_calculate_costs_uses_models_config_prices(self):
+        """Test calcul vectorisé des coûts depuis models_config."""
+        df = pd.DataFrame(
+            {
+                "model": ["GPT-4", "Claude 3.5 Sonnet", "DeepSeek", "GPT-4"],
+                "tokens_in": [1000, 2000, 5000, 0],
+                "tokens_out": [500, 800, 1500, 1000],
+            }
+        )
 
-    def test_calculate_cost_deepseek(self):
-        """Test calcul du coût pour DeepSeek."""
-        row = pd.Series({"model": "DeepSeek", "tokens_in": 5000, "tokens_out": 1500})
+        costs = calculate_costs(df)
 
-        cost = calculate_cost(row)
+        expected = [
+            (1000 / 1000) * 0.03 + (500 / 1000) * 0.06,
+            (2000 / 1000) * 0.003 + (800 / 1000) * 0.015,
+            (5000 / 1000) * 0.0001 + (1500 / 1000) * 0.0002,
+            (1000 / 1000) * 0.06,
+        ]
+        assert costs.tolist() == pytest.approx(expected)
+        assert costs.index.equals(df.index)
 
-        expected_cost = (5000 / 1000) * 0.00014 + (1500 / 1000) * 0.00028
-        assert cost == round(expected_cost, 4)
+    def test_calculate_costs_matches_estimated_cost(self):
+        """Test cohérence avec calculate_estimated_cost, repli GPT-4 compris."""
+        from src.ai.models_config import calculate_estimated_cost
 
-    def test_calculate_cost_unknown_model(self):
-        """Test calcul du coût pour modèle inconnu."""
-        row = pd.Series({"model": "Unknown Model", "tokens_in": 1000, "tokens_out": 500})
+        df = pd.DataFrame({"model": ["Unknown Model", "GPT-4o"], "tokens_in": [1000, 300], "tokens_out": [500, 700]})
 
-        cost = calculate_cost(row)
+        costs = calculate_costs(df)
 
-        # Devrait utiliser les coûts par défaut
-        expected_cost = (1000 / 1000) * 0.01 + (500 / 1000) * 0.01
-        assert cost == round(expected_cost, 4)
+        expected = [calculate_estimated_cost(m, i, o) for m, i, o in zip(df["model"], df["tokens_in"], df["tokens_out"])]
+        assert costs.tolist() == pytest.approx(expected)
+        assert calculate_costs(df.iloc[:0]).empty
 
     @patch("streamlit.info")
     @patch("streamlit.columns")
@@ -152,9 +161,7 @@ class TestPerformanceAnalytics:
     @patch("streamlit.metric")
     def test_show_performance_summary_with_data(self, mock_metric, mock_columns):
         """Test affichage résumé avec données."""
-        # Ajouter la colonne cost manquante
-        test_df = self.sample_df.copy()
-        test_df["cost"] = [0.045, 0.033, 0.021]
+        test_df = self.model_stats
 
         # Mock des colonnes Streamlit avec support context manager
         def create_mock_col():
@@ -192,13 +199,18 @@ class TestPerformanceAnalytics:
     @patch("streamlit.dataframe")
     def test_show_model_comparison_with_data(self, mock_dataframe, mock_subheader):
         """Test comparaison modèles avec données."""
-        test_df = self.sample_df.copy()
-        test_df["cost"] = [0.045, 0.033, 0.021]
+        percentiles = pd.DataFrame(
+            {"model": ["GPT-4", "GPT-4"], "metric": ["latency", "tokens_per_second"], "p50": [1.9, 150.0], "p90": [2.4, 190.0]}
+        )
 
-        show_model_comparison(test_df)
+        show_model_comparison(self.model_stats, percentiles)
 
         mock_subheader.assert_called_once()
-        mock_dataframe.assert_called_once()
+        comparison = mock_dataframe.call_args[0][0]
+        assert comparison["Nb requêtes"].tolist() == [2, 1]
+        assert comparison["Tokens sortie moy."].tolist() == [200.0, 180.0]
+        assert comparison["Latence p90 (s)"].tolist()[0] == 2.4
+        assert comparison["Tokens/s p50"].isna().tolist() == [False, True]
 
     @patch("streamlit.subheader")
     @patch("streamlit.columns")
@@ -216,19 +228,11 @@ class TestPerformanceAnalytics:
     @patch("streamlit.subheader")
     @patch("streamlit.columns")
     @patch("streamlit.plotly_chart")
-    @patch("plotly.express.box")
     @patch("plotly.express.pie")
-    def test_show_performance_charts_with_data(self, mock_pie, mock_box, mock_plotly, mock_columns, mock_subheader):
-        """Test graphiques performance avec données."""
-        test_df = self.sample_df.copy()
-        test_df["cost"] = [0.045, 0.033, 0.021]
-        # Ajouter la colonne 'date' attendue par la fonction
-        test_df["date"] = test_df["timestamp"].dt.date
-
-        # Mock des figures Plotly
+    def test_show_performance_charts_with_data(self, mock_pie, mock_plotly, mock_columns, mock_subheader):
+        """Test graphiques performance avec données agrégées."""
         mock_fig = Mock()
         mock_fig.update_layout = Mock()
-        mock_box.return_value = mock_fig
         mock_pie.return_value = mock_fig
 
         # Mock des colonnes avec support context manager
@@ -238,15 +242,34 @@ class TestPerformanceAnalytics:
             mock_col.__exit__ = Mock(return_value=None)
             return mock_col
 
-        mock_col1 = create_mock_col()
-        mock_col2 = create_mock_col()
-        mock_columns.return_value = [mock_col1, mock_col2]
+        mock_columns.return_value = [create_mock_col(), create_mock_col()]
+        daily_stats = pd.DataFrame(
+            {
+                "date": [(datetime.now() - timedelta(days=d)).date() for d in range(3)],
+                "model": ["GPT-4"] * 3,
+                "latency": [2.5, 1.8, 1.2],
+                "cost": [0.01, 0.02, 0.0],
+                "tokens_in": [100, 150, 80],
+                "tokens_out": [200, 180, 120],
+            }
+        )
+        percentiles = pd.DataFrame(
+            {
+                "model": ["GPT-4"],
+                "metric": ["latency"],
+                "mean": [2.0],
+                **{p: [v] for p, v in zip(["p5", "p25", "p50", "p75", "p95"], [1.0, 1.5, 2.0, 2.4, 2.5])},
+            }
+        )
 
-        show_performance_charts(test_df)
+        show_performance_charts(self.model_stats, daily_stats, percentiles)
 
         mock_subheader.assert_called()
         mock_columns.assert_called()
-        assert mock_plotly.call_count >= 2
+        # Boîtes, camembert, puis latence, coûts et tokens dans le temps
+        assert mock_plotly.call_count == 5
+        box = mock_plotly.call_args_list[0][0][0]
+        assert box.data[0].median == (2.0,)
 
 
 class TestSystemMonitoring:
@@ -33,13 +33,47 @@ class TestPerformanceViews:
         mock_ai_perf.assert_called_once_with(1)
         mock_sys.assert_called_once()
 
+    @patch("src.analytics.performance.show_session_resources")
+    @patch("src.analytics.performance.show_system_monitoring")
+    @patch("src.analytics.performance.show_ai_performance")
+    @patch("src.analytics.performance.st")
+    def test_show_performance_admin_tab(self, mock_st, mock_ai_perf, mock_sys, mock_resources):
+        from src.analytics.performance import show_performance
+        from src.analytics.session_resources import SessionResourceConfig
+
+        mock_st.session_state = {"user": {"id": 1, "email": "admin@example.com"}}
+        mock_st.tabs.return_value = [_Ctx(), _Ctx(), _Ctx()]
+        with patch.object(SessionResourceConfig, "ADMIN_EMAILS", {"admin@example.com"}):
+            show_performance(1)
+        assert len(mock_st.tabs.call_args[0][0]) == 3
+        mock_resources.assert_called_once()
+
+    @patch("src.analytics.performance.st")
+    def test_show_session_resources_tables(self, mock_st):
+        from src.analytics.performance import show_session_resources
+        from src.analytics.session_resources import session_resources
+
+        mock_st.selectbox.return_value = "cpu_s"
+        session_resources.reset()
+        session_resources.record("s1", "chatbot", 0.5, 1.0, 0.1, 0.6, 2048)
+        try:
+            show_session_resources()
+        finally:
+            session_resources.reset()
+        assert mock_st.dataframe.call_count == 2
+        sessions = mock_st.dataframe.call_args_list[1][0][0]
+        assert sessions["State (Ko)"].iloc[0] == 2
+
     @patch("src.analytics.performance.show_performance_charts")
     @patch("src.analytics.performance.show_model_comparison")
     @patch("src.analytics.performance.show_performance_summary")
+    @patch("src.analytics.performance.get_performance_overview")
     @patch("src.analytics.performance.get_performance_data")
     @patch("src.analytics.performance.st")
-    def test_show_ai_performance_with_data(self, mock_st, mock_get_data, mock_summary, mock_comp, mock_charts):
-        from src.analytics.performance import show_ai_performance
+    def test_show_ai_performance_with_data(self, mock_st, mock_get_data, mock_overview, mock_summary, mock_comp, mock_charts):
+        from src.analytics.performance import DETAIL_ROW_LIMIT, show_ai_performance
+
+        mock_overview.return_value = pd.DataFrame({"model": ["GPT-4"], "count": [1]})
 
         # Construire un DataFrame non vide avec colonnes requises
         df = pd.DataFrame(
@@ -72,16 +106,18 @@ class TestPerformanceViews:
         mock_st.expander.return_value.__exit__ = Mock(return_value=None)
 
         show_ai_performance(1)
-        mock_summary.assert_called_once()
+        mock_summary.assert_called_once_with(mock_overview.return_value)
         mock_comp.assert_called_once()
         mock_charts.assert_called_once()
+        # Les logs bruts ne sont chargés que pour le tableau détaillé, bornés
+        mock_get_data.assert_called_once_with(1, 30, limit=DETAIL_ROW_LIMIT)
 
-    @patch("src.analytics.performance.get_performance_data")
+    @patch("src.analytics.performance.get_performance_overview")
     @patch("src.analytics.performance.st")
-    def test_show_ai_performance_empty(self, mock_st, mock_get_data):
+    def test_show_ai_performance_empty(self, mock_st, mock_overview):
         from src.analytics.performance import show_ai_performance
 
-        mock_get_data.return_value = pd.DataFrame()
+        mock_overview.return_value = pd.DataFrame()
         mock_st.selectbox.side_effect = [7]
         mock_st.button.return_value = False
 
@@ -26,7 +26,7 @@ class TestAPIClientManager:
         APIClientManager.get_openai_client.cache_clear()
         APIClientManager.get_anthropic_client.cache_clear()
 
-    @patch.dict(os.environ, {"OPENAI_API_KEY": "test-openai-key"})
+    @patch.dict(os.environ, {"OPENAI_API_KEY": "test-openai-key", "OPENAI_BASE_URL": ""})
     @patch("src.ai.api_client.OpenAI")
     def test_get_openai_client_success(self, mock_openai):
         """Test de création réussie du client OpenAI."""
@@ -57,7 +57,7 @@ class TestAPIClientManager:
             client = APIClientManager.get_openai_client()
             assert client is None
 
-    @patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test-anthropic-key"})
+    @patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test-anthropic-key", "ANTHROPIC_BASE_URL": ""})
     @patch("src.ai.api_client.anthropic.Anthropic")
     def test_get_anthropic_client_success(self, mock_anthropic):
         """Test de création réussie du client Anthropic."""
@@ -0,0 +1,232 @@
+"""
+Tests de la couche fournisseurs asynchrone (src.ai.async_providers)
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import openai
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.ai import async_providers
+from src.ai.api_client import HTTPPoolConfig, pooled_http_client
+from src.ai.async_providers import ProviderCallCancelled, ProviderEventLoop, call_model, stream_model
+from src.ai.chatbot import ChatbotError, call_ai_model_optimized
+from src.ai.comparison import compare_models
+from src.ai.models_config import CHAT_DEFAULTS
+
+MESSAGES = [{"role": "system", "content": "Tu es un MJ."}, {"role": "user", "content": "J'ouvre le coffre"}]
+
+
+@pytest.fixture
+def provider_loop():
+    loop = ProviderEventLoop()
+    with patch.object(async_providers, "_provider_loop", loop):
+        yield loop
+    loop.stop()
+
+
+class FakeStream:
+    """Flux asynchrone minimal (itération + close)."""
+
+    def __init__(self, items, delay=0.0):
+        self.items = items
+        self.delay = delay
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for item in self.items:
+            await asyncio.sleep(self.delay)
+            yield item
+
+    async def close(self):
+        self.closed = True
+
+
+async def close():
+    pass
+
+
+def openai_client(create):
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)), close=close)
+
+
+def openai_response(text, prompt_tokens=12, completion_tokens=5):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens),
+    )
+
+
+def test_hundreds_of_calls_share_one_loop_thread(provider_loop):
+    async def slow(i):
+        await asyncio.sleep(0.2)
+        return i, threading.current_thread().name
+
+    start = time.perf_counter()
+    futures = [provider_loop.submit(slow(i), owner="s1") for i in range(300)]
+    assert provider_loop.in_flight("s1") > 0
+    results = [future.result(timeout=5) for future in futures]
+
+    assert time.perf_counter() - start < 2
+    assert sorted(i for i, _ in results) == list(range(300))
+    assert {name for _, name in results} == {"ai-provider-loop"}
+    assert provider_loop.in_flight() == 0
+
+
+def test_run_cancels_the_request_when_the_script_is_interrupted(provider_loop):
+    cancelled = threading.Event()
+
+    async def never_answers():
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    deadline = time.monotonic() + 0.2
+    with pytest.raises(ProviderCallCancelled):
+        provider_loop.run(never_answers(), owner="s1", should_cancel=lambda: time.monotonic() > deadline)
+    assert cancelled.wait(2)
+
+    future = provider_loop.submit(never_answers(), owner="s2")
+    assert provider_loop.cancel("s2") == 1
+    assert future.cancelled()
+
+
+def test_script_interrupted_reads_streamlit_requests():
+    def ctx(state):
+        return SimpleNamespace(script_requests=SimpleNamespace(_state=SimpleNamespace(name=state)))
+
+    assert async_providers.script_interrupted(ctx("RERUN"))
+    assert async_providers.script_interrupted(ctx("STOP"))
+    assert not async_providers.script_interrupted(ctx("CONTINUE"))
+    assert not async_providers.script_interrupted(SimpleNamespace())
+    assert async_providers.script_scope()[0] is None  # hors Streamlit
+
+
+def test_call_model_maps_responses_and_errors(provider_loop):
+    async def create(**kwargs):
+        assert kwargs["model"] == "gpt-4o" and kwargs["messages"] == MESSAGES
+        return openai_response("Le coffre est vide.")
+
+    async def rate_limited(**kwargs):
+        raise Exception("Error code: 429 - rate limit")
+
+    async def anthropic_create(**kwargs):
+        assert kwargs["system"] == "Tu es un MJ." and kwargs["messages"] == MESSAGES[1:]
+        return SimpleNamespace(
+            content=[SimpleNamespace(text="Un piège !")], usage=SimpleNamespace(input_tokens=20, output_tokens=4)
+        )
+
+    clients = {
+        "openai": openai_client(create),
+        "anthropic": SimpleNamespace(messages=SimpleNamespace(create=anthropic_create), close=close),
+    }
+    with patch("src.ai.async_providers.APIClientManager.create_async_client", side_effect=clients.get):
+        assert call_model("GPT-4o", MESSAGES) == {
+            "content": "Le coffre est vide.",
+            "tokens_in": 12,
+            "tokens_out": 5,
+            "model": "GPT-4o",
+        }
+        assert call_model("Claude 3.5 Sonnet", MESSAGES)["content"] == "Un piège !"
+        with pytest.raises(ChatbotError, match="Clé API DeepSeek manquante"):
+            call_model("DeepSeek", MESSAGES)
+
+    with patch("src.ai.async_providers.APIClientManager.create_async_client", return_value=openai_client(rate_limited)):
+        provider_loop.stop()  # les clients sont gardés par la boucle : repartir d'une boucle neuve
+        with pytest.raises(ChatbotError, match="Rate limit OpenAI"):
+            call_model("GPT-4o", MESSAGES)
+
+
+def stream_chunks():
+    def chunk(text=None, usage=None):
+        choices = [] if text is None else [SimpleNamespace(delta=SimpleNamespace(content=text))]
+        return SimpleNamespace(choices=choices, usage=usage)
+
+    return [chunk("Le coffre "), chunk("s'ouvre."), chunk(usage=SimpleNamespace(prompt_tokens=9, completion_tokens=3))]
+
+
+def test_stream_model_bridges_the_async_stream(provider_loop):
+    response = FakeStream(stream_chunks(), delay=0.01)
+
+    async def create(**kwargs):
+        assert kwargs["stream"] is True
+        return response
+
+    with patch("src.ai.async_providers.APIClientManager.create_async_client", return_value=openai_client(create)):
+        stream = stream_model("GPT-4o", MESSAGES)
+        assert list(stream) == ["Le coffre ", "s'ouvre."]
+
+    result = stream.result()
+    assert (result["content"], result["tokens_in"], result["tokens_out"]) == ("Le coffre s'ouvre.", 9, 3)
+    assert 0 < result["ttft"] <= result["duration"]
+    time.sleep(0.05)
+    assert response.closed
+
+
+def test_stream_model_raises_open_errors_and_cancels_on_interruption(provider_loop):
+    async def quota(**kwargs):
+        raise Exception("insufficient_quota")
+
+    with patch("src.ai.async_providers.APIClientManager.create_async_client", return_value=openai_client(quota)):
+        with pytest.raises(ChatbotError, match="Quota OpenAI dépassé"):
+            stream_model("GPT-4o", MESSAGES)
+
+    response = FakeStream(stream_chunks(), delay=1.0)
+
+    async def slow(**kwargs):
+        return response
+
+    interrupted = threading.Event()
+    provider_loop.stop()  # les clients sont gardés par la boucle : repartir d'une boucle neuve
+    with patch("src.ai.async_providers.APIClientManager.create_async_client", return_value=openai_client(slow)), patch(
+        "src.ai.async_providers.script_scope", return_value=("s1", interrupted.is_set)
+    ):
+        stream = stream_model("GPT-4o", MESSAGES)
+        interrupted.set()
+        with pytest.raises(ProviderCallCancelled):
+            stream.result()
+    time.sleep(0.2)
+    assert response.closed
+    assert provider_loop.in_flight("s1") == 0
+
+
+def test_sync_entry_points_route_to_the_loop_when_enabled(provider_loop):
+    async def create(**kwargs):
+        await asyncio.sleep(0.2)
+        return openai_response("ok")
+
+    with patch.dict(CHAT_DEFAULTS, {"async_providers": True}), patch(
+        "src.ai.async_providers.APIClientManager.create_async_client", return_value=openai_client(create)
+    ), patch("src.ai.chatbot.APIManager.call_openai_model") as sync_call:
+        assert call_ai_model_optimized("GPT-4o", MESSAGES)["content"] == "ok"
+        start = time.perf_counter()
+        results = list(compare_models(["GPT-4o", "GPT-4", "GPT-3.5-turbo"], MESSAGES))
+        elapsed = time.perf_counter() - start
+
+    sync_call.assert_not_called()
+    assert len(results) == 3 and all(result.ok for result in results)
+    assert elapsed < 0.5
+
+
+def test_pooled_http_client_uses_configured_limits():
+    sdk = SimpleNamespace(
+        DEFAULT_CONNECTION_LIMITS=openai.DEFAULT_CONNECTION_LIMITS, Timeout=openai.Timeout, DefaultAsyncHttpxClient=Mock()
+    )
+    pooled_http_client(sdk)
+    kwargs = sdk.DefaultAsyncHttpxClient.call_args.kwargs
+    assert kwargs["limits"].max_connections == HTTPPoolConfig.MAX_CONNECTIONS
+    assert kwargs["limits"].max_keepalive_connections == HTTPPoolConfig.MAX_KEEPALIVE
+    assert kwargs["timeout"].connect == HTTPPoolConfig.CONNECT_TIMEOUT
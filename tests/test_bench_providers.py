@@ -0,0 +1,148 @@
+"""
+Tests du banc d'essai des fournisseurs (scripts/bench_providers.py)
+"""
+
+import json
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts import bench_providers as bench
+from scripts.bench_providers import Sample, classify_error, load_corpus, percentiles, summarize
+from src.ai.api_client import APIClientManager
+from src.ai.models_config import CHAT_DEFAULTS, calculate_estimated_cost
+
+
+def reset_clients():
+    for name in ("_openai_client", "_anthropic_client", "_deepseek_client"):
+        setattr(APIClientManager, name, None)
+    for getter in ("get_openai_client", "get_anthropic_client", "get_deepseek_client"):
+        getattr(APIClientManager, getter).cache_clear()
+
+
+def test_load_corpus_formats(tmp_path):
+    default = load_corpus(None)
+    assert len(default) == len(bench.DEFAULT_PROMPTS)
+    assert default[0] == [
+        {"role": "system", "content": bench.SYSTEM_PROMPT},
+        {"role": "user", "content": bench.DEFAULT_PROMPTS[0]},
+    ]
+
+    conversation = [{"role": "user", "content": "Bonjour"}]
+    json_file = tmp_path / "prompts.json"
+    json_file.write_text(json.dumps(["Je frappe.", conversation]), encoding="utf-8")
+    assert load_corpus(str(json_file)) == [
+        [{"role": "system", "content": bench.SYSTEM_PROMPT}, {"role": "user", "content": "Je frappe."}],
+        conversation,
+    ]
+
+    text_file = tmp_path / "prompts.txt"
+    text_file.write_text("Un\n\n  Deux  \n", encoding="utf-8")
+    assert [corpus[1]["content"] for corpus in load_corpus(str(text_file))] == ["Un", "Deux"]
+
+    text_file.write_text("\n\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_corpus(str(text_file))
+
+
+@pytest.mark.parametrize(
+    "message, kind",
+    [
+        ("Rate limit OpenAI: Trop de requêtes.", "rate_limit"),
+        ("Error code: 429", "rate_limit"),
+        ("Request timed out.", "timeout"),
+        ("Timeout après 30s", "timeout"),
+        ("Erreur OpenAI: 500", "error"),
+    ],
+)
+def test_classify_error(message, kind):
+    assert classify_error(message) == kind
+
+
+def test_percentiles():
+    assert percentiles([]) == {"p50": None, "p95": None, "p99": None, "mean": None}
+    stats = percentiles([float(i) for i in range(1, 101)])
+    assert stats["p50"] == pytest.approx(50.5)
+    assert stats["p95"] == pytest.approx(95.05)
+    assert stats["p99"] == pytest.approx(99.01)
+    assert stats["mean"] == pytest.approx(50.5)
+
+
+def test_summarize_rates_errors_and_cost():
+    samples = [
+        Sample("GPT-4o", True, latency=2.0, ttft=1.0, tokens_in=100, tokens_out=50),
+        Sample("GPT-4o", True, latency=3.0, ttft=0.5, tokens_in=200, tokens_out=100),
+        Sample("GPT-4o", True, latency=1.0, tokens_in=10, tokens_out=0),
+        Sample("GPT-4o", False, latency=0.1, error_kind="rate_limit", error="Rate limit OpenAI"),
+        Sample("GPT-4o", False, latency=0.2, error_kind="error", error="Erreur OpenAI: 500"),
+    ]
+
+    stats = summarize("GPT-4o", samples, wall_time=2.0)
+
+    assert (stats["requests"], stats["succeeded"]) == (5, 3)
+    assert stats["error_rate"] == 0.4
+    assert stats["rate_limit_rate"] == 0.2
+    assert stats["errors"] == {"rate_limit": 1, "error": 1}
+    assert stats["sample_errors"] == ["Erreur OpenAI: 500", "Rate limit OpenAI"]
+    # Débit après le premier token : 50 / (2 - 1) et 100 / (3 - 0.5) ; la réponse vide est ignorée
+    assert stats["output_tokens_per_s"]["p50"] == pytest.approx(45.0)
+    assert stats["ttft_s"]["p50"] == pytest.approx(0.75)
+    assert (stats["tokens_in"], stats["tokens_out"]) == (310, 150)
+    assert stats["throughput_rps"] == 1.5
+    assert stats["throughput_tokens_per_s"] == 75.0
+    expected_cost = sum(calculate_estimated_cost("GPT-4o", s.tokens_in, s.tokens_out) for s in samples[:3])
+    assert stats["cost_total"] == pytest.approx(expected_cost, abs=1e-6)
+    assert stats["cost_per_request"] == pytest.approx(expected_cost / 3, abs=1e-6)
+
+    empty = summarize("GPT-4o", [], wall_time=0.0)
+    assert (empty["error_rate"], empty["throughput_rps"], empty["cost_per_request"]) == (0.0, None, None)
+
+
+def test_main_against_the_mock_counts_every_rate_limit(tmp_path):
+    output = tmp_path / "bench.json"
+    argv = [
+        "--mock",
+        "--models",
+        "GPT-4o",
+        "--requests",
+        "8",
+        "--concurrency",
+        "2",
+        "--warmup",
+        "0",
+        "--mock-latency",
+        "fixed:0",
+        "--mock-tokens-per-second",
+        "0",
+        "--mock-rate-limit-rate",
+        "0.5",
+        "--seed",
+        "3",
+        "--label",
+        "ci",
+        "--output",
+        str(output),
+    ]
+    reset_clients()
+    try:
+        with patch.dict(os.environ), patch.dict(CHAT_DEFAULTS):
+            bench.main(argv)
+    finally:
+        reset_clients()
+
+    report = json.loads(output.read_text(encoding="utf-8"))
+    run, stats = report["run"], report["models"]["GPT-4o"]
+    assert (run["label"], run["requests"], run["max_retries"], run["mock"]["seed"]) == ("ci", 8, 0, 3)
+    assert stats["requests"] == 8
+    # Sans réessai du SDK, chaque 429 servie par le simulateur est comptée côté modèle
+    server = run["mock_server_stats"]
+    assert server["requests"] == 8
+    assert 0 < server["rate_limited"] < 8
+    assert stats["errors"] == {"rate_limit": server["rate_limited"]}
+    assert stats["rate_limit_rate"] == server["rate_limited"] / 8
+    assert stats["succeeded"] == 8 - server["rate_limited"]
+    assert stats["tokens_out"] > 0 and stats["cost_total"] > 0
@@ -70,8 +70,11 @@ class TestChatbot:
         # Stocker des données de performance
         store_performance(user_id, "GPT-4", 1.5, 100, 50, campaign_id)
 
-        # Vérifier en base
+        # L'écriture est différée : forcer le flush avant de vérifier en base
         from src.data.database import get_optimized_connection
+        from src.data.performance_writer import flush_performance_logs
+
+        assert flush_performance_logs()
 
         with get_optimized_connection() as conn:
             cursor = conn.cursor()
@@ -57,12 +57,11 @@ class TestChatbotLaunchFlow:
         launch_chat_interface(1)
 
     @patch("src.ai.chatbot.calculate_estimated_cost", return_value=0.1234)
-    @patch("src.ai.chatbot.store_performance_optimized")
-    @patch("src.ai.chatbot.store_message_optimized")
-    @patch("src.ai.chatbot.call_ai_model_optimized")
+    @patch("src.ai.chatbot.store_turn_optimized")
+    @patch("src.ai.chatbot.call_ai_model_streaming")
     @patch("src.ai.chatbot.st")
-    def test_launch_happy_path(self, mock_st, mock_call, mock_store_msg, mock_store_perf, _mock_cost):
-        from src.ai.chatbot import launch_chat_interface
+    def test_launch_happy_path(self, mock_st, mock_call, mock_store_turn, _mock_cost):
+        from src.ai.chatbot import ChatStream, launch_chat_interface
 
         # Préparer session_state avec une campagne sélectionnée
         sess = SessionLike()
@@ -78,25 +77,26 @@ class TestChatbotLaunchFlow:
         mock_st.spinner.return_value.__enter__ = Mock(return_value=_ctx())
         mock_st.spinner.return_value.__exit__ = Mock(return_value=None)
 
-        # Appel modèle IA simulé
-        mock_call.return_value = {
-            "content": "reply",
-            "tokens_in": 10,
-            "tokens_out": 5,
-            "model": "GPT-4",
-        }
+        # Flux simulé : deux fragments puis l'usage
+        events = iter(["rep", "ly", {"tokens_in": 10, "tokens_out": 5}])
+        mock_call.return_value = ChatStream("GPT-4", events, 0.0, [], "Erreur OpenAI")
 
         launch_chat_interface(123)
 
-        # Vérifications principales
-        assert mock_store_msg.call_count == 2  # user puis assistant
-        mock_store_perf.assert_called_once()
+        # Vérifications principales : un seul commit pour user + assistant + performance
+        mock_store_turn.assert_called_once()
+        user_id, user_content, assistant_content, campaign_id, performance = mock_store_turn.call_args.args
+        assert (user_id, user_content, assistant_content, campaign_id) == (123, "hello", "reply", 1)
+        assert performance["model"] == "GPT-4"
+        assert performance["tokens_out"] == 5
+        assert performance["ttft"] is not None
+        mock_st.write_stream.assert_called_once()
         mock_st.caption.assert_called()
 
-    @patch("src.ai.chatbot.store_message_optimized")
-    @patch("src.ai.chatbot.call_ai_model_optimized")
+    @patch("src.ai.chatbot.store_turn_optimized")
+    @patch("src.ai.chatbot.call_ai_model_streaming")
     @patch("src.ai.chatbot.st")
-    def test_launch_chatbot_error(self, mock_st, mock_call, mock_store_msg):
+    def test_launch_chatbot_error(self, mock_st, mock_call, mock_store_turn):
         from src.ai.chatbot import ChatbotError, launch_chat_interface
 
         sess = SessionLike()
@@ -113,15 +113,15 @@ class TestChatbotLaunchFlow:
 
         launch_chat_interface(1)
 
-        # La seconde sauvegarde (assistant) doit contenir un message d'erreur résumé
-        args_list = mock_store_msg.call_args_list
-        assert len(args_list) == 2
-        assert "Erreur AI" in args_list[1].args[2]  # Message résumé d'erreur
+        # Le tour persisté contient le message joueur et un message d'erreur résumé
+        mock_store_turn.assert_called_once()
+        assert mock_store_turn.call_args.args[1] == "hello"
+        assert "Erreur AI" in mock_store_turn.call_args.args[2]  # Message résumé d'erreur
 
-    @patch("src.ai.chatbot.store_message_optimized")
-    @patch("src.ai.chatbot.call_ai_model_optimized")
+    @patch("src.ai.chatbot.store_turn_optimized")
+    @patch("src.ai.chatbot.call_ai_model_streaming")
     @patch("src.ai.chatbot.st")
-    def test_launch_generic_exception(self, mock_st, mock_call, mock_store_msg):
+    def test_launch_generic_exception(self, mock_st, mock_call, mock_store_turn):
         from src.ai.chatbot import launch_chat_interface
 
         sess = SessionLike()
@@ -138,6 +138,41 @@ class TestChatbotLaunchFlow:
 
         launch_chat_interface(1)
 
-        args_list = mock_store_msg.call_args_list
-        assert len(args_list) == 2
-        assert "Erreur AI" in args_list[1].args[2]  # Message résumé d'erreur
+        mock_store_turn.assert_called_once()
+        assert "Erreur AI" in mock_store_turn.call_args.args[2]  # Message résumé d'erreur
+
+    @pytest.mark.parametrize("interruption", ["stop", "cancelled"])
+    @patch("src.ai.chatbot.store_turn_optimized")
+    @patch("src.ai.chatbot.call_ai_model_streaming")
+    @patch("src.ai.chatbot.st")
+    def test_interrupted_reply_still_persists_the_player_message(self, mock_st, mock_call, mock_store_turn, interruption):
+        from streamlit.runtime.scriptrunner_utils.exceptions import StopException
+
+        from src.ai.async_providers import ProviderCallCancelled
+        from src.ai.chatbot import ChatStream, launch_chat_interface
+
+        sess = SessionLike()
+        sess.campaign = {"id": 4}
+        mock_st.session_state = sess
+        mock_st.columns.side_effect = lambda spec: [_ctx() for _ in range(len(spec) if isinstance(spec, list) else spec)]
+        mock_st.selectbox.return_value = "GPT-4"
+        mock_st.chat_input.return_value = "hello"
+        mock_st.chat_message.side_effect = lambda role: _ctx()
+        mock_st.spinner.return_value.__enter__ = Mock(return_value=_ctx())
+        mock_st.spinner.return_value.__exit__ = Mock(return_value=None)
+
+        def events():
+            yield "début"
+            if interruption == "stop":
+                raise StopException()  # changement de page pendant le flux
+            raise ProviderCallCancelled("Appel GPT-4 annulé")
+
+        mock_call.return_value = ChatStream("GPT-4", events(), 0.0, [], "Erreur OpenAI")
+        mock_st.write_stream.side_effect = lambda stream: list(stream)
+
+        with pytest.raises((StopException, ProviderCallCancelled)):
+            launch_chat_interface(1)
+
+        # Historique de session et base concordent : message joueur persisté sans réponse
+        assert sess.history == [{"role": "user", "content": "hello"}]
+        mock_store_turn.assert_called_once_with(1, "hello", None, 4)
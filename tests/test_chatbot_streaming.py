@@ -0,0 +1,116 @@
+"""
+Tests des réponses en flux (src.ai.chatbot : ChatStream, APIManager.stream_*, generate_reply)
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import MagicMock, Mock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.ai.chatbot import APIManager, ChatbotError, ChatStream, call_ai_model_streaming, generate_reply
+from src.ai.models_config import CHAT_DEFAULTS, get_model_config
+
+MESSAGES = [{"role": "system", "content": "Tu es un MJ."}, {"role": "user", "content": "J'entre dans la taverne"}]
+
+
+def openai_chunk(text=None, usage=None):
+    choices = [] if text is None else [SimpleNamespace(delta=SimpleNamespace(content=text))]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+def openai_client(chunks):
+    client = MagicMock()
+    client.chat.completions.create.return_value = iter(chunks)
+    return client
+
+
+def test_openai_stream_yields_deltas_then_usage():
+    chunks = [
+        openai_chunk("La porte "),
+        openai_chunk(""),
+        openai_chunk("grince."),
+        openai_chunk(usage=SimpleNamespace(prompt_tokens=12, completion_tokens=4)),
+    ]
+    client = openai_client(chunks)
+    with patch("src.ai.chatbot.get_openai_client", return_value=client):
+        stream = APIManager.stream_openai_model(get_model_config("GPT-4o"), MESSAGES)
+        assert list(stream) == ["La porte ", "grince."]
+
+    kwargs = client.chat.completions.create.call_args.kwargs
+    assert kwargs["stream"] is True
+    assert kwargs["stream_options"] == {"include_usage": True}
+    result = stream.result()
+    assert result["content"] == "La porte grince."
+    assert (result["tokens_in"], result["tokens_out"], result["model"]) == (12, 4, "GPT-4o")
+    assert 0 <= result["ttft"] <= result["duration"]
+
+
+def test_anthropic_stream_reads_usage_from_events():
+    events = [
+        SimpleNamespace(type="message_start", message=SimpleNamespace(usage=SimpleNamespace(input_tokens=20))),
+        SimpleNamespace(type="content_block_start"),
+        SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(type="text_delta", text="Bienvenue")),
+        SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(type="text_delta", text=" !")),
+        SimpleNamespace(type="message_delta", usage=SimpleNamespace(output_tokens=3)),
+        SimpleNamespace(type="message_stop"),
+    ]
+    client = MagicMock()
+    client.messages.create.return_value = iter(events)
+    with patch("src.ai.chatbot.get_anthropic_client", return_value=client):
+        result = APIManager.stream_anthropic_model(get_model_config("Claude 3.5 Sonnet"), MESSAGES).result()
+
+    kwargs = client.messages.create.call_args.kwargs
+    assert kwargs["system"] == "Tu es un MJ."
+    assert kwargs["messages"] == MESSAGES[1:]
+    assert (result["content"], result["tokens_in"], result["tokens_out"]) == ("Bienvenue !", 20, 3)
+
+
+def test_usage_is_estimated_when_provider_omits_it():
+    stream = ChatStream("DeepSeek", iter(["x" * 40]), 0.0, [{"role": "user", "content": "y" * 80}], "Erreur DeepSeek")
+    result = stream.result()
+    assert (result["tokens_in"], result["tokens_out"]) == (20, 10)
+
+
+def test_open_errors_are_mapped_before_streaming():
+    client = MagicMock()
+    client.chat.completions.create.side_effect = Exception("Error code: 429 - insufficient_quota")
+    with patch("src.ai.chatbot.get_openai_client", return_value=client):
+        with pytest.raises(ChatbotError, match="Quota OpenAI dépassé"):
+            call_ai_model_streaming("GPT-4o", MESSAGES)
+
+    with patch("src.ai.chatbot.get_deepseek_client", return_value=None):
+        with pytest.raises(ChatbotError, match="Clé API DeepSeek manquante"):
+            call_ai_model_streaming("DeepSeek", MESSAGES)
+
+
+def test_mid_stream_failure_raises_chatbot_error():
+    def broken():
+        yield "Il était "
+        raise ConnectionError("connexion perdue")
+
+    stream = ChatStream("GPT-4o", broken(), 0.0, MESSAGES, "Erreur OpenAI")
+    with pytest.raises(ChatbotError, match="connexion perdue"):
+        stream.result()
+    assert stream.content == "Il était "
+    assert stream.duration is not None
+
+
+@patch("src.ai.chatbot.st")
+def test_generate_reply_streams_or_blocks(mock_st):
+    mock_st.chat_message.return_value = MagicMock()
+    stream = ChatStream("GPT-4o", iter(["ok", {"tokens_in": 1, "tokens_out": 1}]), 0.0, MESSAGES, "Erreur OpenAI")
+    with patch("src.ai.chatbot.call_ai_model_streaming", return_value=stream), patch.dict(CHAT_DEFAULTS, {"stream": True}):
+        streamed = generate_reply("GPT-4o", MESSAGES)
+    mock_st.write_stream.assert_called_once_with(stream)
+    assert streamed["streamed"] and streamed["content"] == "ok"
+
+    blocking = {"content": "ok", "tokens_in": 1, "tokens_out": 1, "model": "GPT-4o"}
+    with patch("src.ai.chatbot.call_ai_model_optimized", return_value=blocking), patch.dict(CHAT_DEFAULTS, {"stream": False}):
+        result = generate_reply("GPT-4o", MESSAGES)
+    assert not result["streamed"]
+    assert result["ttft"] is None
+    assert result["duration"] >= 0
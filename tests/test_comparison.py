@@ -0,0 +1,100 @@
+"""
+Tests de la comparaison multi-modèles (src.ai.comparison et mode comparaison du chat)
+"""
+
+import os
+import sys
+import time
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.ai.comparison import ComparisonResult, compare_models, new_comparison_id, store_comparison
+from src.data import database
+
+MESSAGES = [{"role": "user", "content": "Que vois-je ?"}]
+DELAYS = {"GPT-4": 0.3, "GPT-4o": 0.1, "DeepSeek": 0.2}
+
+
+def fake_call(model_name, messages, temperature=None):
+    time.sleep(DELAYS[model_name])
+    if model_name == "DeepSeek":
+        raise RuntimeError("Clé API DeepSeek manquante")
+    return {"content": f"Réponse {model_name}", "tokens_in": 10, "tokens_out": 20, "model": model_name}
+
+
+@patch("src.ai.comparison.call_ai_model_optimized", side_effect=fake_call)
+def test_models_are_called_concurrently_and_yielded_as_they_finish(_mock_call):
+    start = time.perf_counter()
+    results = list(compare_models(["GPT-4", "GPT-4o", "DeepSeek", "GPT-4o"], MESSAGES))
+    elapsed = time.perf_counter() - start
+
+    assert [result.model for result in results] == ["GPT-4o", "DeepSeek", "GPT-4"]
+    assert elapsed < sum(DELAYS.values()) - 0.1  # durée du plus lent, pas la somme
+    failed = results[1]
+    assert not failed.ok and "DeepSeek" in failed.error
+    assert results[0].content == "Réponse GPT-4o"
+    assert results[0].cost_estimate > 0
+    assert list(compare_models([], MESSAGES)) == []
+
+
+def test_store_comparison_tags_one_row_per_answering_model(user_db):
+    comparison_id = new_comparison_id()
+    results = [
+        ComparisonResult("GPT-4o", "A", 10, 20, 1.5, 0.001),
+        ComparisonResult("DeepSeek", error="timeout"),
+        ComparisonResult("GPT-4", "B", 10, 30, 2.5, 0.002),
+    ]
+    ids = store_comparison(1, comparison_id, results)
+
+    assert len(ids) == 2
+    with database.get_readonly_connection() as conn:
+        rows = conn.execute(
+            "SELECT model, latency, cost_estimate FROM performance_logs WHERE comparison_id = ? ORDER BY id", (comparison_id,)
+        ).fetchall()
+    assert [tuple(row) for row in rows] == [("GPT-4o", 1.5, 0.001), ("GPT-4", 2.5, 0.002)]
+    assert store_comparison(1, new_comparison_id(), [ComparisonResult("GPT-4", error="x")]) == []
+
+
+class SessionLike(dict):
+    def __getattr__(self, key):
+        if key in self:
+            return self[key]
+        raise AttributeError(key)
+
+    def __setattr__(self, key, value):
+        self[key] = value
+
+
+@patch("src.ai.chatbot.store_turn_optimized")
+@patch("src.ai.comparison.store_comparison")
+@patch("src.ai.comparison.compare_models")
+@patch("src.ai.chatbot.st")
+def test_comparison_flow_keeps_the_chosen_reply(mock_st, mock_compare, mock_store, mock_store_turn):
+    from src.ai.chatbot import keep_comparison_reply, run_model_comparison
+
+    mock_st.session_state = SessionLike(history=[{"role": "system", "content": "MJ"}])
+    mock_st.columns.side_effect = lambda n: [MagicMock() for _ in range(n)]
+    mock_compare.return_value = iter(
+        [ComparisonResult("GPT-4o", "Rapide", 5, 5, 0.5), ComparisonResult("GPT-4", "Lent", 5, 5, 1.0)]
+    )
+
+    run_model_comparison(1, 7, "J'avance", ["GPT-4", "GPT-4o"])
+
+    sent_models, sent_messages = mock_compare.call_args.args
+    assert sent_models == ["GPT-4", "GPT-4o"]
+    assert sent_messages[-1] == {"role": "user", "content": "J'avance"}
+    comparison_id, stored = mock_store.call_args.args[1:3]
+    assert [result.model for result in stored] == ["GPT-4", "GPT-4o"]  # ordre de sélection
+    pending = mock_st.session_state.pending_comparison
+    assert pending["id"] == comparison_id
+    assert [result["content"] for result in pending["results"]] == ["Lent", "Rapide"]
+    assert len(mock_st.session_state.history) == 1  # rien n'est ajouté avant le choix du joueur
+
+    keep_comparison_reply(1, 7, pending["prompt"], "Rapide")
+    assert mock_st.session_state.history[-2:] == [
+        {"role": "user", "content": "J'avance"},
+        {"role": "assistant", "content": "Rapide"},
+    ]
+    mock_store_turn.assert_called_once_with(1, "J'avance", "Rapide", 7)
+    assert mock_st.session_state.pending_comparison is None
@@ -50,6 +50,8 @@ class TestDatabaseConnection:
             except:
                 pass
             del DatabaseConnection._thread_local.connection
+        # Repartir d'un pool vide pour que les connexions des autres tests ne soient pas réutilisées
+        DatabaseConnection.configure_pool()
 
     def test_get_connection_creates_connection(self):
         """Test que get_connection crée une connexion."""
@@ -235,6 +237,152 @@ class TestDatabaseSchema:
         assert "id" in columns
         assert "email" in columns
 
+    def test_campaign_stats_triggers(self):
+        """Les triggers maintiennent message_count et last_activity sur campaigns."""
+        conn = self.create_test_connection()
+        DatabaseSchema.create_tables(conn)
+        conn.execute("INSERT INTO users (id, email, password) VALUES (1, 'a@b.c', 'x')")
+        conn.execute("INSERT INTO campaigns (id, user_id, name, language) VALUES (1, 1, 'C', 'fr')")
+        conn.execute("INSERT INTO messages (user_id, campaign_id, role, content, timestamp) VALUES (1, 1, 'user', 'a', 1000)")
+        conn.execute("INSERT INTO messages (user_id, campaign_id, role, content, timestamp) VALUES (1, 1, 'user', 'b', 2000)")
+
+        row = conn.execute("SELECT message_count, last_activity FROM campaigns WHERE id = 1").fetchone()
+        assert tuple(row) == (2, 2000)
+
+        conn.execute("DELETE FROM messages WHERE content = 'b'")
+        row = conn.execute("SELECT message_count, last_activity FROM campaigns WHERE id = 1").fetchone()
+        assert tuple(row) == (1, 1000)
+
+    def test_migration_v6_backfills_campaign_stats(self):
+        """La migration v6 ajoute les colonnes et recalcule les compteurs existants."""
+        conn = self.create_test_connection()
+        conn.execute("CREATE TABLE campaigns (id INTEGER PRIMARY KEY, user_id INTEGER, name TEXT)")
+        conn.execute(
+            "CREATE TABLE messages (id INTEGER PRIMARY KEY, user_id INTEGER, campaign_id INTEGER, content TEXT, timestamp TEXT)"
+        )
+        conn.execute("INSERT INTO campaigns (id, user_id, name) VALUES (1, 1, 'C')")
+        conn.executemany(
+            "INSERT INTO messages (user_id, campaign_id, content, timestamp) VALUES (1, 1, ?, ?)",
+            [("a", "2024-01-01"), ("b", "2024-01-03")],
+        )
+
+        DatabaseSchema._migration_v6(conn)
+
+        row = conn.execute("SELECT message_count, last_activity FROM campaigns WHERE id = 1").fetchone()
+        assert tuple(row) == (2, "2024-01-03")
+        # Les triggers prennent le relais après le backfill
+        conn.execute("INSERT INTO messages (user_id, campaign_id, content, timestamp) VALUES (1, 1, 'c', '2024-01-04')")
+        assert conn.execute("SELECT message_count FROM campaigns WHERE id = 1").fetchone()[0] == 3
+
+    def test_migration_v9_converts_timestamps_to_epoch_ms(self):
+        """La migration v9 reconstruit messages/performance_logs en ms epoch, index et triggers compris."""
+        conn = self.create_test_connection()
+        DatabaseSchema.create_tables(conn)
+        # Simule une base antérieure : messages avec timestamp DATETIME texte
+        conn.execute("DROP TABLE messages")
+        conn.execute(
+            """
+            CREATE TABLE messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, campaign_id INTEGER,
+                role TEXT NOT NULL, content TEXT NOT NULL, character_id INTEGER,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """
+        )
+        conn.execute("CREATE INDEX idx_messages_campaign_timestamp ON messages(campaign_id, timestamp)")
+        DatabaseSchema.create_campaign_stats_triggers(conn)
+        conn.execute("INSERT INTO users (id, email, password) VALUES (1, 'a@b.c', 'x')")
+        conn.execute("INSERT INTO campaigns (id, user_id, name, language) VALUES (1, 1, 'C', 'fr')")
+        conn.executemany(
+            "INSERT INTO messages (user_id, campaign_id, role, content, timestamp) VALUES (1, 1, 'user', ?, ?)",
+            [("a", "2024-01-01 10:00:00"), ("b", "2024-01-01 10:00:00")],
+        )
+
+        DatabaseSchema._migration_v9(conn)
+
+        assert DatabaseSchema._column_type(conn, "messages", "timestamp") == "INTEGER"
+        rows = conn.execute("SELECT id, content, timestamp FROM messages ORDER BY timestamp, id").fetchall()
+        assert [(row[0], row[1], row[2]) for row in rows] == [(1, "a", 1704103200000), (2, "b", 1704103200000)]
+        compat = conn.execute("SELECT timestamp, timestamp_ms FROM messages_compat WHERE id = 1").fetchone()
+        assert tuple(compat) == ("2024-01-01 10:00:00", 1704103200000)
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert "idx_messages_campaign_timestamp" in indexes
+        assert conn.execute("SELECT last_activity FROM campaigns WHERE id = 1").fetchone()[0] == 1704103200000
+
+        # Nouveau message : horodaté en ms par défaut, triggers de statistiques toujours actifs
+        conn.execute("INSERT INTO messages (user_id, campaign_id, role, content) VALUES (1, 1, 'user', 'c')")
+        row = conn.execute("SELECT message_count, last_activity FROM campaigns WHERE id = 1").fetchone()
+        assert row[0] == 3 and row[1] > 1704103200000
+
+    def test_performance_rollup_triggers(self):
+        """Les agrégats horaires/journaliers suivent insertions, modifications et suppressions."""
+        conn = self.create_test_connection()
+        DatabaseSchema.create_tables(conn)
+        conn.execute("INSERT INTO users (id, email, password) VALUES (1, 'a@b.c', 'x')")
+        hour = 3600 * 1000
+        rows = [(1.0, 10, 5, hour), (3.0, 20, 10, hour + 60000), (2.0, 30, 15, 2 * hour)]
+        conn.executemany(
+            "INSERT INTO performance_logs (user_id, model, latency, tokens_in, tokens_out, timestamp) VALUES (1, 'GPT-4o', ?, ?, ?, ?)",
+            rows,
+        )
+
+        hourly = conn.execute(
+            "SELECT bucket, count, latency_sum, latency_min, latency_max, tokens_in FROM performance_rollup_hourly ORDER BY bucket"
+        ).fetchall()
+        assert [tuple(r) for r in hourly] == [(hour, 2, 4.0, 1.0, 3.0, 30), (2 * hour, 1, 2.0, 2.0, 2.0, 30)]
+        daily = conn.execute("SELECT bucket, count, tokens_out FROM performance_rollup_daily").fetchall()
+        assert [tuple(r) for r in daily] == [(0, 3, 30)]
+
+        conn.execute("DELETE FROM performance_logs WHERE latency = 3.0")
+        conn.execute("UPDATE performance_logs SET cost_estimate = 0.5 WHERE latency = 2.0")
+        hourly = conn.execute(
+            "SELECT bucket, count, latency_max, cost FROM performance_rollup_hourly ORDER BY bucket"
+        ).fetchall()
+        assert [tuple(r) for r in hourly] == [(hour, 1, 1.0, 0.0), (2 * hour, 1, 2.0, 0.5)]
+
+        # Le backfill reconstruit exactement les mêmes agrégats
+        before = conn.execute("SELECT * FROM performance_rollup_daily").fetchall()
+        conn.execute("DELETE FROM performance_rollup_daily")
+        DatabaseSchema.rebuild_performance_rollups(conn)
+        assert [tuple(r) for r in conn.execute("SELECT * FROM performance_rollup_daily")] == [tuple(r) for r in before]
+
+    def test_backfill_cost_estimates(self):
+        """Les logs sans coût sont estimés depuis models_config et les agrégats suivent."""
+        from src.ai.models_config import calculate_estimated_cost
+
+        conn = self.create_test_connection()
+        DatabaseSchema.create_tables(conn)
+        conn.execute("INSERT INTO users (id, email, password) VALUES (1, 'a@b.c', 'x')")
+        conn.executemany(
+            "INSERT INTO performance_logs (user_id, model, latency, tokens_in, tokens_out, cost_estimate, timestamp) "
+            "VALUES (1, ?, 1.0, ?, ?, ?, 0)",
+            [("GPT-4o", 1000, 500, None), ("Inconnu", 100, 200, None), ("DeepSeek", 10, 10, 0.25)],
+        )
+
+        assert DatabaseSchema.backfill_cost_estimates(conn) == 2
+        costs = dict(conn.execute("SELECT model, cost_estimate FROM performance_logs").fetchall())
+        assert costs["GPT-4o"] == pytest.approx(calculate_estimated_cost("GPT-4o", 1000, 500))
+        assert costs["Inconnu"] == pytest.approx(calculate_estimated_cost("Inconnu", 100, 200))
+        assert costs["DeepSeek"] == 0.25
+        total = conn.execute("SELECT SUM(cost) FROM performance_rollup_daily").fetchone()[0]
+        assert total == pytest.approx(sum(costs.values()))
+        # Les triggers de mise à jour sont recréés
+        triggers = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+        assert {"trg_performance_rollup_hourly_update", "trg_performance_rollup_daily_update"} <= triggers
+
+    def test_cache_version_triggers(self):
+        """Chaque écriture incrémente la version (utilisateur, portée) dans cache_versions."""
+        conn = self.create_test_connection()
+        DatabaseSchema.create_tables(conn)
+        conn.execute("INSERT INTO users (id, email, password) VALUES (1, 'a@b.c', 'x')")
+        conn.execute("INSERT INTO campaigns (id, user_id, name, language) VALUES (1, 1, 'C', 'fr')")
+        conn.execute("UPDATE campaigns SET name = 'D' WHERE id = 1")
+        # Un message met à jour les statistiques de la campagne, donc sa version
+        conn.execute("INSERT INTO messages (user_id, campaign_id, role, content) VALUES (1, 1, 'user', 'a')")
+
+        versions = dict(conn.execute("SELECT scope, version FROM cache_versions WHERE user_id = 1").fetchall())
+        assert versions == {"user": 1, "campaigns": 3}
+
 
 class TestContextManager:
     """Tests pour le context manager optimisé."""
@@ -0,0 +1,156 @@
+"""
+Tests du pool de connexions SQLite (src.data.database.ConnectionPool)
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.data import database
+from src.data.database import ConnectionPool
+
+
+def make_pool(tmp_path, **kwargs):
+    db_file = str(tmp_path / "pool.db")
+    pool = ConnectionPool(factory=lambda: sqlite3.connect(db_file, check_same_thread=False), **kwargs)
+    return pool, db_file
+
+
+class TestConnectionPool:
+    def test_release_then_reuse_without_creation(self, tmp_path):
+        pool, db_file = make_pool(tmp_path)
+        entry = pool.acquire(db_file)
+        pool.release(entry)
+        again = pool.acquire(db_file)
+
+        assert again is entry
+        stats = pool.stats()
+        assert stats["creations"] == 1
+        assert stats["checkouts"] == 2
+        assert stats["in_use"] == 1
+
+    def test_invalidate_discards_idle_and_leased(self, tmp_path):
+        pool, db_file = make_pool(tmp_path)
+        idle = pool.acquire(db_file)
+        leased = pool.acquire(db_file)
+        pool.release(idle)
+
+        pool.invalidate()
+
+        assert pool.stats()["idle"] == 0
+        assert not pool.is_valid(leased, db_file)
+        pool.release(leased)
+        assert pool.stats()["size"] == 0
+
+    def test_closed_connection_is_not_valid(self, tmp_path):
+        pool, db_file = make_pool(tmp_path)
+        entry = pool.acquire(db_file)
+        entry.connection.close()
+        assert not pool.is_valid(entry, db_file)
+
+    def test_dead_thread_lease_is_reclaimed_when_full(self, tmp_path):
+        pool, db_file = make_pool(tmp_path, max_size=1, checkout_timeout=2.0)
+        leased = []
+        worker = threading.Thread(target=lambda: leased.append(pool.acquire(db_file)))
+        worker.start()
+        worker.join()
+
+        entry = pool.acquire(db_file)
+
+        assert entry is leased[0]
+        assert pool.stats()["reaped_dead_threads"] == 1
+
+    def test_exhausted_pool_waits_then_raises(self, tmp_path):
+        pool, db_file = make_pool(tmp_path, max_size=1, checkout_timeout=0.05)
+        pool.acquire(db_file)
+
+        with pytest.raises(sqlite3.OperationalError):
+            pool.acquire(db_file)
+        assert pool.stats()["waits"] == 1
+
+    def test_reap_closes_idle_above_min_size(self, tmp_path):
+        pool, db_file = make_pool(tmp_path, min_size=1, idle_timeout=0.0)
+        first = pool.acquire(db_file)
+        second = pool.acquire(db_file)
+        pool.release(first)
+        pool.release(second)
+
+        assert pool.reap() == 1
+        stats = pool.stats()
+        assert stats["size"] == 1
+        assert stats["reaped_idle"] == 1
+
+
+class TestDatabaseConnectionPooling:
+    # Accès via le module : d'autres tests rechargent src.data.database
+    def setup_method(self):
+        database.DatabaseConnection._forget_thread_lease()
+        database.DatabaseConnection.configure_pool()
+
+    def test_optimized_connection_returns_lease_to_pool(self, tmp_path):
+        with patch("src.data.database.get_db_path", return_value=tmp_path / "ctx.db"):
+            with database.get_optimized_connection() as conn:
+                conn.execute("CREATE TABLE t (x INTEGER)")
+            with database.get_optimized_connection() as conn2:
+                conn2.execute("INSERT INTO t VALUES (1)")
+
+        stats = database.DatabaseConnection.get_pool_stats()
+        assert conn2 is conn
+        assert stats["creations"] == 1
+        assert stats["in_use"] == 0
+
+    def test_nested_blocks_share_the_outer_transaction(self, tmp_path):
+        with patch("src.data.database.get_db_path", return_value=tmp_path / "nested.db"):
+            with database.get_optimized_connection() as conn:
+                conn.execute("CREATE TABLE t (x INTEGER)")
+
+            with database.get_optimized_connection(immediate=True) as outer:
+                outer.execute("INSERT INTO t VALUES (1)")
+                with database.get_optimized_connection() as inner:
+                    inner.execute("INSERT INTO t VALUES (2)")
+                with pytest.raises(ValueError):
+                    with database.get_optimized_connection() as failing:
+                        failing.execute("INSERT INTO t VALUES (3)")
+                        raise ValueError("échec du bloc interne")
+                outer.execute("INSERT INTO t VALUES (4)")
+
+            with database.get_optimized_connection() as conn2:
+                rows = [row[0] for row in conn2.execute("SELECT x FROM t ORDER BY x")]
+
+        assert inner is outer and failing is outer and conn2 is conn
+        assert rows == [1, 2, 4]
+        stats = database.DatabaseConnection.get_pool_stats()
+        assert stats["creations"] == 1
+        assert stats["in_use"] == 0
+
+    def test_legacy_get_connection_stays_pinned(self, tmp_path):
+        with patch("src.data.database.get_db_path", return_value=tmp_path / "pin.db"):
+            conn = database.DatabaseConnection.get_connection()
+            with database.get_optimized_connection() as inner:
+                assert inner is conn
+
+        assert database.DatabaseConnection.get_pool_stats()["in_use"] == 1
+        database.DatabaseConnection.release_connection()
+        assert database.DatabaseConnection.get_pool_stats()["in_use"] == 0
+
+    def test_readonly_connection_is_separate_and_rejects_writes(self, tmp_path):
+        with patch("src.data.database.get_db_path", return_value=tmp_path / "ro.db"):
+            writer = database.DatabaseConnection.get_connection()
+            writer.execute("CREATE TABLE t (x INTEGER)")
+            writer.execute("INSERT INTO t VALUES (1)")
+
+            with database.get_readonly_connection() as ro:
+                assert ro is not writer
+                assert ro.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+                with pytest.raises(sqlite3.OperationalError):
+                    ro.execute("INSERT INTO t VALUES (2)")
+
+            # La connexion d'écriture du thread reste utilisable
+            assert writer.execute("SELECT 1").fetchone()[0] == 1
+            database.DatabaseConnection.release_connection()
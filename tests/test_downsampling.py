@@ -0,0 +1,48 @@
+"""
+Tests de la réduction de séries temporelles (src.analytics.downsampling)
+"""
+
+import os
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.analytics.downsampling import downsample, lttb_indices
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 50)
+    y[437] = 25.0  # pic isolé
+
+    indices = lttb_indices(x, y, 100)
+
+    assert len(indices) == 100
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+    assert 437 in indices
+
+
+def test_lttb_returns_everything_for_short_series():
+    assert lttb_indices(np.arange(5), np.arange(5), 10).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_downsample_caps_points_per_series():
+    days = [date(2024, 1, 1) + timedelta(days=i) for i in range(365)]
+    df = pd.DataFrame(
+        {
+            "date": days * 2,
+            "model": ["GPT-4"] * 365 + ["DeepSeek"] * 365,
+            "latency": np.random.default_rng(0).random(730),
+        }
+    )
+
+    reduced = downsample(df, "date", "latency", 50, by="model")
+
+    assert reduced.groupby("model").size().to_dict() == {"GPT-4": 50, "DeepSeek": 50}
+    assert reduced[reduced["model"] == "GPT-4"]["date"].is_monotonic_increasing
+    assert downsample(df.iloc[:0], "date", "latency", 50, by="model").empty
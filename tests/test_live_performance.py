@@ -0,0 +1,64 @@
+"""
+Tests du tampon colonnaire et des échantillons de performance récents
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.analytics.live_performance import LivePerformance
+from src.analytics.ring_buffer import ColumnarRingBuffer
+from src.data.database import epoch_ms
+
+
+def test_ring_buffer_overwrites_oldest_and_keeps_order():
+    ring = ColumnarRingBuffer({"t": np.int64, "v": np.float64}, capacity=3)
+    for i in range(5):
+        ring.append(t=i, v=i / 2)
+
+    data = ring.snapshot()
+    assert len(ring) == 3
+    assert data["t"].tolist() == [2, 3, 4]
+    assert data["v"].tolist() == [1.0, 1.5, 2.0]
+    assert ring.since("t", 4)["v"].tolist() == [2.0]
+
+    ring.clear()
+    assert ring.snapshot()["t"].size == 0
+    with pytest.raises(ValueError):
+        ColumnarRingBuffer({"t": np.int64}, capacity=0)
+
+
+def test_window_stats_per_model_and_user():
+    live = LivePerformance(capacity=100)
+    now = epoch_ms()
+    live.record(1, "GPT-4o", 9.0, 10, 90, 0.5, timestamp_ms=now - 2 * 3600 * 1000)  # hors fenêtre 1 h
+    for latency in (1.0, 2.0, 3.0):
+        live.record(1, "GPT-4o", latency, 10, 30, 0.01, timestamp_ms=now - 1000)
+    live.record(2, "GPT-4o", 5.0, 10, 10, 0.01)
+    live.record(1, "DeepSeek", 0.5, 5, 5)
+
+    stats = live.window_stats("GPT-4o", 3600, user_id=1)
+    assert stats["count"] == 3
+    assert stats["latency_p50"] == 2.0
+    assert stats["latency_mean"] == 2.0
+    assert stats["tokens_per_second"] == pytest.approx(90 / 6.0)
+    assert stats["cost"] == pytest.approx(0.03)
+
+    assert live.window_stats("GPT-4o", 86400, user_id=1)["count"] == 4
+    assert live.window_stats("GPT-4o", 3600)["latency_last"] == 5.0
+    assert live.window_stats("Inconnu", 3600) is None
+    assert [s["model"] for s in live.all_window_stats(3600, user_id=1)] == ["GPT-4o", "DeepSeek"]
+
+
+def test_ttft_median_ignores_non_streamed_samples():
+    live = LivePerformance(capacity=10)
+    live.record(1, "GPT-4o", 3.0, 10, 30)
+    assert live.window_stats("GPT-4o", 60)["ttft_p50"] is None
+
+    for ttft in (0.2, 0.4, 0.9):
+        live.record(1, "GPT-4o", 3.0, 10, 30, ttft=ttft)
+    assert live.window_stats("GPT-4o", 60)["ttft_p50"] == pytest.approx(0.4)
@@ -0,0 +1,156 @@
+"""
+Tests du fournisseur simulé (src.ai.mock_provider) : SDK OpenAI réel et format Anthropic brut
+"""
+
+import json
+import os
+import random
+import sys
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.ai import async_providers
+from src.ai.api_client import APIClientManager, get_openai_client, provider_base_url
+from src.ai.async_providers import ProviderEventLoop
+from src.ai.chatbot import APIManager, ChatbotError, call_ai_model_optimized, call_ai_model_streaming
+from src.ai.mock_provider import MockProfile, MockProviderServer, parse_latency, split_tokens
+
+MESSAGES = [{"role": "system", "content": "Tu es un MJ."}, {"role": "user", "content": "Je lance un sort"}]
+
+
+def reset_clients():
+    for name in ("_openai_client", "_anthropic_client", "_deepseek_client"):
+        setattr(APIClientManager, name, None)
+    for getter in ("get_openai_client", "get_anthropic_client", "get_deepseek_client"):
+        getattr(APIClientManager, getter).cache_clear()
+
+
+def post(url, body):
+    """Requête brute (format Anthropic vérifié sans dépendre de la version du SDK)."""
+    request = urllib.request.Request(url, json.dumps(body).encode(), {"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return response.read().decode()
+
+
+def sse_events(raw):
+    """Décode un flux SSE Anthropic en objets (comme le SDK)."""
+    events = []
+    for block in raw.strip().split("\n\n"):
+        data = next(line[6:] for line in block.splitlines() if line.startswith("data: "))
+        events.append(json.loads(data, object_hook=lambda d: SimpleNamespace(**d)))
+    return events
+
+
+@pytest.fixture
+def mock_server(request):
+    profile = getattr(request, "param", None) or MockProfile(latency="fixed:0", tokens_per_second=0, seed=1)
+    reset_clients()
+    with MockProviderServer(profile) as server, patch.dict(os.environ, server.env()):
+        yield server
+    reset_clients()
+
+
+def test_clients_follow_base_url_overrides(mock_server):
+    assert provider_base_url("anthropic") == mock_server.url
+    assert provider_base_url("deepseek") == f"{mock_server.url}/v1"
+    with patch.dict(os.environ, {"DEEPSEEK_BASE_URL": ""}):
+        assert provider_base_url("deepseek") == "https://api.deepseek.com/v1"
+    assert str(get_openai_client().base_url).startswith(mock_server.url)
+
+
+def test_chat_completions_and_messages_round_trip(mock_server):
+    gpt = call_ai_model_optimized("GPT-4o", MESSAGES)
+    assert gpt["content"] == "Réponse simulée de gpt-4o (requête 1) : vous avez dit « Je lance un sort »."
+    assert gpt["tokens_out"] == len(split_tokens(gpt["content"]))
+    assert gpt["tokens_in"] > 0
+
+    assert call_ai_model_optimized("DeepSeek", MESSAGES)["model"] == "DeepSeek"
+
+    body = {"model": "claude", "max_tokens": 3, "messages": MESSAGES[1:]}
+    claude = json.loads(post(f"{mock_server.url}/v1/messages", body))
+    assert claude["type"] == "message" and claude["stop_reason"] == "end_turn"
+    assert claude["content"][0]["text"] == "Réponse simulée de "  # max_tokens respecté
+    assert claude["usage"]["output_tokens"] == 3
+
+
+def test_streams_are_parsed_by_the_sdk_and_decoders(mock_server):
+    for model in ("GPT-4o", "DeepSeek"):
+        stream = call_ai_model_streaming(model, MESSAGES)
+        chunks = list(stream)
+        result = stream.result()
+        assert len(chunks) > 3
+        assert result["content"].endswith("« Je lance un sort ».")
+        assert result["tokens_out"] == len(chunks)
+        assert result["ttft"] is not None
+
+    raw = post(f"{mock_server.url}/v1/messages", {"model": "claude", "stream": True, "messages": MESSAGES[1:]})
+    events = list(APIManager._anthropic_stream_events(sse_events(raw)))
+    text = "".join(event for event in events if isinstance(event, str))
+    assert text.endswith("« Je lance un sort ».")
+    assert {"tokens_out": len(events) - 2} in events
+    assert mock_server.provider.stats["streams"] == 3
+
+
+def test_async_layer_against_the_mock(mock_server):
+    loop = ProviderEventLoop()
+    with patch.object(async_providers, "_provider_loop", loop):
+        try:
+            assert async_providers.call_model("GPT-4o", MESSAGES)["tokens_out"] > 0
+            assert async_providers.stream_model("DeepSeek", MESSAGES).result()["content"]
+        finally:
+            loop.stop()
+
+
+@pytest.mark.parametrize(
+    "mock_server", [MockProfile(latency="fixed:0", tokens_per_second=0, rate_limit_rate=1.0, retry_after=0)], indirect=True
+)
+def test_rate_limits_are_injected_in_provider_format(mock_server):
+    with pytest.raises(ChatbotError, match="Rate limit OpenAI"):
+        call_ai_model_optimized("GPT-4o", MESSAGES)
+    assert mock_server.provider.stats["rate_limited"] >= 2  # le SDK réessaie avant d'abandonner
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post(f"{mock_server.url}/v1/messages", {"model": "claude", "messages": MESSAGES[1:]})
+    assert error.value.code == 429
+    assert error.value.headers["Retry-After"] == "0"
+    assert json.loads(error.value.read())["error"]["type"] == "rate_limit_error"
+
+
+@pytest.mark.parametrize(
+    "mock_server",
+    [MockProfile(latency="fixed:0", tokens_per_second=0, replies=["Le dragon dort.", "La porte grince.", "Un gobelin."])],
+    indirect=True,
+)
+def test_canned_replies_are_deterministic_and_capped(mock_server):
+    first = call_ai_model_optimized("GPT-4o", MESSAGES)["content"]
+    assert call_ai_model_optimized("DeepSeek", MESSAGES)["content"] == first  # même prompt, même réponse
+    assert first in mock_server.provider.profile.replies
+    tokens = mock_server.provider.reply_for("m", "Je lance un sort", 1, max_tokens=1)
+    assert tokens == split_tokens(first)[:1]
+
+
+def test_images_are_served_locally(mock_server):
+    response = get_openai_client().images.generate(model="dall-e-3", prompt="Un elfe", n=1, size="1024x1024")
+    url = response.data[0].url
+    assert url.startswith(mock_server.url)
+    with urllib.request.urlopen(url) as image:
+        assert image.headers["Content-Type"] == "image/png"
+
+
+def test_latency_specs():
+    rng = random.Random(0)
+    assert parse_latency("fixed:250")(rng) == 0.25
+    assert 0.1 <= parse_latency("uniform:100:200")(rng) <= 0.2
+    samples = sorted(parse_latency("lognormal:300:0.5")(rng) for _ in range(2001))
+    assert samples[1000] == pytest.approx(0.3, rel=0.1)
+    assert parse_latency("normal:10:100")(rng) >= 0
+    with pytest.raises(ValueError):
+        parse_latency("pareto:1")
+    with pytest.raises(ValueError):
+        parse_latency("fixed:abc")
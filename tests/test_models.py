@@ -243,6 +243,79 @@ class TestDatabaseModels:
         assert len(messages_2) == 1
         assert messages_2[0]["content"] == "Hello"
 
+    def test_commit_turn_persists_turn_atomically(self, sample_user):
+        """Test du commit d'un tour de chat complet en une transaction."""
+        from src.data.database import get_optimized_connection
+        from src.data.models import MessageManager
+
+        user_id = sample_user["id"]
+        campaign_id = create_campaign(user_id, "Turn Campaign", ["Fantasy"], "fr")
+
+        ids = MessageManager.commit_turn(
+            user_id,
+            "J'ouvre la porte",
+            "La porte grince...",
+            campaign_id,
+            performance={"model": "GPT-4o", "latency": 1.2, "tokens_in": 30, "tokens_out": 60, "ttft": 0.4},
+        )
+
+        assert ids["user_message_id"] < ids["assistant_message_id"]
+        assert ids["performance_id"] is not None
+        messages = get_campaign_messages(user_id, campaign_id)
+        assert [m["role"] for m in messages] == ["user", "assistant"]
+        with get_optimized_connection() as conn:
+            row = conn.execute(
+                "SELECT model, tokens_out, ttft FROM performance_logs WHERE id = ?", (ids["performance_id"],)
+            ).fetchone()
+        assert tuple(row) == ("GPT-4o", 60, 0.4)
+
+    def test_commit_turn_rolls_back_on_error(self, sample_user):
+        """Aucune écriture partielle si une partie du tour échoue."""
+        from src.data.models import MessageManager
+
+        user_id = sample_user["id"]
+        campaign_id = create_campaign(user_id, "Rollback Campaign", ["Fantasy"], "fr")
+
+        with pytest.raises(KeyError):
+            # 'latency' manquant : l'insertion de performance échoue après les messages
+            MessageManager.commit_turn(user_id, "Bonjour", "Salut", campaign_id, performance={"model": "GPT-4"})
+
+        assert get_campaign_messages(user_id, campaign_id) == []
+
+    def test_get_campaign_messages_returns_tail_window(self, sample_user):
+        """Les N derniers messages sont retournés, du plus ancien au plus récent."""
+        from src.data.models import MessageManager
+
+        user_id = sample_user["id"]
+        campaign_id = create_campaign(user_id, "Long Campaign", ["Fantasy"], "fr")
+        for i in range(10):
+            MessageManager.store_message(user_id, "user", f"msg {i}", campaign_id)
+
+        messages = get_campaign_messages(user_id, campaign_id, limit=3)
+
+        assert [m["content"] for m in messages] == ["msg 7", "msg 8", "msg 9"]
+
+    def test_get_message_page_keyset_paging(self, sample_user):
+        """Pagination par curseur vers les messages plus anciens."""
+        from src.data.models import MessageManager, get_message_page
+
+        user_id = sample_user["id"]
+        campaign_id = create_campaign(user_id, "Paged Campaign", ["Fantasy"], "fr")
+        for i in range(5):
+            MessageManager.store_message(user_id, "user", f"msg {i}", campaign_id)
+
+        page = get_message_page(user_id, campaign_id, limit=2)
+        assert [m["content"] for m in page["messages"]] == ["msg 3", "msg 4"]
+        assert page["has_more"]
+
+        page = get_message_page(user_id, campaign_id, limit=2, before_id=page["next_cursor"])
+        assert [m["content"] for m in page["messages"]] == ["msg 1", "msg 2"]
+
+        page = get_message_page(user_id, campaign_id, limit=2, before_id=page["next_cursor"])
+        assert [m["content"] for m in page["messages"]] == ["msg 0"]
+        assert not page["has_more"]
+        assert page["next_cursor"] is None
+
     def test_get_campaign_messages_no_campaign(self, sample_user):
         """Test de récupération des messages sans campagne spécifiée."""
         user_id = sample_user["id"]
@@ -5,6 +5,7 @@ Tests étendus pour le module data.models - améliorer la couverture
 import os
 import sqlite3
 import sys
+import threading
 import time
 from datetime import datetime, timedelta
 from unittest.mock import MagicMock, Mock, patch
@@ -15,6 +16,8 @@ import pytest
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from src.data.models import (
+    MISSING,
+    CacheCoherence,
     CampaignManager,
     CharacterManager,
     ModelCache,
@@ -104,6 +107,212 @@ class TestModelCache:
 
         assert _model_cache.get("test_key") is None
 
+    def test_lru_eviction_by_entry_count(self):
+        """Les entrées les moins récemment utilisées sont évincées au-delà de max_entries."""
+        cache = ModelCache(ttl_seconds=60, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "a" devient la plus récente
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+
+    def test_byte_budget_eviction(self):
+        """Le budget en octets borne la mémoire occupée."""
+        cache = ModelCache(ttl_seconds=60, max_bytes=2000)
+        cache.set("big1", "x" * 1200)
+        cache.set("big2", "y" * 1200)
+
+        assert cache.get("big1") is None
+        assert cache.stats()["bytes"] <= 2000
+
+    def test_namespace_ttl(self):
+        """Le plus long espace de noms correspondant fixe le TTL."""
+        cache = ModelCache(ttl_seconds=60, namespace_ttls={"user": 10, "user_campaigns": 0.05})
+        assert cache.ttl_for("user_1") == 10
+        assert cache.ttl_for("user_campaigns_1") == 0.05
+        assert cache.ttl_for("other") == 60
+
+        cache.set("user_campaigns_1", ["c"])
+        time.sleep(0.1)
+        assert cache.purge_expired() == 1
+        assert cache.stats()["expirations"] == 1
+
+    def test_hit_miss_counters(self):
+        """Compteurs de hits et de misses."""
+        self.cache.set("k", "v")
+        self.cache.get("k")
+        self.cache.get("absent")
+
+        stats = self.cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_background_sweeper_purges_expired(self):
+        """Le balayage en arrière-plan retire les entrées expirées sans lecture."""
+        cache = ModelCache(ttl_seconds=0.01, sweep_interval=0.02)
+        cache.set("k", "v")
+        deadline = time.time() + 2
+        while cache._cache and time.time() < deadline:
+            time.sleep(0.01)
+        cache.stop_sweeper()
+
+        assert "k" not in cache._cache
+
+    def test_negative_entries_distinguished_from_miss(self):
+        """None et listes vides mis en cache ne sont pas confondus avec une absence."""
+        self.cache.set("empty", [])
+        self.cache.set("none", None)
+
+        assert self.cache.get("empty", MISSING) == []
+        assert self.cache.get("none", MISSING) is None
+        assert self.cache.get("absent", MISSING) is MISSING
+        assert self.cache.stats()["negative_hits"] == 2
+
+    def test_negative_ttl_shorter(self):
+        """Les résultats négatifs expirent avec le TTL négatif."""
+        cache = ModelCache(ttl_seconds=60, negative_ttl=0.05)
+        cache.set("empty", [])
+        cache.set("full", [1])
+        time.sleep(0.1)
+
+        assert cache.get("empty", MISSING) is MISSING
+        assert cache.get("full") == [1]
+
+
+class TestCacheLoading:
+    """Tests du calcul coalescé (single-flight) et du stale-while-revalidate."""
+
+    def test_concurrent_misses_run_loader_once(self):
+        """Les appelants concurrents attendent le calcul en cours au lieu de le relancer."""
+        cache = ModelCache(ttl_seconds=60)
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def loader():
+            calls.append(1)
+            started.set()
+            release.wait(2)
+            return ["c1"]
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader))) for _ in range(5)]
+        threads[0].start()
+        started.wait(2)
+        for t in threads[1:]:
+            t.start()
+        time.sleep(0.05)
+        release.set()
+        for t in threads:
+            t.join(2)
+
+        assert len(calls) == 1
+        assert results == [["c1"]] * 5
+        assert cache.stats()["coalesced"] == 4
+
+    def test_loader_error_propagates_and_is_not_cached(self):
+        """Une erreur du calcul est remontée et rien n'est mis en cache."""
+        cache = ModelCache(ttl_seconds=60)
+
+        def failing():
+            raise sqlite3.OperationalError("database is locked")
+
+        with pytest.raises(sqlite3.OperationalError):
+            cache.get_or_load("k", failing)
+        assert cache.get_or_load("k", lambda: 1) == 1
+
+    def test_delete_during_load_skips_caching(self):
+        """Une invalidation pendant le calcul empêche de mettre en cache un résultat périmé."""
+        cache = ModelCache(ttl_seconds=60)
+
+        def loader():
+            cache.delete("k")  # écriture concurrente
+            return "old"
+
+        assert cache.get_or_load("k", loader) == "old"
+        assert cache.get("k", MISSING) is MISSING
+
+    def test_stale_value_served_while_refreshing(self):
+        """Avec stale_ttl, la valeur expirée est servie pendant un unique rafraîchissement."""
+        cache = ModelCache(ttl_seconds=0.05, stale_ttl=60)
+        cache.set("k", "old")
+        time.sleep(0.1)
+        refreshed = threading.Event()
+
+        def loader():
+            refreshed.wait(2)
+            return "new"
+
+        assert cache.get_or_load("k", loader) == "old"
+        assert cache.get_or_load("k", loader) == "old"
+        assert cache.stats()["refreshes"] == 1
+        refreshed.set()
+
+        deadline = time.time() + 2
+        while cache.get("k") != "new" and time.time() < deadline:
+            time.sleep(0.01)
+        assert cache.get("k") == "new"
+
+
+class _FakeCoherence(CacheCoherence):
+    """Versions contrôlées par le test (simule les écritures d'un autre processus)."""
+
+    def __init__(self):
+        super().__init__(check_interval=0)
+        self.db_versions = {}
+
+    def _load(self, user_id):
+        return dict(self.db_versions.get(user_id, {}))
+
+
+class TestCacheCoherence:
+    """Tests de la cohérence inter-processus du cache."""
+
+    def test_scope_for(self):
+        """Les clés versionnées sont associées à leur portée."""
+        coherence = CacheCoherence()
+        assert coherence.scope_for("user_campaigns_7") == (7, "campaigns")
+        assert coherence.scope_for("user_7") == (7, "user")
+        assert coherence.scope_for("model_choice_3") == (3, "model_choice")
+        assert coherence.scope_for("performance_stats_1_7") is None
+
+    def test_entry_invalidated_after_remote_write(self):
+        """Une écriture d'un autre processus invalide l'entrée sans attendre le TTL."""
+        coherence = _FakeCoherence()
+        cache = ModelCache(ttl_seconds=60, coherence=coherence)
+        coherence.db_versions[1] = {"campaigns": 4}
+
+        assert cache.get("user_campaigns_1", MISSING) is MISSING
+        cache.set("user_campaigns_1", ["c1"])
+        assert cache.get("user_campaigns_1") == ["c1"]
+
+        coherence.db_versions[1] = {"campaigns": 5}
+        assert cache.get("user_campaigns_1", MISSING) is MISSING
+        assert cache.stats()["stale"] == 1
+
+    def test_write_during_fill_is_detected(self):
+        """La version est capturée avant le calcul : une écriture concurrente n'est pas masquée."""
+        coherence = _FakeCoherence()
+        cache = ModelCache(ttl_seconds=60, coherence=coherence)
+        coherence.db_versions[1] = {"characters": 1}
+
+        cache.get("user_characters_1")
+        coherence.db_versions[1] = {"characters": 2}  # écriture pendant la requête
+        cache.set("user_characters_1", ["old"])
+
+        assert cache.get("user_characters_1", MISSING) is MISSING
+
+    def test_unversioned_keys_untouched(self):
+        """Les clés hors portée gardent le seul TTL."""
+        coherence = _FakeCoherence()
+        cache = ModelCache(ttl_seconds=60, coherence=coherence)
+        cache.set("performance_stats_1_7", {"n": 1})
+        assert cache.get("performance_stats_1_7") == {"n": 1}
+
 
 class TestUserManager:
     """Tests pour UserManager."""
@@ -323,6 +532,22 @@ class TestCampaignManager:
         assert len(result) == 2
         assert result[0]["name"] == "Campaign 1"
 
+    @patch("src.data.models.get_optimized_connection")
+    def test_get_user_campaigns_empty_is_cached(self, mock_get_connection):
+        """Un compte sans campagne ne relance pas la requête à chaque rerun."""
+        clear_cache()
+        mock_conn = Mock()
+        mock_cursor = Mock()
+        mock_conn.cursor.return_value = mock_cursor
+        mock_get_connection.return_value.__enter__ = Mock(return_value=mock_conn)
+        mock_get_connection.return_value.__exit__ = Mock(return_value=None)
+        mock_cursor.fetchall.return_value = []
+
+        assert CampaignManager.get_user_campaigns(999) == []
+        assert CampaignManager.get_user_campaigns(999) == []
+        assert mock_cursor.execute.call_count == 1
+        clear_cache()
+
 
 class TestCharacterManager:
     """Tests pour CharacterManager."""
@@ -14,7 +14,10 @@ class TestModelsLeftovers:
     def setup_db(self):
         conn = sqlite3.connect(":memory:")
         cur = conn.cursor()
-        cur.execute("CREATE TABLE messages (user_id INTEGER, campaign_id INTEGER, role TEXT, content TEXT, timestamp TEXT)")
+        cur.execute(
+            "CREATE TABLE messages (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, campaign_id INTEGER, "
+            "role TEXT, content TEXT, timestamp TEXT)"
+        )
         cur.execute("CREATE TABLE campaigns (id INTEGER, user_id INTEGER, updated_at TEXT, is_active INTEGER)")
         conn.commit()
         return conn
@@ -26,8 +29,9 @@ class TestModelsLeftovers:
         conn = self.setup_db()
         cur = conn.cursor()
         # Injecter plusieurs messages
-        cur.execute("INSERT INTO messages VALUES (1, 2, 'user', 'a', '2024-01-01')")
-        cur.execute("INSERT INTO messages VALUES (1, 2, 'assistant', 'b', '2024-01-02')")
+        insert = "INSERT INTO messages (user_id, campaign_id, role, content, timestamp) VALUES (?, ?, ?, ?, ?)"
+        cur.execute(insert, (1, 2, "user", "a", "2024-01-01"))
+        cur.execute(insert, (1, 2, "assistant", "b", "2024-01-02"))
         conn.commit()
         mock_get_conn.return_value.__enter__.return_value = conn
         msgs = MessageManager.get_campaign_messages(1, 2, 50)
@@ -12,11 +12,12 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 
 class TestPerformanceManagerAdditional:
     def setup_db(self):
+        from src.data.database import DatabaseSchema
+
+        # Schéma complet : les agrégats lus par get_performance_stats sont alimentés par triggers
         conn = sqlite3.connect(":memory:")
-        cur = conn.cursor()
-        cur.execute(
-            "CREATE TABLE performance_logs (user_id INTEGER, campaign_id INTEGER, model TEXT, latency REAL, tokens_in INTEGER, tokens_out INTEGER, cost_estimate REAL, timestamp TEXT)"
-        )
+        DatabaseSchema.create_tables(conn)
+        conn.execute("INSERT INTO users (id, email, password) VALUES (1, 'a@b.c', 'x')")
         conn.commit()
         return conn
 
@@ -26,9 +27,13 @@ class TestPerformanceManagerAdditional:
 
         conn = self.setup_db()
         cur = conn.cursor()
-        cur.execute("INSERT INTO performance_logs VALUES (1,NULL,'GPT-4',1.0,10,5,0.02,'2024-01-01')")
-        cur.execute("INSERT INTO performance_logs VALUES (1,NULL,'GPT-4',2.0,20,10,0.03,'2024-01-02')")
-        cur.execute("INSERT INTO performance_logs VALUES (1,NULL,'GPT-4o',3.0,30,15,0.04,'2024-01-03')")
+        insert = (
+            "INSERT INTO performance_logs (user_id, campaign_id, model, latency, tokens_in, tokens_out, cost_estimate, timestamp)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+        )
+        cur.execute(insert, (1, None, "GPT-4", 1.0, 10, 5, 0.02, 1704067200000))  # 2024-01-01
+        cur.execute(insert, (1, None, "GPT-4", 2.0, 20, 10, 0.03, 1704153600000))  # 2024-01-02
+        cur.execute(insert, (1, None, "GPT-4o", 3.0, 30, 15, 0.04, 1704240000000))  # 2024-01-03
         conn.commit()
         mock_get_conn.return_value.__enter__.return_value = conn
 
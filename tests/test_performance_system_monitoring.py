@@ -8,6 +8,9 @@ from unittest.mock import Mock, patch
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+from src.analytics import system_monitoring as sm
+from src.data.database import epoch_ms
+
 
 class _Col:
     def __enter__(self):
@@ -17,190 +20,87 @@ class _Col:
         return False
 
 
-def _cols(n):
-    return [_Col() for _ in range(n)]
+def _cols(spec):
+    return [_Col() for _ in range(len(spec) if isinstance(spec, list) else spec)]
+
+
+def _snapshot():
+    return {
+        "timestamp": epoch_ms(),
+        "cpu": {
+            "cpu_usage_total": 12.3,
+            "cpu_usage_per_core": [12.3],
+            "cpu_frequency_current": 0,
+            "cpu_frequency_max": 0,
+            "load_average": [0, 0, 0],
+        },
+        "memory": {
+            "memory_total": 1 << 30,
+            "memory_available": 1 << 29,
+            "memory_used": 1 << 29,
+            "memory_percent": 50.0,
+            "swap_total": 0,
+            "swap_used": 0,
+            "swap_percent": 0.0,
+        },
+        "disk": [],
+        "network": {
+            "bytes_recv": 0,
+            "packets_recv": 0,
+            "errin": 0,
+            "dropin": 0,
+            "bytes_sent": 0,
+            "packets_sent": 0,
+            "errout": 0,
+            "dropout": 0,
+            "sent_rate": 0.0,
+            "recv_rate": 0.0,
+        },
+        "process": {
+            "pid": 1,
+            "memory_info": type("mi", (), {"rss": 0, "vms": 0})(),
+            "cpu_percent": 0.0,
+            "create_time": __import__("datetime").datetime.now(),
+            "status": "running",
+            "num_threads": 1,
+        },
+    }
 
 
 class TestSystemMonitoring:
+    @patch("src.analytics.system_monitoring.st")
     @patch("src.analytics.performance.st")
-    def test_system_monitoring_import_error(self, mock_st):
-        # Forcer ImportError via patch du builtins __import__ pour psutil
-        import builtins
-
-        from src.analytics.performance import show_system_monitoring
-
-        real_import = builtins.__import__
-
-        def fake_import(name, *args, **kwargs):
-            if name == "psutil":
-                raise ImportError("no psutil")
-            return real_import(name, *args, **kwargs)
-
-        mock_st.columns.side_effect = _cols
-
-        with patch("builtins.__import__", side_effect=fake_import):
-            show_system_monitoring()
-
-        mock_st.warning.assert_called()
-
-    @patch("src.analytics.performance.st")
-    def test_system_monitoring_success(self, mock_st):
-        from src.analytics.performance import show_system_monitoring
-
-        # Stub de psutil via sys.modules pour que l'import local trouve notre faux module
-        class VM:
-            percent = 50
-            total = 1 << 30
-            available = 1 << 29
-            used = 1 << 29
-
-        class DU:
-            used = 5
-            total = 10
-
-        class FakePsutil:
-            @staticmethod
-            def virtual_memory():
-                return VM()
-
-            @staticmethod
-            def cpu_percent(interval=0.1):
-                return 12.3
-
-            @staticmethod
-            def disk_usage(path):
-                return DU()
-
-        mock_st.columns.side_effect = _cols
-        with patch.dict("sys.modules", {"psutil": FakePsutil()}):
-            show_system_monitoring()
-
-        mock_st.success.assert_called()
-
-    @patch("src.analytics.performance.st")
-    def test_ram_error_branch(self, mock_st):
+    def test_tab_renders_the_shared_sampler_snapshot(self, mock_st, mock_sm_st):
         from src.analytics.performance import show_system_monitoring
 
-        class FakePsutil:
-            @staticmethod
-            def virtual_memory():
-                raise RuntimeError("ram err")
-
-            @staticmethod
-            def cpu_percent(interval=0.1):
-                return 0.0
-
-            @staticmethod
-            def disk_usage(path):
-                class DU:
-                    used = 1
-                    total = 2
+        sampler = Mock(spec=sm.SystemMetricsSampler, interval=5.0, running=True)
+        sampler.latest.return_value = _snapshot()
+        sampler.history_frame.return_value = []
+        mock_sm_st.columns.side_effect = _cols
 
-                return DU()
-
-        mock_st.columns.side_effect = _cols
-        with patch.dict("sys.modules", {"psutil": FakePsutil()}):
+        with patch("src.analytics.performance.get_system_sampler", return_value=sampler), patch.object(
+            sm.psutil, "cpu_percent"
+        ) as cpu_percent:
             show_system_monitoring()
-        # st.metric("💾 RAM utilisée", "Erreur")
-        found_err_metric = any("RAM utilisée" in str(call) and "Erreur" in str(call) for call in mock_st.metric.call_args_list)
-        assert found_err_metric
-
-    @patch("src.analytics.performance.st")
-    def test_cpu_error_branch(self, mock_st):
-        from src.analytics.performance import show_system_monitoring
-
-        class VM:
-            percent = 10
-            total = 2
-            available = 1
-            used = 1
-
-        class FakePsutil:
-            @staticmethod
-            def virtual_memory():
-                return VM()
 
-            @staticmethod
-            def cpu_percent(interval=0.1):
-                raise RuntimeError("cpu err")
-
-            @staticmethod
-            def disk_usage(path):
-                class DU:
-                    used = 1
-                    total = 2
-
-                return DU()
-
-        mock_st.columns.side_effect = _cols
-        with patch.dict("sys.modules", {"psutil": FakePsutil()}):
-            show_system_monitoring()
-        found_cpu_err = any("CPU utilisé" in str(call) and "Erreur" in str(call) for call in mock_st.metric.call_args_list)
-        assert found_cpu_err
+        mock_st.title.assert_called_once()
+        sampler.latest.assert_called()
+        cpu_percent.assert_not_called()  # aucune mesure bloquante sur le thread du script
+        assert any("CPU Global" in str(call) and "12.3%" in str(call) for call in mock_sm_st.metric.call_args_list)
 
+    @patch("src.analytics.system_monitoring.st")
     @patch("src.analytics.performance.st")
-    def test_disk_fallback_and_error(self, mock_st):
+    def test_tab_without_recent_sample_shows_no_data(self, mock_st, mock_sm_st):
         from src.analytics.performance import show_system_monitoring
 
-        class VM:
-            percent = 10
-            total = 2
-            available = 1
-            used = 1
-
-        class FakePsutilFallback:
-            calls = {"slash": True}
-
-            @staticmethod
-            def virtual_memory():
-                return VM()
+        sampler = Mock(spec=sm.SystemMetricsSampler, interval=5.0, running=True)
+        sampler.latest.return_value = None
 
-            @staticmethod
-            def cpu_percent(interval=0.1):
-                return 0.0
-
-            @staticmethod
-            def disk_usage(path):
-                class DU:
-                    used = 1
-                    total = 2
-
-                if path == "/":
-                    raise RuntimeError("no root")
-                return DU()
-
-        mock_st.columns.side_effect = _cols
-        with patch.dict("sys.modules", {"psutil": FakePsutilFallback()}):
-            show_system_monitoring()
-
-        # Maintenant, forcer erreur totale disque
-        class FakePsutilError:
-            @staticmethod
-            def virtual_memory():
-                return VM()
-
-            @staticmethod
-            def cpu_percent(interval=0.1):
-                return 0.0
-
-            @staticmethod
-            def disk_usage(path):
-                raise RuntimeError("disk err")
-
-        mock_st.metric.reset_mock()
-        with patch.dict("sys.modules", {"psutil": FakePsutilError()}):
+        with patch("src.analytics.performance.get_system_sampler", return_value=sampler), patch.object(
+            sm.psutil, "cpu_percent"
+        ) as cpu_percent:
             show_system_monitoring()
-        found_disk_na = any("Disque utilisé" in str(call) and "N/A" in str(call) for call in mock_st.metric.call_args_list)
-        assert found_disk_na
-
-    @patch("src.analytics.performance.st")
-    def test_generic_exception_branch(self, mock_st):
-        from src.analytics.performance import show_system_monitoring
-
-        # Provoquer une exception générique après import
-        def raise_exc(*args, **kwargs):
-            raise RuntimeError("boom")
 
-        mock_st.columns.side_effect = raise_exc
-        show_system_monitoring()
-        mock_st.error.assert_called()
+        mock_sm_st.info.assert_called_once()
+        mock_sm_st.metric.assert_not_called()
+        cpu_percent.assert_not_called()
@@ -0,0 +1,107 @@
+"""
+Tests du writer différé des logs de performance
+"""
+
+import os
+import sys
+import time
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.data.performance_writer import PerformanceLogWriter
+
+
+def record(i=0):
+    return (1, None, "GPT-4", 1.0 + i, 10, 20, None)
+
+
+@patch("src.data.performance_writer.record_performance_sketches")
+@patch("src.data.performance_writer.get_optimized_connection")
+class TestPerformanceLogWriter:
+    def test_flush_writes_batch_with_executemany(self, mock_ctx, mock_sketches):
+        conn = MagicMock()
+        mock_ctx.return_value.__enter__.return_value = conn
+        writer = PerformanceLogWriter(batch_size=10, flush_interval=60)
+
+        for i in range(3):
+            assert writer.enqueue(record(i))
+        assert writer.flush(timeout=2)
+
+        conn.executemany.assert_called_once()
+        assert len(conn.executemany.call_args[0][1]) == 3
+        assert len(mock_sketches.call_args[0][1]) == 3
+        stats = writer.stats()
+        assert stats["written"] == 3
+        assert stats["batches"] == 1
+        assert stats["queue_depth"] == 0
+        writer.shutdown()
+
+    def test_size_trigger_splits_batches(self, mock_ctx, mock_sketches):
+        conn = MagicMock()
+        mock_ctx.return_value.__enter__.return_value = conn
+        writer = PerformanceLogWriter(batch_size=2, flush_interval=60)
+
+        for i in range(4):
+            writer.enqueue(record(i))
+        assert writer.flush(timeout=2)
+
+        assert conn.executemany.call_count == 2
+        writer.shutdown()
+
+    def test_time_trigger_flushes_without_explicit_flush(self, mock_ctx, mock_sketches):
+        conn = MagicMock()
+        mock_ctx.return_value.__enter__.return_value = conn
+        writer = PerformanceLogWriter(batch_size=100, flush_interval=0.05)
+
+        writer.enqueue(record())
+        deadline = time.monotonic() + 2
+        while writer.stats()["written"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert writer.stats()["written"] == 1
+        writer.shutdown()
+
+    def test_shutdown_drains_queue(self, mock_ctx, mock_sketches):
+        conn = MagicMock()
+        mock_ctx.return_value.__enter__.return_value = conn
+        writer = PerformanceLogWriter(batch_size=100, flush_interval=60)
+
+        writer.enqueue(record())
+        writer.shutdown(timeout=2)
+
+        assert writer.stats()["written"] == 1
+        assert not writer.stats()["running"]
+
+    def test_full_queue_drops_record(self, mock_ctx, mock_sketches):
+        writer = PerformanceLogWriter(max_queue_size=1)
+        with patch.object(writer, "_ensure_started"):
+            assert writer.enqueue(record())
+            assert not writer.enqueue(record())
+        assert writer.stats()["dropped"] == 1
+
+    def test_write_failure_is_counted(self, mock_ctx, mock_sketches):
+        mock_ctx.return_value.__enter__.side_effect = Exception("db locked")
+        writer = PerformanceLogWriter(enabled=False)
+
+        writer.enqueue(record())
+
+        assert writer.stats()["failed"] == 1
+
+    def test_integrity_error_falls_back_to_row_by_row(self, mock_ctx, mock_sketches):
+        import sqlite3
+
+        conn = MagicMock()
+        mock_ctx.return_value.__enter__.return_value = conn
+        conn.executemany.side_effect = sqlite3.IntegrityError("FOREIGN KEY constraint failed")
+        conn.execute.side_effect = [None, sqlite3.IntegrityError("FOREIGN KEY constraint failed")]
+        writer = PerformanceLogWriter(batch_size=10, flush_interval=60)
+
+        writer.enqueue(record(0))
+        writer.enqueue(record(1))
+        assert writer.flush(timeout=2)
+
+        stats = writer.stats()
+        assert stats["written"] == 1
+        assert stats["failed"] == 1
+        writer.shutdown()
@@ -0,0 +1,106 @@
+"""
+Non-régression des plans d'exécution des requêtes chaudes (src.data.query_plans)
+"""
+
+import os
+import sqlite3
+import sys
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.data.query_plans import (
+    HOT_QUERIES,
+    HotQuery,
+    analyze_hot_queries,
+    find_plan_issues,
+    format_report,
+    seed_database,
+    suggest_covering_index,
+)
+
+
+@pytest.fixture(scope="module")
+def seeded_conn():
+    conn = sqlite3.connect(":memory:")
+    seed_database(conn, users=100, messages=10000, performance_logs=10000)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_an_index(seeded_conn, name):
+    (report,) = analyze_hot_queries(seeded_conn, [HOT_QUERIES[name]])
+    assert report.ok, format_report([report])
+
+
+class TestPlanIssues:
+    def test_full_scan_and_temp_btree_are_flagged(self):
+        plan = ["SCAN messages", "USE TEMP B-TREE FOR ORDER BY"]
+        issues = find_plan_issues(plan)
+        assert len(issues) == 2
+
+    def test_full_index_scan_is_flagged(self):
+        assert find_plan_issues(["SCAN users USING COVERING INDEX idx_users_email"])
+
+    def test_allowed_temp_btree_is_ignored(self):
+        plan = ["SEARCH performance_logs USING INDEX idx (user_id=?)", "USE TEMP B-TREE FOR ORDER BY"]
+        assert find_plan_issues(plan, allowed_temp_btrees=("ORDER BY",)) == []
+        assert find_plan_issues(plan + ["USE TEMP B-TREE FOR GROUP BY"], allowed_temp_btrees=("ORDER BY",))
+
+    def test_suggested_index_orders_equality_then_sort_then_columns(self):
+        query = HotQuery(
+            name="t",
+            sql="SELECT b FROM t WHERE a = ? ORDER BY c",
+            params=(1,),
+            table="t",
+            equality=("a",),
+            order_by=("c",),
+            columns=("b", "a"),
+        )
+        assert suggest_covering_index(query) == "CREATE INDEX IF NOT EXISTS idx_t_a_c_b ON t(a, c, b)"
+
+    def test_dropped_index_is_reported_with_suggestion(self, tmp_path):
+        conn = sqlite3.connect(str(tmp_path / "plans.db"))
+        seed_database(conn, users=20, messages=500, performance_logs=500)
+        conn.execute("DROP INDEX idx_campaigns_user_active_updated")
+
+        (report,) = analyze_hot_queries(conn, [HOT_QUERIES["campaigns.active_for_user"]])
+        conn.close()
+
+        assert not report.ok
+        assert "USE TEMP B-TREE FOR ORDER BY" in report.issues[0]
+        assert report.suggestion.endswith("ON campaigns(user_id, is_active, updated_at)")
+
+
+def test_registry_matches_the_sql_the_app_executes(tmp_path):
+    from src.analytics.performance import get_performance_data
+    from src.data import database, models, rollups
+    from src.data.query_stats import normalize_sql
+
+    with patch("src.data.database.get_db_path", return_value=tmp_path / "app.db"):
+        database.init_optimized_db()
+        models._model_cache.clear()
+        database.reset_query_stats()
+        models.UserManager.get_user_by_id(1)
+        models.ModelChoiceManager.get_user_model_choice(1)
+        models.CampaignManager.get_user_campaigns(1)
+        models.CharacterManager.get_user_characters(1)
+        models.MessageManager.get_campaign_messages(1)
+        models.MessageManager.get_campaign_messages(1, campaign_id=1)
+        models.PerformanceManager.get_performance_stats(1)
+        models.CacheCoherence._load(1)
+        rollups.get_model_stats(1, 7)
+        rollups.get_rollups(1, 365)
+        rollups.get_latency_percentiles(1, 30)
+        get_performance_data(1, limit=1000)
+        executed = {stat["sql"] for stat in database.get_query_stats(top_n=500)}
+        database.DatabaseConnection.close_all_connections()
+    models._model_cache.clear()
+    database.reset_query_stats()
+
+    # La connexion (src.auth.auth) passe par Streamlit : seule requête non exécutée ici
+    missing = [name for name, query in HOT_QUERIES.items() if normalize_sql(query.sql) not in executed]
+    assert missing == ["users.by_email"]
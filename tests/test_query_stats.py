@@ -0,0 +1,83 @@
+"""
+Tests de l'instrumentation des requêtes SQL (src.data.query_stats)
+"""
+
+import logging
+import os
+import sqlite3
+import sys
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.data import database
+from src.data.query_stats import OTHER_STATEMENTS, InstrumentedConnection, QueryStats, normalize_sql, query_stats
+
+
+@pytest.fixture
+def conn():
+    query_stats.reset()
+    connection = sqlite3.connect(":memory:", factory=InstrumentedConnection)
+    connection.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+    connection.executemany("INSERT INTO t (name) VALUES (?)", [("a",), ("b",), ("c",)])
+    yield connection
+    connection.close()
+    query_stats.reset()
+
+
+def test_normalize_sql_replaces_literals_and_whitespace():
+    sql = """
+        SELECT * FROM t
+        WHERE id IN (?, ?, ?) AND name = 'x''y' AND n > 42
+    """
+    assert normalize_sql(sql) == "SELECT * FROM t WHERE id IN (?...) AND name = ? AND n > ?"
+
+
+def test_execute_and_fetch_are_recorded_with_caller(conn):
+    conn.execute("SELECT id FROM t WHERE id > 1").fetchall()
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM t WHERE id > 2")
+    cursor.fetchone()
+
+    (select,) = [s for s in query_stats.top() if s["sql"].startswith("SELECT")]
+    assert select["sql"] == "SELECT id FROM t WHERE id > ?"
+    assert select["calls"] == 2
+    assert select["rows"] == 3
+    assert sum(select["histogram"].values()) == 2
+    assert list(select["callers"]) == [f"{__name__}.test_execute_and_fetch_are_recorded_with_caller"]
+
+    (insert,) = [s for s in query_stats.top() if s["sql"].startswith("INSERT")]
+    assert insert["rows"] == 3
+
+
+def test_slow_queries_are_logged(conn, caplog):
+    with patch.object(query_stats, "slow_query_ms", 0.0):
+        with caplog.at_level(logging.WARNING, logger="src.data.slow_queries"):
+            conn.execute("SELECT COUNT(*) FROM t").fetchone()
+
+    assert any("SELECT COUNT(*) FROM t" in record.getMessage() for record in caplog.records)
+
+
+def test_top_orders_and_bounds_statements():
+    stats = QueryStats(slow_query_ms=1e9, max_statements=2)
+    stats.record("SELECT 1", 0.001, 0, "a")
+    stats.record("SELECT a FROM x", 0.010, 0, "a")
+    stats.record("SELECT b FROM y", 0.020, 0, "b")
+
+    top = stats.top(n=2)
+    assert [s["sql"] for s in top] == [OTHER_STATEMENTS, "SELECT a FROM x"]
+    assert stats.top(order_by="calls")[0]["calls"] == 1
+
+
+def test_pool_connections_are_instrumented(tmp_path):
+    database.reset_query_stats()
+    with patch("src.data.database.get_db_path", return_value=tmp_path / "stats.db"):
+        with database.get_optimized_connection() as connection:
+            assert isinstance(connection, InstrumentedConnection)
+            connection.execute("CREATE TABLE IF NOT EXISTS t (id INTEGER)")
+        database.DatabaseConnection.close_all_connections()
+
+    assert any(s["sql"].startswith("CREATE TABLE") for s in database.get_query_stats())
+    database.reset_query_stats()
@@ -0,0 +1,58 @@
+"""
+Tests des agrégats de performance (src.data.rollups)
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.data import database, rollups
+from src.data.database import days_ago_ms
+
+
+@pytest.fixture
+def rollup_db(user_db):
+    with database.get_optimized_connection() as conn:
+        conn.executemany(
+            "INSERT INTO performance_logs (user_id, model, latency, tokens_in, tokens_out, timestamp) "
+            "VALUES (1, ?, ?, 100, 50, ?)",
+            [("GPT-4o", 1.0, days_ago_ms(1)), ("GPT-4o", 3.0, days_ago_ms(1)), ("DeepSeek", 2.0, days_ago_ms(60))],
+        )
+
+
+def test_get_rollups_reads_window(rollup_db):
+    recent = rollups.get_rollups(1, days=7)
+    assert [(r["model"], r["count"], r["latency_sum"]) for r in recent] == [("GPT-4o", 2, 4.0)]
+    assert len(rollups.get_rollups(1, days=90)) == 2
+    assert all(r["bucket"] % (3600 * 1000) == 0 for r in rollups.get_rollups(1, days=90, granularity="hourly"))
+
+
+def test_get_model_stats_aggregates_in_sql(rollup_db):
+    (stats,) = rollups.get_model_stats(1, days=7)
+    assert stats == {
+        "model": "GPT-4o",
+        "count": 2,
+        "latency": 2.0,
+        "latency_min": 1.0,
+        "latency_max": 3.0,
+        "tokens_in": 200,
+        "tokens_out": 100,
+        "cost": 0.0,  # logs insérés sans cost_estimate
+    }
+    assert [s["model"] for s in rollups.get_model_stats(1, days=90)] == ["GPT-4o", "DeepSeek"]
+
+
+def test_backfill_command_rebuilds_rollups(rollup_db, capsys):
+    with database.get_optimized_connection() as conn:
+        conn.execute("DELETE FROM performance_rollup_daily")
+        conn.execute("DELETE FROM performance_rollup_hourly")
+
+    assert rollups.main(["backfill", "--days", "7"]) == 0
+    assert "seaux écrits" in capsys.readouterr().out
+    assert len(rollups.get_rollups(1, days=90)) == 1
+
+    rollups.backfill_performance_rollups()
+    assert len(rollups.get_rollups(1, days=90)) == 2
@@ -0,0 +1,110 @@
+"""
+Tests de l'attribution des ressources par session (src.analytics.session_resources)
+"""
+
+import os
+import sqlite3
+import sys
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.analytics.session_resources import (
+    SessionResourceConfig,
+    SessionResources,
+    add_db_time,
+    approximate_size,
+    is_resource_admin,
+    provider_wait,
+    session_resources,
+    track_page,
+)
+from src.data.query_stats import InstrumentedConnection
+
+
+@pytest.fixture(autouse=True)
+def clean_resources():
+    session_resources.reset()
+    yield
+    session_resources.reset()
+
+
+def test_track_page_attributes_db_and_provider_time():
+    conn = sqlite3.connect(":memory:", factory=InstrumentedConnection)
+    state = {"history": [{"role": "user", "content": "x" * 1000}]}
+
+    with track_page("s1", "chatbot", state) as usage:
+        conn.execute("CREATE TABLE t (v)")
+        conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(100)])
+        conn.execute("SELECT * FROM t").fetchall()
+        with provider_wait():
+            time.sleep(0.02)
+    conn.close()
+
+    assert usage.db_s > 0
+    assert usage.provider_s >= 0.02
+    (session,) = session_resources.top_sessions()
+    assert session["session_id"] == "s1"
+    assert session["runs"] == 1
+    assert session["wall_s"] >= session["provider_s"] >= 0.02
+    assert session["db_s"] == pytest.approx(usage.db_s, abs=1e-6)
+    assert session["state_bytes"] > 1000
+    assert session["last_page"] == "chatbot"
+
+
+def test_time_outside_a_page_is_not_attributed():
+    add_db_time(1.0)
+    with provider_wait():
+        pass
+    assert session_resources.top_sessions() == []
+
+
+def test_run_is_recorded_when_page_raises():
+    with pytest.raises(ValueError):
+        with track_page("s1", "dashboard"):
+            raise ValueError("boom")
+    assert session_resources.page_stats()[0]["runs"] == 1
+
+
+def test_aggregates_per_session_and_page_with_bounded_sessions():
+    resources = SessionResources(max_sessions=2)
+    resources.record("a", "chatbot", 1.0, 2.0, 0.1, 1.5, 100)
+    resources.record("b", "dashboard", 0.2, 0.3, 0.1, 0.0, 50)
+    resources.record("a", "dashboard", 0.5, 0.6, 0.2, 0.0, 120)
+    resources.record("c", "chatbot", 0.1, 0.1, 0.0, 0.0, 10)
+
+    sessions = resources.top_sessions()
+    assert [row["session_id"] for row in sessions] == ["a", "c"]  # "b" évincée (la moins récente)
+    assert sessions[0]["cpu_s"] == pytest.approx(1.5)
+    assert sessions[0]["state_bytes"] == 120
+
+    pages = {row["page"]: row for row in resources.page_stats()}
+    assert pages["dashboard"]["runs"] == 2
+    assert pages["chatbot"]["provider_s"] == pytest.approx(1.5)
+    assert resources.page_stats(order_by="runs")[0]["page"] in {"chatbot", "dashboard"}
+
+
+def test_approximate_size_handles_shared_and_cyclic_references():
+    shared = ["x" * 100]
+    data = {"a": shared, "b": shared}
+    data["self"] = data
+    # La liste partagée n'est comptée qu'une fois
+    assert approximate_size(data) < approximate_size({"a": shared, "b": ["x" * 100], "self": None})
+    assert approximate_size(Mock()) > 0
+
+
+def test_disabled_tracking_records_nothing():
+    with patch.object(SessionResourceConfig, "ENABLED", False):
+        with track_page("s1", "chatbot"):
+            pass
+    assert session_resources.top_sessions() == []
+
+
+def test_is_resource_admin():
+    with patch.object(SessionResourceConfig, "ADMIN_EMAILS", {"admin@example.com"}):
+        assert is_resource_admin("Admin@Example.com")
+        assert not is_resource_admin("user@example.com")
+        assert not is_resource_admin(None)
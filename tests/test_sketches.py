@@ -0,0 +1,83 @@
+"""
+Tests des sketches de quantiles (src.data.sketches)
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.data import database, rollups
+from src.data.database import days_ago_ms
+from src.data.sketches import QuantileSketch, merge_sketches, record_performance_sketches
+
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def test_quantiles_within_relative_accuracy():
+    rng = random.Random(0)
+    values = [rng.lognormvariate(0, 1) for _ in range(20000)]
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+
+    for q in (0.5, 0.9, 0.99):
+        expected = exact_quantile(values, q)
+        assert abs(sketch.quantile(q) - expected) <= 0.01 * expected
+    assert sketch.count == len(values)
+    assert sketch.mean == pytest.approx(sum(values) / len(values))
+
+
+def test_merge_equals_single_sketch_and_survives_serialization():
+    rng = random.Random(1)
+    values = [rng.uniform(0.1, 10) for _ in range(2000)] + [0.0]
+    whole, left, right = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for i, value in enumerate(values):
+        whole.add(value)
+        (left if i % 2 else right).add(value)
+
+    merged = merge_sketches([left.to_bytes(), right.to_bytes()])
+    assert merged.bins == whole.bins
+    assert merged.zero_count == whole.zero_count == 1
+    assert [merged.quantile(q) for q in (0, 0.5, 1)] == [whole.quantile(q) for q in (0, 0.5, 1)]
+    assert merge_sketches([]).quantile(0.5) is None
+
+    with pytest.raises(ValueError):
+        whole.merge(QuantileSketch(relative_accuracy=0.05))
+
+
+def test_percentiles_from_recorded_sketches(user_db):
+    recent, old = days_ago_ms(1), days_ago_ms(60)
+    with database.get_optimized_connection() as conn:
+        record_performance_sketches(conn, [(1, "GPT-4o", float(i), 100, recent) for i in range(1, 101)])
+        record_performance_sketches(conn, [(1, "GPT-4o", 50.0, 100, recent), (1, "DeepSeek", 2.0, 40, old)])
+        assert conn.execute("SELECT COUNT(*) FROM performance_sketches").fetchone()[0] == 4
+
+    (latency, throughput) = rollups.get_latency_percentiles(1, days=7)
+    assert (latency["model"], latency["metric"], latency["count"]) == ("GPT-4o", "latency", 101)
+    assert latency["p50"] == pytest.approx(50, rel=0.01)
+    assert latency["p99"] == pytest.approx(99, rel=0.01)
+    assert throughput["metric"] == "tokens_per_second"
+    expected = exact_quantile([100 / i for i in range(1, 101)] + [2.0], 0.9)
+    assert throughput["p90"] == pytest.approx(expected, rel=0.01)
+    assert {row["model"] for row in rollups.get_latency_percentiles(1, days=90)} == {"GPT-4o", "DeepSeek"}
+
+
+def test_backfill_rebuilds_sketches_from_logs(user_db):
+    with database.get_optimized_connection() as conn:
+        conn.executemany(
+            "INSERT INTO performance_logs (user_id, model, latency, tokens_in, tokens_out, timestamp) "
+            "VALUES (1, 'GPT-4o', ?, 10, 20, ?)",
+            [(latency, days_ago_ms(1)) for latency in (1.0, 2.0, 4.0)],
+        )
+
+    rollups.backfill_performance_rollups()
+    (latency, _) = rollups.get_latency_percentiles(1, days=7)
+    assert latency["count"] == 3
+    assert latency["p50"] == pytest.approx(2.0, rel=0.01)
@@ -0,0 +1,130 @@
+"""
+Tests de l'échantillonneur système (src.analytics.system_monitoring.SystemMetricsSampler)
+"""
+
+import os
+import sys
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.analytics import system_monitoring as sm
+from src.data import database
+
+
+@pytest.fixture
+def fake_stats():
+    """Collecteurs psutil remplacés par des valeurs déterministes (réseau cumulatif croissant)."""
+    network = {"bytes_sent": 0, "bytes_recv": 0}
+
+    def get_network_stats():
+        network["bytes_sent"] += 1000
+        network["bytes_recv"] += 4000
+        return dict(network)
+
+    with patch.object(sm, "get_cpu_stats", return_value={"cpu_usage_total": 40.0, "cpu_usage_per_core": [40.0]}), patch.object(
+        sm,
+        "get_memory_stats",
+        return_value={"memory_percent": 60.0, "swap_percent": 0.0},
+    ), patch.object(sm, "get_disk_stats", return_value=[{"percent": 10.0}, {"percent": 30.0}]), patch.object(
+        sm, "get_network_stats", side_effect=get_network_stats
+    ), patch.object(
+        sm,
+        "get_streamlit_process_info",
+        return_value={"memory_info": SimpleNamespace(rss=1024), "cpu_percent": 5.0, "num_threads": 3},
+    ):
+        yield
+
+
+def test_sample_appends_history_and_computes_network_rates(fake_stats):
+    sampler = sm.SystemMetricsSampler(history=10)
+    clock = iter([1_000_000, 1_002_000])
+    with patch.object(sm, "epoch_ms", side_effect=lambda: next(clock)):
+        first = sampler.sample()
+        second = sampler.sample()
+
+    assert first["network"]["sent_rate"] == 0.0
+    assert second["network"]["sent_rate"] == pytest.approx(500.0)
+    assert second["network"]["recv_rate"] == pytest.approx(2000.0)
+    assert sampler.latest() is second
+
+    history = sampler.history_frame()
+    assert len(history) == 2
+    assert history["disk_percent"].tolist() == [20.0, 20.0]
+    assert history["process_rss"].iloc[-1] == 1024
+
+
+def test_history_is_bounded(fake_stats):
+    sampler = sm.SystemMetricsSampler(history=3)
+    for _ in range(5):
+        sampler.sample()
+    assert len(sampler.history) == 3
+
+
+def test_persist_history_writes_complete_minutes(fake_stats, tmp_path):
+    with patch("src.data.database.get_db_path", return_value=tmp_path / "sysmon.db"):
+        database.init_optimized_db()
+        sampler = sm.SystemMetricsSampler(history=10)
+        sampler._persisted_until = 0
+        minute = (database.epoch_ms() // 60000 - 2) * 60000
+        for offset, cpu in ((0, 20.0), (30000, 40.0), (60000, 90.0)):
+            with patch.object(sm, "epoch_ms", return_value=minute + offset):
+                sampler.sample()
+            sampler.history._columns["cpu_percent"][len(sampler.history) - 1] = cpu
+
+        assert sampler.persist_history() == 2
+        assert sampler.persist_history() == 0
+        with database.get_readonly_connection() as conn:
+            rows = conn.execute("SELECT minute, samples, cpu_percent FROM system_metrics ORDER BY minute").fetchall()
+        assert [tuple(row) for row in rows] == [(minute, 2, 30.0), (minute + 60000, 1, 90.0)]
+
+        history = sm.get_persisted_history(hours=1)
+        assert history["cpu_percent"].tolist() == [30.0, 90.0]
+        database.DatabaseConnection.close_all_connections()
+
+
+def test_start_and_stop_background_thread(fake_stats):
+    sampler = sm.SystemMetricsSampler(interval=0.01, history=100)
+    sampler.start()
+    try:
+        assert sampler.running
+        sampler._stop.wait(0.1)
+    finally:
+        sampler.stop()
+    assert not sampler.running
+    assert len(sampler.history) >= 1
+
+
+def test_snapshot_never_samples_on_script_thread_when_sampler_disabled():
+    sampler = sm.SystemMetricsSampler(history=10)
+    results = []
+    with patch.object(sm.SamplerConfig, "ENABLED", False), patch.object(sm, "get_cpu_stats") as get_cpu_stats:
+        for _ in range(3):  # chaque exécution de script Streamlit a son propre thread
+            thread = threading.Thread(target=lambda: results.append(sm.current_snapshot(sampler)))
+            thread.start()
+            thread.join()
+
+    assert results == [None, None, None]  # « pas de données » plutôt qu'une mesure CPU à 0
+    get_cpu_stats.assert_not_called()
+    assert len(sampler.history) == 0
+    assert not sampler.running
+
+
+def test_snapshot_restarts_a_stopped_sampler_and_measures_on_its_thread(fake_stats):
+    threads = []
+    sampler = sm.SystemMetricsSampler(interval=0.01, history=10)
+    with patch.object(sm.SamplerConfig, "ENABLED", True), patch.object(
+        sm, "get_cpu_stats", side_effect=lambda: threads.append(threading.current_thread().name) or {"cpu_usage_total": 40.0}
+    ):
+        try:
+            assert sm.current_snapshot(sampler) is None  # premier échantillon pas encore pris
+            assert sampler.running
+            sampler._stop.wait(0.1)
+            assert sm.current_snapshot(sampler)["cpu"]["cpu_usage_total"] == 40.0
+        finally:
+            sampler.stop()
+    assert set(threads) == {"system-metrics-sampler"}
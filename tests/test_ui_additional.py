@@ -60,22 +60,17 @@ class TestChatbotAdditional:
         mock_cursor.execute.assert_called()
         mock_conn.commit.assert_called()
 
-    @patch("src.ai.chatbot.get_connection")
-    def test_store_performance_basic(self, mock_get_connection):
-        """Test stockage performance basique."""
+    @patch("src.ai.chatbot.enqueue_performance")
+    def test_store_performance_basic(self, mock_enqueue):
+        """Test stockage performance basique (mise en file pour écriture différée)."""
         from src.ai.chatbot import store_performance
 
-        mock_conn = Mock()
-        mock_cursor = Mock()
-        mock_conn.cursor.return_value = mock_cursor
-        mock_conn.__enter__ = Mock(return_value=mock_conn)
-        mock_conn.__exit__ = Mock(return_value=None)
-        mock_get_connection.return_value = mock_conn
-
         store_performance(1, "gpt-4", 1.5, 100, 200)
 
-        mock_cursor.execute.assert_called()
-        mock_conn.commit.assert_called()
+        # Coût estimé persisté avec le log (tarifs de models_config)
+        from src.ai.models_config import calculate_estimated_cost
+
+        mock_enqueue.assert_called_once_with(1, "gpt-4", 1.5, 100, 200, None, calculate_estimated_cost("gpt-4", 100, 200))
 
     @patch("src.data.models.get_user_model_choice")
     def test_get_last_model_basic(self, mock_get_user_model_choice):